@@ -12,91 +12,100 @@
 #include <errno.h>
 #include <stdlib.h>  // for strtol
 #include <stdbool.h>
+#include <signal.h>
+#include <poll.h>
+#include <sys/eventfd.h>
 
-int epr_buffer = 0; // IN QUBYTES
-
+#include "control.h"
+#include "epr_pool.h"
+#include "link.h"
+#include "trace.h"
 
 //Should be collected from command line arguments
-int epr_frame_size = 10000; // IN QUBYTES
-int epr_buffer_size = 250000; // IN QUBYTES
-int sleep_time = 500000000; // IN NANOSECONDS
-int single_transmission_delay = 1000; //IN NANOSECONDS 1000->1mbit/s
-bool allow_epr = true;
-int buffer_size = 2500; //IN PACKETS
-
-
-pthread_t tid[2];
-
-/* msleep(): Sleep for the requested number of miliseconds. */
-int msleep(long msec)
-{
-  struct timespec ts;
-  int res;
-
-  if (msec < 0)
-    {
-      errno = EINVAL;
-      return -1;
-    }
-
-  int sec = 0;
-  if (msec >= 1000000000){
-    sec = (int)(msec/1000000000);
-    msec = msec % 1000000000;
+struct link_params params = {
+  .epr_frame_size = 10000, // IN QUBYTES
+  .epr_buffer_size = 250000, // IN QUBYTES
+  .sleep_time = 500000000, // IN NANOSECONDS
+  .single_transmission_delay = 1000, //IN NANOSECONDS 1000->1mbit/s
+  .buffer_size = 2500, //IN PACKETS
+};
+// Unix socket the control thread listens on, none if NULL
+const char *control_path = NULL;
+// Packets are traced to a ring that is written to this file on SIGUSR1 and exit, no tracing if NULL
+const char *trace_path = NULL;
+size_t trace_capacity = 1 << 16; //IN RECORDS
+
+// Queues served by the bridge, one direction of the link each (-q 0,1)
+#define MAX_DIRECTIONS 8
+// Directions draw from one EPR pool, unless -p gives each its own
+bool shared_epr_pool = true;
+// How long the control thread waits for a reception thread to apply a request
+#define REQUEST_TIMEOUT_S 2
+
+/* One direction of the link: netfilter queue, reception thread and the link model */
+struct direction {
+  uint16_t queue;
+  uint8_t index;
+  // Scheduler, counters and parameters, packets wait in its scheduler for the verdict thread
+  struct link link;
+  struct nfq_handle *handle;
+  struct nfq_q_handle *queue_handle;
+  pthread_t thread;
+  // Only the reception thread talks to the nfq handle, the control thread leaves requests here
+  int wake_fd; // eventfd, polled together with the netlink socket
+  atomic_uint requested_maxlen;
+  pthread_mutex_t request_lock;
+  pthread_cond_t request_done;
+  uint64_t requests, replies; // Guarded by request_lock
+  int reply;
+};
+
+struct direction directions[MAX_DIRECTIONS];
+size_t direction_count = 0;
+// EPR buffers, their level is computed from timestamps when packets arrive
+struct epr_pool epr_pools[MAX_DIRECTIONS];
+struct link *links[MAX_DIRECTIONS];
+struct link_group link_group;
+struct control_server control;
+struct trace_ring trace;
+
+
+pthread_t signal_thread;
+
+/* Transmission of a packet that arrived at arrival, starts when the link of its direction is free */
+uint64_t transmission_delay(struct direction *d, u_int32_t id, int length, uint64_t arrival){
+  struct transmission t;
+
+  uint64_t departure = link_transmit(&d->link, id, arrival, length, &t);
+  if (trace_path && departure != UINT64_MAX) {
+    struct trace_record record = {
+      .arrival = arrival,
+      .departure = departure,
+      .delay = t.delay,
+      .length = length,
+      .epr_before = t.epr_before,
+      .epr_after = t.epr_after,
+      .mode = t.mode,
+      .link = d->index,
+    };
+    trace_add(&trace, &record);
   }
-  ts.tv_sec =  sec; //msec / 1000;
-  ts.tv_nsec = msec; //(msec % 1000) * 1000000;
 
-  do {
-    res = nanosleep(&ts, &ts);
-  } while (res && errno == EINTR);
-
-  return res;
-}
-
-u_int32_t transmission_delay(int length){
-  int delay;
-
-  printf("Packet length %d\n", length);
-  printf("Avaliable EPRs in buffer %d\n", epr_buffer);
-  if(length<2*epr_buffer){
-    printf("LENGTH < EPR_BUFFER\n");
-    delay = length * 4;
-    epr_buffer -= length/2;
-  }else if(epr_buffer == 0){
-    printf("EPR BUFFER == 0\n");
-    delay = length * 8;
-  }else{
-    printf("LENGTH > EPR_BUFFER\n");
-    delay = epr_buffer * 4 + (length-2*epr_buffer)*8;
-    epr_buffer = 0;
-  }
-  delay = delay * single_transmission_delay;
-  printf("The packet should be delayed for %d ms\n", delay);
-
-  return delay; // Returns delay in miliseconds
+  return departure;
 }
 
-struct timespec start, end, med;
-
-static u_int32_t print_pkt (struct nfq_data *tb)
+static u_int32_t print_pkt (struct direction *d, struct nfq_data *tb, uint64_t arrival, uint64_t *departure)
 {
 	int id = 0;
 	struct nfqnl_msg_packet_hdr *ph;
 	struct nfqnl_msg_packet_hw *hwph;
-	u_int32_t mark,ifi; 
 	int ret;
 	char *data;
 
-  clock_gettime(CLOCK_MONOTONIC_RAW, &start);
-
-
-
 	ph = nfq_get_msg_packet_hdr(tb);
 
 	if (ph) {
 		id = ntohl(ph->packet_id);
-    printf("Protocol in header %d\n", ph->hw_protocol);
 		//printf("hw_protocol=0x%04x hook=%u id=%u ",
 		//	ntohs(ph->hw_protocol), ph->hook, id);
 	}
@@ -104,64 +113,136 @@ static u_int32_t print_pkt (struct nfq_data *tb)
 	hwph = nfq_get_packet_hw(tb);
   int header_size = 0;
 	if (hwph) {
-		int i, hlen = ntohs(hwph->hw_addrlen);
+		int hlen = ntohs(hwph->hw_addrlen);
 
-    printf("hlen = %d", hlen);
     header_size = 2*hlen + 2;
-
-		//printf("hw_src_addr=");
-		//for (i = 0; i < hlen-1; i++)
-			//printf("%02x:", hwph->hw_addr[i]);
-		//printf("%02x ", hwph->hw_addr[hlen-1]);
 	}
 
 
 	ret = nfq_get_payload(tb, &data);
-   //printf("LENGTH=%d \n", ret);
 
-  printf("payload=%d \n",ret);
-  int delay;
+  *departure = transmission_delay(d, id, header_size+ret, arrival);
 
-  delay = transmission_delay(header_size+ret);
+	return id;
+}
 
-  //printf("Delaying");
-  //Should prevent from EPR Formaiton
-  clock_gettime(CLOCK_MONOTONIC_RAW, &end);
+/* Verdict thread: packets leave the link when their transmission ended */
+static void release_pkt(void *ctx, uint32_t id)
+{
+  struct nfq_q_handle *qh = ctx;
+  nfq_set_verdict(qh, id, NF_ACCEPT, 0, NULL);
+}
 
-  uint64_t delta_ns = (end.tv_sec - start.tv_sec) * 1000000000 + (end.tv_nsec - start.tv_nsec);
+/* Control thread: classical buffer size of a direction changed, waits until its reception thread applied it */
+static int set_buffer_size(void *ctx, uint32_t packets)
+{
+  struct direction *d = ctx;
+  struct timespec deadline;
+  uint64_t request;
+  int res = -1;
+
+  pthread_mutex_lock(&d->request_lock);
+  atomic_store(&d->requested_maxlen, packets);
+  request = ++d->requests;
+  pthread_mutex_unlock(&d->request_lock);
+  if (eventfd_write(d->wake_fd, 1) < 0)
+    return -1;
+
+  clock_gettime(CLOCK_REALTIME, &deadline);
+  deadline.tv_sec += REQUEST_TIMEOUT_S;
+  pthread_mutex_lock(&d->request_lock);
+  while (d->replies < request &&
+         pthread_cond_timedwait(&d->request_done, &d->request_lock, &deadline) != ETIMEDOUT)
+    ;
+  if (d->replies >= request)
+    res = d->reply;
+  pthread_mutex_unlock(&d->request_lock);
+  return res;
+}
 
+/* Reception thread: applies the latest request of the control thread, between two recv() calls */
+static void apply_requests(struct direction *d)
+{
+  eventfd_t count;
+  uint64_t request;
+  int res;
 
-  //delay = delay-delta_ns;
-  msleep(delay);
-	//fputc('\n', stdout);
+  if (eventfd_read(d->wake_fd, &count) < 0)
+    return;
+  pthread_mutex_lock(&d->request_lock);
+  request = d->requests;
+  pthread_mutex_unlock(&d->request_lock);
 
-	return id;
-}
+  res = nfq_set_queue_maxlen(d->queue_handle, atomic_load(&d->requested_maxlen));
 
+  pthread_mutex_lock(&d->request_lock);
+  d->replies = request;
+  d->reply = res;
+  pthread_cond_broadcast(&d->request_done);
+  pthread_mutex_unlock(&d->request_lock);
+}
 
+/* Control thread: packets the kernel dropped from the queue of a direction (full queue, netlink overruns) */
+static uint64_t kernel_drops(void *ctx)
+{
+  struct direction *d = ctx;
+  unsigned int queue, portid, total, mode, range, queue_dropped, user_dropped, seq, one;
+  uint64_t drops = 0;
+  FILE *f = fopen("/proc/net/netfilter/nfnetlink_queue", "r");
+
+  if (!f)
+    return 0;
+  while (fscanf(f, "%u %u %u %u %u %u %u %u %u", &queue, &portid, &total, &mode, &range,
+                &queue_dropped, &user_dropped, &seq, &one) == 9) {
+    if (queue == d->queue)
+      drops = (uint64_t)queue_dropped + user_dropped;
+  }
+  fclose(f);
+  return drops;
+}
 
 static int cb(struct nfq_q_handle *qh, struct nfgenmsg *nfmsg, struct nfq_data *nfa, void *data)
 {
-  static int64_t biggest_delay = 0;
-  static int delay_ticker = 0;
-	u_int32_t id = print_pkt(nfa);
-	//u_int32_t id;
-  struct nfqnl_msg_packet_hdr *ph;
-	ph = nfq_get_msg_packet_hdr(nfa);	
-	id = ntohl(ph->packet_id);
-	//printf("entering callback\n");
-
-	return nfq_set_verdict(qh, id, NF_ACCEPT, 0, NULL);
+  uint64_t departure;
+  uint64_t arrival = monotonic_ns();
+  // Reception goes on while the packet is transmitted, the scheduler keeps the link serial
+	u_int32_t id = print_pkt(data, nfa, arrival, &departure);
+
+  if (departure == UINT64_MAX)
+    return nfq_set_verdict(qh, id, NF_ACCEPT, 0, NULL);
+  return 0;
+}
+
+
+static void dump_trace(void)
+{
+  long count = trace_dump(&trace, trace_path);
+  if (count < 0)
+    perror("error writing trace");
+  else
+    printf("%ld trace records written to %s\n", count, trace_path);
 }
 
+/* Handles SIGUSR1 (dump trace) and SIGINT/SIGTERM (dump trace and exit), they are blocked in all other threads */
+void *signalThread(void *arg)
+{
+  sigset_t *signals = arg;
+  int sig;
+
+  while (sigwait(signals, &sig) == 0) {
+    if (trace_path)
+      dump_trace();
+    if (sig != SIGUSR1)
+      exit(0);
+  }
+  return NULL;
+}
 
-void *packetProcessingThread()
+/* Binds the queue of a direction, queues are opened one after another before any thread runs */
+static void open_queue(struct direction *d)
 {
 	struct nfq_handle *h;
 	struct nfq_q_handle *qh;
-	int fd;
-	int rv;
-	char buf[4096] __attribute__ ((aligned));
 
 	//printf("opening library handle\n");
 	h = nfq_open();
@@ -182,15 +263,15 @@ void *packetProcessingThread()
 		exit(1);
 	}
 
-	printf("binding this socket to queue '0'\n");
-	qh = nfq_create_queue(h,  0, &cb, NULL);
+	printf("binding this socket to queue '%u'\n", d->queue);
+	qh = nfq_create_queue(h, d->queue, &cb, d);
 	if (!qh) {
 		fprintf(stderr, "error during nfq_create_queue()\n");
 		exit(1);
 	}
 
   printf("Setting queue length!\n");
-  if(nfq_set_queue_maxlen(qh, buffer_size)<0){
+  if(nfq_set_queue_maxlen(qh, params.buffer_size)<0){
 		fprintf(stderr, "error during nfq_set_queue_maxlen()\n");
 		exit(1);
   }
@@ -201,79 +282,206 @@ void *packetProcessingThread()
 		exit(1);
 	}
 
-	fd = nfq_fd(h);
+  d->handle = h;
+  d->queue_handle = qh;
+}
+
+/* Reception thread of one direction */
+void *packetProcessingThread(void *arg)
+{
+  struct direction *d = arg;
+	int fd;
+	int rv;
+	char buf[4096] __attribute__ ((aligned));
+  struct pollfd fds[2];
 
-	// para el tema del loss:   while ((rv = recv(fd, buf, sizeof(buf), 0)) && rv >= 0)
+	fd = nfq_fd(d->handle);
+  fds[0] = (struct pollfd){ .fd = fd, .events = POLLIN };
+  fds[1] = (struct pollfd){ .fd = d->wake_fd, .events = POLLIN };
 
-  // Moving processing into thread
+  printf("Starting verdict thread of queue %u\n", d->queue);
+  if (scheduler_start(&d->link.scheduler, release_pkt, d->queue_handle) < 0) {
+		fprintf(stderr, "error starting verdict thread\n");
+		exit(1);
+  }
 
-	while ((rv = recv(fd, buf, sizeof(buf), 0)))
+	while (1)
 	{
-    allow_epr = false;
-		//printf("pkt received\n");
-		nfq_handle_packet(h, buf, rv);
-    allow_epr = true;
+    if (poll(fds, 2, -1) < 0) {
+      if (errno == EINTR)
+        continue;
+      break;
+    }
+    if (fds[1].revents & POLLIN)
+      apply_requests(d);
+    if (!(fds[0].revents & (POLLIN | POLLERR | POLLHUP)))
+      continue;
+    rv = recv(fd, buf, sizeof(buf), 0);
+    if (rv < 0 && errno == ENOBUFS) {
+      // Kernel dropped messages, the socket is still usable
+      atomic_fetch_add(&d->link.stats.drops, 1);
+      fprintf(stderr, "netlink socket overrun on queue %u, packets were lost\n", d->queue);
+      continue;
+    }
+    if (rv <= 0)
+      break;
+		nfq_handle_packet(d->handle, buf, rv);
 	}
 
-	printf("unbinding from queue 0\n");
-	nfq_destroy_queue(qh);
+  scheduler_stop(&d->link.scheduler);
+	printf("unbinding from queue %u\n", d->queue);
+	nfq_destroy_queue(d->queue_handle);
 
 #ifdef INSANE
 	/* normally, applications SHOULD NOT issue this command, since
 	 * it detaches other programs/sockets from AF_INET, too ! */
 	printf("unbinding from AF_INET\n");
-	nfq_unbind_pf(h, AF_INET);
+	nfq_unbind_pf(d->handle, AF_INET);
 #endif
 
 	printf("closing library handle\n");
-	nfq_close(h);
+	nfq_close(d->handle);
+  return NULL;
 }
 
-void *eprGenThread(){
-  //printf("Generating EPR\n");
-  while(1){
-    msleep(sleep_time);
+/* Parses a comma separated list of queue numbers (-q 0,1) into directions */
+static int parse_queues(const char *list)
+{
+  char *end;
 
-    if(!allow_epr){
-      //printf("EPR Generation BLOCKED!");
-      continue;
-    }
-    epr_buffer = epr_buffer + epr_frame_size;
-    if(epr_buffer > epr_buffer_size){
-      epr_buffer = epr_buffer_size;
-    }
-    printf("\nEPR BUFFER: %d/%d <- %d w %d\n", epr_buffer, epr_buffer_size, epr_frame_size, sleep_time);
-    //fprintf(stdout, "%lu\n", (unsigned long)time(NULL)); 
-  }
+  direction_count = 0;
+  do {
+    unsigned long queue = strtoul(list, &end, 10);
+    if (end == list || queue > UINT16_MAX || direction_count == MAX_DIRECTIONS)
+      return -1;
+    directions[direction_count].queue = (uint16_t)queue;
+    directions[direction_count].index = (uint8_t)direction_count;
+    direction_count++;
+    list = end + 1;
+  } while (*end == ',');
+  return *end == '\0' ? 0 : -1;
 }
 
 int main(int argc, char **argv)
 {
+  int opt;
+
   for (int i = 0; i < argc; i++) {
     printf("%s\n", argv[i]);
   }
-  if(argc > 5){
-    epr_frame_size = (int) strtol(argv[1], NULL, 10);
-    epr_buffer_size = (int) strtol(argv[2], NULL, 10);
-    sleep_time = (int) strtol(argv[3], NULL, 10);
-    single_transmission_delay = (int) strtol(argv[4], NULL, 10);
-    buffer_size = (int) strtol(argv[5], NULL, 10);
+  parse_queues("0");
+  while ((opt = getopt(argc, argv, "c:t:r:q:p")) != -1) {
+    switch (opt) {
+    case 'c':
+      control_path = optarg;
+      break;
+    case 't':
+      trace_path = optarg;
+      break;
+    case 'r':
+      trace_capacity = strtoull(optarg, NULL, 10);
+      break;
+    case 'q':
+      if (parse_queues(optarg) == 0)
+        break;
+      fprintf(stderr, "invalid queue list %s, at most %d queues\n", optarg, MAX_DIRECTIONS);
+      exit(1);
+    case 'p':
+      shared_epr_pool = false;
+      break;
+    default:
+      fprintf(stderr, "usage: %s [-c control_socket] [-t trace_file] [-r trace_records] "
+              "[-q queue[,queue...]] [-p (EPR pool per queue)] "
+              "[epr_frame_size epr_buffer_size sleep_time "
+              "single_transmission_delay classical_buffer_size]\n", argv[0]);
+      exit(1);
+    }
+  }
+  char **args = argv + optind;
+  if(argc - optind > 4){
+    params.epr_frame_size = strtoull(args[0], NULL, 10);
+    params.epr_buffer_size = strtoull(args[1], NULL, 10);
+    params.sleep_time = strtoull(args[2], NULL, 10);
+    params.single_transmission_delay = strtoull(args[3], NULL, 10);
+    params.buffer_size = strtoull(args[4], NULL, 10);
   }
   printf("BRIDGE PARAMETERS ARE:\n");
-  printf("epr_frame_size: %d\n", epr_frame_size);
-  printf("epr_buffer_size: %d\n", epr_buffer_size);
-  printf("sleep_time: %d\n", sleep_time);
-  printf("single_transmission_delay: %d\n", single_transmission_delay);
-  printf("classical_buffer_size: %d\n", buffer_size);
-
-
-  printf("Starting Packet Processing Thread\n");
-  pthread_create(&(tid[0]), NULL, packetProcessingThread ,NULL);
-  printf("Packet Processing Thread is Running\n");
-  pthread_create(&(tid[1]), NULL, eprGenThread, NULL);
-  printf("EPR generation thread is running\n");
-  pthread_join(tid[0], NULL);
-  pthread_join(tid[1], NULL);
+  printf("epr_frame_size: %lu\n", (unsigned long)params.epr_frame_size);
+  printf("epr_buffer_size: %lu\n", (unsigned long)params.epr_buffer_size);
+  printf("sleep_time: %lu\n", (unsigned long)params.sleep_time);
+  printf("single_transmission_delay: %lu\n", (unsigned long)params.single_transmission_delay);
+  printf("classical_buffer_size: %lu\n", (unsigned long)params.buffer_size);
+  printf("queues:");
+  for (size_t i = 0; i < direction_count; i++)
+    printf(" %u", directions[i].queue);
+  printf(" (%s EPR pool)\n", shared_epr_pool ? "shared" : "one");
+
+
+  // EPR generation starts now, the buffers are filled up as time passes
+  uint64_t now = monotonic_ns();
+  for (size_t i = 0; i < direction_count; i++) {
+    struct direction *d = &directions[i];
+    struct epr_pool *pool = &epr_pools[shared_epr_pool ? 0 : i];
+    if (i == 0 || !shared_epr_pool)
+      epr_pool_init(pool, params.epr_frame_size, params.sleep_time, params.epr_buffer_size, now);
+    if(link_init(&d->link, &params, pool) < 0){
+      fprintf(stderr, "error allocating scheduler\n");
+      exit(1);
+    }
+    d->link.hooks.set_buffer_size = set_buffer_size;
+    d->link.hooks.kernel_drops = kernel_drops;
+    d->link.hooks.ctx = d;
+    d->wake_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+    if (d->wake_fd < 0) {
+      perror("error creating eventfd");
+      exit(1);
+    }
+    pthread_mutex_init(&d->request_lock, NULL);
+    pthread_cond_init(&d->request_done, NULL);
+    links[i] = &d->link;
+  }
+  link_group.links = links;
+  link_group.count = direction_count;
+
+  // Signals go to the signal thread, threads started from here on inherit the mask
+  static sigset_t signals;
+  sigemptyset(&signals);
+  sigaddset(&signals, SIGUSR1);
+  sigaddset(&signals, SIGINT);
+  sigaddset(&signals, SIGTERM);
+  pthread_sigmask(SIG_BLOCK, &signals, NULL);
+  pthread_create(&signal_thread, NULL, signalThread, &signals);
+
+  if(trace_path){
+    if(trace_init(&trace, trace_capacity) < 0){
+      fprintf(stderr, "error allocating trace\n");
+      exit(1);
+    }
+    printf("Tracing the last %zu packets, kill -USR1 %d writes them to %s\n",
+           (size_t)trace.mask + 1, (int)getpid(), trace_path);
+  }
+
+  if(control_path){
+    printf("Listening for control requests on %s\n", control_path);
+    if(control_start(&control, control_path, link_group_control_handler, &link_group) < 0){
+      perror("error starting control thread");
+      exit(1);
+    }
+  }
+
+  for (size_t i = 0; i < direction_count; i++)
+    open_queue(&directions[i]);
+
+  printf("Starting Packet Processing Threads\n");
+  for (size_t i = 0; i < direction_count; i++)
+    pthread_create(&directions[i].thread, NULL, packetProcessingThread, &directions[i]);
+  printf("Packet Processing Threads are Running\n");
+  for (size_t i = 0; i < direction_count; i++)
+    pthread_join(directions[i].thread, NULL);
+  if(control_path)
+    control_stop(&control);
+  if(trace_path)
+    dump_trace();
 
 	exit(0);
 }
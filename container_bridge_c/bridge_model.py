@@ -0,0 +1,428 @@
+"""
+ctypes binding of the link model of the C bridge (libbridge_model.so).
+The model is built without netfilter, so the scheduler can be driven
+without a kernel queue:
+
+    make libbridge_model.so
+    scheduler = LinkScheduler()
+    scheduler.submit(packet_id, arrival, duration)
+    scheduler.release_due(now)  # -> ids of packets that left the link
+
+    pool = EprPool(frame_size, period, capacity, now)
+    pool.transmit(start, length, bit_duration)  # -> Transmission
+
+    link = Link(LinkParams(...), pool)  # scheduler, counters and control requests of a direction
+    group = LinkGroup([forward, backward])  # directions of one bridge, pools shared or not
+    server = ControlServer(path, group)  # control socket of the bridge
+    trace = TraceRing(capacity)  # packet trace, dump() writes it like the bridge does
+
+Times are CLOCK_MONOTONIC nanoseconds (monotonic_ns()).
+"""
+from collections import namedtuple
+import ctypes
+import os
+
+
+LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "libbridge_model.so")
+NO_DEADLINE = 2**64 - 1
+
+RELEASE_FN = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_uint32)
+
+# enum transmission_mode
+MODE_SEQUENTIAL = 0
+MODE_MIXED = 1
+MODE_SUPERDENSE = 2
+
+Transmission = namedtuple("Transmission", ["start", "delay", "epr_before", "epr_after", "mode"])
+
+
+class _Transmission(ctypes.Structure):
+    _fields_ = [
+        ("start", ctypes.c_uint64),
+        ("delay", ctypes.c_uint64),
+        ("epr_before", ctypes.c_uint32),
+        ("epr_after", ctypes.c_uint32),
+        ("mode", ctypes.c_uint8),
+    ]
+
+    def as_tuple(self):
+        return Transmission(self.start, self.delay, self.epr_before, self.epr_after, self.mode)
+
+
+class TraceRecord(ctypes.Structure):
+    """ TraceRecord
+    struct trace_record
+    """
+    _fields_ = [
+        ("seq", ctypes.c_uint64),
+        ("arrival", ctypes.c_uint64),
+        ("departure", ctypes.c_uint64),
+        ("delay", ctypes.c_uint64),
+        ("length", ctypes.c_uint32),
+        ("epr_before", ctypes.c_uint32),
+        ("epr_after", ctypes.c_uint32),
+        ("mode", ctypes.c_uint8),
+        ("link", ctypes.c_uint8),
+        ("reserved", ctypes.c_uint16),
+    ]
+
+
+class LinkParams(ctypes.Structure):
+    """ LinkParams
+    struct link_params, field names are the keys of control set requests
+    """
+    _fields_ = [
+        ("epr_frame_size", ctypes.c_uint64),
+        ("epr_buffer_size", ctypes.c_uint64),
+        ("sleep_time", ctypes.c_uint64),
+        ("single_transmission_delay", ctypes.c_uint64),
+        ("buffer_size", ctypes.c_uint64),
+    ]
+
+
+_lib = None
+
+
+def load(path=LIBRARY):
+    """
+    Loads the model library once and declares its functions
+    """
+    global _lib
+    if _lib is not None:
+        return _lib
+    lib = ctypes.CDLL(path)
+    u64, size, ptr = ctypes.c_uint64, ctypes.c_size_t, ctypes.c_void_p
+    _declare(lib, "monotonic_ns", u64)
+    _declare(lib, "scheduler_new", ptr, size)
+    _declare(lib, "scheduler_free", None, ptr)
+    _declare(lib, "scheduler_push", ctypes.c_int, ptr, ctypes.c_uint32, u64)
+    _declare(lib, "scheduler_submit", u64, ptr, ctypes.c_uint32, u64, u64)
+    _declare(lib, "scheduler_busy_until", u64, ptr)
+    _declare(lib, "scheduler_pending", size, ptr)
+    _declare(lib, "scheduler_next_deadline", u64, ptr)
+    _declare(lib, "scheduler_release_due", size, ptr, u64, ctypes.POINTER(ctypes.c_uint32), size)
+    _declare(lib, "scheduler_start", ctypes.c_int, ptr, RELEASE_FN, ptr)
+    _declare(lib, "scheduler_stop", None, ptr)
+    _declare(lib, "epr_pool_new", ptr, u64, u64, u64, u64)
+    _declare(lib, "epr_pool_free", None, ptr)
+    _declare(lib, "epr_pool_configure", None, ptr, u64, u64, u64, u64)
+    _declare(lib, "epr_pool_level", ctypes.c_uint32, ptr, u64)
+    _declare(lib, "epr_pool_transmit", u64, ptr, u64, ctypes.c_uint32, u64, ctypes.POINTER(_Transmission))
+    _declare(lib, "link_new", ptr, ctypes.POINTER(LinkParams), ptr)
+    _declare(lib, "link_free", None, ptr)
+    _declare(lib, "link_transmit", u64, ptr, ctypes.c_uint32, u64, ctypes.c_uint32, ctypes.POINTER(_Transmission))
+    _declare(lib, "link_get_params", None, ptr, ctypes.POINTER(LinkParams))
+    _declare(lib, "link_set", ctypes.c_int, ptr, ctypes.c_char_p, u64, u64)
+    _declare(lib, "link_control_handler", size, ptr, ctypes.c_char_p, ctypes.c_char_p, size)
+    _declare(lib, "link_group_new", ptr, ctypes.POINTER(ptr), size)
+    _declare(lib, "link_group_free", None, ptr)
+    _declare(lib, "link_group_control_handler", size, ptr, ctypes.c_char_p, ctypes.c_char_p, size)
+    _declare(lib, "control_new", ptr, ctypes.c_char_p, ptr, ptr)
+    _declare(lib, "control_free", None, ptr)
+    _declare(lib, "trace_new", ptr, size)
+    _declare(lib, "trace_free", None, ptr)
+    _declare(lib, "trace_add", None, ptr, ctypes.POINTER(TraceRecord))
+    _declare(lib, "trace_dump", ctypes.c_long, ptr, ctypes.c_char_p)
+    _lib = lib
+    return lib
+
+
+def _declare(lib, name, restype, *argtypes):
+    """
+    PRIVATE METHOD: sets result and argument types of a library function
+    """
+    function = getattr(lib, name)
+    function.restype = restype
+    function.argtypes = argtypes
+
+
+def monotonic_ns():
+    """
+    Clock of the scheduler deadlines
+    """
+    return load().monotonic_ns()
+
+
+class LinkScheduler:
+    """ LinkScheduler
+    Departure scheduler of one serial link (link_scheduler.h)
+    -> submit() computes the departure of a packet, the link sends one packet at a time
+    -> release_due() pops packets whose deadline expired, or
+    -> start(release) lets the verdict thread call release(id) when they expire
+    """
+
+    def __init__(self, capacity=1024):
+        self._lib = load()
+        self._scheduler = self._lib.scheduler_new(capacity)
+        if not self._scheduler:
+            raise MemoryError("scheduler_new failed")
+        self._release = None
+
+    def push(self, packet_id, deadline):
+        if self._lib.scheduler_push(self._scheduler, packet_id, deadline) < 0:
+            raise MemoryError("scheduler_push failed")
+
+    def submit(self, packet_id, arrival, duration):
+        """
+        Returns departure of the packet
+        """
+        departure = self._lib.scheduler_submit(self._scheduler, packet_id, arrival, duration)
+        if departure == NO_DEADLINE:
+            raise MemoryError("scheduler_submit failed")
+        return departure
+
+    @property
+    def busy_until(self):
+        return self._lib.scheduler_busy_until(self._scheduler)
+
+    @property
+    def pending(self):
+        return self._lib.scheduler_pending(self._scheduler)
+
+    @property
+    def next_deadline(self):
+        """
+        Deadline of the next packet, None if there is none
+        """
+        deadline = self._lib.scheduler_next_deadline(self._scheduler)
+        return None if deadline == NO_DEADLINE else deadline
+
+    def release_due(self, now, max_count=1024):
+        """
+        Returns ids of packets with deadline <= now, in departure order
+        """
+        ids = (ctypes.c_uint32 * max_count)()
+        count = self._lib.scheduler_release_due(self._scheduler, now, ids, max_count)
+        return ids[:count]
+
+    def start(self, release):
+        """
+        Starts verdict thread, release(id) is called from it
+        """
+        # Callback must stay referenced while the thread runs
+        self._release = RELEASE_FN(lambda ctx, packet_id: release(packet_id))
+        if self._lib.scheduler_start(self._scheduler, self._release, None) < 0:
+            raise OSError("scheduler_start failed")
+
+    def stop(self):
+        self._lib.scheduler_stop(self._scheduler)
+
+    def close(self):
+        if self._scheduler:
+            self._lib.scheduler_free(self._scheduler)
+            self._scheduler = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class EprPool:
+    """ EprPool
+    EPR buffer of the link (epr_pool.h), frame_size qubytes are generated
+    every period ns up to capacity, except while the link transmits
+    """
+
+    def __init__(self, frame_size, period, capacity, now=0):
+        self._lib = load()
+        self._pool = self._lib.epr_pool_new(frame_size, period, capacity, now)
+        if not self._pool:
+            raise MemoryError("epr_pool_new failed")
+
+    def configure(self, frame_size, period, capacity, now):
+        self._lib.epr_pool_configure(self._pool, frame_size, period, capacity, now)
+
+    def level(self, now):
+        """
+        Qubytes in the buffer at now
+        """
+        return self._lib.epr_pool_level(self._pool, now)
+
+    def transmit(self, start, length, bit_duration):
+        """
+        Packet of length bytes that starts its transmission at start, returns Transmission
+        """
+        transmission = _Transmission()
+        self._lib.epr_pool_transmit(self._pool, start, length, bit_duration, ctypes.byref(transmission))
+        return transmission.as_tuple()
+
+    def close(self):
+        if self._pool:
+            self._lib.epr_pool_free(self._pool)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Link:
+    """ Link
+    One direction of the link (link.h): parameters, counters,
+    its scheduler and the EprPool it draws from
+    """
+    HANDLER = "link_control_handler"
+
+    def __init__(self, params, pool):
+        self._lib = load()
+        self.pool = pool
+        self._link = self._lib.link_new(ctypes.byref(params), pool._pool)
+        if not self._link:
+            raise MemoryError("link_new failed")
+
+    def transmit(self, packet_id, arrival, length):
+        """
+        Schedules packet, returns (departure, Transmission)
+        """
+        transmission = _Transmission()
+        departure = self._lib.link_transmit(self._link, packet_id, arrival, length, ctypes.byref(transmission))
+        if departure == NO_DEADLINE:
+            raise MemoryError("link_transmit failed")
+        return departure, transmission.as_tuple()
+
+    @property
+    def params(self):
+        params = LinkParams()
+        self._lib.link_get_params(self._link, ctypes.byref(params))
+        return params
+
+    def set(self, key, value, now):
+        """
+        Returns 0, -1 for unknown keys, -2 if the value could not be applied
+        """
+        return self._lib.link_set(self._link, key.encode(), value, now)
+
+    def request(self, request, size=4096):
+        """
+        Answers a control request like the control thread does
+        """
+        return _request(self._lib.link_control_handler, self._link, request, size)
+
+    @property
+    def _as_parameter_(self):
+        return self._link
+
+    def close(self):
+        if self._link:
+            self._lib.link_free(self._link)
+            self._link = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LinkGroup:
+    """ LinkGroup
+    Directions of one bridge (struct link_group), requests apply to all links
+    or to one of them with "link <index> <request>"
+    """
+    HANDLER = "link_group_control_handler"
+
+    def __init__(self, links):
+        self._lib = load()
+        self.links = list(links)
+        pointers = (ctypes.c_void_p * len(self.links))(*[link._link for link in self.links])
+        self._group = self._lib.link_group_new(pointers, len(self.links))
+        if not self._group:
+            raise MemoryError("link_group_new failed")
+
+    def request(self, request, size=4096):
+        """
+        Answers a control request like the control thread of the bridge does
+        """
+        return _request(self._lib.link_group_control_handler, self._group, request, size)
+
+    @property
+    def _as_parameter_(self):
+        return self._group
+
+    def close(self):
+        if self._group:
+            self._lib.link_group_free(self._group)
+            self._group = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _request(handler, ctx, request, size):
+    """
+    PRIVATE METHOD: reply of a control handler to request
+    """
+    reply = ctypes.create_string_buffer(size)
+    length = handler(ctx, request.encode(), reply, size)
+    return reply.raw[:length].decode()
+
+
+class ControlServer:
+    """ ControlServer
+    Control thread (control.h) answering requests for a Link or LinkGroup on unix socket path
+    """
+
+    def __init__(self, path, link):
+        self._lib = load()
+        self.link = link
+        handler = ctypes.cast(getattr(self._lib, link.HANDLER), ctypes.c_void_p)
+        self._server = self._lib.control_new(path.encode(), handler, link._as_parameter_)
+        if not self._server:
+            raise OSError(ctypes.get_errno(), f"control_new failed for {path}")
+
+    def close(self):
+        if self._server:
+            self._lib.control_free(self._server)
+            self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class TraceRing:
+    """ TraceRing
+    Packet trace ring of the bridge (trace.h), keeps the last capacity records
+    (rounded up to a power of 2)
+    """
+
+    def __init__(self, capacity):
+        self._lib = load()
+        self._ring = self._lib.trace_new(capacity)
+        if not self._ring:
+            raise MemoryError("trace_new failed")
+
+    def add(self, **fields):
+        """
+        Appends a record, fields are TraceRecord field names
+        """
+        self._lib.trace_add(self._ring, ctypes.byref(TraceRecord(**fields)))
+
+    def dump(self, path):
+        """
+        Writes the records to path, returns their count
+        """
+        count = self._lib.trace_dump(self._ring, path.encode())
+        if count < 0:
+            raise OSError(f"trace_dump failed for {path}")
+        return count
+
+    def close(self):
+        if self._ring:
+            self._lib.trace_free(self._ring)
+            self._ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,138 @@
+#include "control.h"
+
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/socket.h>
+#include <sys/time.h>
+#include <unistd.h>
+
+#define CLIENT_TIMEOUT_SECONDS 5
+
+static int write_all(int fd, const char *data, size_t len)
+{
+  while (len > 0) {
+    ssize_t n = send(fd, data, len, MSG_NOSIGNAL);
+    if (n < 0) {
+      if (errno == EINTR)
+        continue;
+      return -1;
+    }
+    data += n;
+    len -= n;
+  }
+  return 0;
+}
+
+/* Answers requests of one client until it closes the connection */
+static void serve_client(struct control_server *c, int client)
+{
+  char request[CONTROL_MAX_LINE], reply[CONTROL_MAX_LINE];
+  size_t len = 0;
+
+  while (1) {
+    char *end = memchr(request, '\n', len);
+    if (end) {
+      *end = '\0';
+      size_t n = c->handler(c->ctx, request, reply, sizeof(reply));
+      if (n >= sizeof(reply))
+        n = sizeof(reply) - 1;
+      if (write_all(client, reply, n) < 0)
+        return;
+      len -= end + 1 - request;
+      memmove(request, end + 1, len);
+      continue;
+    }
+    if (len == sizeof(request)) // Line too long
+      return;
+    ssize_t n = recv(client, request + len, sizeof(request) - len, 0);
+    if (n < 0 && errno == EINTR)
+      continue;
+    if (n <= 0)
+      return;
+    len += n;
+  }
+}
+
+static void *controlThread(void *arg)
+{
+  struct control_server *c = arg;
+  struct timeval timeout = {CLIENT_TIMEOUT_SECONDS, 0};
+
+  while (1) {
+    int client = accept(c->fd, NULL, NULL);
+    if (client < 0) {
+      if (errno == EINTR || errno == ECONNABORTED)
+        continue;
+      break; // Listening socket was shut down
+    }
+    // A client that stops talking does not block the others for long
+    setsockopt(client, SOL_SOCKET, SO_RCVTIMEO, &timeout, sizeof(timeout));
+    setsockopt(client, SOL_SOCKET, SO_SNDTIMEO, &timeout, sizeof(timeout));
+    serve_client(c, client);
+    close(client);
+  }
+  return NULL;
+}
+
+int control_start(struct control_server *c, const char *path, control_handler handler, void *ctx)
+{
+  struct sockaddr_un addr;
+
+  c->running = false;
+  if (strlen(path) >= sizeof(addr.sun_path)) {
+    errno = ENAMETOOLONG;
+    return -1;
+  }
+  c->fd = socket(AF_UNIX, SOCK_STREAM, 0);
+  if (c->fd < 0)
+    return -1;
+  memset(&addr, 0, sizeof(addr));
+  addr.sun_family = AF_UNIX;
+  strcpy(addr.sun_path, path);
+  strcpy(c->path, path);
+  unlink(path);
+  if (bind(c->fd, (struct sockaddr *)&addr, sizeof(addr)) < 0 || listen(c->fd, 8) < 0) {
+    close(c->fd);
+    return -1;
+  }
+  c->handler = handler;
+  c->ctx = ctx;
+  if (pthread_create(&c->thread, NULL, controlThread, c) != 0) {
+    close(c->fd);
+    unlink(path);
+    return -1;
+  }
+  c->running = true;
+  return 0;
+}
+
+void control_stop(struct control_server *c)
+{
+  if (!c->running)
+    return;
+  shutdown(c->fd, SHUT_RDWR);
+  pthread_join(c->thread, NULL);
+  close(c->fd);
+  unlink(c->path);
+  c->running = false;
+}
+
+struct control_server *control_new(const char *path, control_handler handler, void *ctx)
+{
+  struct control_server *c = malloc(sizeof(*c));
+  if (c && control_start(c, path, handler, ctx) < 0) {
+    free(c);
+    return NULL;
+  }
+  return c;
+}
+
+void control_free(struct control_server *c)
+{
+  if (!c)
+    return;
+  control_stop(c);
+  free(c);
+}
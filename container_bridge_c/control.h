@@ -0,0 +1,39 @@
+#ifndef CONTROL_H
+#define CONTROL_H
+
+#include <pthread.h>
+#include <stdbool.h>
+#include <stddef.h>
+#include <sys/un.h>
+
+/*
+ * Control socket of the bridge.
+ * A unix stream socket, every request is one line, every reply is one line
+ * written by handler (JSON for link_control_handler). Connections are served
+ * one after another by the control thread.
+ */
+
+#define CONTROL_MAX_LINE 4096
+
+typedef size_t (*control_handler)(void *ctx, const char *request, char *reply, size_t size);
+
+struct control_server {
+  int fd;
+  char path[sizeof(((struct sockaddr_un *)0)->sun_path)];
+  control_handler handler;
+  void *ctx;
+  pthread_t thread;
+  bool running;
+};
+
+/* Listens on path (an existing socket file is replaced) and starts the control thread */
+int control_start(struct control_server *c, const char *path, control_handler handler, void *ctx);
+
+/* Stops the control thread and removes the socket file */
+void control_stop(struct control_server *c);
+
+/* Heap allocated server, for bindings that can't embed the struct */
+struct control_server *control_new(const char *path, control_handler handler, void *ctx);
+void control_free(struct control_server *c);
+
+#endif
@@ -0,0 +1,118 @@
+#include "epr_pool.h"
+
+#include <stdlib.h>
+
+typedef unsigned __int128 u128;
+
+static uint64_t full_credit(const struct epr_pool *pool)
+{
+  return pool->capacity * pool->period;
+}
+
+/* Generates credit from the last update (or end of the last transmission) until now */
+static void accrue_locked(struct epr_pool *pool, uint64_t now)
+{
+  if (now <= pool->updated)
+    return;
+  u128 credit = (u128)pool->credit + (u128)(now - pool->updated) * pool->frame_size;
+  pool->credit = credit > full_credit(pool) ? full_credit(pool) : (uint64_t)credit;
+  pool->updated = now;
+}
+
+static void set_params_locked(struct epr_pool *pool, uint64_t frame_size, uint64_t period, uint64_t capacity)
+{
+  if (period == 0) {
+    // No generation period: buffer is refilled right away
+    period = 1;
+    frame_size = capacity;
+  }
+  pool->frame_size = frame_size;
+  pool->period = period;
+  pool->capacity = capacity;
+}
+
+int epr_pool_init(struct epr_pool *pool, uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now)
+{
+  pthread_mutex_init(&pool->lock, NULL);
+  set_params_locked(pool, frame_size, period, capacity);
+  pool->credit = 0;
+  pool->updated = now;
+  return 0;
+}
+
+void epr_pool_destroy(struct epr_pool *pool)
+{
+  pthread_mutex_destroy(&pool->lock);
+}
+
+struct epr_pool *epr_pool_new(uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now)
+{
+  struct epr_pool *pool = malloc(sizeof(*pool));
+  if (pool)
+    epr_pool_init(pool, frame_size, period, capacity, now);
+  return pool;
+}
+
+void epr_pool_free(struct epr_pool *pool)
+{
+  if (!pool)
+    return;
+  epr_pool_destroy(pool);
+  free(pool);
+}
+
+void epr_pool_configure(struct epr_pool *pool, uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now)
+{
+  pthread_mutex_lock(&pool->lock);
+  accrue_locked(pool, now);
+  uint64_t old_period = pool->period;
+  set_params_locked(pool, frame_size, period, capacity);
+  u128 credit = (u128)pool->credit * pool->period / old_period;
+  pool->credit = credit > full_credit(pool) ? full_credit(pool) : (uint64_t)credit;
+  pthread_mutex_unlock(&pool->lock);
+}
+
+uint32_t epr_pool_level(struct epr_pool *pool, uint64_t now)
+{
+  uint32_t level;
+
+  pthread_mutex_lock(&pool->lock);
+  accrue_locked(pool, now);
+  level = (uint32_t)(pool->credit / pool->period);
+  pthread_mutex_unlock(&pool->lock);
+  return level;
+}
+
+uint64_t epr_pool_transmit(struct epr_pool *pool, uint64_t start, uint32_t length, uint64_t bit_duration,
+                           struct transmission *t)
+{
+  uint64_t delay, buffer;
+
+  pthread_mutex_lock(&pool->lock);
+  accrue_locked(pool, start);
+  buffer = pool->credit / pool->period;
+  t->start = start;
+  t->epr_before = (uint32_t)buffer;
+  // Superdense coded bytes take half the time of sequential ones and half a qubyte of EPR pairs
+  if (length < 2 * buffer) {
+    t->mode = MODE_SUPERDENSE;
+    delay = (uint64_t)length * 4;
+    pool->credit -= (uint64_t)(length / 2) * pool->period;
+  } else if (buffer == 0) {
+    t->mode = MODE_SEQUENTIAL;
+    delay = (uint64_t)length * 8;
+  } else {
+    t->mode = MODE_MIXED;
+    delay = buffer * 4 + (length - 2 * buffer) * 8;
+    // Whole qubytes are used up, the part of the next one generated so far is kept
+    pool->credit %= pool->period;
+  }
+  delay *= bit_duration;
+  t->delay = delay;
+  t->epr_after = (uint32_t)(pool->credit / pool->period);
+  // No generation while the packet is on the link
+  if (start + delay > pool->updated)
+    pool->updated = start + delay;
+  pthread_mutex_unlock(&pool->lock);
+  return delay;
+}
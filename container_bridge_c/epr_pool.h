@@ -0,0 +1,61 @@
+#ifndef EPR_POOL_H
+#define EPR_POOL_H
+
+#include <pthread.h>
+#include <stdint.h>
+
+/*
+ * EPR buffer of the link.
+ * EPR pairs are generated continuously, frame_size qubytes every period ns,
+ * up to capacity qubytes. The level is not counted up by a thread, it is
+ * computed from monotonic timestamps when a packet starts its transmission.
+ * Generation is paused while the link transmits.
+ *
+ * Credit is kept in qubytes * period, so the level is exact for any period.
+ */
+
+enum transmission_mode {
+  MODE_SEQUENTIAL = 0, // No EPR pairs, every byte is sent on its own
+  MODE_MIXED = 1,      // Buffer ran out during the packet
+  MODE_SUPERDENSE = 2, // Whole packet superdense coded
+};
+
+struct transmission {
+  uint64_t start;      // CLOCK_MONOTONIC ns
+  uint64_t delay;      // ns
+  uint32_t epr_before; // qubytes
+  uint32_t epr_after;  // qubytes
+  uint8_t mode;
+};
+
+struct epr_pool {
+  pthread_mutex_t lock;
+  uint64_t frame_size; // qubytes per period
+  uint64_t period;     // ns
+  uint64_t capacity;   // qubytes
+  uint64_t credit;     // qubytes * period
+  uint64_t updated;    // Credit is generated up to this time
+};
+
+int epr_pool_init(struct epr_pool *pool, uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now);
+void epr_pool_destroy(struct epr_pool *pool);
+
+/* Heap allocated pool, for bindings that can't embed the struct */
+struct epr_pool *epr_pool_new(uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now);
+void epr_pool_free(struct epr_pool *pool);
+
+/* Changes generation rate and capacity, credit generated until now is kept (and capped) */
+void epr_pool_configure(struct epr_pool *pool, uint64_t frame_size, uint64_t period, uint64_t capacity, uint64_t now);
+
+/* Qubytes in the buffer at now */
+uint32_t epr_pool_level(struct epr_pool *pool, uint64_t now);
+
+/*
+ * Transmission of length bytes that starts at start, bit_duration ns per
+ * sequentially sent bit. Consumes EPR pairs and pauses generation until the
+ * transmission ended. Fills t and returns its delay.
+ */
+uint64_t epr_pool_transmit(struct epr_pool *pool, uint64_t start, uint32_t length, uint64_t bit_duration,
+                           struct transmission *t);
+
+#endif
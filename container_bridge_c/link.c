@@ -0,0 +1,306 @@
+#include "link.h"
+
+#include <inttypes.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define RELAXED memory_order_relaxed
+
+int link_init(struct link *l, const struct link_params *params, struct epr_pool *pool)
+{
+  if (scheduler_init(&l->scheduler, params->buffer_size) < 0)
+    return -1;
+  pthread_mutex_init(&l->lock, NULL);
+  l->params = *params;
+  memset(&l->stats, 0, sizeof(l->stats));
+  l->pool = pool;
+  memset(&l->hooks, 0, sizeof(l->hooks));
+  return 0;
+}
+
+void link_destroy(struct link *l)
+{
+  scheduler_destroy(&l->scheduler);
+  pthread_mutex_destroy(&l->lock);
+}
+
+struct link *link_new(const struct link_params *params, struct epr_pool *pool)
+{
+  struct link *l = malloc(sizeof(*l));
+  if (l && link_init(l, params, pool) < 0) {
+    free(l);
+    return NULL;
+  }
+  return l;
+}
+
+void link_free(struct link *l)
+{
+  if (!l)
+    return;
+  link_destroy(l);
+  free(l);
+}
+
+void link_get_params(struct link *l, struct link_params *params)
+{
+  pthread_mutex_lock(&l->lock);
+  *params = l->params;
+  pthread_mutex_unlock(&l->lock);
+}
+
+uint64_t link_transmit(struct link *l, uint32_t id, uint64_t arrival, uint32_t length, struct transmission *t)
+{
+  uint64_t busy_until = scheduler_busy_until(&l->scheduler);
+  uint64_t start = arrival > busy_until ? arrival : busy_until;
+  uint64_t bit_duration;
+
+  pthread_mutex_lock(&l->lock);
+  bit_duration = l->params.single_transmission_delay;
+  pthread_mutex_unlock(&l->lock);
+
+  epr_pool_transmit(l->pool, start, length, bit_duration, t);
+  uint64_t departure = scheduler_submit(&l->scheduler, id, arrival, t->delay);
+  if (departure == UINT64_MAX)
+    return departure;
+
+  atomic_fetch_add_explicit(&l->stats.packets, 1, RELAXED);
+  atomic_fetch_add_explicit(&l->stats.bytes, length, RELAXED);
+  switch (t->mode) {
+  case MODE_SEQUENTIAL:
+    atomic_fetch_add_explicit(&l->stats.sequential, 1, RELAXED);
+    break;
+  case MODE_MIXED:
+    atomic_fetch_add_explicit(&l->stats.mixed, 1, RELAXED);
+    break;
+  default:
+    atomic_fetch_add_explicit(&l->stats.superdense, 1, RELAXED);
+  }
+  atomic_fetch_add_explicit(&l->stats.delay_total, departure - arrival, RELAXED);
+  atomic_fetch_add_explicit(&l->stats.transmission_total, t->delay, RELAXED);
+  return departure;
+}
+
+/* Sets field key of params, returns -1 for unknown keys */
+static int set_param(struct link_params *params, const char *key, uint64_t value)
+{
+  if (strcmp(key, "epr_frame_size") == 0)
+    params->epr_frame_size = value;
+  else if (strcmp(key, "epr_buffer_size") == 0)
+    params->epr_buffer_size = value;
+  else if (strcmp(key, "sleep_time") == 0)
+    params->sleep_time = value;
+  else if (strcmp(key, "single_transmission_delay") == 0)
+    params->single_transmission_delay = value;
+  else if (strcmp(key, "buffer_size") == 0)
+    params->buffer_size = value;
+  else
+    return -1;
+  return 0;
+}
+
+int link_set(struct link *l, const char *key, uint64_t value, uint64_t now)
+{
+  struct link_params params;
+  int resize;
+
+  pthread_mutex_lock(&l->lock);
+  params = l->params;
+  if (set_param(&params, key, value) < 0) {
+    pthread_mutex_unlock(&l->lock);
+    return -1;
+  }
+  resize = params.buffer_size != l->params.buffer_size;
+  pthread_mutex_unlock(&l->lock);
+
+  // Not under the lock, the hook waits for the reception thread and that takes the lock in link_transmit
+  if (resize && (!l->hooks.set_buffer_size || l->hooks.set_buffer_size(l->hooks.ctx, (uint32_t)value) < 0))
+    return -2;
+
+  pthread_mutex_lock(&l->lock);
+  params = l->params;
+  set_param(&params, key, value);
+  epr_pool_configure(l->pool, params.epr_frame_size, params.sleep_time, params.epr_buffer_size, now);
+  l->params = params;
+  pthread_mutex_unlock(&l->lock);
+  return 0;
+}
+
+/* Plain copy of the counters of one or more links */
+struct stats_snapshot {
+  uint64_t packets, bytes, sequential, mixed, superdense, drops, kernel_drops, delay_total, transmission_total;
+  uint64_t epr_level, queue_length;
+  struct link_params params;
+};
+
+/* Adds the counters of l to s, its EPR level only if count_pool (a shared pool is counted once) */
+static void stats_add(struct link *l, uint64_t now, int count_pool, struct stats_snapshot *s)
+{
+  s->packets += atomic_load_explicit(&l->stats.packets, RELAXED);
+  s->bytes += atomic_load_explicit(&l->stats.bytes, RELAXED);
+  s->sequential += atomic_load_explicit(&l->stats.sequential, RELAXED);
+  s->mixed += atomic_load_explicit(&l->stats.mixed, RELAXED);
+  s->superdense += atomic_load_explicit(&l->stats.superdense, RELAXED);
+  s->drops += atomic_load_explicit(&l->stats.drops, RELAXED);
+  if (l->hooks.kernel_drops)
+    s->kernel_drops += l->hooks.kernel_drops(l->hooks.ctx);
+  s->delay_total += atomic_load_explicit(&l->stats.delay_total, RELAXED);
+  s->transmission_total += atomic_load_explicit(&l->stats.transmission_total, RELAXED);
+  if (count_pool)
+    s->epr_level += epr_pool_level(l->pool, now);
+  s->queue_length += scheduler_pending(&l->scheduler);
+}
+
+static size_t stats_format(const struct stats_snapshot *s, char *buf, size_t size)
+{
+  int n = snprintf(buf, size,
+                   "\"packets\": %" PRIu64 ", \"bytes\": %" PRIu64 ", "
+                   "\"sequential\": %" PRIu64 ", \"mixed\": %" PRIu64 ", \"superdense\": %" PRIu64 ", "
+                   "\"drops\": %" PRIu64 ", \"kernel_drops\": %" PRIu64 ", "
+                   "\"delay_total\": %" PRIu64 ", \"transmission_total\": %" PRIu64 ", "
+                   "\"epr_level\": %" PRIu64 ", \"queue_length\": %" PRIu64 ", "
+                   "\"epr_frame_size\": %" PRIu64 ", \"epr_buffer_size\": %" PRIu64 ", \"sleep_time\": %" PRIu64 ", "
+                   "\"single_transmission_delay\": %" PRIu64 ", \"buffer_size\": %" PRIu64,
+                   s->packets, s->bytes, s->sequential, s->mixed, s->superdense,
+                   s->drops, s->kernel_drops, s->delay_total, s->transmission_total,
+                   s->epr_level, s->queue_length,
+                   s->params.epr_frame_size, s->params.epr_buffer_size, s->params.sleep_time,
+                   s->params.single_transmission_delay, s->params.buffer_size);
+  if (n < 0)
+    return 0;
+  return (size_t)n < size ? (size_t)n : size - 1;
+}
+
+size_t link_stats_json(struct link *l, uint64_t now, char *buf, size_t size)
+{
+  struct stats_snapshot s = {0};
+
+  link_get_params(l, &s.params);
+  stats_add(l, now, 1, &s);
+  return stats_format(&s, buf, size);
+}
+
+static size_t set_reply(int res, const char *key, char *reply, size_t size)
+{
+  switch (res) {
+  case 0:
+    return snprintf(reply, size, "{\"ok\": true}\n");
+  case -1:
+    return snprintf(reply, size, "{\"ok\": false, \"error\": \"unknown parameter %s\"}\n", key);
+  default:
+    return snprintf(reply, size, "{\"ok\": false, \"error\": \"%s could not be applied\"}\n", key);
+  }
+}
+
+/* Length written by snprintf, clamped to what fits in size */
+static size_t clamp(int n, size_t size)
+{
+  if (n < 0 || size == 0)
+    return 0;
+  return (size_t)n < size ? (size_t)n : size - 1;
+}
+
+size_t link_control_handler(void *ctx, const char *request, char *reply, size_t size)
+{
+  struct link *l = ctx;
+  char command[16], key[64];
+  unsigned long long value;
+  int fields = sscanf(request, "%15s %63s %llu", command, key, &value);
+
+  if (fields >= 1 && strcmp(command, "stats") == 0) {
+    size_t n = clamp(snprintf(reply, size, "{\"ok\": true, "), size);
+    n += link_stats_json(l, monotonic_ns(), reply + n, size - n);
+    return n + clamp(snprintf(reply + n, size - n, "}\n"), size - n);
+  }
+  if (fields >= 1 && strcmp(command, "set") == 0) {
+    if (fields < 3)
+      return snprintf(reply, size, "{\"ok\": false, \"error\": \"usage: set <key> <value>\"}\n");
+    return set_reply(link_set(l, key, value, monotonic_ns()), key, reply, size);
+  }
+  return snprintf(reply, size, "{\"ok\": false, \"error\": \"unknown request\"}\n");
+}
+
+struct link_group *link_group_new(struct link **links, size_t count)
+{
+  struct link_group *g = malloc(sizeof(*g));
+  if (!g)
+    return NULL;
+  g->links = malloc(count * sizeof(*g->links));
+  if (!g->links && count) {
+    free(g);
+    return NULL;
+  }
+  memcpy(g->links, links, count * sizeof(*g->links));
+  g->count = count;
+  return g;
+}
+
+void link_group_free(struct link_group *g)
+{
+  if (!g)
+    return;
+  free(g->links);
+  free(g);
+}
+
+static int pool_seen(struct link_group *g, size_t i)
+{
+  for (size_t j = 0; j < i; j++) {
+    if (g->links[j]->pool == g->links[i]->pool)
+      return 1;
+  }
+  return 0;
+}
+
+static size_t group_stats(struct link_group *g, char *reply, size_t size)
+{
+  struct stats_snapshot totals = {0};
+  uint64_t now = monotonic_ns();
+  size_t n;
+
+  if (g->count)
+    link_get_params(g->links[0], &totals.params);
+  for (size_t i = 0; i < g->count; i++)
+    stats_add(g->links[i], now, !pool_seen(g, i), &totals);
+
+  n = clamp(snprintf(reply, size, "{\"ok\": true, "), size);
+  n += stats_format(&totals, reply + n, size - n);
+  n += clamp(snprintf(reply + n, size - n, ", \"links\": ["), size - n);
+  for (size_t i = 0; i < g->count; i++) {
+    n += clamp(snprintf(reply + n, size - n, i ? ", {" : "{"), size - n);
+    n += link_stats_json(g->links[i], now, reply + n, size - n);
+    n += clamp(snprintf(reply + n, size - n, "}"), size - n);
+  }
+  return n + clamp(snprintf(reply + n, size - n, "]}\n"), size - n);
+}
+
+size_t link_group_control_handler(void *ctx, const char *request, char *reply, size_t size)
+{
+  struct link_group *g = ctx;
+  char command[16], key[64];
+  unsigned long long value;
+  size_t index;
+  int offset = 0;
+  int fields = sscanf(request, "%15s", command);
+
+  if (fields == 1 && strcmp(command, "link") == 0) {
+    if (sscanf(request, "%*s %zu %n", &index, &offset) < 1 || offset == 0)
+      return snprintf(reply, size, "{\"ok\": false, \"error\": \"usage: link <index> <request>\"}\n");
+    if (index >= g->count)
+      return snprintf(reply, size, "{\"ok\": false, \"error\": \"no link %zu\"}\n", index);
+    return link_control_handler(g->links[index], request + offset, reply, size);
+  }
+  if (fields == 1 && strcmp(command, "stats") == 0)
+    return group_stats(g, reply, size);
+  if (fields == 1 && strcmp(command, "set") == 0) {
+    int res = 0;
+    if (sscanf(request, "%*s %63s %llu", key, &value) < 2)
+      return snprintf(reply, size, "{\"ok\": false, \"error\": \"usage: set <key> <value>\"}\n");
+    // A shared pool is configured once per link with the same values
+    for (size_t i = 0; i < g->count && res == 0; i++)
+      res = link_set(g->links[i], key, value, monotonic_ns());
+    return set_reply(res, key, reply, size);
+  }
+  return snprintf(reply, size, "{\"ok\": false, \"error\": \"unknown request\"}\n");
+}
@@ -0,0 +1,103 @@
+#ifndef LINK_H
+#define LINK_H
+
+#include <pthread.h>
+#include <stdatomic.h>
+#include <stddef.h>
+#include <stdint.h>
+
+#include "epr_pool.h"
+#include "link_scheduler.h"
+
+/*
+ * One direction of the quantum link: its parameters, counters,
+ * departure scheduler and the EPR pool it draws from.
+ * Parameters can be changed while packets are transmitted.
+ */
+
+struct link_params {
+  uint64_t epr_frame_size;            // qubytes
+  uint64_t epr_buffer_size;           // qubytes
+  uint64_t sleep_time;                // ns per EPR frame
+  uint64_t single_transmission_delay; // ns per bit, 1000 -> 1mbit/s
+  uint64_t buffer_size;               // packets
+};
+
+struct link_stats {
+  atomic_uint_fast64_t packets;
+  atomic_uint_fast64_t bytes;
+  atomic_uint_fast64_t sequential;
+  atomic_uint_fast64_t mixed;
+  atomic_uint_fast64_t superdense;
+  atomic_uint_fast64_t drops;              // Overruns of the netlink socket
+  atomic_uint_fast64_t delay_total;        // ns from arrival to departure
+  atomic_uint_fast64_t transmission_total; // ns on the link
+};
+
+/* Callbacks into the netfilter side, any of them can be NULL */
+struct link_hooks {
+  int (*set_buffer_size)(void *ctx, uint32_t packets); // Called without the lock of the link
+  uint64_t (*kernel_drops)(void *ctx); // Packets the kernel dropped from the queue
+  void *ctx;
+};
+
+struct link {
+  pthread_mutex_t lock; // Guards params
+  struct link_params params;
+  struct link_stats stats;
+  struct link_scheduler scheduler;
+  struct epr_pool *pool;
+  struct link_hooks hooks;
+};
+
+int link_init(struct link *l, const struct link_params *params, struct epr_pool *pool);
+void link_destroy(struct link *l);
+
+/* Heap allocated link, for bindings that can't embed the struct */
+struct link *link_new(const struct link_params *params, struct epr_pool *pool);
+void link_free(struct link *l);
+
+/*
+ * Packet id of length bytes arrived at arrival. Its transmission starts when
+ * the link is free, it is scheduled to leave when it ended.
+ * Fills t and returns departure, UINT64_MAX if it could not be scheduled.
+ */
+uint64_t link_transmit(struct link *l, uint32_t id, uint64_t arrival, uint32_t length, struct transmission *t);
+
+void link_get_params(struct link *l, struct link_params *params);
+
+/* Sets parameter key (a link_params field name), returns 0, -1 for unknown keys, -2 if it could not be applied */
+int link_set(struct link *l, const char *key, uint64_t value, uint64_t now);
+
+/* Counters, EPR level and queue length at now as a JSON object, returns its length */
+size_t link_stats_json(struct link *l, uint64_t now, char *buf, size_t size);
+
+/*
+ * Control requests (control.h handler, ctx is the link):
+ *   stats            -> {"ok": true, <link_stats_json fields>}
+ *   set <key> <value> -> {"ok": true} or {"ok": false, "error": ...}
+ */
+size_t link_control_handler(void *ctx, const char *request, char *reply, size_t size);
+
+/*
+ * Directions served by one bridge, they draw from a shared EPR pool
+ * or from one pool each.
+ */
+struct link_group {
+  struct link **links;
+  size_t count;
+};
+
+/* Heap allocated group of count links, the links themselves are not owned */
+struct link_group *link_group_new(struct link **links, size_t count);
+void link_group_free(struct link_group *g);
+
+/*
+ * Control requests (control.h handler, ctx is the group):
+ *   stats              -> {"ok": true, <totals of all links>, "links": [<link_stats_json>, ...]}
+ *   set <key> <value>  -> sets the parameter on every link
+ *   link <i> <request> -> request answered by link i alone
+ */
+size_t link_group_control_handler(void *ctx, const char *request, char *reply, size_t size);
+
+#endif
@@ -0,0 +1,262 @@
+#include "link_scheduler.h"
+
+#include <errno.h>
+#include <stdlib.h>
+#include <time.h>
+
+#define RELEASE_BATCH 64
+
+uint64_t monotonic_ns(void)
+{
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (uint64_t)ts.tv_sec * 1000000000ULL + (uint64_t)ts.tv_nsec;
+}
+
+static bool entry_before(const struct sched_entry *a, const struct sched_entry *b)
+{
+  if (a->deadline != b->deadline)
+    return a->deadline < b->deadline;
+  return a->seq < b->seq;
+}
+
+static void sift_up(struct sched_entry *heap, size_t i)
+{
+  struct sched_entry entry = heap[i];
+  while (i > 0) {
+    size_t parent = (i - 1) / 2;
+    if (!entry_before(&entry, &heap[parent]))
+      break;
+    heap[i] = heap[parent];
+    i = parent;
+  }
+  heap[i] = entry;
+}
+
+static void sift_down(struct sched_entry *heap, size_t len, size_t i)
+{
+  struct sched_entry entry = heap[i];
+  while (1) {
+    size_t child = 2 * i + 1;
+    if (child >= len)
+      break;
+    if (child + 1 < len && entry_before(&heap[child + 1], &heap[child]))
+      child++;
+    if (!entry_before(&heap[child], &entry))
+      break;
+    heap[i] = heap[child];
+    i = child;
+  }
+  heap[i] = entry;
+}
+
+static struct sched_entry pop_locked(struct link_scheduler *s)
+{
+  struct sched_entry top = s->heap[0];
+  s->len--;
+  if (s->len > 0) {
+    s->heap[0] = s->heap[s->len];
+    sift_down(s->heap, s->len, 0);
+  }
+  return top;
+}
+
+int scheduler_init(struct link_scheduler *s, size_t capacity)
+{
+  pthread_condattr_t attr;
+
+  if (capacity == 0)
+    capacity = 1;
+  s->heap = malloc(capacity * sizeof(*s->heap));
+  if (!s->heap)
+    return -1;
+  s->len = 0;
+  s->cap = capacity;
+  s->seq = 0;
+  s->busy_until = 0;
+  s->stopped = false;
+  s->release = NULL;
+  s->ctx = NULL;
+  s->running = false;
+  pthread_mutex_init(&s->lock, NULL);
+  // Deadlines are monotonic times, so is the timeout of the verdict thread
+  pthread_condattr_init(&attr);
+  pthread_condattr_setclock(&attr, CLOCK_MONOTONIC);
+  pthread_cond_init(&s->cond, &attr);
+  pthread_condattr_destroy(&attr);
+  return 0;
+}
+
+void scheduler_destroy(struct link_scheduler *s)
+{
+  scheduler_stop(s);
+  pthread_cond_destroy(&s->cond);
+  pthread_mutex_destroy(&s->lock);
+  free(s->heap);
+  s->heap = NULL;
+}
+
+struct link_scheduler *scheduler_new(size_t capacity)
+{
+  struct link_scheduler *s = malloc(sizeof(*s));
+  if (s && scheduler_init(s, capacity) < 0) {
+    free(s);
+    return NULL;
+  }
+  return s;
+}
+
+void scheduler_free(struct link_scheduler *s)
+{
+  if (!s)
+    return;
+  scheduler_destroy(s);
+  free(s);
+}
+
+static int push_locked(struct link_scheduler *s, uint32_t id, uint64_t deadline)
+{
+  if (s->len == s->cap) {
+    struct sched_entry *heap = realloc(s->heap, 2 * s->cap * sizeof(*heap));
+    if (!heap)
+      return -1;
+    s->heap = heap;
+    s->cap *= 2;
+  }
+  s->heap[s->len].deadline = deadline;
+  s->heap[s->len].seq = s->seq++;
+  s->heap[s->len].id = id;
+  sift_up(s->heap, s->len);
+  s->len++;
+  // Verdict thread sleeps until the earliest deadline, it changed if this is on top
+  if (s->heap[0].seq == s->seq - 1)
+    pthread_cond_signal(&s->cond);
+  return 0;
+}
+
+int scheduler_push(struct link_scheduler *s, uint32_t id, uint64_t deadline)
+{
+  int res;
+
+  pthread_mutex_lock(&s->lock);
+  res = push_locked(s, id, deadline);
+  pthread_mutex_unlock(&s->lock);
+  return res;
+}
+
+uint64_t scheduler_submit(struct link_scheduler *s, uint32_t id, uint64_t arrival, uint64_t duration)
+{
+  uint64_t departure;
+
+  pthread_mutex_lock(&s->lock);
+  departure = (arrival > s->busy_until ? arrival : s->busy_until) + duration;
+  if (push_locked(s, id, departure) < 0)
+    departure = UINT64_MAX;
+  else
+    s->busy_until = departure;
+  pthread_mutex_unlock(&s->lock);
+  return departure;
+}
+
+uint64_t scheduler_busy_until(struct link_scheduler *s)
+{
+  uint64_t busy_until;
+
+  pthread_mutex_lock(&s->lock);
+  busy_until = s->busy_until;
+  pthread_mutex_unlock(&s->lock);
+  return busy_until;
+}
+
+size_t scheduler_pending(struct link_scheduler *s)
+{
+  size_t len;
+
+  pthread_mutex_lock(&s->lock);
+  len = s->len;
+  pthread_mutex_unlock(&s->lock);
+  return len;
+}
+
+uint64_t scheduler_next_deadline(struct link_scheduler *s)
+{
+  uint64_t deadline;
+
+  pthread_mutex_lock(&s->lock);
+  deadline = s->len > 0 ? s->heap[0].deadline : UINT64_MAX;
+  pthread_mutex_unlock(&s->lock);
+  return deadline;
+}
+
+static size_t pop_due_locked(struct link_scheduler *s, uint64_t now, uint32_t *ids, size_t max)
+{
+  size_t n = 0;
+
+  while (n < max && s->len > 0 && s->heap[0].deadline <= now)
+    ids[n++] = pop_locked(s).id;
+  return n;
+}
+
+size_t scheduler_release_due(struct link_scheduler *s, uint64_t now, uint32_t *ids, size_t max)
+{
+  size_t n;
+
+  pthread_mutex_lock(&s->lock);
+  n = pop_due_locked(s, now, ids, max);
+  pthread_mutex_unlock(&s->lock);
+  return n;
+}
+
+static void *verdictThread(void *arg)
+{
+  struct link_scheduler *s = arg;
+  uint32_t ids[RELEASE_BATCH];
+  struct timespec ts;
+
+  pthread_mutex_lock(&s->lock);
+  while (!s->stopped) {
+    if (s->len == 0) {
+      pthread_cond_wait(&s->cond, &s->lock);
+      continue;
+    }
+    uint64_t deadline = s->heap[0].deadline;
+    uint64_t now = monotonic_ns();
+    if (deadline > now) {
+      ts.tv_sec = deadline / 1000000000ULL;
+      ts.tv_nsec = deadline % 1000000000ULL;
+      pthread_cond_timedwait(&s->cond, &s->lock, &ts);
+      continue;
+    }
+    size_t n = pop_due_locked(s, now, ids, RELEASE_BATCH);
+    // Verdicts are issued without the lock, reception keeps submitting meanwhile
+    pthread_mutex_unlock(&s->lock);
+    for (size_t i = 0; i < n; i++)
+      s->release(s->ctx, ids[i]);
+    pthread_mutex_lock(&s->lock);
+  }
+  pthread_mutex_unlock(&s->lock);
+  return NULL;
+}
+
+int scheduler_start(struct link_scheduler *s, release_fn release, void *ctx)
+{
+  s->release = release;
+  s->ctx = ctx;
+  s->stopped = false;
+  if (pthread_create(&s->thread, NULL, verdictThread, s) != 0)
+    return -1;
+  s->running = true;
+  return 0;
+}
+
+void scheduler_stop(struct link_scheduler *s)
+{
+  if (!s->running)
+    return;
+  pthread_mutex_lock(&s->lock);
+  s->stopped = true;
+  pthread_cond_signal(&s->cond);
+  pthread_mutex_unlock(&s->lock);
+  pthread_join(s->thread, NULL);
+  s->running = false;
+}
@@ -0,0 +1,74 @@
+#ifndef LINK_SCHEDULER_H
+#define LINK_SCHEDULER_H
+
+#include <pthread.h>
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+/*
+ * Departure scheduler of one serial link.
+ * Packets are pushed with the time they leave the link (deadline, CLOCK_MONOTONIC ns),
+ * a verdict thread releases them when their deadline expired.
+ * The link transmits one packet at a time, a packet starts when it arrived
+ * and the packet before it left, so departures are in arrival (FIFO) order.
+ */
+
+typedef void (*release_fn)(void *ctx, uint32_t id);
+
+struct sched_entry {
+  uint64_t deadline;
+  uint64_t seq; // Breaks ties of equal deadlines in push order
+  uint32_t id;
+};
+
+struct link_scheduler {
+  pthread_mutex_t lock;
+  pthread_cond_t cond;
+  struct sched_entry *heap; // Binary min heap on (deadline, seq)
+  size_t len;
+  size_t cap;
+  uint64_t seq;
+  uint64_t busy_until; // Departure of the last submitted packet
+  bool stopped;
+  release_fn release;
+  void *ctx;
+  pthread_t thread;
+  bool running;
+};
+
+uint64_t monotonic_ns(void);
+
+int scheduler_init(struct link_scheduler *s, size_t capacity);
+void scheduler_destroy(struct link_scheduler *s);
+
+/* Heap allocated scheduler, for bindings that can't embed the struct */
+struct link_scheduler *scheduler_new(size_t capacity);
+void scheduler_free(struct link_scheduler *s);
+
+/* Pushes packet id that leaves the link at deadline */
+int scheduler_push(struct link_scheduler *s, uint32_t id, uint64_t deadline);
+
+/* Transmission of duration ns starts when the packet arrived and the link is free,
+ * pushes the packet and returns its departure, UINT64_MAX if it could not be pushed */
+uint64_t scheduler_submit(struct link_scheduler *s, uint32_t id, uint64_t arrival, uint64_t duration);
+
+/* Departure of the last submitted packet, the link is busy until then */
+uint64_t scheduler_busy_until(struct link_scheduler *s);
+
+/* Packets waiting for their deadline */
+size_t scheduler_pending(struct link_scheduler *s);
+
+/* Deadline of the next packet, UINT64_MAX if there is none */
+uint64_t scheduler_next_deadline(struct link_scheduler *s);
+
+/* Pops up to max packets with deadline <= now into ids, in departure order, returns their count */
+size_t scheduler_release_due(struct link_scheduler *s, uint64_t now, uint32_t *ids, size_t max);
+
+/* Starts verdict thread that calls release(ctx, id) when deadlines expire */
+int scheduler_start(struct link_scheduler *s, release_fn release, void *ctx);
+
+/* Stops verdict thread, packets that are still pending are not released */
+void scheduler_stop(struct link_scheduler *s);
+
+#endif
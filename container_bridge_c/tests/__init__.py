@@ -0,0 +1,19 @@
+import os
+import shutil
+import subprocess
+import unittest
+
+import bridge_model
+
+
+def build_model():
+    """
+    Builds libbridge_model.so with make, skips the tests if it can't be built
+    """
+    if shutil.which("make") is None:
+        raise unittest.SkipTest("make is not available")
+    try:
+        subprocess.run(["make", "-s", "-C", os.path.dirname(bridge_model.LIBRARY), "libbridge_model.so"],
+                       check=True)
+    except subprocess.CalledProcessError as e:
+        raise unittest.SkipTest(f"libbridge_model.so could not be built: {e}")
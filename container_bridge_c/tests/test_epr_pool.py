@@ -0,0 +1,68 @@
+import unittest
+
+from bridge_model import EprPool, MODE_SEQUENTIAL, MODE_MIXED, MODE_SUPERDENSE
+from tests import build_model
+
+MS = 10**6
+
+
+def setUpModule():
+    build_model()
+
+
+class TestEprPool(unittest.TestCase):
+
+    def test_level_grows_continuously_up_to_capacity(self):
+        with EprPool(frame_size=10, period=4 * MS, capacity=100) as pool:
+            self.assertEqual(pool.level(0), 0)
+            # 2.5 frames, the half frame is kept as credit
+            self.assertEqual(pool.level(10 * MS), 25)
+            self.assertEqual(pool.level(10 * MS + 399999), 25)
+            self.assertEqual(pool.level(10 * MS + 400000), 26)
+            self.assertEqual(pool.level(10**12), 100)
+
+    def test_transmission_modes(self):
+        with EprPool(frame_size=100, period=MS, capacity=100) as pool:
+            sequential = pool.transmit(0, 60, bit_duration=10)
+            self.assertEqual(sequential.mode, MODE_SEQUENTIAL)
+            self.assertEqual(sequential.delay, 60 * 8 * 10)
+
+            superdense = pool.transmit(10 * MS, 60, bit_duration=10)
+            self.assertEqual(superdense.mode, MODE_SUPERDENSE)
+            self.assertEqual(superdense.delay, 60 * 4 * 10)
+            self.assertEqual((superdense.epr_before, superdense.epr_after), (100, 70))
+
+            mixed = pool.transmit(superdense.start + superdense.delay, 200, bit_duration=10)
+            self.assertEqual(mixed.mode, MODE_MIXED)
+            self.assertEqual(mixed.delay, (70 * 4 + (200 - 140) * 8) * 10)
+            self.assertEqual((mixed.epr_before, mixed.epr_after), (70, 0))
+
+    def test_generation_paused_while_transmitting(self):
+        with EprPool(frame_size=1, period=1000, capacity=10**6) as pool:
+            t = pool.transmit(5000, 4, bit_duration=1000)
+            self.assertEqual((t.epr_before, t.epr_after), (5, 3))
+            end = t.start + t.delay
+            self.assertEqual(pool.level(end - 1), 3)
+            self.assertEqual(pool.level(end + 3000), 6)
+            # Generation was paused for the whole transmission, not only until the level was read
+            later = pool.transmit(end + 3000, 2, bit_duration=1000)
+            self.assertEqual(later.epr_before, 6)
+
+    def test_matches_frame_ticks_at_sub_millisecond_periods(self):
+        period, frame_size = 50000, 3
+        with EprPool(frame_size, period, capacity=10**6) as pool:
+            ticks = 0
+            for n in range(1, 200):
+                now = n * 37 * period + period // 3
+                ticks = now // period
+                self.assertEqual(pool.level(now), ticks * frame_size)
+
+    def test_configure_keeps_generated_credit(self):
+        with EprPool(frame_size=10, period=MS, capacity=1000) as pool:
+            self.assertEqual(pool.level(5 * MS), 50)
+            pool.configure(frame_size=1, period=MS, capacity=20, now=5 * MS)
+            self.assertEqual(pool.level(5 * MS), 20)
+            pool.configure(frame_size=1, period=MS, capacity=1000, now=5 * MS)
+            self.assertEqual(pool.level(15 * MS), 30)
+            pool.configure(frame_size=5, period=0, capacity=40, now=15 * MS)
+            self.assertEqual(pool.level(15 * MS + 1), 40)
@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+
+from bridge_model import EprPool, Link, LinkGroup, LinkParams, ControlServer, MODE_SEQUENTIAL, MODE_SUPERDENSE
+from tests import build_model
+
+MS = 10**6
+
+
+def setUpModule():
+    build_model()
+
+
+def params(**kwargs):
+    values = dict(epr_frame_size=100, epr_buffer_size=1000, sleep_time=MS,
+                  single_transmission_delay=10, buffer_size=16)
+    values.update(kwargs)
+    return LinkParams(**values)
+
+
+class TestLink(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = EprPool(100, MS, 1000)
+        self.link = Link(params(), self.pool)
+
+    def tearDown(self):
+        self.link.close()
+        self.pool.close()
+
+    def stats(self):
+        reply = json.loads(self.link.request("stats"))
+        self.assertTrue(reply["ok"])
+        return reply
+
+    def test_counters(self):
+        departure, first = self.link.transmit(1, 0, 100)
+        self.assertEqual(first.mode, MODE_SEQUENTIAL)
+        self.assertEqual(departure, 100 * 8 * 10)
+        # Arrives while the first packet is on the link
+        departure, second = self.link.transmit(2, 4000, 100)
+        self.assertEqual(second.start, 8000)
+        self.assertEqual(departure, 16000)
+        _, third = self.link.transmit(3, 10 * MS, 100)
+        self.assertEqual(third.mode, MODE_SUPERDENSE)
+
+        stats = self.stats()
+        self.assertEqual(stats["packets"], 3)
+        self.assertEqual(stats["bytes"], 300)
+        self.assertEqual((stats["sequential"], stats["mixed"], stats["superdense"]), (2, 0, 1))
+        self.assertEqual(stats["delay_total"], 8000 + 12000 + 4000)
+        self.assertEqual(stats["transmission_total"], 8000 + 8000 + 4000)
+        self.assertEqual(stats["queue_length"], 3)
+        self.assertEqual(stats["drops"], 0)
+
+    def test_set_parameters(self):
+        self.assertEqual(self.link.set("single_transmission_delay", 20, 0), 0)
+        self.assertEqual(self.link.transmit(1, 0, 10)[1].delay, 10 * 8 * 20)
+        self.assertEqual(self.link.set("nonexistent", 1, 0), -1)
+        # Buffer size can't be applied without a netfilter queue
+        self.assertEqual(self.link.set("buffer_size", 32, 0), -2)
+        self.assertEqual(self.link.params.buffer_size, 16)
+
+        reply = json.loads(self.link.request("set epr_buffer_size 50"))
+        self.assertEqual(reply, {"ok": True})
+        self.assertEqual(self.pool.level(10**12), 50)
+        self.assertEqual(self.stats()["epr_buffer_size"], 50)
+        self.assertFalse(json.loads(self.link.request("set epr_buffer_size"))["ok"])
+        self.assertFalse(json.loads(self.link.request("reboot"))["ok"])
+
+
+class TestLinkGroup(unittest.TestCase):
+
+    def setUp(self):
+        self.pools = [EprPool(100, MS, 1000), EprPool(100, MS, 1000)]
+        self.links = []
+
+    def tearDown(self):
+        for link in self.links:
+            link.close()
+        for pool in self.pools:
+            pool.close()
+
+    def group(self, shared):
+        pools = [self.pools[0], self.pools[0]] if shared else self.pools
+        self.links = [Link(params(), pool) for pool in pools]
+        return LinkGroup(self.links)
+
+    def request(self, group, request):
+        return json.loads(group.request(request))
+
+    def test_directions_have_their_own_buffer(self):
+        forward, backward = self.group(shared=False).links
+        departure, _ = forward.transmit(1, 0, 100)
+        # Does not wait for the packet in the other direction
+        self.assertEqual(backward.transmit(2, 0, 100)[0], departure)
+        self.assertEqual(forward.transmit(3, 0, 100)[0], 2 * departure)
+
+    def test_shared_pool(self):
+        forward, backward = self.group(shared=True).links
+        # 10 frames generated, the forward packet uses 400 of 1000 qubytes
+        _, first = forward.transmit(1, 10 * MS, 800)
+        _, second = backward.transmit(2, 10 * MS, 800)
+        self.assertEqual((first.epr_before, first.epr_after), (1000, 600))
+        self.assertEqual((second.epr_before, second.epr_after), (600, 200))
+
+    def test_separate_pools(self):
+        forward, backward = self.group(shared=False).links
+        forward.transmit(1, 10 * MS, 800)
+        self.assertEqual(backward.transmit(2, 10 * MS, 800)[1].epr_before, 1000)
+
+    def test_stats(self):
+        with self.group(shared=True) as group:
+            self.links[0].transmit(1, 0, 100)
+            self.links[1].transmit(2, 0, 50)
+            self.links[1].transmit(3, 0, 50)
+            stats = self.request(group, "stats")
+            self.assertTrue(stats["ok"])
+            self.assertEqual([link["packets"] for link in stats["links"]], [1, 2])
+            self.assertEqual((stats["packets"], stats["bytes"], stats["queue_length"]), (3, 200, 3))
+            # Shared pool is counted once
+            self.assertEqual(stats["epr_level"], stats["links"][0]["epr_level"])
+            self.assertEqual(self.request(group, "link 1 stats")["packets"], 2)
+
+    def test_set(self):
+        with self.group(shared=False) as group:
+            self.assertEqual(self.request(group, "set single_transmission_delay 20"), {"ok": True})
+            self.assertEqual([link.params.single_transmission_delay for link in self.links], [20, 20])
+            self.assertEqual(self.request(group, "link 0 set single_transmission_delay 30"), {"ok": True})
+            self.assertEqual([link.params.single_transmission_delay for link in self.links], [30, 20])
+            self.assertFalse(self.request(group, "set nonexistent 1")["ok"])
+            self.assertFalse(self.request(group, "link 2 stats")["ok"])
+            self.assertFalse(self.request(group, "link")["ok"])
+
+
+class TestControlServer(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "control.sock")
+        self.pool = EprPool(100, MS, 1000)
+        self.link = Link(params(), self.pool)
+        self.server = ControlServer(self.path, self.link)
+
+    def tearDown(self):
+        self.server.close()
+        self.link.close()
+        self.pool.close()
+        self.dir.cleanup()
+
+    def test_requests_over_socket(self):
+        self.link.transmit(1, 0, 60)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(5)
+            client.connect(self.path)
+            client.sendall(b"set sleep_time 2000000\nstats\n")
+            replies = b""
+            while replies.count(b"\n") < 2:
+                replies += client.recv(4096)
+        set_reply, stats = [json.loads(line) for line in replies.decode().splitlines()]
+        self.assertEqual(set_reply, {"ok": True})
+        self.assertEqual(stats["packets"], 1)
+        self.assertEqual(stats["sleep_time"], 2 * MS)
+
+    def test_group_over_socket(self):
+        backward = Link(params(), self.pool)
+        with LinkGroup([self.link, backward]) as group, \
+                ControlServer(os.path.join(self.dir.name, "group.sock"), group):
+            backward.transmit(1, 0, 60)
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.settimeout(5)
+                client.connect(os.path.join(self.dir.name, "group.sock"))
+                client.sendall(b"stats\n")
+                reply = b""
+                while not reply.endswith(b"\n"):
+                    reply += client.recv(4096)
+        backward.close()
+        stats = json.loads(reply)
+        self.assertEqual([link["packets"] for link in stats["links"]], [0, 1])
+
+    def test_close_removes_socket(self):
+        self.server.close()
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,77 @@
+import threading
+import time
+import unittest
+
+from bridge_model import LinkScheduler, monotonic_ns
+from tests import build_model
+
+# Generous bounds, the verdict thread competes with the rest of a loaded test machine
+TRANSMISSION_NS = 50 * 10**6
+SUBMIT_BOUND_NS = 25 * 10**6
+RELEASE_LATENESS_NS = 100 * 10**6
+
+
+def setUpModule():
+    build_model()
+
+
+class TestLinkScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = LinkScheduler(capacity=2)
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def test_link_is_serial(self):
+        # Second packet arrives while the first one is transmitted
+        self.assertEqual(self.scheduler.submit(1, 1000, 500), 1500)
+        self.assertEqual(self.scheduler.submit(2, 1200, 100), 1600)
+        # Link was idle when the third one arrived
+        self.assertEqual(self.scheduler.submit(3, 5000, 0), 5000)
+        self.assertEqual(self.scheduler.busy_until, 5000)
+        self.assertEqual(self.scheduler.pending, 3)
+        self.assertEqual(self.scheduler.next_deadline, 1500)
+
+    def test_release_due(self):
+        for packet_id in range(10):
+            self.scheduler.submit(packet_id, 0, 10)
+        self.assertEqual(self.scheduler.release_due(9), [])
+        self.assertEqual(self.scheduler.release_due(35), [0, 1, 2])
+        self.assertEqual(self.scheduler.release_due(1000, max_count=4), [3, 4, 5, 6])
+        self.assertEqual(self.scheduler.release_due(1000), [7, 8, 9])
+        self.assertIsNone(self.scheduler.next_deadline)
+
+    def test_push_orders_by_deadline_then_push_order(self):
+        for packet_id, deadline in [(1, 30), (2, 10), (3, 20), (4, 10), (5, 5)]:
+            self.scheduler.push(packet_id, deadline)
+        self.assertEqual(self.scheduler.release_due(100), [5, 2, 4, 3, 1])
+
+    def test_verdict_thread_releases_on_time(self):
+        released = []
+        done = threading.Event()
+
+        def release(packet_id):
+            released.append((packet_id, monotonic_ns()))
+            if len(released) == 3:
+                done.set()
+
+        self.scheduler.start(release)
+        start = monotonic_ns()
+        departures = [self.scheduler.submit(packet_id, start, TRANSMISSION_NS) for packet_id in range(3)]
+        submitted = monotonic_ns()
+        self.assertTrue(done.wait(5))
+        self.scheduler.stop()
+        # Submitting did not wait for transmissions
+        self.assertLess(submitted - start, SUBMIT_BOUND_NS)
+        self.assertEqual([packet_id for packet_id, _ in released], [0, 1, 2])
+        for (_, released_at), departure in zip(released, departures):
+            self.assertGreaterEqual(released_at, departure)
+            self.assertLess(released_at - departure, RELEASE_LATENESS_NS)
+
+    def test_stop_leaves_pending_packets(self):
+        self.scheduler.start(lambda packet_id: None)
+        self.scheduler.submit(1, monotonic_ns(), 10**12)
+        time.sleep(0.01)
+        self.scheduler.stop()
+        self.assertEqual(self.scheduler.pending, 1)
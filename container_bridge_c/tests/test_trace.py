@@ -0,0 +1,75 @@
+import ctypes
+import os
+import struct
+import tempfile
+import threading
+import unittest
+
+from bridge_model import TraceRing, TraceRecord
+from tests import build_model
+
+HEADER_FORMAT = "<8sIIQQQQQ"
+HEADER_SIZE = 64
+RECORD_FORMAT = "<QQQQIIIBBH"
+
+
+def setUpModule():
+    build_model()
+
+
+def read_dump(path):
+    with open(path, "rb") as dump:
+        data = dump.read()
+    magic, version, record_size, count, total, capacity, _, _ = struct.unpack_from(HEADER_FORMAT, data)
+    records = [struct.unpack_from(RECORD_FORMAT, data, HEADER_SIZE + i * record_size) for i in range(count)]
+    return (magic, version, record_size, count, total, capacity), records
+
+
+class TestTraceRing(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "trace.bin")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_layout(self):
+        self.assertEqual(struct.calcsize(RECORD_FORMAT), 48)
+        self.assertEqual(ctypes.sizeof(TraceRecord), 48)
+
+    def test_dump(self):
+        with TraceRing(4) as ring:
+            ring.add(arrival=100, departure=300, delay=200, length=60, epr_before=10, epr_after=0, mode=1)
+            self.assertEqual(ring.dump(self.path), 1)
+        header, records = read_dump(self.path)
+        self.assertEqual(header, (b"QNETTRCE", 1, 48, 1, 1, 4))
+        self.assertEqual(records, [(1, 100, 300, 200, 60, 10, 0, 1, 0, 0)])
+
+    def test_keeps_last_records(self):
+        with TraceRing(5) as ring:
+            for n in range(20):
+                ring.add(arrival=n, length=n)
+            self.assertEqual(ring.dump(self.path), 8)
+        header, records = read_dump(self.path)
+        self.assertEqual(header[3:], (8, 20, 8))
+        self.assertEqual([record[0] for record in records], list(range(13, 21)))
+        self.assertEqual([record[1] for record in records], list(range(12, 20)))
+
+    def test_concurrent_producers(self):
+        with TraceRing(1 << 12) as ring:
+            def produce(link):
+                for n in range(500):
+                    ring.add(arrival=n, link=link)
+
+            threads = [threading.Thread(target=produce, args=(link,)) for link in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(ring.dump(self.path), 2000)
+        _, records = read_dump(self.path)
+        self.assertEqual(sorted(record[0] for record in records), list(range(1, 2001)))
+        for link in range(4):
+            self.assertEqual([record[1] for record in records if record[8] == link], list(range(500)))
+
@@ -0,0 +1,117 @@
+#include "trace.h"
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#define HEADER_SIZE 64
+
+int trace_init(struct trace_ring *ring, size_t capacity)
+{
+  size_t size = 1;
+
+  while (size < capacity)
+    size <<= 1;
+  ring->slots = calloc(size, sizeof(*ring->slots));
+  if (!ring->slots)
+    return -1;
+  ring->mask = size - 1;
+  atomic_init(&ring->head, 0);
+  return 0;
+}
+
+void trace_destroy(struct trace_ring *ring)
+{
+  free(ring->slots);
+  ring->slots = NULL;
+}
+
+struct trace_ring *trace_new(size_t capacity)
+{
+  struct trace_ring *ring = malloc(sizeof(*ring));
+  if (ring && trace_init(ring, capacity) < 0) {
+    free(ring);
+    return NULL;
+  }
+  return ring;
+}
+
+void trace_free(struct trace_ring *ring)
+{
+  if (!ring)
+    return;
+  trace_destroy(ring);
+  free(ring);
+}
+
+void trace_add(struct trace_ring *ring, const struct trace_record *record)
+{
+  uint64_t seq = atomic_fetch_add_explicit(&ring->head, 1, memory_order_relaxed) + 1;
+  struct trace_slot *slot = &ring->slots[(seq - 1) & ring->mask];
+
+  // Readers skip the slot until the new record is complete
+  atomic_store_explicit(&slot->seq, 0, memory_order_relaxed);
+  atomic_thread_fence(memory_order_release);
+  slot->record = *record;
+  slot->record.seq = seq;
+  atomic_store_explicit(&slot->seq, seq, memory_order_release);
+}
+
+static uint64_t clock_ns(clockid_t clock)
+{
+  struct timespec ts;
+  clock_gettime(clock, &ts);
+  return (uint64_t)ts.tv_sec * 1000000000ULL + (uint64_t)ts.tv_nsec;
+}
+
+long trace_dump(struct trace_ring *ring, const char *path)
+{
+  unsigned char header[HEADER_SIZE];
+  uint32_t version = TRACE_VERSION, record_size = sizeof(struct trace_record);
+  uint64_t capacity = ring->mask + 1;
+  uint64_t head = atomic_load_explicit(&ring->head, memory_order_acquire);
+  uint64_t first = head > capacity ? head - capacity + 1 : 1;
+  uint64_t count = 0;
+  uint64_t monotonic = clock_ns(CLOCK_MONOTONIC), realtime = clock_ns(CLOCK_REALTIME);
+  char tmp_path[4096];
+  FILE *f;
+
+  // Readers only ever see a complete dump, it replaces the previous one at once
+  if (snprintf(tmp_path, sizeof(tmp_path), "%s.tmp", path) >= (int)sizeof(tmp_path))
+    return -1;
+  f = fopen(tmp_path, "wb");
+  if (!f)
+    return -1;
+  // Count is filled in when the records are written
+  memset(header, 0, sizeof(header));
+  fwrite(header, 1, sizeof(header), f);
+  for (uint64_t seq = first; seq <= head; seq++) {
+    struct trace_slot *slot = &ring->slots[(seq - 1) & ring->mask];
+    struct trace_record record;
+    if (atomic_load_explicit(&slot->seq, memory_order_acquire) != seq)
+      continue; // Still written, or already overwritten
+    record = slot->record;
+    atomic_thread_fence(memory_order_acquire);
+    if (atomic_load_explicit(&slot->seq, memory_order_relaxed) != seq || record.seq != seq)
+      continue;
+    fwrite(&record, sizeof(record), 1, f);
+    count++;
+  }
+
+  memcpy(header, TRACE_MAGIC, 8);
+  memcpy(header + 8, &version, 4);
+  memcpy(header + 12, &record_size, 4);
+  memcpy(header + 16, &count, 8);
+  memcpy(header + 24, &head, 8);
+  memcpy(header + 32, &capacity, 8);
+  memcpy(header + 40, &monotonic, 8);
+  memcpy(header + 48, &realtime, 8);
+  fseek(f, 0, SEEK_SET);
+  fwrite(header, 1, sizeof(header), f);
+  if (fclose(f) != 0 || rename(tmp_path, path) != 0) {
+    remove(tmp_path);
+    return -1;
+  }
+  return (long)count;
+}
@@ -0,0 +1,61 @@
+#ifndef TRACE_H
+#define TRACE_H
+
+#include <stdatomic.h>
+#include <stddef.h>
+#include <stdint.h>
+
+/*
+ * In-memory packet trace of the bridge.
+ * Fixed size records go into a ring that keeps the last capacity records,
+ * producers claim slots with one atomic increment and never wait.
+ * The ring is written to a file on request (trace_dump), e.g. on SIGUSR1 or exit.
+ *
+ * File layout (little endian, experiments/aux/bridge_trace.py reads it):
+ *   header (64 bytes): magic "QNETTRCE", version, record size, record count,
+ *                      records traced in total, capacity, monotonic and realtime ns at dump
+ *   records: struct trace_record, oldest first
+ */
+
+#define TRACE_MAGIC "QNETTRCE"
+#define TRACE_VERSION 1
+
+struct trace_record {
+  uint64_t seq;        // Number of the record, from 1
+  uint64_t arrival;    // CLOCK_MONOTONIC ns
+  uint64_t departure;  // CLOCK_MONOTONIC ns
+  uint64_t delay;      // ns of transmission on the link
+  uint32_t length;     // bytes
+  uint32_t epr_before; // qubytes
+  uint32_t epr_after;  // qubytes
+  uint8_t mode;        // enum transmission_mode
+  uint8_t link;        // Direction
+  uint16_t reserved;
+};
+
+struct trace_slot {
+  atomic_uint_fast64_t seq; // Record is complete when it equals record.seq, 0 while it's written
+  struct trace_record record;
+};
+
+struct trace_ring {
+  struct trace_slot *slots;
+  uint64_t mask; // capacity - 1, capacity is a power of 2
+  atomic_uint_fast64_t head; // Records claimed so far
+};
+
+/* Ring of at least capacity records */
+int trace_init(struct trace_ring *ring, size_t capacity);
+void trace_destroy(struct trace_ring *ring);
+
+/* Heap allocated ring, for bindings that can't embed the struct */
+struct trace_ring *trace_new(size_t capacity);
+void trace_free(struct trace_ring *ring);
+
+/* Appends a copy of record (its seq is assigned), overwrites the oldest one if the ring is full */
+void trace_add(struct trace_ring *ring, const struct trace_record *record);
+
+/* Writes complete records in the ring to path (through path.tmp), returns their count or -1 */
+long trace_dump(struct trace_ring *ring, const char *path);
+
+#endif
@@ -5,6 +5,7 @@ and adds puts them through custom channels
 import os
 import time
 import sys
+from functools import partial
 
 from netfilterqueue import NetfilterQueue
 from qunetsim.components import Host
@@ -15,32 +16,18 @@ from scapy.all import *
 
 from quantum_bridge.threaded_channel.channel import Channel
 from quantum_bridge.simple_bridge import SimpleChannel
+from quantum_bridge.packet_codec import to_bit_array, from_bit_array, to_bits, from_bits
+from quantum_bridge.queue_worker import QueueWorker, parse_queue_range
+from quantum_bridge.async_logger import LOGGER, HEXDUMP_STREAM, QueueDepthSampler
+from quantum_bridge.bridge_status import StatusPublisher
 
 
 LOGFILE = "/app/log.txt"
+QUEUE_DEPTH_LOGFILE = "/app/queue_depth.log"
+#Status for the host, on the volume shared with it
+STATUS_FILE = "/logs/status.json"
 
 
-def to_bit_array(pkt):
-    """
-    Takes packet netfilterqueue packet and returns list
-    bytes as list of integers representing bits
-    """
-    byte_list = list(raw(pkt))
-    bin_list = [format(x, "#010b") for x in byte_list]
-    bin_list = [x[2:] for x in bin_list]
-    return bin_list
-
-
-def from_bit_array(bin_list):
-    """
-    Takes list of bytes as list of integers representing bits
-    and returns raw bytes that can be used to reconstruct a packet
-    """
-    print(bin_list)
-    byte_list = [hex(int(x,2)) for x in bin_list]
-    result = bytes([int(x,0) for x in byte_list])
-    return result
-
 hosts = []
 with open("/app/hosts.txt", "r") as host_file:
     for line in host_file.readlines():
@@ -52,8 +39,15 @@ if len(sys.argv) > 1:
 buffer_size = None
 if len(sys.argv) > 2:
     buffer_size = int(sys.argv[2])
+batched_frames = False
+if len(sys.argv) > 3:
+    batched_frames = bool(int(sys.argv[3]))
+#Multi-queue mode: range of queues (e.g. 0-1), one worker per queue
+queue_nums = None
+if len(sys.argv) > 4:
+    queue_nums = parse_queue_range(sys.argv[4])
 
-quantum_protocol = Channel(hosts, epr_frame_size)
+quantum_protocol = Channel(hosts, epr_frame_size, batched_frames=batched_frames)
 
 def packet_diff(in_bits:list, out_bits:list):
     """
@@ -77,43 +71,53 @@ def packet_diff(in_bits:list, out_bits:list):
 
 def packet_processing(pkt):
     """
-    Gets called for every packet in the netfilter queue
+    Gets called for every packet in the netfilter queue,
+    submits packet to the quantum link and returns without waiting for it
     """
-    with open("/proc/net/netfilter/nfnetlink_queue", "r") as proc_file:
-        proc_line = [x for x in proc_file.readline().split(" ") if x]
-        print(f"Packets in queue:  {proc_line[2]}")
-        #print(f"Packets processed: {proc_line[7]}")
-
-    with open(LOGFILE, "a") as logfile:
-        pkt.drop()
-        start = time.time()
-        print(pkt.get_payload())
-        print(pkt.get_payload_len())
-        packet = IP(pkt.get_payload())
-        packet_bits = to_bit_array(packet)
-
-        source_address = packet[IP].src
-        print(f"Packet received from {source_address}")
-
-        raw_bytes_list = list(raw(packet))
-        print(raw_bytes_list)
-        if len(raw_bytes_list) == 52 and raw_bytes_list[-4] == 25:
-            print("EPR SIGNAL RECEIVED")
-            epr_packet_bits = quantum_protocol.transmit_packet('epr', source_address, "epr")
-            return
-
-
-        new_packet_bits = quantum_protocol.transmit_packet(packet_bits, source_address, "normal")
-        print("SENDING ONWARDS")
+    pkt.drop()
+    start = time.time()
+    payload = pkt.get_payload()
+    packet = IP(payload)
+    if batched_frames:
+        packet_bits = to_bits(payload)
+    else:
+        packet_bits = to_bit_array(payload)
+
+    source_address = packet[IP].src
+    LOGGER.debug(LOGFILE, f"Packet received from {source_address}, {len(payload)} bytes")
+
+    if len(payload) == 52 and payload[-4] == 25:
+        LOGGER.debug(LOGFILE, "EPR SIGNAL RECEIVED")
+        quantum_protocol.submit_packet('epr', source_address, "epr")
+        return
+
+    quantum_protocol.submit_packet(packet_bits, source_address, "normal",
+                                   callback=partial(forward_packet, packet, start))
+
+
+def forward_packet(packet, start, transmission):
+    """
+    Gets called once packet came out of the quantum link,
+    sends it onwards
+    """
+    new_packet_bits = transmission.result()
+    if new_packet_bits is None:
+        LOGGER.warning(LOGFILE, "PACKET DROPPED (quantum link queue full)")
+        return
+    LOGGER.debug(LOGFILE, "SENDING ONWARDS")
+    if batched_frames:
+        new_packet = IP(from_bits(new_packet_bits))
+    else:
         new_packet = IP(from_bit_array(new_packet_bits))
-        send(new_packet)
-        end = time.time()
-        logfile.write("PACKET TRANSMITTED_________________\n")
-        logfile.write(hexdump(packet, dump=True) + "\n")
-        logfile.write(hexdump(new_packet, dump=True) + "\n")
-        logfile.write("Transmission time:" + str(end-start) + "\n")
-        #packet.show()
-        #new_packet.show()
+    send(new_packet)
+    end = time.time()
+    LOGGER.info(LOGFILE, "PACKET TRANSMITTED_________________")
+    if LOGGER.sampled(HEXDUMP_STREAM):
+        LOGGER.debug(LOGFILE, hexdump(packet, dump=True))
+        LOGGER.debug(LOGFILE, hexdump(new_packet, dump=True))
+    LOGGER.info(LOGFILE, "Transmission time:" + str(end-start))
+    #packet.show()
+    #new_packet.show()
 
 
 try:
@@ -121,6 +125,61 @@ try:
 except OSError:
     pass
 
+#Queue depth is sampled on a timer instead of per packet
+queue_depth_sampler = QueueDepthSampler(LOGGER, QUEUE_DEPTH_LOGFILE)
+queue_depth_sampler.start()
+
+status_publisher = None
+if os.path.isdir(os.path.dirname(STATUS_FILE)):
+    status_publisher = StatusPublisher(STATUS_FILE,
+                                       lambda: {"packets": quantum_protocol.packet_logger.writer.count,
+                                                "queues": quantum_protocol.queue_stats()})
+    status_publisher.start()
+
+
+def signal_ready():
+    """
+    Signals host that bridge has started
+    """
+    open(LOGFILE, 'a').close()
+    if status_publisher is not None:
+        status_publisher.set_ready()
+
+
+def run_multi_queue(queue_nums):
+    """
+    Binds every queue to its own worker and waits until interrupted
+    """
+    if batched_frames:
+        encode, decode = to_bits, from_bits
+    else:
+        encode, decode = to_bit_array, from_bit_array
+    workers = []
+    for queue_num in queue_nums:
+        nfqueue = NetfilterQueue()
+        worker = QueueWorker(nfqueue, queue_num, quantum_protocol, encode, decode, logfile=LOGFILE)
+        if buffer_size == None:
+            nfqueue.bind(queue_num, worker.handle_packet)
+        else:
+            nfqueue.bind(queue_num, worker.handle_packet, buffer_size)
+        workers.append(worker)
+    for worker in workers:
+        worker.start()
+    signal_ready()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print('')
+    for worker in workers:
+        worker.stop()
+        worker.nfqueue.unbind()
+        print(worker.stats())
+
+
+if queue_nums is not None:
+    run_multi_queue(queue_nums)
+    sys.exit(0)
 
 nfqueue = NetfilterQueue()
 if buffer_size == None:
@@ -133,7 +192,7 @@ print("Listening on a netfilter queue 1")
 #print("Started with entanglement generation")
 #t = DaemonThread(quantum_protocol.entanglement_generation)
 #Create file to signal that bridge has started
-open(LOGFILE, 'a').close()
+signal_ready()
 
 try:
     nfqueue.run()
@@ -0,0 +1,238 @@
+"""
+Asynchronous buffered logging of the bridge.
+Log lines are collected in memory and written by a background
+flusher thread, every log file is opened once per flush.
+
+Debug streams (e.g. hexdumps, per qubit traces) are off by default,
+they are enabled and sampled through environment variables:
+    BRIDGE_LOG_LEVEL=DEBUG
+    BRIDGE_DEBUG_STREAMS=hexdump:100,qubits:1   (stream:log every n-th record)
+"""
+from threading import Event, Lock, Thread
+import atexit
+import os
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+HEXDUMP_STREAM = "hexdump"
+QUBIT_STREAM = "qubits"
+
+
+def parse_debug_streams(streams: str):
+    """
+    Parses debug stream configuration,
+    "hexdump:100,qubits" -> {"hexdump": 100, "qubits": 1}
+    """
+    sample_rates = {}
+    for stream in streams.split(","):
+        stream = stream.strip()
+        if not stream:
+            continue
+        name, _, sample_every = stream.partition(":")
+        sample_rates[name] = int(sample_every) if sample_every else 1
+    return sample_rates
+
+
+class AsyncLogger:
+    """ AsyncLogger
+    -> log() only appends the line to an in-memory buffer
+    -> Background thread flushes the buffers every flush_interval seconds,
+       all pending lines of a file are written with a single write
+    -> Lines are dropped (and counted) if more than max_pending are waiting
+    """
+
+    def __init__(self, level=INFO, flush_interval=0.5, max_pending=100000, debug_streams=None):
+        """
+        Inits logger, flusher thread is started with the first logged line
+        debug_streams: stream name -> log every n-th record of the stream
+        """
+        self.level = level
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.debug_streams = dict(debug_streams or {})
+        self._stream_counters = {}
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._flush_now = Event()
+        self._stop_signal = Event()
+        self._thread = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        """
+        Starts flusher thread
+
+        PUBLIC METHOD
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_signal.clear()
+            self._thread = Thread(target=self._flusher, daemon=True)
+            self._thread.start()
+
+    def log(self, path, line, level=INFO):
+        """
+        Buffers line for the file at path
+
+        PUBLIC METHOD
+        """
+        if level < self.level:
+            return
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            if self._pending_count >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.setdefault(path, []).append(line)
+            self._pending_count += 1
+
+    def debug(self, path, line):
+        self.log(path, line, DEBUG)
+
+    def info(self, path, line):
+        self.log(path, line, INFO)
+
+    def warning(self, path, line):
+        self.log(path, line, WARNING)
+
+    def error(self, path, line):
+        self.log(path, line, ERROR)
+
+    def enabled(self, stream):
+        """
+        True if debug stream is enabled,
+        used to skip building expensive log lines
+
+        PUBLIC METHOD
+        """
+        return self.level <= DEBUG and stream in self.debug_streams
+
+    def sampled(self, stream):
+        """
+        True for every n-th call of an enabled debug stream
+
+        PUBLIC METHOD
+        """
+        if not self.enabled(stream):
+            return False
+        with self._lock:
+            count = self._stream_counters.get(stream, 0)
+            self._stream_counters[stream] = count + 1
+        return count % self.debug_streams[stream] == 0
+
+    def flush(self):
+        """
+        Writes all pending lines now
+
+        PUBLIC METHOD
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._pending_count = 0
+            for path, lines in pending.items():
+                try:
+                    with open(path, "a") as log_file:
+                        log_file.write("\n".join(lines) + "\n")
+                    self.written += len(lines)
+                except OSError as e:
+                    print(f"Could not write log {path}: {e}")
+
+    def close(self):
+        """
+        Stops flusher thread and writes remaining lines
+
+        PUBLIC METHOD
+        """
+        self._stop_signal.set()
+        self._flush_now.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _flusher(self):
+        """
+        Is ran in thread
+
+        PRIVATE METHOD: started by start
+        """
+        while not self._stop_signal.is_set():
+            self._flush_now.wait(self.flush_interval)
+            self._flush_now.clear()
+            self.flush()
+
+
+class QueueDepthSampler:
+    """ QueueDepthSampler
+    Samples netfilter queue depth on a timer instead of per packet,
+    every sample is logged as: queue_num, packets waiting, packets dropped by kernel
+    """
+
+    PROC_FILE = "/proc/net/netfilter/nfnetlink_queue"
+
+    def __init__(self, logger, path, interval=1):
+        self.logger = logger
+        self.path = path
+        self.interval = interval
+        self._stop_signal = Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts sampler thread
+
+        PUBLIC METHOD
+        """
+        self._thread = Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampler thread
+
+        PUBLIC METHOD
+        """
+        self._stop_signal.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def sample(self):
+        """
+        Reads queue depths once
+
+        PUBLIC METHOD
+        """
+        try:
+            with open(self.PROC_FILE, "r") as proc_file:
+                lines = proc_file.readlines()
+        except OSError:
+            return []
+        samples = []
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            samples.append((int(fields[0]), int(fields[2]), int(fields[5])))
+        return samples
+
+    def _sample_loop(self):
+        while not self._stop_signal.wait(self.interval):
+            for queue_num, waiting, dropped in self.sample():
+                self.logger.info(self.path, f"Packets in queue {queue_num}: {waiting} (dropped {dropped})")
+
+
+LOGGER = AsyncLogger(level=LEVELS.get(os.environ.get("BRIDGE_LOG_LEVEL", "INFO").upper(), INFO),
+                     debug_streams=parse_debug_streams(os.environ.get("BRIDGE_DEBUG_STREAMS", "")))
+atexit.register(LOGGER.close)
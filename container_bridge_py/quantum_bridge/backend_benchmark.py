@@ -0,0 +1,74 @@
+"""
+Benchmark of the stabilizer backends.
+Distributes an EPR frame, encodes a payload superdensely into it
+and decodes it again, the way batched quantum frames do.
+
+Run from container_bridge_py:
+    python -m quantum_bridge.backend_benchmark [epr_frame_size] [rounds]
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from qunetsim.objects import Qubit
+
+from quantum_bridge.threaded_channel.quantum_frame import encode_superdense, decode_superdense
+from quantum_bridge.threaded_channel.simple_stabilizer_backend import SimpleStabilizerBackend
+from quantum_bridge.threaded_channel.array_stabilizer_backend import ArrayStabilizerBackend
+
+
+def epr_frame_round_trip(backend, pair_count, use_indices=False):
+    """
+    Creates pair_count EPR pairs, sends 2*pair_count bits through them
+    and returns the received bits
+    """
+    bits = np.random.randint(0, 2, 2 * pair_count).astype(np.uint8)
+    if use_indices:
+        local = backend.create_qubits("A", pair_count)
+        remote = backend.create_qubits("A", pair_count)
+    else:
+        host = SimpleNamespace(host_id="A", backend=backend)
+        local = [Qubit(host, qubit=q, q_id=str(i))
+                 for i, q in enumerate(backend.create_qubits("A", pair_count))]
+        remote = [Qubit(host, qubit=q, q_id=str(i))
+                  for i, q in enumerate(backend.create_qubits("A", pair_count))]
+    backend.H_batch(local)
+    backend.cnot_batch(local, remote)
+    backend.apply_paulis(local, encode_superdense(bits))
+    backend.cnot_batch(local, remote)
+    backend.H_batch(local)
+    received = decode_superdense(backend.measure_batch(local), backend.measure_batch(remote))
+    if not np.array_equal(bits, received):
+        raise Exception("Backend decoded wrong bits")
+    return received
+
+
+def benchmark(name, backend_factory, pair_count, rounds, use_indices=False):
+    """
+    Runs the round trip rounds times and prints the average duration
+    """
+    backend = backend_factory()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        epr_frame_round_trip(backend, pair_count, use_indices)
+    duration = (time.perf_counter() - start) / rounds
+    print(f"{name:<32} {duration*1000:10.2f} ms/frame {pair_count/duration:14.0f} pairs/s")
+    return duration
+
+
+if __name__ == "__main__":
+    epr_frame_size = 1500
+    if len(sys.argv) > 1:
+        epr_frame_size = int(sys.argv[1])
+    rounds = 5
+    if len(sys.argv) > 2:
+        rounds = int(sys.argv[2])
+
+    pair_count = epr_frame_size * 8
+    print(f"EPR frame size: {epr_frame_size} qubytes ({pair_count} pairs), {rounds} rounds")
+    simple = benchmark("SimpleStabilizerBackend", SimpleStabilizerBackend, pair_count, rounds)
+    array = benchmark("ArrayStabilizerBackend (Qubit)", ArrayStabilizerBackend, pair_count, rounds)
+    indices = benchmark("ArrayStabilizerBackend (indices)", ArrayStabilizerBackend, pair_count, rounds,
+                        use_indices=True)
+    print(f"Speedup: {simple/array:.1f}x with Qubit objects, {simple/indices:.1f}x with index arrays")
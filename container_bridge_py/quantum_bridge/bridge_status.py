@@ -0,0 +1,87 @@
+"""
+Bridge status published for the host.
+Status is a small JSON file on the shared /logs volume,
+it is replaced atomically (write + rename) so readers never see a partial file
+and host side can wait for it with inotify instead of polling the container shell.
+"""
+from threading import Event, Lock, Thread
+import json
+import os
+import time
+
+
+class StatusPublisher:
+    """ StatusPublisher
+    -> Publishes readiness of the bridge and its counters
+    -> Counters are re-read every interval seconds, file is only rewritten when they change
+    """
+
+    def __init__(self, path, counters=None, interval=0.5):
+        """
+        Inits publisher
+        counters: callable returning dict of counters (e.g. packets transmitted)
+        """
+        self.path = path
+        self.counters = counters
+        self.interval = interval
+        self.status = {"ready": False, "pid": os.getpid(), "started_at": time.time()}
+        self._published = None
+        self._lock = Lock()
+        self._stop_signal = Event()
+        self._thread = None
+
+    def set_ready(self):
+        """
+        Marks bridge as ready and publishes status
+
+        PUBLIC METHOD
+        """
+        self.status["ready"] = True
+        self.publish()
+
+    def publish(self):
+        """
+        Writes status if it changed since last write
+
+        PUBLIC METHOD
+        """
+        with self._lock:
+            status = dict(self.status)
+            if self.counters is not None:
+                status.update(self.counters())
+            if status == self._published:
+                return
+            self._published = dict(status)
+            status["updated_at"] = time.time()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as status_file:
+                json.dump(status, status_file)
+            os.replace(tmp_path, self.path)
+
+    def start(self):
+        """
+        Starts publishing counters periodically
+
+        PUBLIC METHOD
+        """
+        self._thread = Thread(target=self._publish_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops publishing, last status is written
+
+        PUBLIC METHOD
+        """
+        self._stop_signal.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.publish()
+
+    def _publish_loop(self):
+        while not self._stop_signal.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as e:
+                print("Exception in status publisher")
+                print(e)
@@ -0,0 +1,70 @@
+"""
+Packet codec, converts raw packet payloads to bit planes and back.
+
+Packets coming out of netfilterqueue are plain bytes, the quantum channel
+works on bits. The codec unpacks the payload into a numpy array of bits
+(one uint8 per bit) without creating python objects per byte.
+The old list-of-strings representation ("01000101", ...) is still
+available through to_bit_array()/from_bit_array().
+"""
+import numpy as np
+
+
+BITS_PER_BYTE = 8
+
+# Lookup tables for the list-of-strings representation
+_BYTE_STRINGS = tuple(format(x, "08b") for x in range(256))
+_BYTE_VALUES = {s: x for x, s in enumerate(_BYTE_STRINGS)}
+
+
+def to_bits(payload):
+    """
+    Takes raw packet payload (bytes, bytearray or memoryview)
+    and returns numpy array of bits (MSB first)
+    """
+    return np.unpackbits(np.frombuffer(memoryview(payload), dtype=np.uint8))
+
+
+def from_bits(bits):
+    """
+    Takes numpy array of bits (MSB first) and returns raw bytes
+    that can be used to reconstruct a packet
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    if len(bits) % BITS_PER_BYTE != 0:
+        raise ValueError(f"Bit array length {len(bits)} is not a multiple of {BITS_PER_BYTE}")
+    return np.packbits(bits).tobytes()
+
+
+def to_bit_array(payload):
+    """
+    Takes raw packet payload and returns list of bytes
+    as strings of bits ("01000101")
+
+    COMPATIBILITY: used by the list based quantum frames
+    """
+    return [_BYTE_STRINGS[x] for x in memoryview(payload).cast("B")]
+
+
+def from_bit_array(bin_list):
+    """
+    Takes list of bytes as strings of bits
+    and returns raw bytes that can be used to reconstruct a packet
+
+    COMPATIBILITY: used by the list based quantum frames
+    """
+    return bytes([_BYTE_VALUES[x] for x in bin_list])
+
+
+def bit_array_to_bits(bin_list):
+    """
+    Converts list of bytes as strings of bits to numpy array of bits
+    """
+    return to_bits(from_bit_array(bin_list))
+
+
+def bits_to_bit_array(bits):
+    """
+    Converts numpy array of bits to list of bytes as strings of bits
+    """
+    return to_bit_array(from_bits(bits))
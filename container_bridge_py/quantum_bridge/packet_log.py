@@ -0,0 +1,196 @@
+"""
+Binary packet log of the threaded channel.
+Every transmitted packet is stored as a fixed width record in a
+preallocated, memory mapped file, the record count in the header
+is updated after each record so the file can be read while it's written.
+
+File layout:
+    header (64 bytes): magic, version, record size, record count, capacity, channel start time
+    records: RECORD_DTYPE
+
+Run from container_bridge_py:
+    python -m quantum_bridge.packet_log export packet_logs.bin packet_logs.log
+    python -m quantum_bridge.packet_log count packet_logs.bin
+"""
+from threading import Lock
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+
+MAGIC = b"QNETPLOG"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = "<8sIIQQd"
+COUNT_OFFSET = 16
+
+TRANSMISSION_TYPES = ["normal", "epr", "mixed", "superdense"]
+
+RECORD_DTYPE = np.dtype([
+    ("sender", "S32"),
+    ("receiver", "S32"),
+    ("start_time", "<f8"),
+    ("end_time", "<f8"),
+    ("measurement_time", "<f8"),
+    ("bit_length", "<u4"),
+    ("epr_consumed", "<i4"),
+    ("transmissions", "<u4"),
+    ("transmission_type", "u1"),
+])
+
+CSV_HEADER = ["sender", "receiver", "start_time", "end_time", "transmission_time",
+              "measurement_time", "transmission_time_no_measurement", "packet bit length",
+              "packet transmission rate (w m)", "packet transmission rate (w/o measurement)",
+              "transmission type", "number of epr consumed", "number of transmissions"]
+
+
+class PacketLogWriter:
+    """ PacketLogWriter
+    Appends packet records to a memory mapped file,
+    file grows by doubling its capacity when it's full
+    """
+
+    def __init__(self, path, channel_start_time=0.0, capacity=65536):
+        """
+        Inits writer, existing file at path is replaced
+        channel_start_time: unix time record times are relative to
+        """
+        self.path = path
+        self.channel_start_time = channel_start_time
+        self.count = 0
+        self._lock = Lock()
+        self._file = open(path, "w+b")
+        self._mmap = None
+        self._records = None
+        self._map(capacity)
+
+    def _map(self, capacity):
+        """
+        Resizes file to capacity records and maps it
+
+        PRIVATE METHOD
+        """
+        self._unmap()
+        self.capacity = capacity
+        self._file.truncate(HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._mmap[:HEADER_SIZE] = struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_DTYPE.itemsize,
+                                               self.count, capacity,
+                                               self.channel_start_time).ljust(HEADER_SIZE, b"\0")
+        self._records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=capacity, offset=HEADER_SIZE)
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._records = None
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+
+    def append(self, sender, receiver, start_time, end_time, measurement_time, bit_length,
+               epr_consumed, transmissions, transmission_type):
+        """
+        Appends one packet record,
+        times are in seconds since channel start
+
+        PUBLIC METHOD
+        """
+        with self._lock:
+            if self._mmap is None:
+                raise ValueError("Packet log is closed")
+            if self.count == self.capacity:
+                self._map(2 * self.capacity)
+            self._records[self.count] = (sender, receiver, start_time, end_time, measurement_time,
+                                         bit_length, epr_consumed, transmissions,
+                                         TRANSMISSION_TYPES.index(transmission_type))
+            self.count += 1
+            struct.pack_into("<Q", self._mmap, COUNT_OFFSET, self.count)
+
+    def flush(self):
+        """
+        Flushes mapped pages to the file
+
+        PUBLIC METHOD
+        """
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.flush()
+
+    def close(self):
+        """
+        Unmaps file and cuts off unused capacity
+
+        PUBLIC METHOD
+        """
+        with self._lock:
+            if self._mmap is None:
+                return
+            self._unmap()
+            self._file.truncate(HEADER_SIZE + self.count * RECORD_DTYPE.itemsize)
+            #Capacity shrinks to the record count
+            self._file.seek(COUNT_OFFSET + 8)
+            self._file.write(struct.pack("<Q", self.count))
+            self._file.close()
+
+
+def read_header(path):
+    """
+    Returns header of the packet log as dict
+    """
+    with open(path, "rb") as log_file:
+        magic, version, record_size, count, capacity, channel_start_time = struct.unpack(
+            HEADER_FORMAT, log_file.read(struct.calcsize(HEADER_FORMAT)))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a packet log")
+    if record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Unsupported packet log record size {record_size}")
+    return {"version": version, "count": count, "capacity": capacity,
+            "channel_start_time": channel_start_time}
+
+
+def read_packet_log(path):
+    """
+    Returns packet records as numpy structured array (RECORD_DTYPE)
+    """
+    header = read_header(path)
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=header["count"], offset=HEADER_SIZE)
+
+
+def csv_lines(records):
+    """
+    Formats records the way the text packet log did
+    """
+    transmission_time = records["end_time"] - records["start_time"]
+    with np.errstate(divide="ignore"):
+        bandwidth = records["bit_length"] / transmission_time
+    yield ",".join(CSV_HEADER)
+    columns = zip(records["sender"].tolist(), records["receiver"].tolist(),
+                  records["start_time"].tolist(), records["end_time"].tolist(),
+                  transmission_time.tolist(), records["bit_length"].tolist(), bandwidth.tolist(),
+                  records["transmission_type"].tolist(), records["epr_consumed"].tolist(),
+                  records["transmissions"].tolist())
+    for (sender, receiver, start_time, end_time, duration, bit_length, rate,
+         transmission_type, epr_consumed, transmissions) in columns:
+        yield (f"{sender.decode()},{receiver.decode()},{start_time:.2f},{end_time:.2f},{duration:.2f},0,"
+               f"{duration:.2f},{bit_length},{rate:.2f},{rate:.2f},"
+               f"{TRANSMISSION_TYPES[transmission_type]},{epr_consumed},{transmissions}")
+
+
+def export_csv(path, csv_path):
+    """
+    Exports binary packet log to the comma separated text format
+    """
+    with open(csv_path, "w") as csv_file:
+        for line in csv_lines(read_packet_log(path)):
+            csv_file.write(line + "\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "export":
+        export_csv(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 3 and sys.argv[1] == "count":
+        print(read_header(sys.argv[2])["count"])
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,11 @@
+"""
+Pauli operation codes shared by the frame encoders and the backends.
+
+Batched frames describe the encoding of every qubit with one code,
+bit 0 is an X, bit 1 a Z gate, PAULI_XZ applies both (X first).
+"""
+
+PAULI_I = 0
+PAULI_X = 1
+PAULI_Z = 2
+PAULI_XZ = PAULI_X | PAULI_Z
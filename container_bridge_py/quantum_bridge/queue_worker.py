@@ -0,0 +1,174 @@
+"""
+Multi-queue mode of the bridge.
+Every netfilter queue is served by its own QueueWorker thread,
+packets are put through the channel and re-injected with
+their new payload by the verdict (set_payload + accept).
+"""
+from collections import deque
+from functools import partial
+from threading import Event
+import os
+import select
+import socket
+
+from .async_logger import LOGGER
+from .threaded_channel.daemon_thread import DaemonThread
+
+
+def parse_queue_range(queue_range: str):
+    """
+    Parses queue range given on command line,
+    "0-1" -> [0, 1], "3" -> [3]
+    """
+    if "-" in queue_range:
+        first, last = queue_range.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(queue_range)]
+
+
+def is_epr_signal(payload):
+    """
+    EPR signal packets are 52 bytes long with IP option 25 set
+    """
+    return len(payload) == 52 and payload[-4] == 25
+
+
+class QueueWorker:
+    """ QueueWorker
+    Serves one netfilter queue in a thread
+    -> Packets are submitted to the channel without waiting for them
+    -> Packets that came out of the channel are collected and receive their
+       verdicts in batches, from the worker thread that owns the queue
+    -> Payload is replaced in the kernel (set_payload + accept),
+       packet is not sent again through a socket
+    """
+
+    def __init__(self, nfqueue, queue_num, channel, encode, decode, poll_interval=1, logfile=None):
+        """
+        Inits worker
+        nfqueue: NetfilterQueue that is already bound to queue_num
+        encode, decode: packet payload <-> channel bits conversion
+        logfile: debug log of the bridge, nothing is logged if None
+        """
+        self.nfqueue = nfqueue
+        self.queue_num = queue_num
+        self.channel = channel
+        self.encode = encode
+        self.decode = decode
+        self.poll_interval = poll_interval
+        self.logfile = logfile
+        self.completed = deque()
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        self.stop_signal = Event()
+        self.thread = None
+        self.received = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.verdict_batches = 0
+
+    def start(self):
+        """
+        Starts worker thread
+
+        PUBLIC METHOD
+        """
+        self.thread = DaemonThread(self.run)
+        print(f"Listening on a netfilter queue {self.queue_num}")
+
+    def stop(self):
+        """
+        Stops worker thread, waits for it to exit
+
+        PUBLIC METHOD
+        """
+        self.stop_signal.set()
+        os.write(self.wakeup_write, b"\0")
+        if self.thread is not None:
+            self.thread.join()
+
+    def handle_packet(self, pkt):
+        """
+        Callback of the netfilter queue,
+        submits packet to the channel and returns without a verdict
+
+        PUBLIC METHOD
+        """
+        #Newer NetfilterQueue frees the packet after the callback unless retained
+        if hasattr(pkt, "retain"):
+            pkt.retain()
+        self.received += 1
+        payload = pkt.get_payload()
+        source_address = socket.inet_ntoa(payload[12:16])
+        if is_epr_signal(payload):
+            if self.logfile is not None:
+                LOGGER.debug(self.logfile, "EPR SIGNAL RECEIVED")
+            self.channel.submit_packet("epr", source_address, "epr")
+            pkt.drop()
+            self.dropped += 1
+            return
+        self.channel.submit_packet(self.encode(payload), source_address, "normal",
+                                   callback=partial(self._complete, pkt))
+
+    def _complete(self, pkt, transmission):
+        """
+        Queues packet for the verdict and wakes up the worker
+
+        PRIVATE METHOD: called by the channel once packet came out of the link
+        """
+        self.completed.append((pkt, transmission.result()))
+        os.write(self.wakeup_write, b"\0")
+
+    def run(self):
+        """
+        Waits for new packets or completed transmissions.
+        Is ran in thread.
+
+        PUBLIC METHOD
+        """
+        queue_fd = self.nfqueue.get_fd()
+        while not self.stop_signal.is_set():
+            readable, _, _ = select.select([queue_fd, self.wakeup_read], [], [], self.poll_interval)
+            if queue_fd in readable:
+                self.nfqueue.run(block=False)
+            if self.wakeup_read in readable:
+                try:
+                    os.read(self.wakeup_read, 4096)
+                except BlockingIOError:
+                    pass
+            self.flush_verdicts()
+
+    def flush_verdicts(self):
+        """
+        Gives verdicts to all completed packets at once
+
+        PUBLIC METHOD
+        """
+        batch_size = 0
+        while len(self.completed) > 0:
+            pkt, out_bits = self.completed.popleft()
+            if out_bits is None:
+                pkt.drop()
+                self.dropped += 1
+            else:
+                pkt.set_payload(self.decode(out_bits))
+                pkt.accept()
+                self.accepted += 1
+            batch_size += 1
+        if batch_size > 0:
+            self.verdict_batches += 1
+        return batch_size
+
+    def stats(self):
+        """
+        Returns packet and verdict counters
+
+        PUBLIC METHOD
+        """
+        return {
+            "queue_num": self.queue_num,
+            "received": self.received,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "verdict_batches": self.verdict_batches,
+        }
@@ -0,0 +1,101 @@
+import random
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from qunetsim.objects import Qubit
+from ..threaded_channel.quantum_frame import encode_superdense, decode_superdense, encode_sequential
+from ..threaded_channel.simple_stabilizer_backend import SimpleStabilizerBackend
+from ..threaded_channel.array_stabilizer_backend import ArrayStabilizerBackend
+
+
+class TestArrayStabilizerBackend(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.backend = ArrayStabilizerBackend(capacity=4)
+        self.bits = np.random.randint(0, 2, 8 * 64).astype(np.uint8)
+
+    def test_capacity_grows(self):
+        idx = self.backend.create_qubits("A", 100)
+        self.assertEqual(idx.tolist(), list(range(100)))
+        host = SimpleNamespace(host_id="A", backend=self.backend)
+        self.assertEqual(Qubit(host).qubit, 100)
+
+    def test_superdense_round_trip_indices(self):
+        pair_count = len(self.bits) // 2
+        local = self.backend.create_qubits("A", pair_count)
+        remote = self.backend.create_qubits("A", pair_count)
+        self.backend.H_batch(local)
+        self.backend.cnot_batch(local, remote)
+        self.backend.apply_paulis(local, encode_superdense(self.bits))
+        self.backend.cnot_batch(local, remote)
+        self.backend.H_batch(local)
+        first_bits = self.backend.measure_batch(local)
+        second_bits = self.backend.measure_batch(remote)
+        self.assertTrue(np.array_equal(decode_superdense(first_bits, second_bits), self.bits))
+
+    def test_sequential_round_trip_indices(self):
+        qubits = self.backend.create_qubits("A", len(self.bits))
+        self.backend.apply_paulis(qubits, encode_sequential(self.bits))
+        self.assertTrue(np.array_equal(self.backend.measure_batch(qubits), self.bits))
+
+    def test_destructive_measure(self):
+        qubits = self.backend.create_qubits("A", 2)
+        self.backend.measure_batch(qubits[:1])
+        with self.assertRaises(Exception):
+            self.backend.measure_batch(qubits[:1])
+        self.backend.measure_batch(qubits[1:], non_destructive=True)
+        self.backend.measure_batch(qubits[1:])
+
+    def test_slots_are_recycled(self):
+        host = SimpleNamespace(host_id="A", backend=self.backend)
+        for _ in range(1000):
+            qubits = self.backend.create_qubits("A", 8)
+            self.backend.measure_batch(qubits)
+            Qubit(host).release()
+        stats = self.backend.stats()
+        self.assertEqual(stats["live_qubits"], 0)
+        self.assertLessEqual(stats["high_water_mark"], 9)
+        self.assertEqual(stats["allocated"], 9000)
+        self.assertEqual(stats["released"], 1000)
+
+    def test_reused_slot_is_not_entangled(self):
+        local, remote = self.backend.create_qubits("A", 2)
+        self.backend.H_batch(np.array([local]))
+        self.backend.cnot_batch(np.array([local]), np.array([remote]))
+        self.backend.measure_batch(np.array([remote]))
+        # New qubit gets the slot of remote, measuring local must not touch it
+        reused, other = self.backend.create_qubits("A", 2)
+        self.assertEqual(reused, remote)
+        self.backend.H_batch(np.array([reused]))
+        self.backend.cnot_batch(np.array([reused]), np.array([other]))
+        self.backend.X_batch(np.array([local]))
+        self.assertEqual(self.backend.measure_batch(np.array([local])).tolist(), [0])
+        self.assertEqual(self.backend.measure_batch(np.array([reused])).tolist(), [0])
+
+    def test_matches_simple_backend(self):
+        """ Random gate sequences give the same measurements on both backends """
+        rng = random.Random(7)
+        for _ in range(200):
+            simple = SimpleStabilizerBackend()
+            array = ArrayStabilizerBackend(capacity=2)
+            simple_host = SimpleNamespace(host_id="A", backend=simple)
+            array_host = SimpleNamespace(host_id="A", backend=array)
+            simple_qubits = [Qubit(simple_host) for _ in range(4)]
+            array_qubits = [Qubit(array_host) for _ in range(4)]
+            for _ in range(rng.randint(1, 12)):
+                gate = rng.choice(["X", "Z", "H", "cnot"])
+                i, j = rng.sample(range(4), 2)
+                if gate == "cnot":
+                    simple_qubits[i].cnot(simple_qubits[j])
+                    array_qubits[i].cnot(array_qubits[j])
+                else:
+                    getattr(simple_qubits[i], gate)()
+                    getattr(array_qubits[i], gate)()
+            for simple_qubit, array_qubit in zip(simple_qubits, array_qubits):
+                ops = list(simple_qubit.qubit._ops)
+                expected = simple_qubit.measure()
+                measured = array_qubit.measure()
+                if ops == ["H"] or expected is None:
+                    continue
+                self.assertEqual(measured, expected)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from ..async_logger import AsyncLogger, QueueDepthSampler, parse_debug_streams, DEBUG, INFO, WARNING
+
+
+class TestAsyncLogger(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "log.txt")
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.log_dir.cleanup()
+
+    def read_lines(self):
+        with open(self.path) as log_file:
+            return log_file.read().splitlines()
+
+    def test_lines_are_written_by_flusher(self):
+        logger = AsyncLogger(flush_interval=10)
+        for i in range(100):
+            logger.info(self.path, str(i))
+        self.assertFalse(os.path.exists(self.path))
+        logger.close()
+        self.assertEqual(self.read_lines(), [str(i) for i in range(100)])
+        self.assertEqual(logger.written, 100)
+
+    def test_level_filter(self):
+        logger = AsyncLogger(level=WARNING)
+        logger.info(self.path, "info")
+        logger.warning(self.path, "warning")
+        logger.close()
+        self.assertEqual(self.read_lines(), ["warning"])
+
+    def test_debug_streams_are_opt_in(self):
+        logger = AsyncLogger(level=INFO, debug_streams={"hexdump": 1})
+        self.assertFalse(logger.sampled("hexdump"))
+        logger = AsyncLogger(level=DEBUG, debug_streams={"hexdump": 3})
+        self.assertFalse(logger.enabled("qubits"))
+        self.assertEqual([logger.sampled("hexdump") for _ in range(6)],
+                         [True, False, False, True, False, False])
+
+    def test_overflow_drops(self):
+        logger = AsyncLogger(max_pending=2, flush_interval=10)
+        for i in range(5):
+            logger.info(self.path, str(i))
+        logger.close()
+        self.assertEqual(self.read_lines(), ["0", "1"])
+        self.assertEqual(logger.dropped, 3)
+
+    def test_parse_debug_streams(self):
+        self.assertEqual(parse_debug_streams("hexdump:100, qubits"), {"hexdump": 100, "qubits": 1})
+        self.assertEqual(parse_debug_streams(""), {})
+
+    def test_queue_depth_sample(self):
+        proc_file = os.path.join(self.log_dir.name, "nfnetlink_queue")
+        with open(proc_file, "w") as f:
+            f.write("    0  12345     7 2 65531     3     0       42  1\n")
+            f.write("    1  12346     0 2 65531     0     0        5  1\n")
+        sampler = QueueDepthSampler(AsyncLogger(), self.path)
+        sampler.PROC_FILE = proc_file
+        self.assertEqual(sampler.sample(), [(0, 7, 3), (1, 0, 0)])
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import unittest
+from ..bridge_status import StatusPublisher
+
+
+class TestStatusPublisher(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "status.json")
+        self.counters = {"packets": 0}
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.log_dir.cleanup()
+
+    def read_status(self):
+        with open(self.path) as status_file:
+            return json.load(status_file)
+
+    def test_ready_and_counters(self):
+        publisher = StatusPublisher(self.path, lambda: dict(self.counters))
+        publisher.publish()
+        self.assertFalse(self.read_status()["ready"])
+        publisher.set_ready()
+        self.counters["packets"] = 5
+        publisher.publish()
+        status = self.read_status()
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["packets"], 5)
+        self.assertEqual(os.listdir(self.log_dir.name), ["status.json"])
+
+    def test_unchanged_status_is_not_rewritten(self):
+        publisher = StatusPublisher(self.path, lambda: dict(self.counters))
+        publisher.publish()
+        updated_at = self.read_status()["updated_at"]
+        publisher.publish()
+        self.assertEqual(self.read_status()["updated_at"], updated_at)
+
+    def test_periodic_publishing(self):
+        publisher = StatusPublisher(self.path, lambda: dict(self.counters), interval=0.01)
+        publisher.start()
+        self.counters["packets"] = 3
+        publisher.stop()
+        self.assertEqual(self.read_status()["packets"], 3)
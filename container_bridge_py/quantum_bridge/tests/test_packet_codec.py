@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+from ..packet_codec import to_bits, from_bits, to_bit_array, from_bit_array
+from ..packet_codec import bit_array_to_bits, bits_to_bit_array
+
+
+class TestPacketCodec(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.payload = bytes(range(256)) + b"\x45\x00\x00\x34" * 375
+
+    def test_bits_round_trip(self):
+        bits = to_bits(self.payload)
+        self.assertEqual(bits.dtype, np.uint8)
+        self.assertEqual(len(bits), len(self.payload) * 8)
+        self.assertEqual(from_bits(bits), self.payload)
+
+    def test_bits_msb_first(self):
+        self.assertEqual(to_bits(b"\x80\x01").tolist(),
+                         [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1])
+
+    def test_memoryview_payload(self):
+        self.assertEqual(from_bits(to_bits(memoryview(self.payload))), self.payload)
+
+    def test_from_bits_rejects_partial_bytes(self):
+        with self.assertRaises(ValueError):
+            from_bits(np.zeros(7, dtype=np.uint8))
+
+    def test_bit_array_matches_legacy_format(self):
+        legacy = [format(x, "#010b")[2:] for x in self.payload]
+        self.assertEqual(to_bit_array(self.payload), legacy)
+        self.assertEqual(from_bit_array(legacy), self.payload)
+
+    def test_bit_array_conversion(self):
+        bin_list = to_bit_array(self.payload)
+        self.assertTrue(np.array_equal(bit_array_to_bits(bin_list), to_bits(self.payload)))
+        self.assertEqual(bits_to_bit_array(to_bits(self.payload)), bin_list)
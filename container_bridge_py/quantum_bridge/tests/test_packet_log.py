@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from ..packet_log import PacketLogWriter, read_packet_log, read_header, csv_lines, export_csv
+
+
+class TestPacketLog(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "packet_logs.bin")
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.log_dir.cleanup()
+
+    def test_records_round_trip(self):
+        writer = PacketLogWriter(self.path, capacity=2)
+        for i in range(5):
+            writer.append("10.0.0.1", "10.0.0.2", i, i + 0.5, 0.1, 8 * (i + 1), i, i + 1, "superdense")
+        self.assertEqual(read_header(self.path)["count"], 5)
+        records = read_packet_log(self.path)
+        self.assertEqual(records["bit_length"].tolist(), [8, 16, 24, 32, 40])
+        self.assertEqual(records["sender"][0], b"10.0.0.1")
+        writer.close()
+        self.assertEqual(len(read_packet_log(self.path)), 5)
+        self.assertEqual(read_header(self.path)["capacity"], 5)
+
+    def test_csv_matches_text_log_format(self):
+        writer = PacketLogWriter(self.path)
+        writer.append("10.0.0.1", "10.0.0.2", 1.0, 3.0, 0.5, 1600, 10, 800, "mixed")
+        writer.append("10.0.0.2", "10.0.0.1", 4.0, 4.25, 0.0, 416, -416, 416, "epr")
+        lines = list(csv_lines(read_packet_log(self.path)))
+        self.assertEqual(lines[0].split(",")[0:2], ["sender", "receiver"])
+        self.assertEqual(lines[1], "10.0.0.1,10.0.0.2,1.00,3.00,2.00,0,2.00,1600,800.00,800.00,mixed,10,800")
+        self.assertEqual(lines[2], "10.0.0.2,10.0.0.1,4.00,4.25,0.25,0,0.25,416,1664.00,1664.00,epr,-416,416")
+        csv_path = os.path.join(self.log_dir.name, "packet_logs.log")
+        export_csv(self.path, csv_path)
+        with open(csv_path) as csv_file:
+            self.assertEqual(csv_file.read().splitlines(), lines)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            read_header(self.path)
@@ -0,0 +1,61 @@
+import queue
+import threading
+import time
+import unittest
+from ..threaded_channel.packet_queue import PacketQueue, OVERFLOW_BLOCK, OVERFLOW_DROP_TAIL, OVERFLOW_DROP_HEAD
+
+
+class TestPacketQueue(unittest.TestCase):
+
+    def test_fifo(self):
+        packets = PacketQueue(4)
+        for i in range(4):
+            self.assertTrue(packets.put(i))
+        self.assertEqual([packets.get() for _ in range(4)], [0, 1, 2, 3])
+        with self.assertRaises(queue.Empty):
+            packets.get_nowait()
+
+    def test_drop_tail(self):
+        packets = PacketQueue(2, OVERFLOW_DROP_TAIL)
+        results = [packets.put(i) for i in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual([packets.get(), packets.get()], [0, 1])
+        self.assertEqual(packets.stats()["dropped_tail"], 2)
+
+    def test_drop_head(self):
+        evicted = []
+        packets = PacketQueue(2, OVERFLOW_DROP_HEAD, on_drop=evicted.append)
+        results = [packets.put(i) for i in range(4)]
+        self.assertEqual(results, [True, True, True, True])
+        self.assertEqual([packets.get(), packets.get()], [2, 3])
+        self.assertEqual(evicted, [0, 1])
+        self.assertEqual(packets.stats()["dropped_head"], 2)
+
+    def test_block_timeout(self):
+        packets = PacketQueue(1, OVERFLOW_BLOCK)
+        packets.put(0)
+        self.assertTrue(packets.full())
+        self.assertFalse(packets.put(1, timeout=0.05))
+        self.assertEqual(packets.stats()["dropped_tail"], 1)
+
+    def test_block_until_consumed(self):
+        packets = PacketQueue(1, OVERFLOW_BLOCK)
+        packets.put(0)
+        consumer = threading.Timer(0.05, packets.get)
+        consumer.start()
+        self.assertTrue(packets.put(1, timeout=1))
+        consumer.join()
+        self.assertEqual(packets.get(), 1)
+
+    def test_close_wakes_waiters(self):
+        packets = PacketQueue(1)
+        threading.Timer(0.05, packets.close).start()
+        start = time.monotonic()
+        with self.assertRaises(queue.Empty):
+            packets.get(timeout=1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(packets.put(0))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            PacketQueue(1, "drop-random")
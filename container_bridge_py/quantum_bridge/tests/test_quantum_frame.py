@@ -1,5 +1,11 @@
 import unittest
+from types import SimpleNamespace
+import numpy as np
+from qunetsim.objects import Qubit
 from ..threaded_channel import QuantumFrame
+from ..threaded_channel.quantum_frame import encode_superdense, decode_superdense, encode_sequential
+from ..pauli import PAULI_I, PAULI_X, PAULI_Z, PAULI_XZ
+from ..threaded_channel.simple_stabilizer_backend import SimpleStabilizerBackend
 
 
 class TestQuantumFrame(unittest.TestCase):
@@ -15,7 +21,7 @@ class TestQuantumFrame(unittest.TestCase):
 
     # Runs before each test
     def setUp(self) -> None:
-        pass
+        self.bits = np.random.randint(0, 2, 8 * 64).astype(np.uint8)
 
     # Runs after each test
     def tearDown(self) -> None:
@@ -23,3 +29,36 @@ class TestQuantumFrame(unittest.TestCase):
 
     def test_init(self):
         self.assertTrue(True)
+
+    def test_superdense_encoding(self):
+        ops = encode_superdense(np.array([0, 0, 0, 1, 1, 0, 1, 1]))
+        self.assertEqual(ops.tolist(), [PAULI_I, PAULI_X, PAULI_Z, PAULI_XZ])
+        self.assertTrue(np.array_equal(
+            decode_superdense((ops & PAULI_Z) // PAULI_Z, ops & PAULI_X), [0, 0, 0, 1, 1, 0, 1, 1]))
+
+    def test_sequential_encoding(self):
+        self.assertEqual(encode_sequential(self.bits).tolist(),
+                         [PAULI_X if bit else PAULI_I for bit in self.bits.tolist()])
+
+    def test_backend_superdense_round_trip(self):
+        backend = SimpleStabilizerBackend()
+        host = SimpleNamespace(host_id="A", backend=backend)
+        pair_count = len(self.bits) // 2
+        local = [Qubit(host) for _ in range(pair_count)]
+        remote = [Qubit(host) for _ in range(pair_count)]
+        backend.H_batch(local)
+        backend.cnot_batch(local, remote)
+
+        backend.apply_paulis(local, encode_superdense(self.bits))
+        backend.cnot_batch(local, remote)
+        backend.H_batch(local)
+        first_bits = backend.measure_batch(local)
+        second_bits = backend.measure_batch(remote)
+        self.assertTrue(np.array_equal(decode_superdense(first_bits, second_bits), self.bits))
+
+    def test_backend_sequential_round_trip(self):
+        backend = SimpleStabilizerBackend()
+        host = SimpleNamespace(host_id="A", backend=backend)
+        qubits = [Qubit(host) for _ in range(len(self.bits))]
+        backend.apply_paulis(qubits, encode_sequential(self.bits))
+        self.assertTrue(np.array_equal(backend.measure_batch(qubits), self.bits))
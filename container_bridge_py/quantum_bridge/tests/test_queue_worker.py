@@ -0,0 +1,130 @@
+import os
+import time
+import unittest
+from concurrent.futures import Future
+from ..packet_codec import to_bits, from_bits
+from ..queue_worker import QueueWorker, parse_queue_range
+
+
+class _Packet:
+    """ Packet handed to the netfilter queue callback """
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.verdict = None
+
+    def get_payload(self):
+        return self.payload
+
+    def set_payload(self, payload):
+        self.payload = payload
+
+    def accept(self):
+        self.verdict = "accept"
+
+    def drop(self):
+        self.verdict = "drop"
+
+
+class _Queue:
+    """ Netfilter queue with packets arriving through a pipe """
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.callback = None
+        self.waiting = []
+
+    def get_fd(self):
+        return self.read_fd
+
+    def push(self, pkt):
+        self.waiting.append(pkt)
+        os.write(self.write_fd, b"\0")
+
+    def run(self, block=True):
+        os.read(self.read_fd, 4096)
+        while self.waiting:
+            self.callback(self.waiting.pop(0))
+
+
+class _Channel:
+    """ Channel that flips the last payload bit of every packet, completes on flush """
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_packet(self, packet_bits, source_host, packet_type, callback=None):
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        self.submitted.append((packet_bits, source_host, packet_type, future))
+        return future
+
+    def complete_all(self, drop=False):
+        for packet_bits, _, _, future in self.submitted:
+            if drop:
+                future.set_result(None)
+            else:
+                out_bits = packet_bits.copy()
+                out_bits[-1] ^= 1
+                future.set_result(out_bits)
+        self.submitted = []
+
+
+def _ip_packet(source, payload_length=20):
+    header = bytes([0x45, 0, 0, 20 + payload_length]) + bytes(8) + bytes(source) + bytes([10, 0, 0, 2])
+    return header + bytes(payload_length)
+
+
+class TestQueueWorker(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.nfqueue = _Queue()
+        self.channel = _Channel()
+        self.worker = QueueWorker(self.nfqueue, 0, self.channel, to_bits, from_bits, poll_interval=0.05)
+        self.nfqueue.callback = self.worker.handle_packet
+        self.worker.start()
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.worker.stop()
+
+    def wait_for(self, predicate):
+        deadline = time.monotonic() + 2
+        while not predicate() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(predicate())
+
+    def test_payload_is_reinjected_by_verdict(self):
+        packets = [_Packet(_ip_packet([10, 0, 0, 1])) for _ in range(5)]
+        for pkt in packets:
+            self.nfqueue.push(pkt)
+        self.wait_for(lambda: len(self.channel.submitted) == 5)
+        self.assertEqual(self.channel.submitted[0][1], "10.0.0.1")
+        self.assertTrue(all(pkt.verdict is None for pkt in packets))
+        self.channel.complete_all()
+        self.wait_for(lambda: all(pkt.verdict == "accept" for pkt in packets))
+        self.assertEqual(packets[0].payload[-1], 1)
+        stats = self.worker.stats()
+        self.assertEqual(stats["accepted"], 5)
+        self.assertLessEqual(stats["verdict_batches"], 5)
+
+    def test_dropped_by_channel(self):
+        pkt = _Packet(_ip_packet([10, 0, 0, 1]))
+        self.nfqueue.push(pkt)
+        self.wait_for(lambda: len(self.channel.submitted) == 1)
+        self.channel.complete_all(drop=True)
+        self.wait_for(lambda: pkt.verdict == "drop")
+
+    def test_epr_signal(self):
+        payload = bytearray(_ip_packet([10, 0, 0, 1], payload_length=32))
+        payload[-4] = 25
+        pkt = _Packet(bytes(payload))
+        self.nfqueue.push(pkt)
+        self.wait_for(lambda: pkt.verdict == "drop")
+        self.assertEqual(self.channel.submitted[0][2], "epr")
+
+    def test_parse_queue_range(self):
+        self.assertEqual(parse_queue_range("0-1"), [0, 1])
+        self.assertEqual(parse_queue_range("3"), [3])
@@ -0,0 +1,67 @@
+import unittest
+from types import SimpleNamespace
+from qunetsim.objects import Qubit
+from ..threaded_channel.simple_stabilizer_backend import SimpleStabilizerBackend
+
+
+class TestSimpleStabilizerBackend(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.backend = SimpleStabilizerBackend(sweep_interval=0)
+        self.host = SimpleNamespace(host_id="A", backend=self.backend)
+
+    def test_measured_slot_is_recycled(self):
+        q1 = Qubit(self.host)
+        slot = q1.qubit.q_id
+        q1.measure()
+        q2 = Qubit(self.host)
+        self.assertEqual(q2.qubit.q_id, slot)
+        self.assertEqual(self.backend.stats()["high_water_mark"], 1)
+        with self.assertRaises(Exception):
+            q1.measure()
+
+    def test_release(self):
+        q = Qubit(self.host)
+        q.release()
+        q.release()
+        stats = self.backend.stats()
+        self.assertEqual(stats["live_qubits"], 0)
+        self.assertEqual(stats["released"], 1)
+        with self.assertRaises(Exception):
+            q.measure()
+
+    def test_unreferenced_qubits_are_reclaimed(self):
+        for _ in range(1000):
+            local = Qubit(self.host)
+            remote = Qubit(self.host)
+            local.H()
+            local.cnot(remote)
+        del local, remote
+        stats = self.backend.stats()
+        self.assertEqual(stats["live_qubits"], 0)
+        self.assertLessEqual(stats["high_water_mark"], 4)
+        self.assertEqual(stats["reclaimed"], 2000)
+
+    def test_sweep_orphaned_partners(self):
+        local = Qubit(self.host)
+        remote = Qubit(self.host)
+        local.H()
+        local.cnot(remote)
+        local.X()
+        del local
+        self.assertEqual(self.backend.sweep(), 1)
+        self.assertEqual(remote.qubit.entangled_pairs, [])
+        self.assertEqual(remote.measure(), 0)
+
+    def test_periodic_sweep(self):
+        backend = SimpleStabilizerBackend(sweep_interval=2)
+        host = SimpleNamespace(host_id="A", backend=backend)
+        local = Qubit(host)
+        remote = Qubit(host)
+        local.H()
+        local.cnot(remote)
+        del local
+        Qubit(host)
+        Qubit(host)
+        self.assertEqual(remote.qubit.entangled_pairs, [])
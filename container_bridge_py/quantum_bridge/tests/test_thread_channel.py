@@ -1,5 +1,13 @@
+import os
+import tempfile
+import time
+from collections import deque
 import unittest
-from ..threaded_channel import Node
+from types import SimpleNamespace
+from ..threaded_channel import Node, Channel
+from ..packet_codec import to_bits, from_bits
+from ..packet_log import read_packet_log
+from ..threaded_channel.simple_stabilizer_backend import SimpleStabilizerBackend
 
 
 class TestNode(unittest.TestCase):
@@ -16,11 +24,102 @@ class TestNode(unittest.TestCase):
 
     # Runs before each test
     def setUp(self) -> None:
-        pass
+        network = SimpleNamespace(add_host=lambda host: None, update_host=lambda host: None)
+        self.node = Node("A", network, SimpleStabilizerBackend(), epr_manual_mode=False,
+                         batched_frames=True)
+        self.node.peer = SimpleNamespace(in_flight=deque())
+        self.sent = []
+        self.node._transmit_data_frame = lambda packet: self.sent.append(packet)
+        self.node._transmit_epr_frame = lambda: self.sent.append("EPR_TRIGGER")
 
     # Runs after each test
     def tearDown(self) -> None:
-        pass
+        if self.node.sender_thread is not None:
+            self.node.stop()
 
     def test_init(self):
         self.assertTrue(True)
+
+    def test_sender_is_idle_without_work(self):
+        self.node.start()
+        time.sleep(0.5)
+        self.node.add_to_in_queue("packet")
+        time.sleep(0.1)
+        self.assertEqual(self.sent, ["packet"])
+        stats = self.node.sender_stats()
+        self.assertGreater(stats["idle_time"], 0.4)
+        self.assertGreater(stats["idle_cpu"], 0.9)
+
+    def test_data_is_sent_before_epr(self):
+        self.node.add_to_in_queue("first")
+        self.node.add_to_in_queue("EPR")
+        self.node.add_to_in_queue("second")
+        self.node.epr_trigger.set()
+        self.node.start()
+        self.node.epr_lock.wait(timeout=1)
+        self.assertEqual(self.sent, ["first", "EPR_TRIGGER", "second", "EPR_TRIGGER"])
+
+    def test_packet_ids_follow_frames(self):
+        self.node.add_to_in_queue("first", packet_id=1)
+        self.node.add_to_in_queue("second", packet_id=2)
+        self.node.start()
+        time.sleep(0.1)
+        self.assertEqual(list(self.node.peer.in_flight), [1, 2])
+
+    def test_skipped_epr_frames_leave_no_packet_id(self):
+        # Not batched, send_epr_frame skips frames while a node is receiving
+        network = SimpleNamespace(add_host=lambda host: None, update_host=lambda host: None)
+        dropped = []
+        node = Node("B", network, SimpleStabilizerBackend(), epr_manual_mode=True, on_drop=dropped.append)
+        node.peer = SimpleNamespace(in_flight=deque(), is_busy=node.is_busy)
+        node._transmit_data_frame = lambda packet: None
+        node.is_busy.set()
+        node.add_to_in_queue("first", packet_id=1)
+        node.add_to_in_queue("EPR", packet_id=2)
+        node.add_to_in_queue("second", packet_id=3)
+        node.start()
+        time.sleep(0.1)
+        node.stop()
+        self.assertEqual(list(node.peer.in_flight), [1, 3])
+        self.assertEqual(dropped, [(2, "EPR")])
+
+    def test_stop_wakes_sender(self):
+        self.node.start()
+        self.node.stop()
+        self.assertFalse(self.node.sender_thread.is_alive())
+
+
+class TestChannel(unittest.TestCase):
+
+    # Runs before all tests
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.cwd = os.getcwd()
+        cls.log_dir = tempfile.TemporaryDirectory()
+        os.chdir(cls.log_dir.name)
+        cls.channel = Channel(["A", "B"], 2, batched_frames=True)
+
+    # Runs after all tests
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.channel.stop()
+        os.chdir(cls.cwd)
+        cls.log_dir.cleanup()
+
+    def test_submitted_packets_complete_in_order(self):
+        payloads = [bytes([i]) * 64 for i in range(8)]
+        completed = []
+        futures = [self.channel.submit_packet(to_bits(payload), "A", "normal",
+                                              callback=lambda f: completed.append(from_bits(f.result())))
+                   for payload in payloads]
+        results = [from_bits(future.result(timeout=30)) for future in futures]
+        self.assertEqual(results, payloads)
+        self.assertEqual(completed, payloads)
+
+    def test_transmit_packet_both_directions(self):
+        payload = bytes(range(40))
+        self.assertEqual(from_bits(self.channel.transmit_packet(to_bits(payload), "A", "normal")), payload)
+        self.assertEqual(from_bits(self.channel.transmit_packet(to_bits(payload), "B", "normal")), payload)
+        records = read_packet_log("packet_logs.bin")
+        self.assertEqual(records[-1]["sender"], b"B")
+        self.assertEqual(records[-1]["bit_length"], len(payload) * 8)
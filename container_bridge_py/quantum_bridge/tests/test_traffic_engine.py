@@ -0,0 +1,194 @@
+import random
+import socket
+import struct
+import unittest
+from ..queue_worker import is_epr_signal
+from ..traffic_engine import (TrafficEngine, RawSocketSender, checksum, ip_packet, udp_packet, epr_signal_packet,
+                              burst_packet_count, bernoulli_bursts, choices, on_off, poisson, sequence, replay)
+
+
+class _Clock:
+    """ Simulated monotonic clock, sleep advances it, so does every read by tick """
+
+    def __init__(self, tick=0.0):
+        self.now = 100.0
+        self.tick = tick
+        self.sleeps = []
+
+    def __call__(self):
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class _Sender:
+    """ Records send times, every `fail_every`th packet fails """
+
+    def __init__(self, clock, fail_every=None, send_time=0.0):
+        self.clock = clock
+        self.fail_every = fail_every
+        self.send_time = send_time
+        self.sent = []
+        self.calls = 0
+
+    def send(self, packet):
+        self.calls += 1
+        self.clock.now += self.send_time
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise OSError(105, "No buffer space available")
+        self.sent.append((self.clock.now, packet))
+
+
+class TestTemplates(unittest.TestCase):
+
+    def test_ip_header(self):
+        packet = ip_packet("11.0.0.1", "11.0.0.2", b"abcd", protocol=17)
+        version_ihl, _, total_length, _, _, ttl, protocol, _, src, dst = struct.unpack("!BBHHHBBH4s4s", packet[:20])
+        self.assertEqual(version_ihl, 0x45)
+        self.assertEqual(total_length, 24)
+        self.assertEqual((ttl, protocol), (64, 17))
+        self.assertEqual(socket.inet_ntoa(src), "11.0.0.1")
+        self.assertEqual(socket.inet_ntoa(dst), "11.0.0.2")
+        self.assertEqual(checksum(packet[:20]), 0)
+
+    def test_udp_frame_size(self):
+        packet = udp_packet("11.0.0.1", "11.0.0.2", 500)
+        # Ethernet header is added by the kernel
+        self.assertEqual(len(packet) + 14, 500)
+        self.assertEqual(struct.unpack("!H", packet[24:26])[0], 500 - 14 - 20)
+        self.assertEqual(len(udp_packet("11.0.0.1", "11.0.0.2", 10)), 28)
+
+    def test_epr_signal_is_recognized_by_bridge(self):
+        packet = epr_signal_packet(None, "11.0.0.2")
+        self.assertTrue(is_epr_signal(packet))
+        self.assertEqual(packet[0] & 0x0f, 13)
+        self.assertEqual(checksum(packet[:52]), 0)
+        self.assertFalse(is_epr_signal(udp_packet("11.0.0.1", "11.0.0.2", 66)))
+
+    def test_burst_packet_count(self):
+        self.assertEqual(burst_packet_count(1000 * 1000, 500), 250)
+        self.assertEqual(burst_packet_count(1000, 0), 0)
+
+
+class TestPatterns(unittest.TestCase):
+
+    def test_on_off_matches_periodic_rounds(self):
+        offsets = [offset for offset, _ in on_off(b"p", 2, period_length=5, on_length=2, rounds=12, spacing=0.1)]
+        self.assertEqual(offsets, [0, 0.1, 1, 1.1, 5, 5.1, 6, 6.1, 10, 10.1, 11, 11.1])
+
+    def test_bernoulli_bursts(self):
+        offsets = [offset for offset, _ in bernoulli_bursts(b"p", 3, 0.3, rounds=10000, rng=random.Random(1))]
+        self.assertEqual(len(offsets) % 3, 0)
+        self.assertAlmostEqual(len(offsets) / 3 / 10000, 0.3, delta=0.02)
+        self.assertEqual(offsets, sorted(offsets))
+        self.assertEqual(list(bernoulli_bursts(b"p", 3, 0, rounds=100)), [])
+
+    def test_patterns_without_packets_end(self):
+        # Unbounded rounds, nothing would ever be yielded (e.g. packet_size < 42 gives packet_count 0)
+        self.assertEqual(list(bernoulli_bursts(b"p", 0, 0.5)), [])
+        self.assertEqual(list(bernoulli_bursts(b"p", 3, 0)), [])
+        self.assertEqual(list(on_off(b"p", 0, period_length=5, on_length=2)), [])
+        self.assertEqual(list(on_off(b"p", 2, period_length=5, on_length=0)), [])
+        self.assertEqual(list(sequence([], 1)), [])
+
+    def test_choices(self):
+        picked = list(choices(b"p", b"e", 0.25, 2, rounds=8000, rng=random.Random(3)))
+        self.assertEqual([offset for offset, _ in picked[:3]], [0, 2, 4])
+        self.assertAlmostEqual([packet for _, packet in picked].count(b"p") / 8000, 0.25, delta=0.02)
+
+    def test_poisson_rate(self):
+        pattern = poisson(b"p", rate=50, rng=random.Random(2))
+        offsets = [next(pattern)[0] for _ in range(20000)]
+        self.assertAlmostEqual(len(offsets) / offsets[-1], 50, delta=2)
+
+    def test_sequence(self):
+        self.assertEqual(list(sequence([b"e", b"p"], 2, rounds=2)),
+                         [(0.0, b"e"), (2.0, b"p"), (4.0, b"e"), (6.0, b"p")])
+
+    def test_replay_builds_one_template_per_length(self):
+        built = []
+
+        def template(length):
+            built.append(length)
+            return bytes(length)
+
+        replayed = list(replay([(10.5, 100), (10.75, 60), (11.5, 100)], template))
+        self.assertEqual([offset for offset, _ in replayed], [0, 0.25, 1])
+        self.assertEqual([len(packet) for _, packet in replayed], [100, 60, 100])
+        self.assertEqual(built, [100, 60])
+
+
+class TestTrafficEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = _Clock()
+
+    def engine(self, sender):
+        return TrafficEngine(sender, clock=self.clock, sleep=self.clock.sleep, spin=0)
+
+    def test_packets_leave_when_due(self):
+        sender = _Sender(self.clock)
+        report = self.engine(sender).run(sequence([b"x" * 100], 0.5, rounds=5))
+        self.assertEqual([t - 100 for t, _ in sender.sent], [0, 0.5, 1, 1.5, 2])
+        self.assertEqual(report.packets, 5)
+        self.assertEqual(report.lateness_max, 0)
+        self.assertAlmostEqual(report.target_rate, 5 * 800 / 2)
+        self.assertAlmostEqual(report.achieved_rate, report.target_rate)
+
+    def test_slow_sender_falls_behind(self):
+        sender = _Sender(self.clock, send_time=0.01)
+        report = self.engine(sender).run(on_off(b"x" * 125, 10, 2, 1, rounds=4))
+        self.assertEqual(report.packets, 20)
+        # A burst takes 0.1s, the last packet of a burst is 0.09s late
+        self.assertAlmostEqual(report.lateness_max, 0.09)
+        self.assertAlmostEqual(sender.sent[10][0] - 100, 2.01)
+        self.assertLess(report.achieved_rate, report.target_rate)
+
+    def test_duration_and_failures(self):
+        sender = _Sender(self.clock, fail_every=4)
+        report = self.engine(sender).run(sequence([b"x" * 10], 1), duration=8)
+        self.assertEqual(report.packets + report.failed, 8)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.elapsed, 8)
+        self.assertAlmostEqual(report.target_rate, 8 * 80 / 8)
+        self.assertAlmostEqual(report.achieved_rate, 6 * 80 / 8)
+
+    def test_no_packets_idles_for_duration(self):
+        sender = _Sender(self.clock)
+        report = self.engine(sender).run(bernoulli_bursts(b"x", 0, 0.5), duration=5)
+        self.assertEqual((report.packets, report.elapsed), (0, 5))
+        self.assertEqual(self.engine(sender).run(on_off(b"x", 0, 10, 5)).packets, 0)
+
+    def test_reports_while_running(self):
+        reports = []
+        self.engine(_Sender(self.clock)).run(sequence([b"x"], 1, rounds=25), report_interval=10,
+                                             on_report=lambda report: reports.append(report.packets))
+        self.assertEqual(reports, [11, 21])
+
+    def test_spins_before_due_time(self):
+        self.clock = _Clock(tick=0.0001)
+        engine = TrafficEngine(_Sender(self.clock), clock=self.clock, sleep=self.clock.sleep, spin=0.001)
+        engine.run(sequence([b"x"], 0.5, rounds=2))
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.499, delta=0.001)
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+
+class TestRawSocketSender(unittest.TestCase):
+
+    def test_sends_to_loopback(self):
+        try:
+            sender = RawSocketSender()
+        except PermissionError as e:
+            self.skipTest(f"raw socket: {e}")
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(1)
+        port = receiver.getsockname()[1]
+        udp = struct.pack("!HHHH", 4000, port, 8 + 5, 0) + b"hello"
+        sender.send(ip_packet("127.0.0.1", "127.0.0.1", udp, protocol=17))
+        self.assertEqual(receiver.recvfrom(100)[0], b"hello")
+        sender.close()
+        receiver.close()
@@ -2,3 +2,4 @@ from .node import Node
 from .channel import Channel
 from .quantum_frame import QuantumFrame
 from .daemon_thread import DaemonThread
+from .packet_queue import PacketQueue
@@ -0,0 +1,440 @@
+from threading import RLock
+
+import numpy as np
+
+from ..pauli import PAULI_X, PAULI_Z
+from .simple_stabilizer_backend import SimpleStabilizerBackend
+
+
+# Op stack codes, stack is packed into uint64, two bits per op
+_OP_X = 1
+_OP_Z = 2
+_OP_H = 3
+_OP_BITS = 2
+_OP_MASK = 3
+
+
+class ArrayStabilizerBackend(SimpleStabilizerBackend):
+    """
+    Array backed version of SimpleStabilizerBackend.
+    Follows the same simplified stabilizer model, but qubit state is kept in
+    preallocated numpy arrays (op stack, partner index, state bit), qubits are
+    referred to by their slot index. Batch methods accept either lists of Qubit
+    objects or numpy arrays of slot indices.
+
+    Op stack keeps the 32 most recent ops of a qubit, older ops are dropped.
+    Slots of measured and released qubits are recycled, links of their
+    partners are dropped so a new qubit in the slot is not affected.
+    """
+
+    def __init__(self, capacity=1024):
+        super().__init__()
+        self._lock = RLock()
+        self._capacity = 0
+        self._stack = np.zeros(0, dtype=np.uint64)
+        self._depth = np.zeros(0, dtype=np.int32)
+        self._state = np.zeros(0, dtype=np.uint8)
+        self._partner = np.zeros(0, dtype=np.int64)
+        self._entangled = np.zeros(0, dtype=bool)
+        self._alive = np.zeros(0, dtype=bool)
+        # Stack of free slots, the first _free_count entries are used
+        self._free = np.zeros(0, dtype=np.int64)
+        self._free_count = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        """
+        Resizes state arrays to given capacity
+
+        PRIVATE METHOD
+        """
+        size = self._capacity
+        self._stack = np.concatenate((self._stack[:size], np.zeros(capacity - size, dtype=np.uint64)))
+        self._depth = np.concatenate((self._depth[:size], np.zeros(capacity - size, dtype=np.int32)))
+        self._state = np.concatenate((self._state[:size], np.zeros(capacity - size, dtype=np.uint8)))
+        self._partner = np.concatenate((self._partner[:size], np.full(capacity - size, -1, dtype=np.int64)))
+        self._entangled = np.concatenate((self._entangled[:size], np.zeros(capacity - size, dtype=bool)))
+        self._alive = np.concatenate((self._alive[:size], np.zeros(capacity - size, dtype=bool)))
+        self._free = np.concatenate((self._free[:self._free_count], np.zeros(capacity - self._free_count,
+                                                                             dtype=np.int64)))
+        self._capacity = capacity
+
+    @staticmethod
+    def _indices(qubits):
+        """
+        Returns slot indices of qubits (list of Qubit objects or index array)
+
+        PRIVATE METHOD
+        """
+        if isinstance(qubits, np.ndarray):
+            return qubits.astype(np.int64, copy=False)
+        return np.fromiter((q.qubit for q in qubits), dtype=np.int64, count=len(qubits))
+
+    @staticmethod
+    def _is_unique(*index_arrays):
+        """
+        Checks that no slot appears twice in the given index arrays
+
+        PRIVATE METHOD
+        """
+        idx = np.concatenate(index_arrays)
+        return len(np.unique(idx)) == len(idx)
+
+    def _top(self, idx):
+        return (self._stack[idx] & np.uint64(_OP_MASK)).astype(np.uint8)
+
+    def _push(self, idx, op):
+        self._stack[idx] = (self._stack[idx] << np.uint64(_OP_BITS)) | np.uint64(op)
+        self._depth[idx] += 1
+
+    def _pop(self, idx):
+        self._stack[idx] = self._stack[idx] >> np.uint64(_OP_BITS)
+        self._depth[idx] -= 1
+
+    def _toggle(self, idx, op):
+        """
+        Pushes op on the stack or cancels it if it is on top
+
+        PRIVATE METHOD
+        """
+        cancel = (self._depth[idx] > 0) & (self._top(idx) == op)
+        self._pop(idx[cancel])
+        pushed = idx[~cancel]
+        self._push(pushed, op)
+        return pushed
+
+    def _x(self, idx):
+        self._state[self._toggle(idx, _OP_X)] = 1
+
+    def _z(self, idx):
+        self._toggle(idx, _OP_Z)
+
+    def _h(self, idx):
+        self._toggle(idx[~self._entangled[idx]], _OP_H)
+
+    def _cnot(self, controls, targets):
+        active = ~self._entangled[controls] & (self._depth[controls] > 0)
+        controls = controls[active]
+        targets = targets[active]
+        top = self._top(controls)
+
+        self._x(targets[top == _OP_X])
+
+        entangling = top == _OP_H
+        controls = controls[entangling]
+        targets = targets[entangling]
+        self._entangled[controls] = True
+        self._entangled[targets] = True
+        free = self._partner[targets] < 0
+        self._partner[targets[free]] = controls[free]
+        free = self._partner[controls] < 0
+        self._partner[controls[free]] = targets[free]
+        self._pop(controls)
+
+    def _measure(self, idx):
+        depth = self._depth[idx]
+        top = self._top(idx)
+        entangled = self._entangled[idx]
+        partner = self._partner[idx]
+        result = np.zeros(len(idx), dtype=np.uint8)
+        # Partner was measured or released already
+        linked = partner >= 0
+
+        empty = depth == 0
+        result[empty & entangled] = self._state[idx[empty & entangled]]
+
+        single = depth == 1
+        self._pop(idx[single])
+        mask = single & entangled & (top == _OP_X)
+        self._state[partner[mask & linked]] = 1
+        mask = single & entangled & (top == _OP_Z)
+        self._state[partner[mask & linked]] = 0
+        result[mask] = 1
+        mask = single & ~entangled & (top == _OP_X)
+        result[mask] = self._state[idx[mask]]
+        mask = single & ~entangled & (top == _OP_H)
+        result[mask] = np.random.randint(0, 2, np.count_nonzero(mask))
+
+        mask = (depth == 2) & entangled
+        self._state[partner[mask & linked]] = 1
+        result[mask] = 1
+        return result
+
+    def _reset(self, idx):
+        self._stack[idx] = 0
+        self._depth[idx] = 0
+        self._state[idx] = 0
+        self._partner[idx] = -1
+        self._entangled[idx] = False
+
+    def _free_slots_of(self, idx):
+        """
+        Marks slots as unused and puts them on the free stack,
+        partners stop referring to them. Caller holds the lock.
+
+        PRIVATE METHOD
+        """
+        idx = np.unique(idx)
+        idx = idx[self._alive[idx]]
+        self._alive[idx] = False
+        partners = self._partner[idx]
+        partners = partners[partners >= 0]
+        self._partner[partners[np.isin(self._partner[partners], idx)]] = -1
+        self._free[self._free_count:self._free_count + len(idx)] = idx
+        self._free_count += len(idx)
+        return len(idx)
+
+    def _take_slots(self, count):
+        """
+        Returns count slot indices, free slots first, grows the arrays if needed.
+        Caller holds the lock.
+
+        PRIVATE METHOD
+        """
+        reused = min(count, self._free_count)
+        self._free_count -= reused
+        idx = self._free[self._free_count:self._free_count + reused].copy()
+        fresh = count - reused
+        start = self._num_qubits
+        if start + fresh > self._capacity:
+            self._grow(max(2 * self._capacity, start + fresh))
+        idx = np.concatenate((idx, np.arange(start, start + fresh, dtype=np.int64)))
+        self._num_qubits = start + fresh
+        self._reset(idx)
+        self._alive[idx] = True
+        self._allocated += count
+        return idx
+
+    def create_qubit(self, host_id):
+        """
+        Creates a new Qubit of the type of the backend.
+
+        Args:
+            host_id (str): Id of the host to whom the qubit belongs.
+
+        Returns:
+            Slot index of the qubit.
+        """
+        with self._lock:
+            return int(self._take_slots(1)[0])
+
+    def create_qubits(self, host_id, count):
+        """
+        Creates count new qubits.
+
+        Args:
+            host_id (str): Id of the host to whom the qubits belong.
+            count (int): Number of qubits.
+
+        Returns:
+            np.ndarray: Slot indices of the qubits.
+        """
+        with self._lock:
+            return self._take_slots(count)
+
+    ##########################
+    #   Gate definitions    #
+    #########################
+
+    def I(self, qubit):
+        """
+        Perform Identity gate on a qubit.
+
+        Args:
+            qubit (Qubit): Qubit on which gate should be applied to.
+        """
+        pass
+
+    def X(self, qubit):
+        """
+        Perform pauli X gate on a qubit.
+
+        Args:
+            qubit (Qubit): Qubit on which gate should be applied to.
+        """
+        with self._lock:
+            self._x(np.array([qubit.qubit]))
+
+    def Z(self, qubit):
+        """
+        Perform pauli Z gate on a qubit.
+
+        Args:
+            qubit (Qubit): Qubit on which gate should be applied to.
+        """
+        with self._lock:
+            self._z(np.array([qubit.qubit]))
+
+    def H(self, qubit):
+        """
+        Perform Hadamard gate on a qubit.
+
+        Args:
+            qubit (Qubit): Qubit on which gate should be applied to.
+        """
+        with self._lock:
+            self._h(np.array([qubit.qubit]))
+
+    def cnot(self, qubit, target):
+        """
+        Applies a controlled x gate to the target qubit.
+
+        Args:
+            qubit (Qubit): Qubit to control cnot.
+            target (Qubit): Qubit on which the cnot gate should be applied.
+        """
+        with self._lock:
+            self._cnot(np.array([qubit.qubit]), np.array([target.qubit]))
+
+    ##########################
+    #   Batch definitions    #
+    #########################
+
+    def X_batch(self, qubits):
+        """
+        Perform pauli X gate on every qubit.
+
+        Args:
+            qubits (list or np.ndarray): Qubits on which gate should be applied to.
+        """
+        idx = self._indices(qubits)
+        with self._lock:
+            if self._is_unique(idx):
+                self._x(idx)
+            else:
+                for i in range(len(idx)):
+                    self._x(idx[i:i + 1])
+
+    def Z_batch(self, qubits):
+        """
+        Perform pauli Z gate on every qubit.
+
+        Args:
+            qubits (list or np.ndarray): Qubits on which gate should be applied to.
+        """
+        idx = self._indices(qubits)
+        with self._lock:
+            if self._is_unique(idx):
+                self._z(idx)
+            else:
+                for i in range(len(idx)):
+                    self._z(idx[i:i + 1])
+
+    def H_batch(self, qubits):
+        """
+        Perform Hadamard gate on every qubit.
+
+        Args:
+            qubits (list or np.ndarray): Qubits on which gate should be applied to.
+        """
+        idx = self._indices(qubits)
+        with self._lock:
+            if self._is_unique(idx):
+                self._h(idx)
+            else:
+                for i in range(len(idx)):
+                    self._h(idx[i:i + 1])
+
+    def apply_paulis(self, qubits, ops):
+        """
+        Applies pauli operations to qubits, one operation per qubit.
+
+        Args:
+            qubits (list or np.ndarray): Qubits on which operations should be applied to.
+            ops (np.ndarray): Operation codes (PAULI_I, PAULI_X, PAULI_Z, PAULI_XZ).
+        """
+        idx = self._indices(qubits)
+        ops = np.asarray(ops)
+        with self._lock:
+            if self._is_unique(idx):
+                self._x(idx[(ops & PAULI_X) != 0])
+                self._z(idx[(ops & PAULI_Z) != 0])
+            else:
+                for i in range(len(idx)):
+                    if ops[i] & PAULI_X:
+                        self._x(idx[i:i + 1])
+                    if ops[i] & PAULI_Z:
+                        self._z(idx[i:i + 1])
+
+    def cnot_batch(self, qubits, targets):
+        """
+        Applies controlled x gates pairwise.
+
+        Args:
+            qubits (list or np.ndarray): Qubits to control cnot.
+            targets (list or np.ndarray): Qubits on which the cnot gates should be applied.
+        """
+        controls = self._indices(qubits)
+        targets = self._indices(targets)
+        with self._lock:
+            if self._is_unique(controls, targets):
+                self._cnot(controls, targets)
+            else:
+                for i in range(len(controls)):
+                    self._cnot(controls[i:i + 1], targets[i:i + 1])
+
+    def measure_batch(self, qubits, non_destructive=False):
+        """
+        Measures every qubit. Batch is measured at once if no qubit
+        is measured together with its partner, otherwise one by one.
+
+        Args:
+            qubits (list or np.ndarray): Qubits which should be measured.
+            non_destructive (bool): Determines if the Qubits should stay in the
+                                    system or be eliminated.
+
+        Returns:
+            np.ndarray: The values which have been measured.
+        """
+        idx = self._indices(qubits)
+        with self._lock:
+            if not self._alive[idx].all():
+                raise Exception('Qubit does not exist')
+            partners = self._partner[idx]
+            if self._is_unique(idx) and not np.isin(partners, idx).any():
+                result = self._measure(idx)
+            else:
+                result = np.concatenate([self._measure(idx[i:i + 1]) for i in range(len(idx))])
+            if not non_destructive:
+                self._free_slots_of(idx)
+            return result
+
+    def measure(self, qubit, non_destructive):
+        """
+        Perform a measurement on a qubit.
+
+        Args:
+            qubit (Qubit): Qubit which should be measured.
+            non_destructive (bool): Determines if the Qubit should stay in the
+                                    system or be eliminated.
+
+        Returns:
+            The value which has been measured.
+        """
+        return int(self.measure_batch(np.array([qubit.qubit]), non_destructive)[0])
+
+    def release(self, qubit):
+        """
+        Releases the qubit.
+
+        Args:
+            qubit (Qubit): The qubit which should be released.
+        """
+        with self._lock:
+            self._released += self._free_slots_of(np.array([qubit.qubit]))
+
+    def stats(self):
+        """
+        Returns qubit allocation statistics.
+
+        Returns:
+            dict: live qubits, high water mark, free slots, number of allocated and released qubits.
+        """
+        with self._lock:
+            return {
+                "live_qubits": int(np.count_nonzero(self._alive[:self._num_qubits])),
+                "high_water_mark": self._num_qubits,
+                "free_slots": self._free_count,
+                "allocated": self._allocated,
+                "released": self._released,
+            }
@@ -1,12 +1,19 @@
 from qunetsim.backends.qutip_backend import QuTipBackend
 from qunetsim.components import Network
 from qunetsim.objects import Logger
+from concurrent.futures import Future
 from datetime import timedelta, datetime
+from itertools import count
+from threading import Lock
+import numpy as np
 from .simple_stabilizer_backend import SimpleStabilizerBackend
+from ..packet_log import PacketLogWriter
 
 Logger.DISABLED = True
 
 from .node import Node
+from .packet_queue import OVERFLOW_BLOCK
+from .daemon_thread import DaemonThread
 
 
 def routing_algorithm(di_graph, source, destination):
@@ -20,106 +27,203 @@ class Channel:
     -> Passes classical messages to the right node and retrievs them from other node
     """
 
-    def __init__(self, hosts, epr_frame_size, backend=SimpleStabilizerBackend()):
+    def __init__(self, hosts, epr_frame_size, backend=SimpleStabilizerBackend(), batched_frames=False,
+                 queue_size=512, overflow_policy=OVERFLOW_BLOCK, enqueue_timeout=None):
         """
         Inits Channel
+        batched_frames: packets are numpy bit arrays, transmitted as single frame objects
+        queue_size, overflow_policy: bound and overflow behaviour of the node packet queues
+        enqueue_timeout: longest time a packet waits for space with the block policy
         """
         self.backend = backend
         self.network = Network.get_instance()
         self.epr_frame_size = epr_frame_size
+        self.enqueue_timeout = enqueue_timeout
+        #Packets submitted but not yet received, keyed by packet id
+        self.pending = {}
+        self.pending_lock = Lock()
+        self.packet_ids = count()
         self.network.delay = 0
         self.network.quantum_routing_algo = routing_algorithm
         self.network.classical_routing_algo = routing_algorithm
         self.network.start(nodes=hosts, backend=self.backend)
         self.node_a = Node(hosts[0], self.network, self.backend, is_epr_initiator=False,
-                           epr_manual_mode=True, epr_frame_size=self.epr_frame_size)
+                           epr_manual_mode=True, epr_frame_size=self.epr_frame_size,
+                           batched_frames=batched_frames, queue_size=queue_size,
+                           overflow_policy=overflow_policy, on_drop=self._drop_packet)
         self.node_b = Node(hosts[1], self.network, self.backend, is_epr_initiator=False,
-                           epr_manual_mode=True, epr_frame_size=self.epr_frame_size)
+                           epr_manual_mode=True, epr_frame_size=self.epr_frame_size,
+                           batched_frames=batched_frames, queue_size=queue_size,
+                           overflow_policy=overflow_policy, on_drop=self._drop_packet)
         self.node_a.connect(self.node_b)
         self.node_b.connect(self.node_a)
         self.node_a.start()
         self.node_a.host.start()
         self.node_b.start()
         self.node_b.host.start()
+        self.completion_threads = [DaemonThread(self._completion_protocol, args=(node,))
+                                   for node in [self.node_a, self.node_b]]
 
-        self.packet_logger = _Packet_logger(datetime.now(), "packet_logs.log")
+        self.packet_logger = _Packet_logger(datetime.now(), "packet_logs.bin")
+        self.log_lock = Lock()
 
     def transmit_packet(self, packet_bits, source_host, packet_type):
         """
         Passes packet to appropriate node to be sent through quantum link.
         Waits until packet was received, and then returns the bits that came out
-        on the other side
+        on the other side.
+        Returns None if the packet was dropped by the source node queue (backpressure),
+        caller should not forward it.
 
         PUBLIC METHOD
         packet_type = [EPR, NORMAL]
         """
-        print(f"Packet_type: {packet_type}")
-        start_time = datetime.now()
+        return self.submit_packet(packet_bits, source_host, packet_type).result()
+
+    def submit_packet(self, packet_bits, source_host, packet_type, callback=None):
+        """
+        Passes packet to appropriate node to be sent through quantum link, doesn't wait.
+        Returns Future which resolves to the bits that came out on the other side,
+        or None if the packet was dropped. Packets sent in one direction are completed
+        in submission order, so next frame is serialized while previous one is decoded.
+        callback: called with the Future once it is done
+
+        PUBLIC METHOD
+        packet_type = [EPR, NORMAL]
+        """
+        if packet_type == "normal":
+            data = packet_bits
+        elif packet_type == "epr":
+            data = "EPR"
+        else:
+            raise ValueError(f"Unknown packet type {packet_type}")
         source_node = [node for node in [self.node_a, self.node_b]
                     if node.host.host_id == source_host][0]
         destination_node = [node for node in [self.node_a, self.node_b]
                                 if node.host.host_id != source_host][0]
-        if packet_type == "normal":
-            source_node.add_to_in_queue(packet_bits)
-            out_packet = destination_node.get_from_out_queue()
-            out_bits = out_packet[0]
-            epr_consumed = out_packet[1]["number_of_epr_pairs_consumed"]
-            number_of_transmissions = out_packet[1]["number_of_transmissions"]
-            transmission_type = out_packet[1]["transmission_type"]
-            measurement_time = out_packet[1]["measurment_time"]
-
-            end_time = datetime.now()
-            self.packet_logger.log_packet(source_node.host.host_id, destination_node.host.host_id,
-                                        start_time, end_time, measurement_time,
-                                        out_bits, int(epr_consumed), int(number_of_transmissions), transmission_type)
-            return out_bits
-        elif packet_type == "epr":
-            print("SENDING EPR??")
-            source_node.add_to_in_queue("EPR")
-            out_packet = destination_node.get_from_out_queue()
-            out_bits = out_packet[0]
-            epr_consumed = out_packet[1]["number_of_epr_pairs_consumed"]
-            number_of_transmissions = out_packet[1]["number_of_transmissions"]
-            transmission_type = out_packet[1]["transmission_type"]
-            end_time = datetime.now()
-            measurement_time = timedelta(seconds=0)
-            print(f"{type(epr_consumed)}, epr consumed, {epr_consumed}")
-            print(f"{type(number_of_transmissions)}, number_of_transmissions, {number_of_transmissions}")
-            self.packet_logger.log_packet(source_node.host.host_id, destination_node.host.host_id,
-                                        start_time, end_time, measurement_time,
-                                        out_bits, int(epr_consumed), int(number_of_transmissions), transmission_type)
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self.pending_lock:
+            packet_id = next(self.packet_ids)
+            self.pending[packet_id] = _Pending_packet(source_node.host.host_id, destination_node.host.host_id,
+                                                      packet_type, datetime.now(), future)
+        if not source_node.add_to_in_queue(data, self.enqueue_timeout, packet_id):
+            self._drop_packet((packet_id, data))
+        return future
+
+    def stop(self):
+        """
+        Stops both nodes, packets still in flight resolve to None
+
+        PUBLIC METHOD
+        """
+        self.node_a.stop()
+        self.node_b.stop()
+        for completion_thread in self.completion_threads:
+            completion_thread.join()
+        self.packet_logger.close()
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for packet in pending:
+            packet.future.set_result(None)
+
+    def _drop_packet(self, item):
+        """
+        Resolves future of a packet that was dropped from the source node queue
+
+        PRIVATE METHOD: called by submit_packet and node queues (drop-head)
+        """
+        packet_id, _ = item
+        with self.pending_lock:
+            packet = self.pending.pop(packet_id, None)
+        if packet is not None:
+            packet.future.set_result(None)
+
+    def _completion_protocol(self, node):
+        """
+        Takes received packets from node and completes their futures.
+        Is ran in thread, one per node.
+
+        PRIVATE METHOD: started by __init__
+        """
+        while True:
+            out_packet = node.get_from_out_queue()
+            if out_packet is None:
+                return
+            out_bits, metadata = out_packet
+            with self.pending_lock:
+                packet = self.pending.pop(metadata.get("packet_id"), None)
+            if packet is None:
+                continue
+            try:
+                epr_consumed = metadata["number_of_epr_pairs_consumed"]
+                number_of_transmissions = metadata["number_of_transmissions"]
+                transmission_type = metadata["transmission_type"]
+                if packet.packet_type == "epr":
+                    measurement_time = timedelta(seconds=0)
+                else:
+                    measurement_time = metadata["measurment_time"]
+                end_time = datetime.now()
+                with self.log_lock:
+                    self.packet_logger.log_packet(packet.sender, packet.receiver,
+                                                  packet.start_time, end_time, measurement_time,
+                                                  out_bits, int(epr_consumed), int(number_of_transmissions),
+                                                  transmission_type)
+            except Exception as e:
+                print("Exception in packet logging")
+                print(e)
+            packet.future.set_result(out_bits)
+
+    def backpressure(self, source_host):
+        """
+        True if packets from source_host would currently be blocked or dropped
+
+        PUBLIC METHOD
+        """
+        return [node for node in [self.node_a, self.node_b]
+                if node.host.host_id == source_host][0].backpressure()
+
+    def queue_stats(self):
+        """
+        Returns packet queue occupancy and drop counters of both nodes, keyed by host id
+
+        PUBLIC METHOD
+        """
+        return {node.host.host_id: node.queue_stats() for node in [self.node_a, self.node_b]}
+
+    def sender_stats(self):
+        """
+        Returns sender thread utilization of both nodes, keyed by host id
+
+        PUBLIC METHOD
+        """
+        return {node.host.host_id: node.sender_stats() for node in [self.node_a, self.node_b]}
 
 
 class _Packet_logger:
     """ _Packet_logger
     private class
-    logs packet information into a file
+    logs packet information into a binary packet log,
+    quantum_bridge.packet_log exports it to the comma separated format
 
     """
     def __init__(self, channel_start_time, log_file):
         self.channel_start_time = channel_start_time
         self.log_file = log_file
-        log_line = ["sender", "receiver", "start_time", "end_time", "transmission_time",
-                    "measurement_time", "transmission_time_no_measurement", "packet bit length",
-                    "packet transmission rate (w m)", "packet transmission rate (w/o measurement)"]
-        log_line.extend(["transmission type", "number of epr consumed", "number of transmissions"])
-        self._write_log_line(log_line)
+        self.writer = PacketLogWriter(log_file, channel_start_time.timestamp())
 
     def log_packet(self, sender, receiver, start_time, end_time, measurement_time, packet_bits,
                    epr_used, number_of_transmissions, transmission_type):
-        print(f"Logging: {transmission_type}")
-        transmission_time = end_time - start_time
-        print(type(transmission_time))
-        transmission_time_no_measurement = transmission_time
-        #transmission_time = str(transmission_time.seconds) + '.' + str(transmission_time.microseconds/1000)
         start_time =  start_time - self.channel_start_time
-        #start_time = str(start_time.seconds) + '.' + str(start_time.microseconds/1000)
-        bit_len = len(packet_bits)*8
         end_time =  end_time - self.channel_start_time
-        #end_time = str(end_time.seconds) + '.' + str(end_time.microseconds/1000)
-
-        bandwidth = bit_len/(float(transmission_time.total_seconds()))
-        bandwidth_n_m = bit_len/(float(transmission_time_no_measurement.total_seconds()))
+        if isinstance(packet_bits, np.ndarray):
+            bit_len = len(packet_bits)
+        else:
+            bit_len = len(packet_bits)*8
+        if not isinstance(measurement_time, timedelta):
+            measurement_time = timedelta(seconds=float(measurement_time))
 
         if transmission_type == "DATA_SEQ":
             transmission_type = "normal"
@@ -130,22 +234,22 @@ class _Packet_logger:
         else:
             transmission_type = "superdense"
 
+        self.writer.append(sender, receiver, start_time.total_seconds(), end_time.total_seconds(),
+                           measurement_time.total_seconds(), bit_len, epr_used, number_of_transmissions,
+                           transmission_type)
 
-
-        log_line = [sender, receiver, format(float(start_time.total_seconds()),".2f"),
-                    format(float(end_time.total_seconds()),".2f"), format(float(transmission_time.total_seconds()),".2f")]
-        log_line.extend(["0",format(float(transmission_time.total_seconds()),".2f")])
-        log_line.extend([str(bit_len), format(bandwidth,".2f"),format(bandwidth_n_m,".2f")])
-        log_line.extend([transmission_type, str(epr_used), str(number_of_transmissions)])
-        log_line = [str(x) for x in log_line]
-        self._write_log_line(log_line)
-
-    def _write_log_line(self, log_line):
-        with open(self.log_file, "a") as f:
-            log_line = ",".join(log_line)
-            f.write(log_line+"\n")
-
-
-
+    def close(self):
+        self.writer.close()
 
 
+class _Pending_packet:
+    """ _Pending_packet
+    private class
+    packet submitted to the channel, waiting to come out on the other side
+    """
+    def __init__(self, sender, receiver, packet_type, start_time, future):
+        self.sender = sender
+        self.receiver = receiver
+        self.packet_type = packet_type
+        self.start_time = start_time
+        self.future = future
@@ -1,11 +1,15 @@
-from threading import Event, Timer
+from collections import deque
+from threading import Condition, Event, Timer
 import queue 
+import time
 
 from qunetsim.components import Host
 from qunetsim.objects import Logger
 
 from .daemon_thread import DaemonThread
 from .quantum_frame import QuantumFrame
+from .packet_queue import PacketQueue, OVERFLOW_BLOCK
+from ..async_logger import LOGGER
 
 Logger.DISABLED = False
 
@@ -19,9 +23,15 @@ class Node:
     """
 
     def __init__(self, host: str, network, backend, queue_size=512, is_epr_initiator=False, frame_size=48,
-                 epr_transmission_time=20, epr_manual_mode=False,epr_frame_size=20):
+                 epr_transmission_time=20, epr_manual_mode=False,epr_frame_size=20,
+                 batched_frames=False, overflow_policy=OVERFLOW_BLOCK, on_drop=None):
         """
         Inits node
+        queue_size: capacity of the packet in/out queues
+        overflow_policy: what a full incomming queue does (block, drop-tail, drop-head),
+                         full outgoing queue always blocks the receiver
+        on_drop: called with (packet_id, data) of packets evicted from the incomming queue (drop-head)
+                 and of manual EPR packets whose frame could not be sent
         """
         self.host = Host(host, backend)
         self.host.delay = 0
@@ -31,11 +41,14 @@ class Node:
         self.queue_size = queue_size
         self.frame_size = frame_size
         self.epr_frame_size = epr_frame_size
+        #Sender thread sleeps on wakeup until data, EPR trigger or stop arrives
+        self.wakeup = Condition()
         #Packet management before/after channel transmission
-        self.packet_in_queue_event = Event()
-        self.packet_out_queue_event = Event()
-        self.packet_in_queue = []
-        self.packet_out_queue = []
+        self.packet_in_queue = PacketQueue(queue_size, overflow_policy, condition=self.wakeup, on_drop=on_drop)
+        self.on_drop = on_drop
+        self.packet_out_queue = PacketQueue(queue_size, OVERFLOW_BLOCK)
+        #Packet ids of frames sent to this node by the peer, in transmission order
+        self.in_flight = deque()
         self.epr_trigger = Event()
         self.epr_lock = Event()
         self.stop_signal = Event()
@@ -48,6 +61,12 @@ class Node:
         self.max_queue_size = 8*1000
         self.epr_transmission_time = epr_transmission_time
         self.epr_manual_mode = epr_manual_mode
+        #Batched frames are passed between peers as single objects
+        self.batched_frames = batched_frames
+        self.frame_queue = queue.Queue()
+        self.sender_start_time = None
+        self.sender_idle_time = 0.0
+        self.sender_cpu_time = 0.0
 
     def connect(self, node):
         """
@@ -84,6 +103,9 @@ class Node:
         PUBLIC METHOD
         """
         self.stop_signal.set()
+        self.packet_in_queue.close()
+        self.packet_out_queue.close()
+        self.frame_queue.put(None)
         self.receiver_thread.join()
         self.sender_thread.join()
 
@@ -118,8 +140,10 @@ class Node:
             return
         if self.entanglement_buffer.qsize() > self.max_queue_size:
             return
-        print(f"{self.host.host_id} initiated EPR Transmission")
-        self.epr_trigger.set()
+        LOGGER.debug(self._logfile(), f"{self.host.host_id} initiated EPR Transmission")
+        with self.wakeup:
+            self.epr_trigger.set()
+            self.wakeup.notify()
         self.epr_lock.wait()
         self.epr_trigger.clear()
         self.epr_lock.clear()
@@ -139,9 +163,14 @@ class Node:
                 if self.stop_signal.is_set():
                     return
                 qf = QuantumFrame(node=self, mtu=self.epr_frame_size)
-                print("WAITING TO RECEIVE")
-                qf.receive(self.peer.host)
-                print(f"NUMBER OF TRANSMISSIONS {qf.number_of_transmissions}")
+                if self.batched_frames:
+                    frame = self.frame_queue.get()
+                    if frame is None:
+                        return
+                    qf.receive_frame_batch(frame)
+                else:
+                    qf.receive(self.peer.host)
+                packet_id = self.in_flight.popleft() if len(self.in_flight) > 0 else None
                 if qf.type == 'EPR':
                     for q in qf.extract_local_pairs():
                         #print(q.id)
@@ -149,25 +178,25 @@ class Node:
                     #map(self.entanglement_buffer.put, qf.extract_local_pairs())
                     #self.entanglement_buffer.extend(qf.extract_local_pairs())
                     if self.epr_manual_mode:
-                        self.packet_out_queue.append((qf.raw_qubits,
-                                                        {"number_of_epr_pairs_consumed":qf.epr_consumed,
-                                                        "number_of_transmissions":qf.number_of_transmissions,
-                                                        "transmission_type":qf.type,
-                                                        "measurment_time":"0"
-                                                        }))
-                        self.packet_out_queue_event.set()
-                    print(str(self.entanglement_buffer.qsize()) + " available local pairs")
+                        self.packet_out_queue.put((qf.raw_qubits,
+                                                     {"number_of_epr_pairs_consumed":qf.epr_consumed,
+                                                     "number_of_transmissions":qf.number_of_transmissions,
+                                                     "transmission_type":qf.type,
+                                                     "measurment_time":"0",
+                                                     "packet_id":packet_id
+                                                     }))
+                    LOGGER.debug(self._logfile(), f"{self.entanglement_buffer.qsize()} available local pairs")
                 else:
-                    print("DATA FRAME RECEIVED -- " + qf.type)
-                    self.packet_out_queue.append((qf.raw_bits,
-                                                  {"number_of_epr_pairs_consumed":qf.epr_consumed,
-                                                   "number_of_transmissions":qf.number_of_transmissions,
-                                                   "transmission_type":qf.type,
-                                                   "measurment_time":qf.measurement_time
-                                                   }))
-                    print(qf.epr_consumed)
-                    print(qf.number_of_transmissions)
-                    self.packet_out_queue_event.set()
+                    self.packet_out_queue.put((qf.raw_bits,
+                                               {"number_of_epr_pairs_consumed":qf.epr_consumed,
+                                                "number_of_transmissions":qf.number_of_transmissions,
+                                                "transmission_type":qf.type,
+                                                "measurment_time":qf.measurement_time,
+                                                "packet_id":packet_id
+                                                }))
+                    LOGGER.debug(self._logfile(), f"DATA FRAME RECEIVED -- {qf.type}, "
+                                                  f"{qf.epr_consumed} EPR pairs consumed, "
+                                                  f"{qf.number_of_transmissions} transmissions")
 
         except Exception as e:
             print("Exception in receiver protocol")
@@ -181,65 +210,135 @@ class Node:
         PUBLIC METHOD
         """
         print(self.host.host_id + " sender protocol started")
+        self.sender_start_time = time.monotonic()
         try:
             while True:
-                if self.stop_signal.is_set():
-                    return
-                if self.packet_in_queue_event.is_set():
-                    packet = self.packet_in_queue.pop(0)
-                    print("PACKET FLAG IS SET")
-                    print(packet)
-                    if packet == "EPR":
-                        print("MANUAL EPR DATA FRAME TRANSMISSION")
-                        self._transmit_epr_frame()
+                with self.wakeup:
+                    idle_start = time.monotonic()
+                    self.wakeup.wait_for(self._sender_has_work)
+                    self.sender_idle_time += time.monotonic() - idle_start
+                    if self.stop_signal.is_set():
+                        return
+                    item = None
+                    if len(self.packet_in_queue) > 0:
+                        item = self.packet_in_queue.get_nowait()
+                if item is not None:
+                    packet_id, packet = item
+                    self.peer.in_flight.append(packet_id)
+                    if isinstance(packet, str) and packet == "EPR":
+                        LOGGER.debug(self._logfile(), "MANUAL EPR DATA FRAME TRANSMISSION")
+                        if not self._transmit_epr_frame() and self.on_drop is not None:
+                            self.on_drop(item)
                     else:
                         self._transmit_data_frame(packet)
-                    if len(self.packet_in_queue) == 0:
-                        self.packet_in_queue_event.clear()
-                elif self.epr_trigger.is_set() and not self.epr_manual_mode:
+                else:
+                    self.peer.in_flight.append(None)
                     self._transmit_epr_frame()
                     self.epr_lock.set()
                     self.epr_trigger.clear()
+                self.sender_cpu_time = time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID)
         except Exception as e:
             print("Exception in sender protocol")
             print(e)
 
-    def add_to_in_queue(self, data):
+    def _sender_has_work(self):
+        """
+        Wakeup predicate of the sender thread,
+        data packets are served before EPR triggers
+
+        PRIVATE METHOD: called by sender_protocol
+        """
+        return (self.stop_signal.is_set() or len(self.packet_in_queue) > 0
+                or (self.epr_trigger.is_set() and not self.epr_manual_mode))
+
+    def sender_stats(self):
+        """
+        Returns sender thread utilization since start:
+        wall time, cpu time, time spent blocked waiting for work
+        and share of the wall time the thread did not use the cpu
+
+        PUBLIC METHOD
+        """
+        if self.sender_start_time is None:
+            return None
+        wall_time = time.monotonic() - self.sender_start_time
+        return {
+            "wall_time": wall_time,
+            "cpu_time": self.sender_cpu_time,
+            "idle_time": self.sender_idle_time,
+            "idle_cpu": 1 - self.sender_cpu_time / wall_time if wall_time > 0 else 1.0,
+        }
+
+    def add_to_in_queue(self, data, timeout=None, packet_id=None):
         """
         Adds packets to incomming queue.
         Used to interract with sender thread.
+        packet_id is handed back in the metadata of the peer's out queue entry.
+        Returns False if the packet was dropped because the queue is full
+        (backpressure), True otherwise.
 
         PUBLIC METHOD
         """
-        print("Adding packet to queue")
-        self.packet_in_queue.append(data)
-        self.packet_in_queue_event.set()
+        return self.packet_in_queue.put((packet_id, data), timeout)
 
-    def get_from_out_queue(self):
+    def get_from_out_queue(self, timeout=None):
         """
         Waits and gets packet from outgoing queue.
         Used to interract with receiver thread.
+        Returns None on timeout or if the node was stopped.
 
         PUBLIC METHOD
         """
-        self.packet_out_queue_event.wait()
-        out_packet = self.packet_out_queue.pop(0)
-        if len(self.packet_out_queue) == 0:
-            self.packet_out_queue_event.clear()
-        return out_packet
+        try:
+            return self.packet_out_queue.get(timeout)
+        except queue.Empty:
+            return None
+
+    def backpressure(self):
+        """
+        True if the incomming queue is full and new packets
+        would be blocked or dropped
+
+        PUBLIC METHOD
+        """
+        return self.packet_in_queue.full()
+
+    def queue_stats(self):
+        """
+        Returns occupancy and drop counters of the packet queues
+
+        PUBLIC METHOD
+        """
+        return {"in": self.packet_in_queue.stats(), "out": self.packet_out_queue.stats()}
+
+    def _logfile(self):
+        """
+        PRIVATE METHOD: debug log of the node, like the qubit traces of QuantumFrame
+        """
+        return self.host.host_id + ".log"
 
     def _transmit_epr_frame(self):
         """
         Sends epr quantum frame.
         Is triggered periodically by epr_timer() method.
+        Returns False if the frame was skipped because a node was busy,
+        its entry in peer.in_flight is taken back then.
 
         PRIVATE METHOD: called by sender_protocol()
         """
         qf = QuantumFrame(node=self, mtu=self.epr_frame_size)
-        qf.send_epr_frame(self.peer)
+        if self.batched_frames:
+            sent = qf.send_epr_frame_batch(self.peer)
+        else:
+            sent = qf.send_epr_frame(self.peer)
+        if not sent:
+            #Appended before sending so the receiver finds it, only this thread appends so it is the last entry
+            self.peer.in_flight.pop()
+            return False
         for q in qf.extract_local_pairs():
             self.entanglement_buffer.put(q)
-        print("NUM OF QUBITS IN SENDER BUFFER", self.entanglement_buffer.qsize())
+        LOGGER.debug(self._logfile(), f"NUM OF QUBITS IN SENDER BUFFER {self.entanglement_buffer.qsize()}")
+        return True
 
     def _transmit_data_frame(self, data):
         """
@@ -248,5 +347,8 @@ class Node:
         PRIVATE METHOD: called by sender_protocol()
         """
         qf = QuantumFrame(node=self,mtu=self.epr_frame_size)
-        qf.send_data_frame(data, self.peer, self.entanglement_buffer)
+        if self.batched_frames:
+            qf.send_data_frame_batch(data, self.peer, self.entanglement_buffer)
+        else:
+            qf.send_data_frame(data, self.peer, self.entanglement_buffer)
 
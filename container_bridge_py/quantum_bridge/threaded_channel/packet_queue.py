@@ -0,0 +1,134 @@
+from collections import deque
+from threading import Condition
+import queue
+
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_TAIL = "drop-tail"
+OVERFLOW_DROP_HEAD = "drop-head"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_TAIL, OVERFLOW_DROP_HEAD)
+
+
+class PacketQueue:
+    """ PacketQueue
+    Bounded thread safe FIFO of packets waiting for / coming out of the quantum link
+    -> Overflow policy decides what happens when the queue is full:
+        -> block: producer waits until there is space (or timeout)
+        -> drop-tail: new packet is rejected
+        -> drop-head: oldest packet is evicted, new packet is accepted
+    -> put returns False if the packet was rejected, producers use it as backpressure signal
+    -> condition can be shared with the consumer, so it can wait for more than one source
+    """
+
+    def __init__(self, maxsize=512, overflow_policy=OVERFLOW_BLOCK, condition=None, on_drop=None):
+        """
+        Inits queue
+        on_drop: called with every evicted packet (drop-head)
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy}, use one of {OVERFLOW_POLICIES}")
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+        self.condition = condition if condition is not None else Condition()
+        self.on_drop = on_drop
+        self.closed = False
+        self.enqueued = 0
+        self.dropped_tail = 0
+        self.dropped_head = 0
+        self._items = deque()
+
+    def __len__(self):
+        return len(self._items)
+
+    def full(self):
+        """
+        True if next put would block or drop
+
+        PUBLIC METHOD
+        """
+        return len(self._items) >= self.maxsize
+
+    def put(self, item, timeout=None):
+        """
+        Adds packet to the end of the queue.
+        Returns True if the packet was accepted, False if it was dropped.
+
+        PUBLIC METHOD
+        """
+        evicted = None
+        with self.condition:
+            if self.closed:
+                return False
+            if self.full():
+                if self.overflow_policy == OVERFLOW_BLOCK:
+                    if not self.condition.wait_for(lambda: self.closed or not self.full(), timeout):
+                        self.dropped_tail += 1
+                        return False
+                    if self.closed:
+                        return False
+                elif self.overflow_policy == OVERFLOW_DROP_TAIL:
+                    self.dropped_tail += 1
+                    return False
+                else:
+                    evicted = self._items.popleft()
+                    self.dropped_head += 1
+            self._items.append(item)
+            self.enqueued += 1
+            self.condition.notify_all()
+        if evicted is not None and self.on_drop is not None:
+            self.on_drop(evicted)
+        return True
+
+    def get(self, timeout=None):
+        """
+        Waits and removes packet from the front of the queue.
+        Raises queue.Empty on timeout or if the queue was closed while empty.
+
+        PUBLIC METHOD
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.closed or len(self._items) > 0, timeout):
+                raise queue.Empty
+            return self.get_nowait()
+
+    def get_nowait(self):
+        """
+        Removes packet from the front of the queue without waiting.
+        Raises queue.Empty if there is none.
+
+        PUBLIC METHOD
+        """
+        with self.condition:
+            if len(self._items) == 0:
+                raise queue.Empty
+            item = self._items.popleft()
+            self.condition.notify_all()
+            return item
+
+    def close(self):
+        """
+        Rejects further packets and wakes up all waiting threads
+
+        PUBLIC METHOD
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        """
+        Returns queue occupancy and drop counters
+
+        PUBLIC METHOD
+        """
+        with self.condition:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "overflow_policy": self.overflow_policy,
+                "enqueued": self.enqueued,
+                "dropped_tail": self.dropped_tail,
+                "dropped_head": self.dropped_head,
+            }
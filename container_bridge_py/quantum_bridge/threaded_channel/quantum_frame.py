@@ -1,21 +1,67 @@
 import time
 from datetime import timedelta, datetime
 
+import numpy as np
 from qunetsim.objects import Logger
 from qunetsim.objects import Qubit
 
+from ..async_logger import LOGGER, QUBIT_STREAM
+from ..pauli import PAULI_I, PAULI_X, PAULI_Z, PAULI_XZ
+
 def simple_logger(host, log_line):
     """
     Simple Logger function to test qubits, will be removed
+    Lines go to the sampled qubit debug stream of the bridge logger
     """
-    with open(str(host)+".log", "a") as log_file:
-        log_file.write(log_line+"\n")
+    if LOGGER.sampled(QUBIT_STREAM):
+        LOGGER.debug(str(host)+".log", log_line)
 
 EPR_DICT_FOR_LOGGING = {}
 SENDER_EPR_QUBIT_IDS = []
 RECEIVER_EPR_QUBIT_IDS = []
 
 
+def encode_superdense(bits):
+    """
+    Takes numpy array of bits and returns array of pauli operations,
+    one operation per crumb ('00' -> I, '01' -> X, '10' -> Z, '11' -> XZ)
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    return (bits[0::2] * PAULI_Z) | (bits[1::2] * PAULI_X)
+
+
+def decode_superdense(first_bits, second_bits):
+    """
+    Takes measurement results of both qubits of every pair
+    and returns numpy array of received bits
+    """
+    bits = np.empty(2 * len(first_bits), dtype=np.uint8)
+    bits[0::2] = first_bits
+    bits[1::2] = second_bits
+    return bits
+
+
+def encode_sequential(bits):
+    """
+    Takes numpy array of bits and returns array of pauli operations,
+    one operation per bit ('0' -> I, '1' -> X)
+    """
+    return np.asarray(bits, dtype=np.uint8) * PAULI_X
+
+
+class QubitFrame:
+    """
+    Batch of qubits handed to the transport as a single object.
+    First superdense_count qubits carry two bits each, remaining qubits
+    carry one bit each.
+    """
+
+    def __init__(self, frame_type, qubits, superdense_count=0):
+        self.type = frame_type
+        self.qubits = qubits
+        self.superdense_count = superdense_count
+
+
 class QuantumFrame:
     """
     Quantum Frame class, handles actual transmition of data encoded into
@@ -67,7 +113,6 @@ class QuantumFrame:
         """
         Send data frame, sequential or superdense ecnoded
         """
-        print("Send data frame")
         self.creation_time = time.time()
         self.raw_bits = data
         data.append(self.termination_byte)
@@ -79,7 +124,6 @@ class QuantumFrame:
             if entanglement_buffer.qsize() > 0:
                 self.type = "DATA_SC"
                 self._send_data_frame_header(destination_node.host)
-                print("Sending data frame superdense")
                 self._send_data_frame_sc(data, destination_node.host)
                 return
             send_sequentially = True
@@ -89,7 +133,6 @@ class QuantumFrame:
         if send_sequentially:
             self.type = "DATA_SEQ"
             self._send_data_frame_header(destination_node.host)
-            print("Sending data frame without entanglement enhancment")
             self._send_data_frame_seq(data, destination_node.host)
 
 
@@ -168,7 +211,8 @@ class QuantumFrame:
 
     def send_epr_frame(self, destination_node):
         """
-        Sends EPR frame to the destination
+        Sends EPR frame to the destination,
+        returns False if no frame was sent because one of the nodes is busy receiving
 
         PUBLIC METHOD
         """
@@ -176,13 +220,14 @@ class QuantumFrame:
         q_f_num = 0
 
         if destination_node.is_busy.is_set() or self.node.is_busy.is_set():
-            return
+            return False
         header = '00'
         for h in header:
             q = Qubit(self.host, q_id=str(q_f_num) + "-" + timestamp + "-EPR-HEADER" )
             q_f_num = q_f_num + 1
-            simple_logger(self.node.host.host_id,
-                          f"Header: {h}\n {q.id}")
+            if LOGGER.enabled(QUBIT_STREAM):
+                simple_logger(self.node.host.host_id,
+                              f"Header: {h}\n {q.id}")
             if h == '1':
                 q.X()
             self.host.send_qubit(destination_node.host.host_id, q, await_ack=self.await_ack,
@@ -198,14 +243,105 @@ class QuantumFrame:
                 self.local_qubits.append(q1)
                 self.host.send_qubit(destination_node.host.host_id, q2, await_ack=self.await_ack,
                                      no_ack=True)
-                EPR_DICT_FOR_LOGGING[q1.id]=q2.id
-                simple_logger(self.node.host.host_id,
-                            f"-EPR \n local: {q1.id} \n remote: {q2.id}")
-        SENDER_EPR_QUBIT_IDS = [x.id for x in self.local_qubits]
-        for q in self.local_qubits:
-            q = q.id
-            simple_logger(self.node.host.host_id+"-epr",
-                          f"{q} - {EPR_DICT_FOR_LOGGING[q]}")
+                if LOGGER.enabled(QUBIT_STREAM):
+                    EPR_DICT_FOR_LOGGING[q1.id]=q2.id
+                    simple_logger(self.node.host.host_id,
+                                f"-EPR \n local: {q1.id} \n remote: {q2.id}")
+        if LOGGER.enabled(QUBIT_STREAM):
+            SENDER_EPR_QUBIT_IDS = [x.id for x in self.local_qubits]
+            for q in self.local_qubits:
+                q = q.id
+                simple_logger(self.node.host.host_id+"-epr",
+                              f"{q} - {EPR_DICT_FOR_LOGGING[q]}")
+        return True
+
+    def send_data_frame_batch(self, data, destination_node, entanglement_buffer=None):
+        """
+        Send data frame as a single batch, superdense encoded while
+        entanglement is available, remaining bits are sent sequentially.
+        Data is numpy array of bits, backend must support batch operations.
+
+        PUBLIC METHOD
+        """
+        self.creation_time = time.time()
+        if self.type is not None:
+            raise Exception("Quantum Frame type already defined")
+        bits = np.asarray(data, dtype=np.uint8)
+        self.raw_bits = bits
+
+        superdense_count = 0
+        if entanglement_buffer is not None:
+            superdense_count = min(entanglement_buffer.qsize(), len(bits) // 2)
+        sequential_bits = bits[2 * superdense_count:]
+
+        timestamp = str(time.time())
+        backend = self.host.backend
+        qubits = [entanglement_buffer.get() for _ in range(superdense_count)]
+        qubits.extend(Qubit(self.host, qubit=q, q_id=str(q_num) + "-" + timestamp)
+                      for q_num, q in enumerate(backend.create_qubits(self.host.host_id,
+                                                                      len(sequential_bits))))
+        ops = np.concatenate((encode_superdense(bits[:2 * superdense_count]),
+                              encode_sequential(sequential_bits)))
+
+        self.type = "DATA_SC" if superdense_count > 0 else "DATA_SEQ"
+        backend.apply_paulis(qubits, ops)
+        backend.send_qubits_to(qubits, self.host.host_id, destination_node.host.host_id)
+        destination_node.frame_queue.put(QubitFrame(self.type, qubits, superdense_count))
+        self.deletion_time = time.time()
+
+    def send_epr_frame_batch(self, destination_node):
+        """
+        Sends EPR frame to the destination as a single batch,
+        always sent, returns True like send_epr_frame
+
+        PUBLIC METHOD
+        """
+        timestamp = str(time.time())
+        pair_count = self.MTU * 8
+        backend = self.host.backend
+        self.local_qubits = [Qubit(self.host, qubit=q, q_id=str(q_num) + "-" + timestamp + "-EPR-LOCAL")
+                             for q_num, q in enumerate(backend.create_qubits(self.host.host_id, pair_count))]
+        remote_qubits = [Qubit(self.host, qubit=q, q_id=str(q_num) + "-" + timestamp + "-EPR-REMOTE")
+                         for q_num, q in enumerate(backend.create_qubits(self.host.host_id, pair_count))]
+        backend.H_batch(self.local_qubits)
+        backend.cnot_batch(self.local_qubits, remote_qubits)
+        backend.send_qubits_to(remote_qubits, self.host.host_id, destination_node.host.host_id)
+        destination_node.frame_queue.put(QubitFrame("EPR", remote_qubits))
+        return True
+
+    def receive_frame_batch(self, frame):
+        """
+        Receives and decodes a whole batched frame at once
+
+        PUBLIC METHOD
+        """
+        self.type = frame.type
+        if frame.type == "EPR":
+            self.local_qubits = frame.qubits
+            self.epr_consumed = -len(frame.qubits)
+            self.raw_qubits = ['eeeeeeee'] * (len(frame.qubits) // 8)
+            return
+
+        self.node.is_busy.set()
+        backend = self.host.backend
+        superdense_qubits = frame.qubits[:frame.superdense_count]
+        sequential_qubits = frame.qubits[frame.superdense_count:]
+        buffer = self.node.entanglement_buffer
+        local_qubits = [buffer.get() for _ in range(frame.superdense_count)]
+
+        pre_measurement_time = datetime.now()
+        backend.cnot_batch(superdense_qubits, local_qubits)
+        backend.H_batch(superdense_qubits)
+        first_bits = backend.measure_batch(superdense_qubits)
+        second_bits = backend.measure_batch(local_qubits)
+        sequential_bits = backend.measure_batch(sequential_qubits)
+        self.measurement_time = self.measurement_time + (datetime.now() - pre_measurement_time)
+
+        self.raw_bits = np.concatenate((decode_superdense(first_bits, second_bits),
+                                        sequential_bits))
+        self.epr_consumed = frame.superdense_count
+        self.number_of_transmissions = len(frame.qubits)
+        self.node.is_busy.clear()
 
     def extract_local_pairs(self):
         """
@@ -234,7 +370,7 @@ class QuantumFrame:
                     header = header + '1'
                 else:
                     header = header + '0'
-        print(f"HEADER: {header}")
+        simple_logger(self.node.host.host_id, f"HEADER: {header}")
         if header == '00':
             self._receive_epr(source)
         if header == '01':
@@ -286,14 +422,15 @@ class QuantumFrame:
                 data.append(crumb)
 
             if len(data[-1])==8:
-                log_list = []
-                for i, rec in enumerate(rec_qbyte_ids):
-                    log_list.append(" , ".join([rec, buf_qbyte_ids[i]]))
-                log_list = "\n".join(log_list)
-
-                simple_logger(self.node.host.host_id,
-                              f"""RECEIVED DATA SD: {data[-1]}\nRECEIVED_Q_IDS, BUFF_IDS:\n{log_list}
-                              """)
+                if LOGGER.enabled(QUBIT_STREAM):
+                    log_list = []
+                    for i, rec in enumerate(rec_qbyte_ids):
+                        log_list.append(" , ".join([rec, buf_qbyte_ids[i]]))
+                    log_list = "\n".join(log_list)
+
+                    simple_logger(self.node.host.host_id,
+                                  f"""RECEIVED DATA SD: {data[-1]}\nRECEIVED_Q_IDS, BUFF_IDS:\n{log_list}
+                                  """)
                 buf_qbyte_ids = []
                 rec_qbyte_ids = []
 
@@ -350,5 +487,6 @@ class QuantumFrame:
                 self.local_qubits.append(q)
             self.raw_qubits.append('eeeeeeee')
         simple_logger(self.node.host.host_id, "---- EPR RECEIVED")
-        for q in self.local_qubits:
-            simple_logger(self.node.host.host_id+"-epr", str(q.id))
+        if LOGGER.enabled(QUBIT_STREAM):
+            for q in self.local_qubits:
+                simple_logger(self.node.host.host_id+"-epr", str(q.id))
@@ -1,8 +1,19 @@
+from collections import deque
+from threading import RLock
+import weakref
+
 from qunetsim.backends import SafeDict
 from numpy import random
+import numpy as np
+
+from ..pauli import PAULI_X, PAULI_Z
 
 
 class SimpleStabilizerQubit:
+    """
+    Entangled partners are referenced weakly, qubit is freed
+    as soon as nothing but its partners refers to it.
+    """
     def __init__(self, q_id):
         self.entangled_pairs = []
         self.state = 0
@@ -48,10 +59,29 @@ class SimpleStabilizerQubit:
         elif self._ops[-1] == 'H':
             self._is_entangled = True
             target._is_entangled = True
-            target.entangled_pairs.append(self)
-            self.entangled_pairs.append(target)
+            target.entangled_pairs.append(weakref.ref(self))
+            self.entangled_pairs.append(weakref.ref(target))
             self._ops.pop()
 
+    def _set_partner_state(self, state):
+        if len(self.entangled_pairs) == 0:
+            return
+        partner = self.entangled_pairs[0]()
+        if partner is not None:
+            partner.state = state
+
+    def sweep_partners(self):
+        """
+        Drops entanglement links if none of the partners exist anymore.
+        Returns True if links were dropped.
+        """
+        if len(self.entangled_pairs) == 0:
+            return False
+        if any(partner() is not None for partner in self.entangled_pairs):
+            return False
+        self.entangled_pairs = []
+        return True
+
     def measure(self):
         if len(self._ops) == 0:
             if self._is_entangled:
@@ -61,10 +91,10 @@ class SimpleStabilizerQubit:
             op = self._ops.pop()
             if self._is_entangled:
                 if op == 'X':
-                    self.entangled_pairs[0].state = 1
+                    self._set_partner_state(1)
                     return 0
                 elif op == 'Z':
-                    self.entangled_pairs[0].state = 0
+                    self._set_partner_state(0)
                     return 1
             else:
                 if op == 'X':
@@ -74,7 +104,7 @@ class SimpleStabilizerQubit:
                 return 0
         elif len(self._ops) == 2:
             if self._is_entangled:
-                self.entangled_pairs[0].state = 1
+                self._set_partner_state(1)
                 return 1
             return 0
         else:
@@ -84,12 +114,24 @@ class SimpleStabilizerQubit:
 class SimpleStabilizerBackend:
     """
     Definition of how a backend has to look and behave like.
+
+    Qubits live in numbered slots, slots of measured, released or
+    unreferenced qubits are recycled. Number of slots is therefore the
+    high water mark of simultaneously existing qubits.
     """
 
-    def __init__(self):
+    def __init__(self, sweep_interval=100000):
         self._hosts = SafeDict()
         self._num_qubits = 0
+        # slot -> weak reference of the qubit
         self._qubits = {}
+        self._free_slots = deque()
+        # Reentrant, _reclaim can run in a thread that holds it already
+        self._lock = RLock()
+        self._sweep_interval = sweep_interval
+        self._allocated = 0
+        self._released = 0
+        self._reclaimed = 0
 
     def start(self, **kwargs):
         """
@@ -126,11 +168,99 @@ class SimpleStabilizerBackend:
         Returns:
             Qubit of backend type.
         """
-        q = SimpleStabilizerQubit(self._num_qubits)
-        self._qubits[self._num_qubits] = q
-        self._num_qubits += 1
+        with self._lock:
+            if len(self._free_slots) > 0:
+                slot = self._free_slots.popleft()
+            else:
+                slot = self._num_qubits
+                self._num_qubits += 1
+            q = SimpleStabilizerQubit(slot)
+            self._qubits[slot] = weakref.ref(q, lambda ref, slot=slot: self._reclaim(slot, ref))
+            self._allocated += 1
+            sweep = self._sweep_interval and self._allocated % self._sweep_interval == 0
+        if sweep:
+            self.sweep()
         return q
 
+    def _exists(self, q):
+        """
+        Checks if qubit still owns its slot
+
+        PRIVATE METHOD
+        """
+        ref = self._qubits.get(q.q_id)
+        return ref is not None and ref() is q
+
+    def _free(self, q):
+        """
+        Frees slot of the qubit, returns False if qubit doesn't exist
+
+        PRIVATE METHOD
+        """
+        if not self._exists(q):
+            return False
+        self._qubits.pop(q.q_id, None)
+        self._free_slots.append(q.q_id)
+        return True
+
+    def _reclaim(self, slot, ref):
+        """
+        Called when qubit isn't referenced anymore, frees its slot.
+        Runs in whichever thread dropped the last reference.
+
+        PRIVATE METHOD
+        """
+        with self._lock:
+            if self._qubits.get(slot) is ref:
+                self._qubits.pop(slot, None)
+                self._free_slots.append(slot)
+                self._reclaimed += 1
+
+    def sweep(self):
+        """
+        Drops entanglement links of qubits whose partners don't exist anymore.
+        Runs periodically every sweep_interval created qubits.
+
+        Returns:
+            Number of qubits whose links were dropped.
+        """
+        swept = 0
+        for ref in list(self._qubits.values()):
+            q = ref()
+            if q is not None and q.sweep_partners():
+                swept += 1
+        return swept
+
+    def stats(self):
+        """
+        Returns qubit allocation statistics.
+
+        Returns:
+            dict: live qubits, high water mark, free slots, number of
+                  allocated, released and reclaimed (unreferenced) qubits.
+        """
+        return {
+            "live_qubits": len(self._qubits),
+            "high_water_mark": self._num_qubits,
+            "free_slots": len(self._free_slots),
+            "allocated": self._allocated,
+            "released": self._released,
+            "reclaimed": self._reclaimed,
+        }
+
+    def create_qubits(self, host_id, count):
+        """
+        Creates count new Qubits of the type of the backend.
+
+        Args:
+            host_id (str): Id of the host to whom the qubits belong.
+            count (int): Number of qubits.
+
+        Returns:
+            List of qubits of backend type.
+        """
+        return [self.create_qubit(host_id) for _ in range(count)]
+
     def send_qubit_to(self, qubit, from_host_id, to_host_id):
         """
         Sends a qubit to a new host.
@@ -335,6 +465,73 @@ class SimpleStabilizerBackend:
         raise (EnvironmentError("This is only an interface, not \
                         an actual implementation!"))
 
+    ##########################
+    #   Batch definitions    #
+    #########################
+
+    def apply_paulis(self, qubits, ops):
+        """
+        Applies pauli operations to qubits, one operation per qubit.
+
+        Args:
+            qubits (list): Qubits on which operations should be applied to.
+            ops (np.ndarray): Operation codes (PAULI_I, PAULI_X, PAULI_Z, PAULI_XZ).
+        """
+        for qubit, op in zip(qubits, ops.tolist()):
+            if op & PAULI_X:
+                qubit.qubit.X()
+            if op & PAULI_Z:
+                qubit.qubit.Z()
+
+    def H_batch(self, qubits):
+        """
+        Perform Hadamard gate on every qubit.
+
+        Args:
+            qubits (list): Qubits on which gate should be applied to.
+        """
+        for qubit in qubits:
+            qubit.qubit.H()
+
+    def cnot_batch(self, qubits, targets):
+        """
+        Applies controlled x gates pairwise.
+
+        Args:
+            qubits (list): Qubits to control cnot.
+            targets (list): Qubits on which the cnot gates should be applied.
+        """
+        for qubit, target in zip(qubits, targets):
+            qubit.qubit.cnot(target.qubit)
+
+    def measure_batch(self, qubits, non_destructive=False):
+        """
+        Measures every qubit.
+
+        Args:
+            qubits (list): Qubits which should be measured.
+            non_destructive (bool): Determines if the Qubits should stay in the
+                                    system or be eliminated.
+
+        Returns:
+            np.ndarray: The values which have been measured.
+        """
+        return np.array([self.measure(qubit, non_destructive) for qubit in qubits],
+                        dtype=np.uint8)
+
+    def send_qubits_to(self, qubits, from_host_id, to_host_id):
+        """
+        Sends qubits to a new host.
+
+        Args:
+            qubits (list): Qubits to be send.
+            from_host_id (str): From the starting host.
+            to_host_id (str): New host of the qubits.
+        """
+        host = self._hosts.get_from_dict(to_host_id)
+        for qubit in qubits:
+            qubit.host = host
+
     def density_operator(self, qubit):
         """
         Returns the density operator of this qubit. I the qubit is entangled,
@@ -361,12 +558,12 @@ class SimpleStabilizerBackend:
         Returns:
             The value which has been measured.
         """
-        if qubit.qubit.q_id not in self._qubits:
+        if not self._exists(qubit.qubit):
             raise Exception('Qubit does not exist')
 
         m = qubit.qubit.measure()
         if not non_destructive:
-            del self._qubits[qubit.qubit.q_id]
+            self._free(qubit.qubit)
 
         return m
 
@@ -377,5 +574,5 @@ class SimpleStabilizerBackend:
         Args:
             qubit (Qubit): The qubit which should be released.
         """
-        raise (EnvironmentError("This is only an interface, not \
-                        an actual implementation!"))
+        if self._free(qubit.qubit):
+            self._released += 1
@@ -0,0 +1,313 @@
+"""
+Traffic generator engine.
+Packets are built once as templates (bytes of the whole IPv4 datagram) and
+sent over one raw socket. A pattern gives the time every packet is due, the
+engine waits for it on the monotonic clock (sleeps, then spins for the last
+moment), so packets leave on time instead of whenever a thread or a
+subprocess gets to them.
+
+Patterns yield (offset in seconds from the start, packet):
+    -> bernoulli_bursts: a burst every tick with some probability (lt_traffic_generation.py)
+    -> choices: one of two packets every interval, picked with some probability (traffic_generation.py random)
+    -> on_off: a burst every tick in the first part of every period (periodic_traffic_generation.py)
+    -> poisson: exponential times between packets
+    -> replay: times and lengths of a recorded trace
+    -> sequence: packets one after another at a fixed interval (traffic_generation.py periodic)
+
+    engine = TrafficEngine(RawSocketSender())
+    report = engine.run(poisson(udp_packet("11.0.0.1", "11.0.0.2", 500), rate=200), duration=10)
+    print(report)
+"""
+from itertools import count
+import random
+import socket
+import struct
+import time
+
+
+ETHERNET_HEADER_SIZE = 14
+IPV4_HEADER_SIZE = 20
+UDP_HEADER_SIZE = 8
+# Packet sizes of the generators are frame sizes, like the -p payload of mz plus its headers
+UDP_PACKET_HEADER_SIZE = ETHERNET_HEADER_SIZE + IPV4_HEADER_SIZE + UDP_HEADER_SIZE
+IPPROTO_UDP = 17
+DEFAULT_TTL = 64
+
+# EPR signals are 52 bytes long with IP option 25 in the last word (queue_worker.is_epr_signal)
+EPR_SIGNAL_OPTION = 25
+EPR_SIGNAL_SIZE = 52
+IP_OPTION_NOP = 1
+
+
+def checksum(data):
+    """
+    Internet checksum (RFC 1071)
+    """
+    if len(data) % 2:
+        data = data + b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+def ip_packet(src, dst, payload=b"", protocol=0, options=b"", ttl=DEFAULT_TTL):
+    """
+    IPv4 datagram, options are padded to a multiple of 4 bytes,
+    src None lets the kernel fill in the address of the outgoing interface
+    """
+    options = options + b"\0" * (-len(options) % 4)
+    header_length = IPV4_HEADER_SIZE + len(options)
+    header = struct.pack("!BBHHHBBH4s4s", 0x40 | header_length // 4, 0, header_length + len(payload),
+                         0, 0, ttl, protocol, 0,
+                         socket.inet_aton(src or "0.0.0.0"), socket.inet_aton(dst)) + options
+    header = header[:10] + struct.pack("!H", checksum(header)) + header[12:]
+    return header + bytes(payload)
+
+
+def udp_packet(src, dst, packet_size, source_port=0, destination_port=0):
+    """
+    UDP datagram of a packet_size bytes long frame, payload is zeros (mz -T udp -p packet_size-42)
+    """
+    payload_length = max(packet_size - UDP_PACKET_HEADER_SIZE, 0)
+    udp = struct.pack("!HHHH", source_port, destination_port, UDP_HEADER_SIZE + payload_length, 0)
+    return ip_packet(src, dst, udp + bytes(payload_length), protocol=IPPROTO_UDP)
+
+
+def epr_signal_packet(src, dst):
+    """
+    Packet that tells the bridge to generate EPR pairs
+    """
+    option_length = EPR_SIGNAL_SIZE - IPV4_HEADER_SIZE
+    options = bytes([IP_OPTION_NOP] * (option_length - 4) + [EPR_SIGNAL_OPTION, 0, 0, 0])
+    return ip_packet(src, dst, options=options)
+
+
+def burst_packet_count(rate, packet_size):
+    """
+    Packets of a burst that carries rate bits in one second
+    """
+    return int(rate / (8 * packet_size)) if packet_size > 0 else 0
+
+
+def _rounds(rounds):
+    """
+    PRIVATE METHOD: round numbers, forever if rounds is None
+    """
+    return count() if rounds is None else range(rounds)
+
+
+def bernoulli_bursts(packet, packet_count, probability, tick=1.0, rounds=None, spacing=0.0, rng=None):
+    """
+    Every tick, with probability, packet_count packets spacing seconds apart (back to back by default)
+    Ends right away if no packet can be produced (probability or packet_count 0)
+    """
+    if packet_count <= 0 or probability <= 0:
+        return
+    rng = rng or random.Random()
+    for n in _rounds(rounds):
+        if rng.random() < probability:
+            for i in range(packet_count):
+                yield n * tick + i * spacing, packet
+
+
+def on_off(packet, packet_count, period_length, on_length, tick=1.0, rounds=None, spacing=0.0):
+    """
+    Bursts of packet_count packets in ticks n with n % period_length < on_length
+    Ends right away if no packet can be produced (on_length or packet_count 0)
+    """
+    if packet_count <= 0 or on_length <= 0:
+        return
+    for n in _rounds(rounds):
+        if n % period_length < on_length:
+            for i in range(packet_count):
+                yield n * tick + i * spacing, packet
+
+
+def choices(packet, other, probability, interval, rounds=None, rng=None):
+    """
+    Every interval, packet with probability, other otherwise
+    """
+    rng = rng or random.Random()
+    for n in _rounds(rounds):
+        yield n * interval, packet if rng.random() < probability else other
+
+
+def poisson(packet, rate, rng=None):
+    """
+    Packets with exponentially distributed times between them, rate packets per second on average
+    """
+    rng = rng or random.Random()
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate)
+        yield offset, packet
+
+
+def sequence(packets, interval, rounds=None):
+    """
+    Rounds of packets, interval seconds between packets
+    """
+    packets = list(packets)
+    if not packets:
+        return
+    offset = 0.0
+    for _ in _rounds(rounds):
+        for packet in packets:
+            yield offset, packet
+            offset += interval
+
+
+def replay(records, template):
+    """
+    Replays (timestamp, length) records, times are relative to the first record
+    template: length -> packet, called once per distinct length
+    """
+    packets = {}
+    first = None
+    for timestamp, length in records:
+        if first is None:
+            first = timestamp
+        if length not in packets:
+            packets[length] = template(length)
+        yield timestamp - first, packets[length]
+
+
+def read_trace(path):
+    """
+    Reads "timestamp length" lines (e.g. tshark -T fields -e frame.time_epoch -e frame.len)
+    """
+    with open(path) as trace:
+        for line in trace:
+            fields = line.split()
+            if len(fields) >= 2:
+                yield float(fields[0]), int(fields[1])
+
+
+class RawSocketSender:
+    """ RawSocketSender
+    One raw IPv4 socket (IP_HDRINCL) for all packets, destination is taken from the packet
+    """
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+        self._destinations = {}
+
+    def send(self, packet):
+        destination = packet[16:20]
+        address = self._destinations.get(destination)
+        if address is None:
+            address = self._destinations[destination] = (socket.inet_ntoa(destination), 0)
+        self.socket.sendto(packet, address)
+
+    def close(self):
+        self.socket.close()
+
+
+class TrafficReport:
+    """ TrafficReport
+    Packets sent, target and achieved rate (bit/s), lateness of packets (s)
+    """
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.failed = 0
+        self.scheduled_bytes = 0
+        self.scheduled_span = 0.0
+        self.elapsed = 0.0
+        self.lateness_total = 0.0
+        self.lateness_max = 0.0
+
+    @property
+    def target_rate(self):
+        """
+        Bits of scheduled packets over the time they were scheduled in
+        """
+        return self.scheduled_bytes * 8 / self.scheduled_span if self.scheduled_span > 0 else 0.0
+
+    @property
+    def achieved_rate(self):
+        """
+        Bits of sent packets over the time it took to send them
+        """
+        return self.bytes * 8 / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def average_lateness(self):
+        attempts = self.packets + self.failed
+        return self.lateness_total / attempts if attempts else 0.0
+
+    def __str__(self):
+        return (f"{self.packets} packets ({self.failed} failed) in {self.elapsed:.3f}s, "
+                f"rate {self.achieved_rate / 10**6:.4f} of {self.target_rate / 10**6:.4f} mbit/s, "
+                f"lateness avg {self.average_lateness * 10**6:.1f}us max {self.lateness_max * 10**6:.1f}us")
+
+
+class TrafficEngine:
+    """ TrafficEngine
+    -> Sends packets of a pattern when they are due
+    -> Packets that are late are sent right away, the schedule is not shifted
+    -> Send errors (e.g. full socket buffer) are counted, the packet is skipped
+    """
+
+    def __init__(self, sender, clock=time.monotonic, sleep=time.sleep, spin=0.0005):
+        """
+        sender: object with send(packet)
+        spin: the last seconds before a packet is due are busy waited
+        """
+        self.sender = sender
+        self.clock = clock
+        self.sleep = sleep
+        self.spin = spin
+        self.report = TrafficReport()
+
+    def _wait(self, due):
+        """
+        PRIVATE METHOD: called by run, returns once the clock reached due
+        """
+        while True:
+            remaining = due - self.clock()
+            if remaining <= 0:
+                return
+            if remaining > self.spin:
+                self.sleep(remaining - self.spin)
+
+    def run(self, pattern, duration=None, report_interval=None, on_report=None):
+        """
+        Sends packets of pattern, stops when it ends or at duration seconds
+        on_report(report) is called every report_interval seconds
+        Returns TrafficReport, also available as self.report while running
+
+        PUBLIC METHOD
+        """
+        report = self.report = TrafficReport()
+        start = self.clock()
+        next_report = report_interval
+        for offset, packet in pattern:
+            if duration is not None and offset >= duration:
+                break
+            due = start + offset
+            self._wait(due)
+            now = self.clock()
+            try:
+                self.sender.send(packet)
+                report.packets += 1
+                report.bytes += len(packet)
+            except OSError:
+                report.failed += 1
+            lateness = now - due
+            report.lateness_total += lateness
+            if lateness > report.lateness_max:
+                report.lateness_max = lateness
+            report.scheduled_bytes += len(packet)
+            report.scheduled_span = offset
+            report.elapsed = now - start
+            if on_report is not None and next_report is not None and offset >= next_report:
+                on_report(report)
+                next_report = offset + report_interval
+        if duration is not None:
+            self._wait(start + duration)
+            report.scheduled_span = duration
+            report.elapsed = self.clock() - start
+        return report
@@ -16,6 +16,7 @@ from scapy.all import *
 
 from quantum_bridge.threaded_channel.channel import Channel
 from quantum_bridge.simple_bridge import SimpleChannel
+from quantum_bridge.packet_codec import to_bit_array, from_bit_array
 
 
 LOGFILE = "/app/log.txt"
@@ -50,31 +51,6 @@ def log_info(LOGFILE, start_time, end_time, packet, C):
     print(f"Logging the following line \n{line}")
 
 
-
-
-
-def to_bit_array(pkt):
-    """
-    Takes packet netfilterqueue packet and returns list
-    bytes as list of integers representing bits
-    """
-    byte_list = list(raw(pkt))
-    bin_list = [format(x, "#010b") for x in byte_list]
-    bin_list = [x[2:] for x in bin_list]
-    return bin_list
-
-
-def from_bit_array(bin_list):
-    """
-    Takes list of bytes as list of integers representing bits
-    and returns raw bytes that can be used to reconstruct a packet
-    """
-    print(bin_list)
-    byte_list = [hex(int(x,2)) for x in bin_list]
-    result = bytes([int(x,0) for x in byte_list])
-    return result
-
-
 hosts = []
 with open("/app/hosts.txt", "r") as host_file:
     for line in host_file.readlines():
@@ -123,8 +99,9 @@ def packet_processing(pkt):
     with open(LOGFILE, "a") as logfile:
         pkt.drop()
         start = datetime.now()
-        packet = IP(pkt.get_payload())
-        packet_bits = to_bit_array(packet)
+        payload = pkt.get_payload()
+        packet = IP(payload)
+        packet_bits = to_bit_array(payload)
 
         source_address = packet[IP].src
         print(f"Packet received from {source_address}")
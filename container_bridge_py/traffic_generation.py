@@ -1,14 +1,18 @@
 """
 Artificial simple traffic generation script
 Script input variables:
+- destination
+- rounds (-1 forever)
+- EPR signal packets and data packets of a periodic round
 - packet size
-- time between packets
+- type (periodic or random)
+- probability of a data packet in random rounds
+Packets are sent 2 seconds apart by the traffic engine
 """
-from scapy.all import *
-import random
-import time
 import sys
 
+from quantum_bridge.traffic_engine import TrafficEngine, RawSocketSender, ip_packet, epr_signal_packet, sequence, choices
+
 DESTINATION = str(sys.argv[1])
 ROUNDS = int(sys.argv[2])
 EPR_NUM = int(sys.argv[3])
@@ -26,58 +30,22 @@ PROBABILITY = 0.5
 if len(sys.argv) > 7:
     PROBABILITY = float(sys.argv[7])
 
-def generate_packet(packet_size):
-    packet = IP(dst=DESTINATION, src="11.0.0.1")
-    packet_size = packet_size - 48
-    if packet_size < 0:
-        packet_size = 0
-    load = bytearray([0]*packet_size)
+INTERVAL = 2
 
-    packet = packet/Raw(load=load)
-    print(len(packet))
-    return packet
 
-def generate_epr_packet():
-    #\x19 is first unused option
-    packet = IP(dst=DESTINATION, options='\x19')
-    return packet
+def generate_packet(packet_size):
+    return ip_packet("11.0.0.1", DESTINATION, bytes(max(packet_size - 48, 0)))
 
-def generate_traffic_periodic():
-    if ROUNDS == -1:
-        while True:
-            generate_round()
-    else:
-        for r in range(ROUNDS):
-            generate_round()
 
-def generate_traffic_random():
-    if ROUNDS == -1:
-        while True:
-            generate_random_round()
-    else:
-        for r in range(ROUNDS):
-            generate_random_round()
+def generate_epr_packet():
+    return epr_signal_packet(None, DESTINATION)
 
-def generate_random_round():
-    packet = None
-    if random.choices([True, False], [PROBABILITY, 1-PROBABILITY])[0]:
-        packet = generate_packet(PACKET_SIZE)
-    else:
-        packet = generate_epr_packet()
-    send(packet)
-    time.sleep(2)
 
-def generate_round():
-    for i in range(EPR_NUM):
-        packet = generate_epr_packet()
-        send(packet)
-        time.sleep(2)
-    for i in range(PACKET_NUM):
-        packet = generate_packet(PACKET_SIZE)
-        send(packet)
-        time.sleep(2)
 if __name__=="__main__":
+    rounds = None if ROUNDS == -1 else ROUNDS
     if TYPE == "periodic":
-        generate_traffic_periodic()
+        pattern = sequence([generate_epr_packet()] * EPR_NUM + [generate_packet(PACKET_SIZE)] * PACKET_NUM,
+                           INTERVAL, rounds)
     else:
-        generate_traffic_random()
+        pattern = choices(generate_packet(PACKET_SIZE), generate_epr_packet(), PROBABILITY, INTERVAL, rounds)
+    print(TrafficEngine(RawSocketSender()).run(pattern, report_interval=10, on_report=print))
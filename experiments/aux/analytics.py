@@ -0,0 +1,113 @@
+"""
+Vectorized statistics of captured traffic.
+Works on arrays of packet timestamps (seconds) and lengths (bytes), shared by
+the experiment scripts, the network analyzer and the GEWI simulator:
+    -> binned_rates: rate of every segment, empty segments are zero
+    -> deviations: root mean square deviation above and below the average
+    -> active_statistics: average, std and deviations of segments above a threshold
+    -> percentiles, bursts
+
+    rates = binned_rates(timestamps, lengths, segment_duration=0.1)
+    average, std, positive, negative = active_statistics(rates, ea_rate*0.1)
+
+Segments start at the first packet, a packet exactly on a segment boundary
+belongs to the segment it starts (the old loops decided these by the rounding
+of their accumulated segment start).
+"""
+import math
+
+import numpy as np
+
+
+#Divisors turning bit/s into the units of the results
+MBIT = 1000 * 1000
+KIBIT = 1024
+
+
+def segment_indices(timestamps, segment_duration, start=None):
+    """
+    Segment of every packet, segments are segment_duration long and start at start
+    (first timestamp by default)
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    if start is None:
+        start = timestamps[0] if len(timestamps) else 0.0
+    return np.maximum(np.floor((timestamps - start) / segment_duration), 0).astype(np.int64)
+
+
+def binned_rates(timestamps, lengths, segment_duration=0.1, start=None, unit=MBIT, closed_only=True):
+    """
+    Rates (bit/s divided by unit) of segment_duration long segments, segments without
+    packets are zero; timestamps must be sorted.
+    closed_only: leaves out the segment of the last packet, which was still open when
+    the capture ended (what the experiment loops report)
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    if len(timestamps) == 0:
+        return np.zeros(0)
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=float), timestamps.shape)
+    indices = segment_indices(timestamps, segment_duration, start)
+    count = int(indices[-1]) + (0 if closed_only else 1)
+    transmitted = np.bincount(indices, weights=lengths, minlength=count)[:count]
+    return transmitted * 8 / segment_duration / unit
+
+
+def deviations(array):
+    """
+    Root mean square deviation above and below the average,
+    points equal to the average are counted on both sides
+    """
+    array = np.asarray(array, dtype=float)
+    if len(array) == 0:
+        return 0, 0
+    average = np.average(array)
+    positive = np.where(array >= average, array - average, 0)
+    negative = np.where(array <= average, average - array, 0)
+    count = len(array) + np.count_nonzero(array == average)
+    return math.sqrt(np.sum(positive**2)/count), math.sqrt(np.sum(negative**2)/count)
+
+
+def active_statistics(rates, threshold):
+    """
+    Average, standard deviation and deviations of the rates above threshold
+    (average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg of the experiments)
+    """
+    rates = np.asarray(rates, dtype=float)
+    active = rates[rates > threshold]
+    if len(active) == 0:
+        return float("nan"), float("nan"), 0, 0
+    positive, negative = deviations(active)
+    return float(np.average(active)), float(np.std(active)), positive, negative
+
+
+def percentiles(rates, q=(5, 25, 50, 75, 95)):
+    """
+    Returns percentile -> rate, nan for every percentile of an empty array
+    """
+    rates = np.asarray(rates, dtype=float)
+    if len(rates) == 0:
+        return {p: float("nan") for p in q}
+    return dict(zip(q, np.percentile(rates, q).tolist()))
+
+
+def bursts(rates, threshold):
+    """
+    Runs of consecutive segments with a rate above threshold
+    Returns (starts, ends) segment indices, ends are exclusive
+    """
+    active = np.concatenate(([False], np.asarray(rates) > threshold, [False]))
+    edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+    return edges[::2], edges[1::2]
+
+
+def burst_statistics(rates, threshold, segment_duration=0.1):
+    """
+    Number of bursts, their durations (seconds) and average rates
+    """
+    rates = np.asarray(rates, dtype=float)
+    starts, ends = bursts(rates, threshold)
+    if len(starts) == 0:
+        return 0, np.zeros(0), np.zeros(0)
+    cumulative = np.concatenate(([0.0], np.cumsum(rates)))
+    durations = (ends - starts) * segment_duration
+    return len(starts), durations, (cumulative[ends] - cumulative[starts]) / (ends - starts)
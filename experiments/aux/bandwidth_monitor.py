@@ -0,0 +1,227 @@
+"""
+Streaming bandwidth monitor.
+Packets are counted as they arrive, into a ring of segment_len long bins per
+interface; only the last `bins` segments are kept, so memory does not grow
+with the time an interface is watched.
+
+    monitor = BandwidthMonitor(segment_len=0.25, bins=400)
+    monitor.watch("sw2-h2")
+    times, rates = monitor.series("sw2-h2")
+    monitor.stop()
+
+Packets are read from an AF_PACKET socket (root), or fed by any other source
+through RollingRate.add, e.g. the prn callback of scapy's sniff.
+"""
+import socket
+import threading
+import time
+
+import numpy as np
+
+from .analytics import KIBIT
+from .pcap_analysis import ethernet_ip_offset
+
+
+#Linux: receive packets of all protocols
+ETH_P_ALL = 0x0003
+MAX_FRAME_SIZE = 65535
+
+
+class RollingRate:
+    """ RollingRate
+    Bytes of the last `bins` segments in a ring buffer,
+    segments start at origin (first packet by default)
+    """
+
+    def __init__(self, segment_len, bins, origin=None, unit=KIBIT):
+        self.segment_len = segment_len
+        self.bins = int(bins)
+        self.origin = origin
+        self.unit = unit
+        self.transmitted = np.zeros(self.bins)
+        self.first = None
+        self.newest = None
+        self.lock = threading.Lock()
+
+    def _segment(self, timestamp):
+        return int((timestamp - self.origin) // self.segment_len)
+
+    def _advance(self, segment):
+        """
+        PRIVATE METHOD: called with lock held, zeroes bins reused by segments up to segment
+        """
+        if segment - self.newest >= self.bins:
+            self.transmitted[:] = 0
+        else:
+            self.transmitted[np.arange(self.newest + 1, segment + 1) % self.bins] = 0
+        self.newest = segment
+
+    def add(self, timestamp, length):
+        """
+        Counts packet, packets older than the ring are ignored
+
+        PUBLIC METHOD
+        """
+        with self.lock:
+            if self.origin is None:
+                self.origin = timestamp
+            segment = self._segment(timestamp)
+            if self.newest is None:
+                self.first = self.newest = max(segment, 0)
+            elif segment > self.newest:
+                self._advance(segment)
+            if segment < max(self.first, self.newest - self.bins + 1):
+                return
+            self.transmitted[segment % self.bins] += length
+
+    def advance(self, timestamp):
+        """
+        Moves ring to timestamp, segments passed without packets become zeros
+
+        PUBLIC METHOD
+        """
+        with self.lock:
+            if self.origin is None:
+                return
+            segment = self._segment(timestamp)
+            if self.newest is None:
+                self.first = self.newest = max(segment, 0)
+            elif segment > self.newest:
+                self._advance(segment)
+
+    def series(self, closed_only=True):
+        """
+        Returns (segment start times relative to origin, rates) of segments in the ring, oldest first
+        closed_only: leaves out the newest segment, which is still filling up
+        """
+        with self.lock:
+            if self.newest is None:
+                return np.zeros(0), np.zeros(0)
+            last = self.newest - 1 if closed_only else self.newest
+            segments = np.arange(max(self.first, self.newest - self.bins + 1), last + 1)
+            rates = self.transmitted[segments % self.bins] * 8 / self.segment_len / self.unit
+        return segments * self.segment_len, rates
+
+
+class WindowAverage:
+    """ WindowAverage
+    Running average of per window rate series, shorter series are padded with zeros
+    """
+
+    def __init__(self, bins):
+        self.total = np.zeros(int(bins))
+        self.windows = 0
+
+    def add(self, rates):
+        rates = np.asarray(rates, dtype=float)[:len(self.total)]
+        self.total[:len(rates)] += rates
+        self.windows += 1
+
+    def average(self):
+        if self.windows == 0:
+            return np.zeros(len(self.total))
+        return self.total / self.windows
+
+
+class PacketSocket:
+    """ PacketSocket
+    AF_PACKET socket of an interface, iterates over (timestamp, length) of IPv4 packets
+    in both directions until closed
+    """
+
+    def __init__(self, iface, timeout=0.5):
+        self.iface = iface
+        self.socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        self.socket.bind((iface, 0))
+        self.socket.settimeout(timeout)
+        self.closed = False
+
+    def __iter__(self):
+        buffer = bytearray(MAX_FRAME_SIZE)
+        view = memoryview(buffer)
+        try:
+            while not self.closed:
+                try:
+                    length = self.socket.recv_into(buffer)
+                except socket.timeout:
+                    continue
+                if ethernet_ip_offset(view[:length]) is not None:
+                    yield time.time(), length
+        finally:
+            self.socket.close()
+
+    def close(self):
+        """
+        Reading stops within the socket timeout
+        """
+        self.closed = True
+
+
+class BandwidthMonitor:
+    """ BandwidthMonitor
+    -> RollingRate of every watched interface, starting when watching starts
+    -> One reader thread per interface
+    """
+
+    def __init__(self, segment_len=0.25, bins=400, unit=KIBIT):
+        self.segment_len = segment_len
+        self.bins = bins
+        self.unit = unit
+        self.rates = {}
+        self._sockets = {}
+        self._threads = {}
+
+    def rate(self, iface):
+        """
+        RollingRate of iface, created on first use (can be fed by other packet sources)
+
+        PUBLIC METHOD
+        """
+        if iface not in self.rates:
+            self.rates[iface] = RollingRate(self.segment_len, self.bins, origin=time.time(), unit=self.unit)
+        return self.rates[iface]
+
+    def watch(self, iface):
+        """
+        Starts counting packets of iface in a reader thread
+
+        PUBLIC METHOD
+        """
+        if iface in self._threads:
+            return
+        rate = self.rate(iface)
+        packets = PacketSocket(iface)
+        self._sockets[iface] = packets
+        thread = threading.Thread(target=self._read, args=(packets, rate), daemon=True)
+        self._threads[iface] = thread
+        thread.start()
+
+    def _read(self, packets, rate):
+        """
+        PRIVATE METHOD: called by watch, reader thread
+        """
+        for timestamp, length in packets:
+            rate.add(timestamp, length)
+
+    def series(self, iface, closed_only=True):
+        """
+        Returns (times, rates) of iface up to now
+
+        PUBLIC METHOD
+        """
+        rate = self.rate(iface)
+        rate.advance(time.time())
+        return rate.series(closed_only)
+
+    def stop(self):
+        """
+        Closes sockets and waits for reader threads
+
+        PUBLIC METHOD
+        """
+        for packets in self._sockets.values():
+            packets.close()
+        for thread in self._threads.values():
+            thread.join()
+        self._sockets = {}
+        self._threads = {}
@@ -0,0 +1,128 @@
+"""
+Decoder of the packet trace of the C bridge (container_bridge_c/trace.h).
+The bridge keeps the last records in memory and writes them on SIGUSR1 and exit:
+    ./bridge -t /logs/trace.bin ...    (kill -USR1 <pid> for a dump while running)
+
+    trace = read_trace("trace.bin")
+    trace.records["delay"], trace.wall_times("arrival"), trace.queueing_delays()
+
+Run from experiments:
+    python -m aux.bridge_trace trace.bin trace.csv
+"""
+from collections import namedtuple
+import csv
+import struct
+import sys
+
+import numpy as np
+
+
+MAGIC = b"QNETTRCE"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = "<8sIIQQQQQ"
+
+#enum transmission_mode
+MODE_NAMES = ["sequential", "mixed", "superdense"]
+
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("arrival", "<u8"),
+    ("departure", "<u8"),
+    ("delay", "<u8"),
+    ("length", "<u4"),
+    ("epr_before", "<u4"),
+    ("epr_after", "<u4"),
+    ("mode", "u1"),
+    ("link", "u1"),
+    ("reserved", "<u2"),
+])
+
+TraceHeader = namedtuple("TraceHeader", ["version", "record_size", "count", "total", "capacity",
+                                         "monotonic", "realtime"])
+
+
+class TraceFormatException(Exception):
+    pass
+
+
+class BridgeTrace:
+    """ BridgeTrace
+    Header and records (RECORD_DTYPE array, oldest first) of a trace dump,
+    times are CLOCK_MONOTONIC ns of the bridge
+    """
+
+    def __init__(self, header, records):
+        self.header = header
+        self.records = records
+
+    @property
+    def lost(self):
+        """
+        Records overwritten in the ring before the dump
+        """
+        return self.header.total - self.header.count
+
+    def wall_times(self, field="arrival"):
+        """
+        Unix times (s) of a time field, from the clocks sampled at the dump
+        """
+        offset = self.header.realtime - self.header.monotonic
+        return (self.records[field].astype(np.int64) + offset) / 10**9
+
+    def queueing_delays(self):
+        """
+        ns packets waited for the link before their transmission started
+        """
+        return (self.records["departure"] - self.records["arrival"] - self.records["delay"]).astype(np.int64)
+
+    def mode_counts(self):
+        """
+        Number of packets per transmission mode name
+        """
+        counts = np.bincount(self.records["mode"], minlength=len(MODE_NAMES))
+        return dict(zip(MODE_NAMES, counts.tolist()))
+
+
+def read_trace(path):
+    """
+    Reads a trace dump, returns BridgeTrace
+    """
+    with open(path, "rb") as trace_file:
+        data = trace_file.read()
+    if len(data) < HEADER_SIZE:
+        raise TraceFormatException(f"{path} is too short for a trace header")
+    magic, *fields = struct.unpack_from(HEADER_FORMAT, data)
+    header = TraceHeader(*fields)
+    if magic != MAGIC or header.version != VERSION:
+        raise TraceFormatException(f"{path} is not a version {VERSION} bridge trace")
+    if header.record_size != RECORD_DTYPE.itemsize:
+        raise TraceFormatException(f"record size {header.record_size} != {RECORD_DTYPE.itemsize}")
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=header.count, offset=HEADER_SIZE)
+    return BridgeTrace(header, records)
+
+
+def export_csv(trace, dest):
+    """
+    Writes records as comma separated values, times relative to the first arrival in seconds
+    """
+    records = trace.records
+    start = int(records["arrival"][0]) if len(records) else 0
+    with open(dest, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["seq", "link", "arrival", "departure", "delay", "length",
+                         "epr_before", "epr_after", "mode"])
+        for record in records.tolist():
+            seq, arrival, departure, delay, length, epr_before, epr_after, mode, link, _ = record
+            writer.writerow([seq, link, (arrival - start) / 10**9, (departure - start) / 10**9, delay / 10**9,
+                             length, epr_before, epr_after, MODE_NAMES[mode]])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    trace = read_trace(sys.argv[1])
+    print(f"{trace.header.count} records, {trace.lost} overwritten, modes {trace.mode_counts()}")
+    if len(sys.argv) > 2:
+        export_csv(trace, sys.argv[2])
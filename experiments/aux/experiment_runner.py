@@ -0,0 +1,259 @@
+"""
+Parallel experiment runner with a resumable result store.
+Every setting of a parameter grid is a job, jobs run in a process pool
+and each worker process gets its own slot, slot determines container,
+interface and controller port names so jobs can run side by side.
+Results are kept in SQLite, keyed by experiment name and parameters;
+finished jobs are skipped when the sweep is started again.
+
+    runner = ExperimentRunner("c_bridge", run_job, "results.sqlite", workers=4)
+    runner.run(parameter_grid(packet_generation_probability=[0.1, 0.2], epr_buffer_size=[0.1, 1]))
+    runner.store.export_csv("c_bridge", "c_bridge.csv")
+
+run_job(names, **params) is called in a worker process and returns result row.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+import csv
+import json
+import multiprocessing
+import os
+import sqlite3
+import string
+import time
+import traceback
+
+
+#Linux interface names are at most 15 characters
+MAX_INTERFACE_NAME = 15
+TOKEN_CHARACTERS = string.ascii_lowercase + string.digits
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def parameter_grid(**axes):
+    """
+    parameter_grid(a=[1, 2], b=[3]) -> [{"a": 1, "b": 3}, {"a": 2, "b": 3}]
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in product(*axes.values())]
+
+
+def job_key(params):
+    """
+    Canonical key of a parameter set
+    """
+    return json.dumps(params, sort_keys=True)
+
+
+class JobNames:
+    """ JobNames
+    Unique names of one job slot, slot None gives the names experiments used so far
+    """
+
+    def __init__(self, slot=None, controller_port=6633):
+        self.slot = slot
+        self.token = "" if slot is None else self._token(slot)
+        self.controller_port = controller_port if slot is None else controller_port + slot
+
+    @staticmethod
+    def _token(slot):
+        """
+        Short token, 0 -> "a", 35 -> "9", 36 -> "aa"
+        """
+        token = ""
+        while True:
+            token = TOKEN_CHARACTERS[slot % len(TOKEN_CHARACTERS)] + token
+            slot = slot // len(TOKEN_CHARACTERS) - 1
+            if slot < 0:
+                return token
+
+    def node(self, name):
+        """
+        Name of a host, switch or controller
+        """
+        return name + self.token
+
+    def bridge_prefix(self):
+        """
+        Prefix of Qontainernet bridges (name_prefix)
+        """
+        return self.token
+
+    def bridge(self, counter=0, name="bridge"):
+        return self.token + name + str(counter)
+
+    def interface(self, node_1, node_2):
+        """
+        Interface of node_1 towards node_2, both are names given by this object
+        """
+        name = f"{node_1}-{node_2}"
+        if len(name) > MAX_INTERFACE_NAME:
+            raise ValueError(f"Interface name {name} is longer than {MAX_INTERFACE_NAME} characters")
+        return name
+
+    def path(self, file_name):
+        """
+        Per slot file name, "c_traffic_in.pcap" -> "c_traffic_in_a.pcap"
+        """
+        if not self.token:
+            return file_name
+        root, extension = os.path.splitext(file_name)
+        return f"{root}_{self.token}{extension}"
+
+    def log_dir(self):
+        return self.path("./tmp")
+
+    def kill_containers(self, *names):
+        """
+        Kills containers left over by a previous job of this slot
+        """
+        for name in names:
+            os.system(f"docker kill $(docker ps -a -q --filter=name='mn.{self.node(name)}$') 2>/dev/null")
+
+
+class ResultStore:
+    """ ResultStore
+    SQLite table of job results: experiment, key -> params, result, status
+    Only the process running the pool writes to it
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "experiment TEXT NOT NULL, key TEXT NOT NULL, params TEXT NOT NULL, "
+            "result TEXT, status TEXT NOT NULL, error TEXT, "
+            "started REAL, finished REAL, "
+            "PRIMARY KEY (experiment, key))")
+        self.connection.commit()
+
+    def done_keys(self, experiment):
+        rows = self.connection.execute(
+            "SELECT key FROM results WHERE experiment = ? AND status = ?", (experiment, DONE))
+        return {row[0] for row in rows}
+
+    def mark_started(self, experiment, params):
+        self.connection.execute(
+            "INSERT INTO results (experiment, key, params, status, started) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (experiment, key) DO UPDATE SET status = excluded.status, started = excluded.started",
+            (experiment, job_key(params), json.dumps(params), PENDING, time.time()))
+        self.connection.commit()
+
+    def save(self, experiment, params, result=None, error=None):
+        self.connection.execute(
+            "UPDATE results SET result = ?, status = ?, error = ?, finished = ? WHERE experiment = ? AND key = ?",
+            (None if result is None else json.dumps(result, default=float), FAILED if error is not None else DONE,
+             error, time.time(), experiment, job_key(params)))
+        self.connection.commit()
+
+    def results(self, experiment, status=DONE):
+        """
+        Returns (params, result) of jobs with status
+        """
+        rows = self.connection.execute(
+            "SELECT params, result FROM results WHERE experiment = ? AND status = ? ORDER BY started",
+            (experiment, status))
+        return [(json.loads(params), json.loads(result) if result is not None else None) for params, result in rows]
+
+    def export_csv(self, experiment, path, delimiter="|"):
+        """
+        Writes result rows of finished jobs the way experiments wrote them
+        """
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file, delimiter=delimiter)
+            for _, result in self.results(experiment):
+                writer.writerow(result)
+
+    def close(self):
+        self.connection.close()
+
+
+_SLOT = None
+
+
+def _init_worker(slots):
+    """
+    PRIVATE METHOD: worker process takes a slot for its lifetime
+    """
+    global _SLOT
+    _SLOT = slots.get()
+
+
+def _run_job(function, params):
+    """
+    PRIVATE METHOD: runs job in worker process
+    """
+    try:
+        return function(JobNames(_SLOT), **params), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+class ExperimentRunner:
+    """ ExperimentRunner
+    -> Runs function for every parameter set that is not in the store yet
+    -> Jobs run in workers processes, results are saved as they finish
+    """
+
+    def __init__(self, experiment, function, store_path, workers=None):
+        """
+        experiment: name results are stored under
+        function: module level function(names, **params), must be picklable
+        workers: number of jobs running at the same time, all cores by default
+        """
+        self.experiment = experiment
+        self.function = function
+        self.store = ResultStore(store_path)
+        self.workers = workers or os.cpu_count()
+
+    def pending(self, grid):
+        """
+        Parameter sets without result, duplicates removed
+
+        PUBLIC METHOD
+        """
+        done = self.store.done_keys(self.experiment)
+        pending = {}
+        for params in grid:
+            key = job_key(params)
+            if key not in done:
+                pending.setdefault(key, params)
+        return list(pending.values())
+
+    def run(self, grid):
+        """
+        Runs pending jobs of the grid, returns number of failed jobs
+
+        PUBLIC METHOD
+        """
+        jobs = self.pending(grid)
+        total = len({job_key(params) for params in grid})
+        print(f"{self.experiment}: {total - len(jobs)} of {total} jobs done, running {len(jobs)}")
+        if not jobs:
+            return 0
+        manager = multiprocessing.Manager()
+        slots = manager.Queue()
+        workers = min(self.workers, len(jobs))
+        for slot in range(workers):
+            slots.put(slot)
+        failed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(slots,)) as executor:
+            futures = {}
+            for params in jobs:
+                self.store.mark_started(self.experiment, params)
+                futures[executor.submit(_run_job, self.function, params)] = params
+            for future in as_completed(futures):
+                params = futures[future]
+                result, error = future.result()
+                self.store.save(self.experiment, params, result, error)
+                if error is not None:
+                    failed += 1
+                    print(f"{self.experiment}: job {job_key(params)} failed\n{error}")
+                else:
+                    print(f"{self.experiment}: {job_key(params)} -> {result}")
+        manager.shutdown()
+        return failed
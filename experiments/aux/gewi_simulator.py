@@ -0,0 +1,272 @@
+"""
+Discrete-event simulation of the GEWI link of the C bridge (container_bridge_c/bridge.c).
+Same model as the bridge, but simulated instead of slept through:
+    -> traffic generator sends a burst every second (random or periodic traffic)
+    -> ingress interface smooths it with htb at ea_rate and a bfifo (quantum_interface)
+    -> bridge queue holds classical_buffer_size packets, packets are dropped when it's full
+    -> packets are transmitted one by one, EPR pairs in the buffer speed up transmission
+       (superdense: 4 units/byte, sequential: 8 units/byte, mixed when buffer runs out)
+    -> EPR generator adds a frame every sleep_time, but only while the bridge is idle
+
+Time between packets is skipped, EPR frames generated during an idle period are
+counted at once, so simulated time is limited only by the number of packets.
+
+Usage (from experiments):
+    python -m aux.gewi_simulator random 0.5
+    python -m aux.gewi_simulator periodic 5 10
+"""
+from collections import deque
+import math
+import sys
+import time
+
+import numpy as np
+
+from .analytics import binned_rates, active_statistics
+
+SUPERDENSE = "superdense"
+SEQUENTIAL = "sequential"
+MIXED = "mixed"
+
+UDP_PACKET_HEADER_SIZE = 42
+
+
+class GewiLink:
+    """ GewiLink
+    State of the bridge: EPR buffer and classical queue
+    Parameters are in the units of bridge.c arguments
+    """
+
+    def __init__(self, epr_frame_size, epr_buffer_size, sleep_time,
+                 single_transmission_duration, classical_buffer_size):
+        """
+        epr_frame_size, epr_buffer_size: qubytes
+        sleep_time: ns between EPR frames
+        single_transmission_duration: ns per transmission of one (qu)bit
+        classical_buffer_size: packets
+        """
+        self.epr_frame_size = int(epr_frame_size)
+        self.epr_buffer_size = int(epr_buffer_size)
+        self.sleep_time = sleep_time * 1e-9
+        self.single_transmission_duration = int(single_transmission_duration) * 1e-9
+        self.classical_buffer_size = int(classical_buffer_size)
+        self.epr_buffer = 0
+        self.transmissions = {SUPERDENSE: 0, SEQUENTIAL: 0, MIXED: 0}
+
+    @classmethod
+    def from_experiment(cls, epr_buffer_size=0.1, sleep_time=10000000, ea_rate=0.2, nea_rate=0.1,
+                        packet_size=500, classical_buffer_size=1):
+        """
+        Link parameters derived the way c_bridge_link_test.test_topo derives them
+        epr_buffer_size: mbit
+        classical_buffer_size: seconds of traffic at ea_rate
+        """
+        return cls(
+            epr_frame_size=int(nea_rate * sleep_time * 10**(-9) * 10**6 / 8),
+            epr_buffer_size=int((epr_buffer_size * 10**6) / 8),
+            sleep_time=sleep_time,
+            single_transmission_duration=1 / (nea_rate * 1000000) * 1000000000,
+            classical_buffer_size=classical_buffer_size * int(ea_rate * (10**6) / (8 * packet_size)),
+        )
+
+    def ticks_before(self, t):
+        """
+        Number of EPR frames generated before time t (first one at sleep_time)
+        """
+        return max(0, math.ceil(t / self.sleep_time) - 1)
+
+    def generate(self, idle_from, idle_to):
+        """
+        Adds EPR frames generated while the bridge was idle
+        """
+        frames = self.ticks_before(idle_to) - self.ticks_before(idle_from)
+        if frames > 0:
+            self.epr_buffer = min(self.epr_buffer_size, self.epr_buffer + frames * self.epr_frame_size)
+
+    def transmission_delay(self, length):
+        """
+        Time to transmit packet of length bytes, consumes EPR buffer (bridge.c transmission_delay)
+        """
+        if length < 2 * self.epr_buffer:
+            delay = length * 4
+            self.epr_buffer -= length // 2
+            self.transmissions[SUPERDENSE] += 1
+        elif self.epr_buffer == 0:
+            delay = length * 8
+            self.transmissions[SEQUENTIAL] += 1
+        else:
+            delay = self.epr_buffer * 4 + (length - 2 * self.epr_buffer) * 8
+            self.epr_buffer = 0
+            self.transmissions[MIXED] += 1
+        return delay * self.single_transmission_duration
+
+    def run(self, arrivals, length):
+        """
+        Passes packets arriving at times (sorted) through the link
+        Returns departure times, nan for dropped packets
+        """
+        departures = np.full(len(arrivals), np.nan)
+        in_system = deque()
+        busy_until = 0.0
+        for i, t in enumerate(arrivals.tolist()):
+            while in_system and in_system[0] <= t:
+                in_system.popleft()
+            if len(in_system) >= self.classical_buffer_size:
+                continue
+            start = t if t > busy_until else busy_until
+            if start > busy_until:
+                self.generate(busy_until, start)
+            busy_until = start + self.transmission_delay(length)
+            in_system.append(busy_until)
+            departures[i] = busy_until
+        return departures
+
+
+def random_traffic(probability, duration, rng):
+    """
+    Seconds with a burst, lt_traffic_generation.py
+    """
+    return np.flatnonzero(rng.random(int(math.ceil(duration))) < probability).astype(float)
+
+
+def periodic_traffic(period_length, generation_period_length, duration):
+    """
+    Seconds with a burst, periodic_traffic_generation.py
+    """
+    seconds = np.arange(int(math.ceil(duration)))
+    return seconds[(seconds % period_length) < generation_period_length].astype(float)
+
+
+def burst_packet_count(ea_rate, packet_size, traffic="random"):
+    """
+    Packets sent by mz in one burst
+    """
+    rate_if_trans = int(ea_rate * 1024 * 1024) if traffic == "random" else int(ea_rate * 1000 * 1000)
+    return int(rate_if_trans / (8 * packet_size))
+
+
+def shape(burst_times, packet_count, packet_size, rate, buffer_size):
+    """
+    Ingress htb (rate mbit/s, no burst) with bfifo of buffer_size bytes,
+    every burst of packet_count packets arrives at once.
+    Returns times packets leave the interface
+    """
+    transmission_time = packet_size * 8 / (rate * 10**6)
+    capacity = int(buffer_size // packet_size)
+    out = []
+    waiting = deque()
+    busy_until = 0.0
+    for t in burst_times.tolist():
+        for _ in range(packet_count):
+            while waiting and waiting[0] <= t:
+                waiting.popleft()
+            if len(waiting) >= capacity:
+                continue
+            start = t if t > busy_until else busy_until
+            busy_until = start + transmission_time
+            waiting.append(start)
+            out.append(busy_until)
+    return np.array(out)
+
+
+def simulate(packet_generation_probability=0.4,
+             period_length=100,
+             generation_period_length=50,
+             epr_buffer_size=0.1,
+             sleep_time=10000000,
+             ea_rate=0.2,
+             nea_rate=0.1,
+             packet_size=500,
+             classical_buffer_size=1,
+             test_length=100,
+             traffic="random",
+             seed=None):
+    """
+    Simulates one test_topo run, returns dict with packet times and counters
+    """
+    if packet_size < UDP_PACKET_HEADER_SIZE:
+        packet_size = 0
+    rng = np.random.default_rng(seed)
+    if traffic == "random":
+        burst_times = random_traffic(packet_generation_probability, test_length, rng)
+    else:
+        burst_times = periodic_traffic(period_length, generation_period_length, test_length)
+
+    arrivals = shape(burst_times, burst_packet_count(ea_rate, packet_size, traffic), packet_size,
+                     ea_rate, int((ea_rate * 1000 * 1000) / 8))
+    link = GewiLink.from_experiment(epr_buffer_size=epr_buffer_size, sleep_time=sleep_time,
+                                    ea_rate=ea_rate, nea_rate=nea_rate, packet_size=packet_size,
+                                    classical_buffer_size=classical_buffer_size)
+    departures = link.run(arrivals, packet_size)
+    captured_in = arrivals[arrivals < test_length]
+    captured_out = np.sort(departures[departures < test_length])
+    return {
+        "in": captured_in,
+        "out": captured_out,
+        "dropped": int(np.count_nonzero(np.isnan(departures))),
+        "transmissions": dict(link.transmissions),
+        "packet_size": packet_size,
+    }
+
+
+def test_topo(packet_generation_probability=0.4,
+              period_length=100,
+              generation_period_length=50,
+              epr_buffer_size=0.1,
+              epr_generation_rate=0.1,
+              sleep_time=10000000,
+              ea_rate=0.2,
+              nea_rate=0.1,
+              packet_size=500,
+              classical_buffer_size=1,
+              test_length=100,
+              traffic="random",
+              seed=None):
+    """
+    Simulated counterpart of c_bridge_link_test.test_topo, returns the same row
+    (epr_generation_rate is unused there as well, EPR frames follow nea_rate)
+    """
+    result = simulate(packet_generation_probability, period_length, generation_period_length,
+                      epr_buffer_size, sleep_time, ea_rate, nea_rate, packet_size,
+                      classical_buffer_size, test_length, traffic, seed)
+    packet_size = result["packet_size"]
+    in_count = len(result["in"])
+    out_count = len(result["out"])
+    transmission_rates = binned_rates(result["out"], packet_size)
+
+    try:
+        throughput = out_count/in_count
+    except ZeroDivisionError:
+        throughput = 1
+    if throughput > 1:
+        throughput = 1
+
+    rejection_rate = 1-throughput
+    average_transmission_rate = (out_count*packet_size*8/test_length)/10**6 # mbps
+    average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg = active_statistics(
+        transmission_rates, ea_rate*0.1)
+
+    if traffic == "random":
+        return (packet_generation_probability, throughput, rejection_rate,
+                average_transmission_rate, average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg)
+    return (generation_period_length, period_length, throughput, rejection_rate,
+            average_transmission_rate, average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("random", "periodic"):
+        print(__doc__)
+        sys.exit(1)
+    simulation_duration = 10000
+    wall_start = time.perf_counter()
+    if sys.argv[1] == "random":
+        row = test_topo(packet_generation_probability=float(sys.argv[2]), epr_buffer_size=0.5,
+                        ea_rate=0.1, nea_rate=0.05, packet_size=100, classical_buffer_size=1,
+                        test_length=simulation_duration, traffic="random", seed=0)
+    else:
+        row = test_topo(generation_period_length=float(sys.argv[2]), period_length=float(sys.argv[3]),
+                        epr_buffer_size=0.5, ea_rate=0.1, nea_rate=0.05, packet_size=100,
+                        classical_buffer_size=1, test_length=simulation_duration, traffic="periodic")
+    wall_time = time.perf_counter() - wall_start
+    print("|".join(str(x) for x in row))
+    print(f"{simulation_duration}s simulated in {wall_time:.2f}s")
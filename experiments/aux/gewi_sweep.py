@@ -0,0 +1,204 @@
+"""
+Vectorized Monte-Carlo sweep over GEWI link parameters.
+Fluid version of the model simulated by aux.gewi_simulator: time advances in
+segment_duration steps and every step updates the whole parameter grid
+(probabilities x EPR buffer sizes x classical buffer sizes x ea rates x nea rates x seeds)
+as one NumPy array, so a grid is evaluated in seconds instead of one container run per setting.
+
+    result = sweep(probabilities=np.linspace(0.1, 1, 10), epr_buffer_sizes=[0.1, 0.5, 1],
+                   classical_buffer_sizes=[0.1, 1, 2], ea_rates=[0.1], nea_rates=[0.05], seeds=200)
+    result.save_csv("sweep.csv")
+
+Usage (from experiments):
+    python -m aux.gewi_sweep
+"""
+from statistics import NormalDist
+import csv
+import time
+
+import numpy as np
+
+from .gewi_simulator import burst_packet_count
+
+
+AXES = ["probability", "epr_buffer_size", "classical_buffer_size", "ea_rate", "nea_rate"]
+METRICS = ["throughput", "rejection_rate", "average_transmission_rate", "average_active_transmission_rate"]
+
+
+class SweepResult:
+    """ SweepResult
+    -> axes: axis name -> values
+    -> mean, low, high: metric -> array over the axes, low/high are the confidence interval
+    """
+
+    def __init__(self, axes, samples, confidence):
+        self.axes = axes
+        self.confidence = confidence
+        self.samples = samples
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.mean = {}
+        self.low = {}
+        self.high = {}
+        for metric, values in samples.items():
+            count = np.count_nonzero(~np.isnan(values), axis=-1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = _nanmean(values, count)
+                half_width = z * _nanstd(values, mean, count) / np.sqrt(count)
+            self.mean[metric] = mean
+            self.low[metric] = mean - half_width
+            self.high[metric] = mean + half_width
+
+    def rows(self):
+        """
+        Yields one row per grid point: axis values, then mean/low/high of every metric
+        """
+        for index in np.ndindex(*[len(values) for values in self.axes.values()]):
+            row = [values[i] for values, i in zip(self.axes.values(), index)]
+            for metric in METRICS:
+                row.extend([self.mean[metric][index], self.low[metric][index], self.high[metric][index]])
+            yield row
+
+    def header(self):
+        header = list(self.axes)
+        for metric in METRICS:
+            header.extend([metric, f"{metric}_low", f"{metric}_high"])
+        return header
+
+    def save_csv(self, path, delimiter="|"):
+        """
+        Writes rows, | delimited like the experiment results
+        """
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file, delimiter=delimiter)
+            writer.writerow(self.header())
+            writer.writerows(self.rows())
+
+    def best(self, metric="throughput"):
+        """
+        Returns axis values of the grid point with the highest mean of metric
+        """
+        index = np.unravel_index(np.nanargmax(self.mean[metric]), self.mean[metric].shape)
+        return {name: values[i] for (name, values), i in zip(self.axes.items(), index)}
+
+
+def _nanmean(values, count):
+    return np.where(count > 0, np.nansum(values, axis=-1) / np.maximum(count, 1), np.nan)
+
+
+def _nanstd(values, mean, count):
+    squared = np.nansum((values - mean[..., None]) ** 2, axis=-1)
+    return np.sqrt(np.where(count > 1, squared / np.maximum(count - 1, 1), np.nan))
+
+
+def sweep(probabilities=(0.5,),
+          epr_buffer_sizes=(0.1,),
+          classical_buffer_sizes=(1,),
+          ea_rates=(0.2,),
+          nea_rates=(0.1,),
+          seeds=100,
+          packet_size=500,
+          sleep_time=10000000,
+          test_length=100,
+          segment_duration=0.1,
+          traffic="random",
+          period_length=10,
+          confidence=0.95,
+          seed=None):
+    """
+    Evaluates the whole parameter grid, units are the ones of c_bridge_link_test.test_topo:
+        epr_buffer_sizes: mbit
+        classical_buffer_sizes: seconds of traffic at ea rate
+        ea_rates, nea_rates: mbit/s
+    traffic == "periodic": probabilities are generation period lengths in a period of period_length seconds
+    Returns SweepResult
+    """
+    axes = {
+        "probability": np.asarray(probabilities, dtype=float),
+        "epr_buffer_size": np.asarray(epr_buffer_sizes, dtype=float),
+        "classical_buffer_size": np.asarray(classical_buffer_sizes, dtype=float),
+        "ea_rate": np.asarray(ea_rates, dtype=float),
+        "nea_rate": np.asarray(nea_rates, dtype=float),
+    }
+    shape = tuple(len(values) for values in axes.values()) + (seeds,)
+    grid = np.meshgrid(*axes.values(), indexing="ij")
+    probability, epr_buffer, classical_buffer, ea_rate, nea_rate = [g[..., None] for g in grid]
+    rng = np.random.default_rng(seed)
+
+    #Link parameters in bits and seconds, derived like GewiLink.from_experiment
+    burst_bits = np.vectorize(lambda rate: burst_packet_count(rate, packet_size, traffic))(ea_rate) * packet_size * 8
+    shaper_limit = np.floor(ea_rate * 10**6 / 8) * 8
+    shaper_rate = ea_rate * 10**6
+    bridge_limit = classical_buffer * np.floor(ea_rate * 10**6 / (8 * packet_size)) * packet_size * 8
+    epr_limit = np.floor(epr_buffer * 10**6 / 8) * 8
+    epr_generation_rate = np.floor(nea_rate * sleep_time * 10**(-3) / 8) * 8 / (sleep_time * 10**(-9))
+    sequential_rate = nea_rate * 10**6
+
+    shaper_queue = np.zeros(shape)
+    bridge_queue = np.zeros(shape)
+    epr = np.zeros(shape)
+    in_bits = np.zeros(shape)
+    out_bits = np.zeros(shape)
+    active_sum = np.zeros(shape)
+    active_count = np.zeros(shape)
+    active_threshold = ea_rate * 0.1
+
+    steps_per_second = int(round(1 / segment_duration))
+    for step in range(int(round(test_length / segment_duration))):
+        if step % steps_per_second == 0:
+            second = step // steps_per_second
+            if traffic == "random":
+                burst = rng.random(shape) < probability
+            else:
+                burst = np.broadcast_to((second % period_length) < probability, shape)
+            shaper_queue = np.minimum(shaper_queue + burst * burst_bits, shaper_limit)
+
+        #Ingress interface drains at ea rate into the bridge
+        inflow = np.minimum(shaper_queue, shaper_rate * segment_duration)
+        shaper_queue -= inflow
+        in_bits += inflow
+        waiting = bridge_queue + inflow
+
+        #Superdense coding while EPR pairs last, sequential transmission afterwards
+        superdense = np.minimum(np.minimum(waiting, 2 * sequential_rate * segment_duration), 2 * epr)
+        busy = superdense / (2 * sequential_rate)
+        sequential = np.minimum(waiting - superdense, sequential_rate * (segment_duration - busy))
+        busy += sequential / sequential_rate
+        epr = np.minimum(epr - superdense / 2 + epr_generation_rate * (segment_duration - busy), epr_limit)
+        transmitted = superdense + sequential
+
+        #Classical buffer overflows are dropped
+        bridge_queue = np.minimum(waiting - transmitted, bridge_limit)
+        out_bits += transmitted
+        rate = transmitted / segment_duration / 10**6
+        active = rate > active_threshold
+        active_sum += np.where(active, rate, 0)
+        active_count += active
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        throughput = np.where(in_bits > 0, np.minimum(out_bits / in_bits, 1), 1)
+        samples = {
+            "throughput": throughput,
+            "rejection_rate": 1 - throughput,
+            "average_transmission_rate": out_bits / test_length / 10**6,
+            "average_active_transmission_rate": np.where(active_count > 0, active_sum / active_count, np.nan),
+        }
+    return SweepResult(axes, samples, confidence)
+
+
+if __name__ == "__main__":
+    wall_start = time.perf_counter()
+    result = sweep(probabilities=np.linspace(0.1, 1, 10),
+                   epr_buffer_sizes=[0.1, 0.5, 1],
+                   classical_buffer_sizes=[0.1, 1, 2, 5],
+                   ea_rates=[0.1],
+                   nea_rates=[0.05],
+                   packet_size=100,
+                   test_length=101,
+                   seeds=200,
+                   seed=0)
+    wall_time = time.perf_counter() - wall_start
+    print("|".join(result.header()))
+    for row in result.rows():
+        print("|".join(f"{x:.4f}" for x in row))
+    print(f"Best throughput: {result.best()}")
+    print(f"{result.mean['throughput'].size} settings x 200 seeds in {wall_time:.2f}s")
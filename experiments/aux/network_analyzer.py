@@ -3,53 +3,41 @@ import matplotlib.pyplot as plt
 from binascii import hexlify
 from threading import Thread
 from datetime import datetime
+from collections import deque
+import sys
 import time
 
+import numpy as np
+
+from .bandwidth_monitor import BandwidthMonitor, RollingRate, WindowAverage
+
 
 class Network_Analyzer:
-    def __init__(self, time, segment_len):
+    def __init__(self, time, segment_len, kept_windows=10):
         self.time = time
         self.segment_len = segment_len
-        self.bws = []
-        self.ts  = [0]
+        self.bins = int(time/segment_len)
+        #Only the last windows are drawn, the average covers all of them
+        self.bws = deque(maxlen=kept_windows)
+        self.average = WindowAverage(self.bins)
+        self.ts = (np.arange(self.bins) * self.segment_len).tolist()
         self.capture_thread= None
-        for i in range(0,int(time/self.segment_len)-1):
-            if len(self.ts) == 0:
-                continue
-            self.ts.append(self.ts[-1] + self.segment_len)
 
     def capture(self, iface):
-        bw = []
+        """
+        Captures one window, packets are counted as they are sniffed and not kept
+        """
         print(f"Capturing traffic for {self.time}s")
-        f_time = datetime.now().timestamp()
-        packets = sniff(iface=iface, timeout=self.time)
-        f_time = 0 ## Timestamp of first packet
-        current_segment = 1
-        segment_load = 0
-        for packet in packets:
-            if f_time == 0:
-                f_time = packet.time
-            try:
-                packet[IP].src
-            except:
-                continue
-
-            if packet.time > f_time + current_segment*self.segment_len:
-                #New segment
-                segment_bw = ((segment_load*8)/self.segment_len)/1024
-                bw.append(segment_bw)
-                segment_load = 0
-                current_segment = current_segment + 1
-
-                #Calculate pauses if no packet was transmitted
-                if (packet.time - (f_time+current_segment*self.segment_len)) > (2* self.segment_len):
-                    pause =int((packet.time - f_time-current_segment*self.segment_len)/self.segment_len)
-                    print(pause)
-                    for i in range(pause):
-                        current_segment = current_segment + 1
-                        bw.append(0)
-            segment_load = segment_load + len(packet)
+        rate = RollingRate(self.segment_len, self.bins + 1)
+
+        def count(packet):
+            if IP in packet:
+                rate.add(float(packet.time), len(packet))
+
+        sniff(iface=iface, timeout=self.time, prn=count, store=False)
+        bw = rate.series()[1][:self.bins]
         self.bws.append(bw)
+        self.average.add(bw)
 
     def run_capture_thread(self, ifce):
         print("Running a capture thread")
@@ -59,35 +47,13 @@ class Network_Analyzer:
 
     def join_capture_thread(self):
         self.capture_thread.join()
-        #print(self.bws[0])
-        #print(self.ts)
-        print(f"{len(self.bws[0])} - {len(self.ts)}")
+        print(f"{len(self.bws[-1])} - {len(self.ts)}")
 
     def plot(self, file_name=None):
         plt.clf()
-        average = [0] * int((self.time/self.segment_len))
-        average_div = [0] * int((self.time/self.segment_len))
         for bw in self.bws:
-
-            for i in range(0,len(self.ts)-len(bw)):
-                bw.append(0)
-
-            plt.plot(self.ts , bw, alpha=0.1)
-            for i in range(len(bw)):
-                average[i] = average[i] + bw[i]
-                average_div[i] = average_div[i] + 1
-        for i in range(len(average)):
-            try:
-                average[i] = average[i]/average_div[i]
-            except:
-                average[i] = 0
-        x = 0
-        for i in range(len(average)):
-            x = i
-            if average_div[i] == 0:
-                break
-
-        plt.plot(self.ts, average, "black")
+            plt.plot(self.ts[:len(bw)], bw, alpha=0.1)
+        plt.plot(self.ts, self.average.average(), "black")
         print("Updating plots")
         if file_name is None:
             plt.title("Bandwidth")
@@ -100,10 +66,37 @@ class Network_Analyzer:
         else:
             pass #Save figure
 
+    def plot_live(self, iface, interval=None):
+        """
+        Plots the rate of the last `time` seconds of iface, updated every interval
+        (segment_len by default) until interrupted
+        """
+        monitor = BandwidthMonitor(self.segment_len, self.bins)
+        monitor.watch(iface)
+        plt.clf()
+        plt.title(f"Bandwidth {iface}")
+        plt.xlabel("time[s]")
+        plt.ylabel("bandwidth[Kbits/s]")
+        line, = plt.plot([], [], "black")
+        plt.ion()
+        plt.show()
+        try:
+            while True:
+                ts, bw = monitor.series(iface)
+                line.set_data(ts, bw)
+                plt.gca().relim()
+                plt.gca().autoscale_view()
+                plt.draw()
+                plt.pause(interval or self.segment_len)
+        finally:
+            monitor.stop()
+
 
 if __name__ == "__main__":
     na = Network_Analyzer(30, 0.5)
     try:
+        if "--live" in sys.argv:
+            na.plot_live("sw2-h2")
         while True:
             print("New sequence")
             na.run_capture_thread("sw2-h2")
@@ -0,0 +1,195 @@
+"""
+Streaming analysis of pcap captures.
+Records are read one by one and only the link and IPv4 headers are parsed,
+packets are never dissected or kept in memory; counts and rate segments
+are updated as the file is read.
+
+    capture = analyze("c_traffic_out.pcap", src="11.0.0.1")
+    capture.matched, capture.rates()
+"""
+from array import array
+import socket
+import struct
+import sys
+
+import numpy as np
+
+
+PCAP_MAGIC_US = 0xa1b2c3d4
+PCAP_MAGIC_NS = 0xa1b23c4d
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+
+GLOBAL_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+
+
+def ethernet_ip_offset(data):
+    """
+    Offset of the IPv4 header in an Ethernet frame (VLAN tags skipped), None for other protocols
+    """
+    offset = 12
+    ethertype = int.from_bytes(data[offset:offset + 2], "big")
+    while ethertype in ETHERTYPE_VLAN:
+        offset += 4
+        ethertype = int.from_bytes(data[offset:offset + 2], "big")
+    return offset + 2 if ethertype == ETHERTYPE_IPV4 else None
+
+
+class PcapReader:
+    """ PcapReader
+    Iterates over records of a pcap file: (timestamp, captured length, IPv4 source or None)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        header = self._file.read(GLOBAL_HEADER_SIZE)
+        if len(header) < GLOBAL_HEADER_SIZE:
+            #tshark did not write anything (yet)
+            self.linktype = None
+            return
+        for endian in ("<", ">"):
+            magic, = struct.unpack(endian + "I", header[:4])
+            if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+                break
+        else:
+            self._file.close()
+            raise ValueError(f"{path} is not a pcap file (pcapng is not supported, capture with -F pcap)")
+        self.resolution = 1e-9 if magic == PCAP_MAGIC_NS else 1e-6
+        self.linktype = struct.unpack(endian + "I", header[20:24])[0]
+        self._record_header = struct.Struct(endian + "IIII")
+
+    def _ip_offset(self, data):
+        """
+        Offset of the IPv4 header in the record, None for other protocols
+        """
+        if self.linktype == LINKTYPE_ETHERNET:
+            return ethernet_ip_offset(data)
+        if self.linktype == LINKTYPE_LINUX_SLL:
+            return 16 if int.from_bytes(data[14:16], "big") == ETHERTYPE_IPV4 else None
+        if self.linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+            return 0 if data[:1] and data[0] >> 4 == 4 else None
+        return None
+
+    def __iter__(self):
+        if self.linktype is None:
+            return
+        read = self._file.read
+        unpack = self._record_header.unpack
+        resolution = self.resolution
+        while True:
+            header = read(RECORD_HEADER_SIZE)
+            if len(header) < RECORD_HEADER_SIZE:
+                return
+            seconds, fraction, captured_length, _ = unpack(header)
+            data = read(captured_length)
+            if len(data) < captured_length:
+                #Last record is still being written
+                return
+            offset = self._ip_offset(data)
+            source = None
+            if offset is not None and len(data) >= offset + 20:
+                source = data[offset + 12:offset + 16]
+            yield seconds + fraction * resolution, captured_length, source
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RateSegments:
+    """ RateSegments
+    Rate (mbit/s) of segment_duration long segments, segments start at the first packet,
+    updated packet by packet; the segment that is still open is not reported
+    (same binning as the loops of the experiment scripts)
+    """
+
+    def __init__(self, segment_duration=0.1):
+        self.segment_duration = segment_duration
+        self.segment_start = None
+        self.segment_bytes = 0
+        self._rates = array("d")
+
+    def add(self, timestamp, length):
+        if self.segment_start is None:
+            self.segment_start = timestamp
+        elif timestamp - self.segment_start > self.segment_duration:
+            self._rates.append(self.segment_bytes * 8 / self.segment_duration / 1000 / 1000)
+            self.segment_bytes = 0
+            self.segment_start += self.segment_duration
+            empty_segments = int((timestamp - self.segment_start) / self.segment_duration)
+            if empty_segments > 0:
+                self._rates.extend([0.0] * empty_segments)
+                self.segment_start += empty_segments * self.segment_duration
+        self.segment_bytes += length
+
+    def rates(self):
+        return np.frombuffer(self._rates, dtype=np.float64).copy()
+
+
+class CaptureStats:
+    """ CaptureStats
+    -> packets: number of records
+    -> ip_packets: number of IPv4 packets
+    -> matched: number of IPv4 packets from the source address
+    -> segments: RateSegments of all IPv4 packets
+    """
+
+    def __init__(self, segment_duration=0.1):
+        self.packets = 0
+        self.ip_packets = 0
+        self.matched = 0
+        self.matched_bytes = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.segments = RateSegments(segment_duration)
+
+    def rates(self):
+        return self.segments.rates()
+
+
+def analyze(path, src=None, segment_duration=0.1):
+    """
+    Reads capture once, counts packets from src (dotted IPv4 address) and
+    bins the rate of all IPv4 packets
+    """
+    source = socket.inet_aton(src) if src is not None else None
+    stats = CaptureStats(segment_duration)
+    add = stats.segments.add
+    with PcapReader(path) as reader:
+        for timestamp, length, packet_source in reader:
+            stats.packets += 1
+            if packet_source is None:
+                continue
+            stats.ip_packets += 1
+            if stats.first_timestamp is None:
+                stats.first_timestamp = timestamp
+            stats.last_timestamp = timestamp
+            if source is None or packet_source == source:
+                stats.matched += 1
+                stats.matched_bytes += length
+            add(timestamp, length)
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("python -m aux.pcap_analysis <capture.pcap> [source address]")
+        sys.exit(1)
+    capture = analyze(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    rates = capture.rates()
+    print(f"packets: {capture.packets}, ipv4: {capture.ip_packets}, from source: {capture.matched}")
+    if len(rates):
+        print(f"segments: {len(rates)}, average rate: {rates.mean():.4f}mbit/s, peak: {rates.max():.4f}mbit/s")
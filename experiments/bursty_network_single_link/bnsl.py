@@ -59,6 +59,7 @@ def test_topo(rounds, epr_num, packet_num, epr_frame_size,net):
     net.wait_for_number_of_packets_transmitted(bridge, 100)# rounds*(packets_per_epr+1))
     info("*** Enough packets recorded\n")
     #Testing log extraction
+    net.export_packet_log(bridge)
     net.extract_data(bridge, "/app/packet_logs.log", f"simulation_results/packet_log_{epr_frame_size}B-{rounds}-{epr_num}-{packet_num}.csv")
     #net.extract_data(bridge, "/app/packet_logs.log", f"simulation_results/'EPR-B:{epr_frame_size} P/EPR:{packet_num}/{epr_num}.csv'")
 
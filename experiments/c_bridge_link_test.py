@@ -9,6 +9,7 @@ from itertools import filterfalse
 import random
 import os
 import csv
+import sys
 import numpy as np
 import time
 import subprocess
@@ -20,34 +21,9 @@ from mininet.log import info, setLogLevel
 from mininet.node import Controller
 
 from qontainernet import Qontainernet
-
-
-def deviations(array):
-    average = np.average(array)
-    negative = []
-    positive = []
-    for point in array:
-        if point >= average:
-            positive.append(point-average)
-            negative.append(0)
-        if point <= average:
-            negative.append(average-point)
-            positive.append(0)
-
-    p = 0
-    n = 0
-    for x in positive:
-        p = p + x**2
-    for x in negative:
-        n = n + x**2
-
-    try:
-        p = math.sqrt(p/len(positive))
-        n = math.sqrt(n/len(negative))
-    except:
-        print("Division by 0")
-
-    return p,n
+from aux.pcap_analysis import analyze
+from aux.analytics import active_statistics
+from aux.experiment_runner import ExperimentRunner, JobNames, parameter_grid
 
 
 def test_topo(net,
@@ -62,9 +38,13 @@ def test_topo(net,
               packet_size = 500,
               classical_buffer_size = 1,
               test_length=100,
-              traffic = "random"
+              traffic = "random",
+              names = None
               ):
-    """Run test topology: double hop"""
+    """Run test topology: double hop
+    names: JobNames of the job slot, names used so far if None"""
+    if names is None:
+        names = JobNames()
     if packet_size < 42:
         packet_size=0
 
@@ -86,17 +66,17 @@ def test_topo(net,
 
 
     info("*** Adding Controller \n")
-    net.addController("c1", port=6633)
+    net.addController(names.node("c1"), port=names.controller_port)
 
     info("*** Adding hosts\n")
     h1 = net.addDockerHost(
-        "ch1",
+        names.node("ch1"),
         dimage="quantum_bridge:latest",
         ip="11.0.0.1/24",
         docker_args={"hostname":"ch1"}
     )
     h2 = net.addDockerHost(
-        "ch2",
+        names.node("ch2"),
         dimage="quantum_bridge:latest",
         ip="11.0.0.2/24",
         docker_args={"hostname":"ch2"}
@@ -104,8 +84,8 @@ def test_topo(net,
     info("*** Creating switch\n")
 
     info("*** Adding switch\n")
-    s1 = net.addSwitch("cs1")
-    s2 = net.addSwitch("cs2")
+    s1 = net.addSwitch(names.node("cs1"))
+    s2 = net.addSwitch(names.node("cs2"))
 
     net.addLinkNamedIfce(h1,s1,bw=10, delay="0ms")
     net.addLinkNamedIfce(h2,s2,bw=10, delay="0ms")
@@ -144,7 +124,7 @@ def test_topo(net,
     net.start()
 
     ## TO SMOOTHEN THE TRAFFIC
-    net.quantum_interface("ch1-cs1", h1,base_rate=ea_rate, peak_rate=ea_rate,
+    net.quantum_interface(names.interface(h1.name, s1.name), h1,base_rate=ea_rate, peak_rate=ea_rate,
                           e_buffer_size=0,
                           c_buffer_size=ea_rate)
 
@@ -160,15 +140,17 @@ def test_topo(net,
     h1.cmd(wrapper_command)
     info("*** Started traffic generation\n")
 
-    cmd1 = ["tshark","-i", "cs1-bridge0", "-w" , "c_traffic_in.pcap", "-a", f"duration:{test_length}", "-F", "pcap"]
-    cmd2 = ["tshark","-i", "cs2-bridge0", "-w" , "c_traffic_out.pcap", "-a", f"duration:{test_length}", "-F", "pcap"]
+    pcap_in = names.path("c_traffic_in.pcap")
+    pcap_out = names.path("c_traffic_out.pcap")
+    cmd1 = ["tshark","-i", names.interface(s1.name, bridge1.name), "-w" , pcap_in, "-a", f"duration:{test_length}", "-F", "pcap"]
+    cmd2 = ["tshark","-i", names.interface(s2.name, bridge1.name), "-w" , pcap_out, "-a", f"duration:{test_length}", "-F", "pcap"]
     subprocess.run(["pwd"])
-    subprocess.run(["rm","c_traffic_in.pcap"])
-    subprocess.run(["touch","c_traffic_in.pcap"])
-    subprocess.Popen(["chmod", "a+rw", "c_traffic_in.pcap"])
-    subprocess.run(["rm","c_traffic_out.pcap"])
-    subprocess.run(["touch","c_traffic_out.pcap"])
-    subprocess.Popen(["chmod", "a+rw", "c_traffic_out.pcap"])
+    subprocess.run(["rm",pcap_in])
+    subprocess.run(["touch",pcap_in])
+    subprocess.Popen(["chmod", "a+rw", pcap_in])
+    subprocess.run(["rm",pcap_out])
+    subprocess.run(["touch",pcap_out])
+    subprocess.Popen(["chmod", "a+rw", pcap_out])
 
     info(f"*** Capturing traffic for the next {test_length} seconds \n")
     h1.cmd(wrapper_command)
@@ -177,48 +159,11 @@ def test_topo(net,
     time.sleep(test_length+2)
 
     info(f"*** Analyzing *.pcap fiels\n")
-    in_count = 0
-    out_count = 0
-    for packet in rdpcap('c_traffic_in.pcap'):
-        try:
-            if IP in packet:
-                if packet[IP].src == "11.0.0.1":
-                    in_count = in_count+1
-        except:
-            pass
-
-    transmission_rates = []
-    segment_start_timestamp = 0
-    segment_duration = 0.1
-    segment_transmitted = 0
-    for packet in rdpcap('c_traffic_out.pcap'):
-        try:
-            if IP in packet:
-                if packet[IP].src == "11.0.0.1":
-                    out_count = out_count+1
-
-                if segment_start_timestamp == 0:
-                    segment_start_timestamp = float(packet.time)
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                elif (float(packet.time) - segment_start_timestamp)>segment_duration:
-                    transmission_rates.append(segment_transmitted*8/segment_duration/1000/1000)
-                    segment_transmitted = 0
-                    segment_start_timestamp = segment_start_timestamp + segment_duration
-
-                    empty_segments = 0
-                    empty_segments = int((float(packet.time)-segment_start_timestamp) / segment_duration)
-                    if empty_segments> 0:
-                        for s in range(empty_segments):
-                            transmission_rates.append(0)
-                        segment_start_timestamp = segment_start_timestamp + empty_segments * segment_duration
-
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                else:
-                    segment_transmitted = segment_transmitted + int(len(packet))
-
-        except Exception as e:
-            print("exception", e)
-            pass
+    captured_in = analyze(pcap_in, src="11.0.0.1")
+    captured_out = analyze(pcap_out, src="11.0.0.1")
+    in_count = captured_in.matched
+    out_count = captured_out.matched
+    transmission_rates = captured_out.rates().tolist()
     print("RESULTS: ")
     print(in_count)
     print(out_count)
@@ -231,9 +176,8 @@ def test_topo(net,
 
     rejection_rate = 1-throughput
     average_transmission_rate = (out_count*packet_size*8/test_length)/10**6 # mbps
-    average_active_transmission_rate = np.average([x for x in transmission_rates if x > ea_rate*0.1])
-    ur_err_pos, ur_err_neg = deviations([x for x in transmission_rates if x > ea_rate*0.1])
-    aar_dev = np.std([x for x in transmission_rates if x > ea_rate*0.1])
+    average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg = active_statistics(
+        transmission_rates, ea_rate*0.1)
 
     if traffic == "random":
         print(packet_generation_probability, throughput, rejection_rate,
@@ -364,6 +308,37 @@ def continued_simulation(
             break
 
 
+def run_job(names, **params):
+    """
+    One setting of the parallel sweep, runs in a worker process of ExperimentRunner
+    """
+    names.kill_containers("ch1", "ch2", "c1")
+    os.system(f"docker kill $(docker ps -a -q --filter=name='mn.{names.bridge()}$') 2>/dev/null")
+    net = Qontainernet(controller=Controller, link=TCLink,
+                       name_prefix=names.bridge_prefix(), log_dir=names.log_dir())
+    try:
+        return test_topo(net, names=names, **params)
+    finally:
+        net.stop()
+
+
+def parallel_simulation(grid, workers=None, store_path="c_temp/results.sqlite"):
+    """
+    Runs settings of the grid side by side, finished settings are skipped,
+    results of every traffic type are exported to c_temp/c_<traffic>_link.csv
+    """
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    runner = ExperimentRunner("c_bridge_link", run_job, store_path, workers=workers)
+    failed = runner.run(grid)
+    for traffic in sorted({params["traffic"] for params in grid}):
+        results = [result for params, result in runner.store.results(runner.experiment)
+                   if params["traffic"] == traffic]
+        with open(f"c_temp/c_{traffic}_link.csv", "w", newline="") as f:
+            csv.writer(f, delimiter="|").writerows(results)
+    runner.store.close()
+    return failed
+
+
 
 
 if __name__ == "__main__":
@@ -385,6 +360,20 @@ if __name__ == "__main__":
     ]
     simulation_duration = 101
     period_length = 10
+    if "--parallel" in sys.argv:
+        grid = []
+        for setting in settings:
+            grid += parameter_grid(packet_generation_probability=[x/10 for x in range(1, 11)],
+                                   epr_buffer_size=[setting["e"]], classical_buffer_size=[setting["c"]],
+                                   ea_rate=[0.1], nea_rate=[0.05], packet_size=[100],
+                                   test_length=[simulation_duration], traffic=["random"])
+            grid += parameter_grid(generation_period_length=list(range(1, period_length+1)),
+                                   period_length=[period_length],
+                                   epr_buffer_size=[setting["e"]], classical_buffer_size=[setting["c"]],
+                                   ea_rate=[0.1], nea_rate=[0.05], packet_size=[100],
+                                   test_length=[simulation_duration], traffic=["periodic"])
+        parallel_simulation(grid)
+        sys.exit(0)
     for setting in settings:
         print(setting)
 
@@ -21,34 +21,7 @@ from mininet.log import info, setLogLevel
 from mininet.node import Controller
 
 from qontainernet import Qontainernet
-
-def deviations(array):
-    average = np.average(array)
-    negative = []
-    positive = []
-    for point in array:
-        if point >= average:
-            positive.append(point-average)
-            negative.append(0)
-        if point <= average:
-            negative.append(average-point)
-            positive.append(0)
-
-    p = 0
-    n = 0
-    for x in positive:
-        p = p + x**2
-    for x in negative:
-        n = n + x**2
-
-    try:
-        p = math.sqrt(p/len(positive))
-        n = math.sqrt(n/len(negative))
-    except:
-        print("Division by 0")
-
-    return p,n
-
+from aux.analytics import active_statistics
 
 def test_topo(net,
               packet_generation_probability= 0.2,
@@ -244,9 +217,8 @@ def test_topo(net,
 
     rejection_rate = 1-throughput
     average_transmission_rate = (out_count*packet_size*8/test_length)/10**6 # mbps
-    average_active_transmission_rate = np.average([x for x in transmission_rates if x > ea_rate*0.1])
-    ur_err_pos, ur_err_neg = deviations([x for x in transmission_rates if x > ea_rate*0.1])
-    aar_dev = np.std([x for x in transmission_rates if x > ea_rate*0.1])
+    average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg = active_statistics(
+        transmission_rates, ea_rate*0.1)
 
     if traffic == "random":
         print(packet_generation_probability, throughput, rejection_rate,
@@ -74,6 +74,7 @@ def test_qns_link_epr_processing_times(epr_frame_size=20,
     h1.cmd(f"tmux new-session -d -s h1 'python traffic_generation.py 11.0.0.2 -1 10 0'")
     packet_num = 10
     net.wait_for_number_of_packets_transmitted(bridge1,packet_num)
+    net.export_packet_log(bridge1)
     net.extract_data(bridge1, "/app/packet_logs.log", f"qns_eval/packet_log_epr_{epr_frame_size}-{packet_num}.csv")
 
     net.stop()
@@ -148,6 +149,7 @@ def test_qns_link_nea_processing_times(epr_frame_size=0,
         h1.cmd(f"tmux new-session -d -s h1 'python traffic_generation.py 11.0.0.2 -1 0 1 {packet_size}'")
         print(packet_size)
         net.wait_for_number_of_packets_transmitted(bridge1,packet_num)
+        net.export_packet_log(bridge1)
         net.extract_data(bridge1, "/app/packet_logs.log", f"qns_eval/packet_log_nea_{packet_size}-{packet_num}.csv")
 
         net.stop()
@@ -232,6 +234,7 @@ def test_qns_link_ea_processing_times(epr_frame_size=0,
         for i in range(packet_num):
             h1.cmd(f"tmux new-session -d -s h1 'python traffic_generation.py 11.0.0.2 -1 1 1 {packet_size}'")
         net.wait_for_number_of_packets_transmitted(bridge1,packet_num)
+        net.export_packet_log(bridge1)
         net.extract_data(bridge1, "/app/packet_logs.log", f"qns_eval/packet_log_ea_{packet_size}-{packet_num}.csv")
 
         net.stop()
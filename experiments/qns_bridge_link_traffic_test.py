@@ -87,6 +87,7 @@ def test_qns_link_test(epr_frame_size=20,
         h1.cmd(f"tmux new-session -d -s h1 'python traffic_generation.py 11.0.0.2 -1 0 0 {packet_size} random {probability}'")
     packet_num = 100
     net.wait_for_number_of_packets_transmitted(bridge1,packet_num)
+    net.export_packet_log(bridge1)
     net.extract_data(bridge1, "/app/packet_logs.log", f"qns_eval/{traffic_type}_packet_log_epr_{epr_frame_size}-{packet_num}.csv")
 
     net.stop()
@@ -15,6 +15,7 @@ from mininet.node import Controller, OVSSwitch
 
 
 from qontainernet import Qontainernet
+from topology import QuantumTopology
 
 
 def test_topo(net, epr_frame_size):
@@ -58,40 +59,43 @@ def test_topo(net, epr_frame_size):
     s4 = net.addSwitch("s4")
 
     info("*** Creating quantum links\n")
-    bridge1 = net.add_quantum_link(s1 , s2,
-                                   "11.0.0.101/24",
-                                   node_1_ip=None,
-                                   node_2_ip=None,
-                                   docker_bridge="quantum_bridge_c",
-                                   epr_frame_size=epr_frame_size,
-                                   )
-    bridge2 = net.add_quantum_link(s2, s3,
-                                   "11.0.0.102/24",
-                                   node_1_ip=None,
-                                   node_2_ip=None,
-                                   docker_bridge="quantum_bridge_c",
-                                   epr_frame_size=epr_frame_size,
-                                   )
-    bridge3 = net.add_quantum_link(s3, s4,
-                                   "11.0.0.103/24",
-                                   node_1_ip=None,
-                                   node_2_ip=None,
-                                   docker_bridge="quantum_bridge_c",
-                                   epr_frame_size=epr_frame_size,
-                                   )
-    bridge4 = net.add_quantum_link(s4, s1,
-                                   "11.0.0.104/24",
-                                   node_1_ip=None,
-                                   node_2_ip=None,
-                                   docker_bridge="quantum_bridge_c",
-                                   epr_frame_size=epr_frame_size,
-                                   )
+    topology = QuantumTopology(net)
+    topology.add_quantum_link(s1 , s2,
+                              "11.0.0.101/24",
+                              node_1_ip=None,
+                              node_2_ip=None,
+                              docker_bridge="quantum_bridge_c",
+                              epr_frame_size=epr_frame_size,
+                              )
+    topology.add_quantum_link(s2, s3,
+                              "11.0.0.102/24",
+                              node_1_ip=None,
+                              node_2_ip=None,
+                              docker_bridge="quantum_bridge_c",
+                              epr_frame_size=epr_frame_size,
+                              )
+    topology.add_quantum_link(s3, s4,
+                              "11.0.0.103/24",
+                              node_1_ip=None,
+                              node_2_ip=None,
+                              docker_bridge="quantum_bridge_c",
+                              epr_frame_size=epr_frame_size,
+                              )
+    topology.add_quantum_link(s4, s1,
+                              "11.0.0.104/24",
+                              node_1_ip=None,
+                              node_2_ip=None,
+                              docker_bridge="quantum_bridge_c",
+                              epr_frame_size=epr_frame_size,
+                              )
+    topology.create()
     net.addLinkNamedIfce(s1, h1, bw=10, delay="0ms")
     net.addLinkNamedIfce(s2, h2, bw=10, delay="0ms")
     net.addLinkNamedIfce(s3, h3, bw=10, delay="0ms")
     net.addLinkNamedIfce(s4, h4, bw=10, delay="0ms")
     print("Starting network")
     net.start()
+    topology.build()
 
     info("*** Enabling STP to prevent routing loops\n")
     s1.cmd("ovs-vsctl set-fail-mode s1 standalone")
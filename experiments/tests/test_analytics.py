@@ -0,0 +1,181 @@
+import math
+import unittest
+
+import numpy as np
+
+from aux.analytics import (binned_rates, segment_indices, deviations, active_statistics,
+                           percentiles, bursts, burst_statistics, KIBIT)
+from aux.pcap_analysis import RateSegments
+
+
+#Loops the experiment scripts used before aux.analytics
+def loop_segment_rates(timestamps, lengths, segment_duration=0.1):
+    transmission_rates = []
+    segment_start_timestamp = 0
+    segment_transmitted = 0
+    for t, length in zip(timestamps, lengths):
+        if segment_start_timestamp == 0:
+            segment_start_timestamp = t
+            segment_transmitted = segment_transmitted + length
+        elif (t - segment_start_timestamp) > segment_duration:
+            transmission_rates.append(segment_transmitted*8/segment_duration/1000/1000)
+            segment_transmitted = 0
+            segment_start_timestamp = segment_start_timestamp + segment_duration
+            empty_segments = int((t - segment_start_timestamp) / segment_duration)
+            if empty_segments > 0:
+                for s in range(empty_segments):
+                    transmission_rates.append(0)
+                segment_start_timestamp = segment_start_timestamp + empty_segments * segment_duration
+            segment_transmitted = segment_transmitted + length
+        else:
+            segment_transmitted = segment_transmitted + length
+    return transmission_rates
+
+
+def loop_deviations(array):
+    average = np.average(array)
+    negative = []
+    positive = []
+    for point in array:
+        if point >= average:
+            positive.append(point-average)
+            negative.append(0)
+        if point <= average:
+            negative.append(average-point)
+            positive.append(0)
+
+    p = 0
+    n = 0
+    for x in positive:
+        p = p + x**2
+    for x in negative:
+        n = n + x**2
+
+    try:
+        p = math.sqrt(p/len(positive))
+        n = math.sqrt(n/len(negative))
+    except ZeroDivisionError:
+        pass
+
+    return p,n
+
+
+def loop_network_analyzer(packets, segment_len):
+    bw = []
+    f_time = 0
+    current_segment = 1
+    segment_load = 0
+    for time, length in packets:
+        if f_time == 0:
+            f_time = time
+        if time > f_time + current_segment*segment_len:
+            segment_bw = ((segment_load*8)/segment_len)/1024
+            bw.append(segment_bw)
+            segment_load = 0
+            current_segment = current_segment + 1
+
+            if (time - (f_time+current_segment*segment_len)) > (2* segment_len):
+                pause =int((time - f_time-current_segment*segment_len)/segment_len)
+                for i in range(pause):
+                    current_segment = current_segment + 1
+                    bw.append(0)
+        segment_load = segment_load + length
+    return bw
+
+
+def random_capture(rng, duration=60.0, rate=2000, gaps=True):
+    """
+    Poisson packets with idle periods of up to a few seconds
+    """
+    timestamps = np.sort(rng.uniform(1000.0, 1000.0 + duration, int(duration * rate)))
+    if gaps:
+        for start in rng.uniform(1000.0, 1000.0 + duration, 10):
+            timestamps = timestamps[(timestamps < start) | (timestamps > start + rng.uniform(0, 3))]
+    lengths = rng.integers(60, 1500, len(timestamps))
+    return timestamps, lengths
+
+
+class TestBinnedRates(unittest.TestCase):
+
+    def test_equals_experiment_loop(self):
+        rng = np.random.default_rng(1)
+        for _ in range(5):
+            timestamps, lengths = random_capture(rng)
+            expected = loop_segment_rates(timestamps.tolist(), lengths.tolist())
+            np.testing.assert_allclose(binned_rates(timestamps, lengths), expected)
+
+    def test_equals_rate_segments(self):
+        timestamps, lengths = random_capture(np.random.default_rng(2))
+        segments = RateSegments()
+        for t, length in zip(timestamps.tolist(), lengths.tolist()):
+            segments.add(t, length)
+        np.testing.assert_allclose(binned_rates(timestamps, lengths), segments.rates())
+
+    def test_equals_network_analyzer_loop_without_idle_segments(self):
+        timestamps, lengths = random_capture(np.random.default_rng(3), gaps=False)
+        expected = loop_network_analyzer(zip(timestamps.tolist(), lengths.tolist()), 0.25)
+        np.testing.assert_allclose(binned_rates(timestamps, lengths, 0.25, unit=KIBIT), expected)
+
+    def test_fills_idle_segments(self):
+        #Gap of 1.5 segments, the network analyzer loop did not add a zero for it
+        timestamps = [0.0, 0.05, 0.25, 0.32]
+        rates = binned_rates(timestamps, 100, 0.1, closed_only=False)
+        np.testing.assert_allclose(rates, [0.016, 0, 0.008, 0.008])
+        self.assertEqual(len(loop_network_analyzer(zip(timestamps, [100] * 4), 0.1)), 2)
+
+    def test_start_and_open_segment(self):
+        np.testing.assert_array_equal(segment_indices([1.05, 1.1, 1.35], 0.1, start=1.0), [0, 1, 3])
+        rates = binned_rates([1.05, 1.35], [125, 125], 0.1, start=1.0, unit=1)
+        np.testing.assert_allclose(rates, [10000, 0, 0])
+        self.assertEqual(len(binned_rates([1.05, 1.35], [125, 125], 0.1, start=1.0, closed_only=False)), 4)
+
+    def test_empty(self):
+        self.assertEqual(len(binned_rates([], [])), 0)
+
+
+class TestDeviations(unittest.TestCase):
+
+    def test_equals_loop(self):
+        rng = np.random.default_rng(5)
+        for array in (rng.exponential(1, 1000), rng.integers(0, 5, 100).astype(float), [1.0, 1.0, 1.0], [2.0]):
+            np.testing.assert_allclose(deviations(array), loop_deviations(array))
+
+    def test_empty(self):
+        self.assertEqual(deviations([]), (0, 0))
+
+    def test_active_statistics(self):
+        rates = np.array([0.0, 0.01, 0.3, 0.1, 0.2, 0.0])
+        average, std, positive, negative = active_statistics(rates, 0.02)
+        active = [0.3, 0.1, 0.2]
+        self.assertAlmostEqual(average, np.average(active))
+        self.assertAlmostEqual(std, np.std(active))
+        np.testing.assert_allclose((positive, negative), loop_deviations(active))
+        average, std, positive, negative = active_statistics(rates, 1)
+        self.assertTrue(math.isnan(average) and math.isnan(std))
+        self.assertEqual((positive, negative), (0, 0))
+
+
+class TestBursts(unittest.TestCase):
+
+    def test_bursts(self):
+        rates = [0.5, 0, 0.3, 0.4, 0, 0, 0.2]
+        starts, ends = bursts(rates, 0.1)
+        np.testing.assert_array_equal(starts, [0, 2, 6])
+        np.testing.assert_array_equal(ends, [1, 4, 7])
+        count, durations, averages = burst_statistics(rates, 0.1, segment_duration=0.5)
+        self.assertEqual(count, 3)
+        np.testing.assert_allclose(durations, [0.5, 1.0, 0.5])
+        np.testing.assert_allclose(averages, [0.5, 0.35, 0.2])
+
+    def test_no_bursts(self):
+        self.assertEqual(burst_statistics([0, 0], 0.1)[0], 0)
+        self.assertEqual(len(bursts([], 0.1)[0]), 0)
+
+    def test_percentiles(self):
+        result = percentiles(np.arange(101), q=(5, 50, 95))
+        self.assertEqual(result, {5: 5.0, 50: 50.0, 95: 95.0})
+        self.assertTrue(math.isnan(percentiles([], q=(50,))[50]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import socket
+import threading
+import unittest
+
+import numpy as np
+
+from aux.analytics import binned_rates, KIBIT
+from aux.bandwidth_monitor import RollingRate, WindowAverage, PacketSocket
+
+
+class TestRollingRate(unittest.TestCase):
+
+    def test_equals_binned_rates(self):
+        rng = np.random.default_rng(0)
+        timestamps = np.sort(rng.uniform(100, 110, 5000))
+        timestamps = timestamps[(timestamps < 103) | (timestamps > 104.3)]
+        lengths = rng.integers(60, 1500, len(timestamps))
+        rate = RollingRate(0.25, 100)
+        for t, length in zip(timestamps.tolist(), lengths.tolist()):
+            rate.add(t, length)
+        times, rates = rate.series()
+        np.testing.assert_allclose(rates, binned_rates(timestamps, lengths, 0.25, unit=KIBIT))
+        np.testing.assert_allclose(times, np.arange(len(rates)) * 0.25)
+
+    def test_keeps_last_bins(self):
+        rate = RollingRate(1, 3, origin=0, unit=1)
+        for t in range(10):
+            rate.add(t + 0.5, 1)
+        times, rates = rate.series(closed_only=False)
+        np.testing.assert_array_equal(times, [7, 8, 9])
+        np.testing.assert_array_equal(rates, [8, 8, 8])
+        self.assertEqual(len(rate.transmitted), 3)
+
+    def test_advance_zeroes_idle_segments(self):
+        rate = RollingRate(1, 4, origin=0, unit=1)
+        rate.add(0.5, 1)
+        rate.add(1.5, 2)
+        rate.advance(3.2)
+        np.testing.assert_array_equal(rate.series()[1], [8, 16, 0])
+        rate.advance(100)
+        np.testing.assert_array_equal(rate.series(closed_only=False)[1], [0, 0, 0, 0])
+
+    def test_old_packets_ignored(self):
+        rate = RollingRate(1, 2, origin=0, unit=1)
+        rate.add(5.5, 1)
+        rate.add(2.5, 1)
+        rate.add(-1, 1)
+        np.testing.assert_array_equal(rate.series(closed_only=False)[1], [8])
+
+    def test_empty(self):
+        self.assertEqual(len(RollingRate(1, 2).series()[1]), 0)
+
+
+class TestWindowAverage(unittest.TestCase):
+
+    def test_average_pads_short_windows(self):
+        average = WindowAverage(3)
+        np.testing.assert_array_equal(average.average(), [0, 0, 0])
+        average.add([1, 2, 3])
+        average.add([3])
+        average.add([2, 2, 2, 9])
+        np.testing.assert_allclose(average.average(), [2, 4 / 3, 5 / 3])
+
+
+class TestPacketSocket(unittest.TestCase):
+
+    def test_counts_ipv4_frames_of_loopback(self):
+        try:
+            packets = PacketSocket("lo", timeout=0.1)
+        except (PermissionError, OSError) as e:
+            self.skipTest(f"AF_PACKET socket: {e}")
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        frames = iter(packets)
+        threading.Timer(0.2, sender.sendto, (b"x" * 100, receiver.getsockname())).start()
+        threading.Timer(1, packets.close).start()
+        lengths = [length for timestamp, length in frames]
+        sender.close()
+        receiver.close()
+        #Ethernet + IPv4 + UDP headers
+        self.assertIn(14 + 20 + 8 + 100, lengths)
+        self.assertEqual(packets.socket.fileno(), -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
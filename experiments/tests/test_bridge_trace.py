@@ -0,0 +1,62 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from aux.bridge_trace import (read_trace, export_csv, RECORD_DTYPE, HEADER_FORMAT, MAGIC, HEADER_SIZE,
+                              TraceFormatException)
+
+
+def write_trace(path, records, total=None, monotonic=5 * 10**9, realtime=1700000000 * 10**9):
+    header = struct.pack(HEADER_FORMAT, MAGIC, 1, RECORD_DTYPE.itemsize, len(records),
+                         len(records) if total is None else total, 1024, monotonic, realtime)
+    with open(path, "wb") as trace_file:
+        trace_file.write(header.ljust(HEADER_SIZE, b"\0"))
+        trace_file.write(records.tobytes())
+
+
+class TestBridgeTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "trace.bin")
+        self.records = np.zeros(3, dtype=RECORD_DTYPE)
+        self.records["seq"] = [8, 9, 10]
+        self.records["arrival"] = [10**9, 2 * 10**9, 2 * 10**9 + 500]
+        self.records["delay"] = [1000, 2000, 3000]
+        self.records["departure"] = [10**9 + 1000, 2 * 10**9 + 2000, 2 * 10**9 + 5000]
+        self.records["length"] = [60, 1500, 100]
+        self.records["mode"] = [0, 2, 2]
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_record_size_matches_c_struct(self):
+        self.assertEqual(RECORD_DTYPE.itemsize, 48)
+
+    def test_read(self):
+        write_trace(self.path, self.records, total=10)
+        trace = read_trace(self.path)
+        self.assertEqual(trace.header.count, 3)
+        self.assertEqual(trace.lost, 7)
+        np.testing.assert_array_equal(trace.records, self.records)
+        self.assertEqual(trace.queueing_delays().tolist(), [0, 0, 1500])
+        self.assertEqual(trace.mode_counts(), {"sequential": 1, "mixed": 0, "superdense": 2})
+        self.assertAlmostEqual(trace.wall_times()[0], 1700000000 - 4)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as trace_file:
+            trace_file.write(b"QNETPLOG".ljust(HEADER_SIZE, b"\0"))
+        with self.assertRaises(TraceFormatException):
+            read_trace(self.path)
+
+    def test_export_csv(self):
+        write_trace(self.path, self.records)
+        dest = os.path.join(self.dir.name, "trace.csv")
+        export_csv(read_trace(self.path), dest)
+        with open(dest) as csv_file:
+            lines = csv_file.read().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[2], "9,0,1.0,1.000002,2e-06,1500,0,0,superdense")
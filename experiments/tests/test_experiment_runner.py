@@ -0,0 +1,140 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from aux.experiment_runner import (parameter_grid, job_key, JobNames, ResultStore, ExperimentRunner,
+                                   PENDING, DONE, FAILED)
+
+
+#Jobs run in worker processes, so they are module level functions
+def square_job(names, x, fail=False):
+    if fail:
+        raise RuntimeError(f"job {x} failed")
+    return [x, x * x, names.token]
+
+
+class TestParameters(unittest.TestCase):
+
+    def test_parameter_grid(self):
+        self.assertEqual(parameter_grid(a=[1, 2], b=[3]), [{"a": 1, "b": 3}, {"a": 2, "b": 3}])
+        self.assertEqual(len(parameter_grid(a=[1, 2], b=[3, 4], c=[5, 6, 7])), 12)
+        self.assertEqual(parameter_grid(a=[]), [])
+
+    def test_job_key(self):
+        self.assertEqual(job_key({"a": 1, "b": 0.5}), job_key({"b": 0.5, "a": 1}))
+        self.assertNotEqual(job_key({"a": 1}), job_key({"a": 2}))
+
+
+class TestJobNames(unittest.TestCase):
+
+    def test_token(self):
+        self.assertEqual([JobNames._token(slot) for slot in (0, 1, 25, 26, 35, 36, 37)],
+                         ["a", "b", "z", "0", "9", "aa", "ab"])
+        self.assertEqual(JobNames._token(36 + 36 * 36), "aaa")
+
+    def test_default_names(self):
+        names = JobNames()
+        self.assertEqual(names.node("h1"), "h1")
+        self.assertEqual(names.bridge(), "bridge0")
+        self.assertEqual(names.controller_port, 6633)
+        self.assertEqual(names.path("c_traffic_in.pcap"), "c_traffic_in.pcap")
+
+    def test_slot_names(self):
+        names = JobNames(2)
+        self.assertEqual(names.node("h1"), "h1c")
+        self.assertEqual(names.bridge(1), "cbridge1")
+        self.assertEqual(names.controller_port, 6635)
+        self.assertEqual(names.path("c_traffic_in.pcap"), "c_traffic_in_c.pcap")
+        self.assertEqual(names.path("results"), "results_c")
+        self.assertEqual(names.log_dir(), "./tmp_c")
+
+    def test_interface(self):
+        names = JobNames(40)
+        self.assertEqual(names.interface(names.node("h1"), names.bridge()), "h1ae-aebridge0")
+        with self.assertRaises(ValueError):
+            names.interface(names.node("host1"), names.bridge())
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "results.sqlite")
+        self.store = ResultStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def status(self, params):
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT status FROM results WHERE key = ?", (job_key(params),)).fetchone()[0]
+
+    def test_statuses(self):
+        self.store.mark_started("exp", {"x": 1})
+        self.assertEqual(self.status({"x": 1}), PENDING)
+        self.store.save("exp", {"x": 1}, result=[1, 2])
+        self.assertEqual(self.status({"x": 1}), DONE)
+        self.store.mark_started("exp", {"x": 2})
+        self.store.save("exp", {"x": 2}, error="Traceback")
+        self.assertEqual(self.status({"x": 2}), FAILED)
+        self.assertEqual(self.store.done_keys("exp"), {job_key({"x": 1})})
+        self.assertEqual(self.store.results("exp"), [({"x": 1}, [1, 2])])
+        self.assertEqual(self.store.results("exp", FAILED), [({"x": 2}, None)])
+        self.assertEqual(self.store.done_keys("other"), set())
+
+    def test_export_csv(self):
+        self.store.mark_started("exp", {"x": 1})
+        self.store.save("exp", {"x": 1}, result=[1, 0.5])
+        path = os.path.join(self.dir.name, "exp.csv")
+        self.store.export_csv("exp", path)
+        with open(path) as csv_file:
+            self.assertEqual(csv_file.read().splitlines(), ["1|0.5"])
+
+    def test_resume(self):
+        runner = ExperimentRunner("exp", square_job, self.path)
+        # Interrupted sweep: one job done, one started but not finished, one failed
+        self.store.mark_started("exp", {"x": 1})
+        self.store.save("exp", {"x": 1}, result=[1, 1, ""])
+        self.store.mark_started("exp", {"x": 2})
+        self.store.mark_started("exp", {"x": 3})
+        self.store.save("exp", {"x": 3}, error="Traceback")
+        self.assertEqual(runner.pending(parameter_grid(x=[1, 2, 3, 4])), [{"x": 2}, {"x": 3}, {"x": 4}])
+        runner.store.close()
+
+
+class TestExperimentRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.runner = ExperimentRunner("squares", square_job, os.path.join(self.dir.name, "results.sqlite"),
+                                       workers=2)
+
+    def tearDown(self):
+        self.runner.store.close()
+        self.dir.cleanup()
+
+    def test_pending_removes_duplicates(self):
+        grid = [{"x": 1, "y": 2}, {"y": 2, "x": 1}, {"x": 3, "y": 2}]
+        self.assertEqual(self.runner.pending(grid), [{"x": 1, "y": 2}, {"x": 3, "y": 2}])
+
+    def test_run(self):
+        grid = parameter_grid(x=[1, 2, 3, 4]) + [{"x": 5, "fail": True}]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(self.runner.run(grid), 1)
+        self.assertIn("RuntimeError: job 5 failed", output.getvalue())
+        results = sorted(result for _, result in self.runner.store.results("squares"))
+        self.assertEqual([result[:2] for result in results], [[1, 1], [2, 4], [3, 9], [4, 16]])
+        # Each of the 2 worker processes has its own slot
+        self.assertTrue({result[2] for result in results} <= {"a", "b"})
+        self.assertEqual(self.runner.store.results("squares", FAILED), [({"x": 5, "fail": True}, None)])
+
+        # Finished jobs are skipped, the failed one runs again
+        self.assertEqual(self.runner.pending(grid), [{"x": 5, "fail": True}])
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(self.runner.run(parameter_grid(x=[1, 2])), 0)
+        self.assertIn("2 of 2 jobs done, running 0", output.getvalue())
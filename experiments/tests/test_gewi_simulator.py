@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+
+from aux.gewi_simulator import (GewiLink, random_traffic, periodic_traffic, burst_packet_count, shape,
+                                simulate, test_topo as simulated_topo, SUPERDENSE, SEQUENTIAL, MIXED)
+
+US = 1e-6
+
+
+def link(epr_frame_size=10, epr_buffer_size=100, sleep_time=10**9, single_transmission_duration=1000,
+         classical_buffer_size=2):
+    return GewiLink(epr_frame_size, epr_buffer_size, sleep_time, single_transmission_duration,
+                    classical_buffer_size)
+
+
+class TestTransmissionDelay(unittest.TestCase):
+    """ Formulas of bridge.c transmission_delay, 1000 ns per unit """
+
+    def test_superdense(self):
+        gewi = link()
+        gewi.epr_buffer = 100
+        self.assertAlmostEqual(gewi.transmission_delay(60), 60 * 4 * 1000 * 1e-9)
+        self.assertEqual(gewi.epr_buffer, 70)
+        # Odd lengths consume length//2 qubytes
+        gewi.transmission_delay(61)
+        self.assertEqual(gewi.epr_buffer, 40)
+        self.assertEqual(gewi.transmissions[SUPERDENSE], 2)
+
+    def test_sequential(self):
+        gewi = link()
+        self.assertAlmostEqual(gewi.transmission_delay(100), 100 * 8 * 1000 * 1e-9)
+        self.assertEqual(gewi.epr_buffer, 0)
+        self.assertEqual(gewi.transmissions[SEQUENTIAL], 1)
+
+    def test_mixed(self):
+        gewi = link()
+        gewi.epr_buffer = 10
+        self.assertAlmostEqual(gewi.transmission_delay(100), (10 * 4 + 80 * 8) * 1000 * 1e-9)
+        self.assertEqual(gewi.epr_buffer, 0)
+        self.assertEqual(gewi.transmissions[MIXED], 1)
+
+    def test_boundary_is_mixed(self):
+        # length == 2*buffer is not superdense in bridge.c either
+        gewi = link()
+        gewi.epr_buffer = 50
+        self.assertAlmostEqual(gewi.transmission_delay(100), 50 * 4 * 1000 * 1e-9)
+        self.assertEqual(gewi.transmissions[MIXED], 1)
+
+
+class TestGeneration(unittest.TestCase):
+
+    def test_ticks_before(self):
+        gewi = link()
+        self.assertEqual([gewi.ticks_before(t) for t in (0, 0.5, 1.0, 1.5, 3.5)], [0, 0, 0, 1, 3])
+
+    def test_generate(self):
+        gewi = link()
+        gewi.generate(0.5, 3.5)
+        self.assertEqual(gewi.epr_buffer, 30)
+        # No tick between the two times
+        gewi.generate(3.6, 3.9)
+        self.assertEqual(gewi.epr_buffer, 30)
+        gewi.generate(0, 100)
+        self.assertEqual(gewi.epr_buffer, 100)
+
+    def test_no_generation_while_busy(self):
+        # 1 ms frames, packets of 8 ms back to back
+        gewi = link(sleep_time=10**6, classical_buffer_size=10)
+        gewi.run(np.array([0.0, 0.0]), 1000)
+        self.assertEqual(gewi.transmissions[SEQUENTIAL], 2)
+        # Idle from 16 ms to 20 ms
+        gewi.run(np.array([0.02]), 1000)
+        self.assertEqual(gewi.transmissions[MIXED], 1)
+
+    def test_idle_gap_before_packet(self):
+        gewi = link(classical_buffer_size=10)
+        departures = gewi.run(np.array([0.0, 2.5]), 100)
+        # 2 frames generated between the packets
+        self.assertAlmostEqual(departures[1], 2.5 + (20 * 4 + 60 * 8) * US)
+
+
+class TestRun(unittest.TestCase):
+
+    def test_drops_when_buffer_is_full(self):
+        gewi = link(epr_frame_size=0, classical_buffer_size=2)
+        departures = gewi.run(np.array([0.0, 0.0, 0.0, 0.0025]), 125)
+        np.testing.assert_allclose(departures, [0.001, 0.002, np.nan, 0.0035])
+
+    def test_unlimited_buffer(self):
+        gewi = link(epr_frame_size=0, classical_buffer_size=10)
+        departures = gewi.run(np.zeros(4), 125)
+        self.assertFalse(np.isnan(departures).any())
+
+
+class TestTraffic(unittest.TestCase):
+
+    def test_random_traffic(self):
+        self.assertEqual(len(random_traffic(0, 50, np.random.default_rng(0))), 0)
+        np.testing.assert_array_equal(random_traffic(1, 5, np.random.default_rng(0)), np.arange(5.0))
+        bursts = random_traffic(0.3, 100, np.random.default_rng(1))
+        expected = np.flatnonzero(np.random.default_rng(1).random(100) < 0.3)
+        np.testing.assert_array_equal(bursts, expected)
+
+    def test_periodic_traffic(self):
+        np.testing.assert_array_equal(periodic_traffic(10, 3, 25), [0, 1, 2, 10, 11, 12, 20, 21, 22])
+
+    def test_burst_packet_count(self):
+        self.assertEqual(burst_packet_count(0.2, 500, "random"), int(int(0.2 * 1024 * 1024) / 4000))
+        self.assertEqual(burst_packet_count(0.2, 500, "periodic"), 50)
+
+    def test_shape_bfifo_drops(self):
+        # 1 ms per packet, bfifo holds 3 packets besides the one being sent
+        out = shape(np.array([0.0, 1.0]), 5, 100, 0.8, 300)
+        np.testing.assert_allclose(out, [0.001, 0.002, 0.003, 0.004, 1.001, 1.002, 1.003, 1.004])
+
+
+class TestTopo(unittest.TestCase):
+
+    def test_random_row(self):
+        row = simulated_topo(packet_generation_probability=0.5, test_length=20, seed=0)
+        # (probability, throughput, rejection_rate, average, active average, deviation, errors +/-)
+        self.assertEqual(len(row), 8)
+        self.assertEqual(row[0], 0.5)
+        self.assertTrue(0 <= row[1] <= 1)
+        self.assertAlmostEqual(row[1] + row[2], 1)
+
+    def test_periodic_row(self):
+        row = simulated_topo(generation_period_length=5, period_length=10, test_length=20, traffic="periodic")
+        self.assertEqual(len(row), 9)
+        self.assertEqual(row[:2], (5, 10))
+        self.assertAlmostEqual(row[2] + row[3], 1)
+
+    def test_seeded_runs_repeat(self):
+        first = simulate(packet_generation_probability=0.5, test_length=20, seed=3)
+        second = simulate(packet_generation_probability=0.5, test_length=20, seed=3)
+        np.testing.assert_array_equal(first["out"], second["out"])
+        self.assertEqual(first["dropped"], second["dropped"])
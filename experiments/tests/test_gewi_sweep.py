@@ -0,0 +1,114 @@
+import csv
+import math
+import os
+import tempfile
+import unittest
+from statistics import NormalDist
+
+import numpy as np
+
+from aux.gewi_sweep import sweep, SweepResult, AXES, METRICS
+from aux import gewi_simulator
+
+LINK = dict(ea_rate=0.1, nea_rate=0.05, packet_size=100, test_length=101)
+
+
+def axes(probabilities):
+    return {"probability": np.asarray(probabilities, dtype=float), "epr_buffer_size": np.array([0.1]),
+            "classical_buffer_size": np.array([1.0]), "ea_rate": np.array([0.1]), "nea_rate": np.array([0.05])}
+
+
+def samples(values):
+    """ Same values for every metric, values: probabilities x seeds """
+    values = np.asarray(values, dtype=float).reshape(len(values), 1, 1, 1, 1, -1)
+    return {metric: values for metric in METRICS}
+
+
+class TestSweepResult(unittest.TestCase):
+
+    def setUp(self):
+        self.result = SweepResult(axes([0.1, 0.2]), samples([[1, 2, 3], [4, np.nan, 6]]), confidence=0.95)
+
+    def test_confidence_interval(self):
+        mean, low, high = (values["throughput"].ravel() for values in
+                           (self.result.mean, self.result.low, self.result.high))
+        half_width = NormalDist().inv_cdf(0.975) / math.sqrt(3)
+        self.assertAlmostEqual(mean[0], 2)
+        self.assertAlmostEqual(low[0], 2 - half_width)
+        self.assertAlmostEqual(high[0], 2 + half_width)
+        # nan samples are left out: 4 and 6, half width z * sqrt(2) / sqrt(2)
+        self.assertAlmostEqual(mean[1], 5)
+        self.assertAlmostEqual(high[1] - mean[1], NormalDist().inv_cdf(0.975))
+
+    def test_single_sample_has_no_interval(self):
+        result = SweepResult(axes([0.1]), samples([[0.5]]), confidence=0.95)
+        self.assertEqual(result.mean["throughput"].ravel()[0], 0.5)
+        self.assertTrue(np.isnan(result.low["throughput"]).all())
+
+    def test_rows_and_csv(self):
+        header = self.result.header()
+        self.assertEqual(header[:len(AXES)], AXES)
+        self.assertEqual(len(header), len(AXES) + 3 * len(METRICS))
+        rows = list(self.result.rows())
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(len(row) == len(header) for row in rows))
+        self.assertEqual(rows[1][0], 0.2)
+        self.assertAlmostEqual(rows[1][len(AXES)], 5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sweep.csv")
+            self.result.save_csv(path)
+            with open(path, newline="") as csv_file:
+                lines = list(csv.reader(csv_file, delimiter="|"))
+        self.assertEqual(lines[0], header)
+        self.assertEqual(len(lines), 3)
+
+    def test_best(self):
+        self.assertEqual(self.result.best()["probability"], 0.2)
+        self.assertEqual(self.result.best()["nea_rate"], 0.05)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_grid_shape(self):
+        result = sweep(probabilities=[0.2, 0.5, 0.8], epr_buffer_sizes=[0.1, 0.5], seeds=4, test_length=10, seed=0)
+        self.assertEqual(result.mean["throughput"].shape, (3, 2, 1, 1, 1))
+        self.assertEqual(result.samples["throughput"].shape, (3, 2, 1, 1, 1, 4))
+        self.assertTrue(np.all(result.mean["throughput"] <= 1))
+
+    def test_seeded_sweeps_repeat(self):
+        first = sweep(probabilities=[0.5], seeds=5, test_length=10, seed=1)
+        second = sweep(probabilities=[0.5], seeds=5, test_length=10, seed=1)
+        np.testing.assert_array_equal(first.samples["throughput"], second.samples["throughput"])
+
+    def test_agrees_with_simulator(self):
+        # Throughput within about 0.01 of the discrete-event simulator averaged over seeds
+        for probability, epr_buffer_size, classical_buffer_size in [(0.2, 0.1, 0.1), (0.5, 0.5, 1), (0.8, 0.1, 1)]:
+            with self.subTest(probability=probability, epr_buffer_size=epr_buffer_size):
+                simulated = [gewi_simulator.test_topo(packet_generation_probability=probability,
+                                                      epr_buffer_size=epr_buffer_size,
+                                                      classical_buffer_size=classical_buffer_size,
+                                                      seed=seed, **LINK)
+                             for seed in range(30)]
+                result = sweep(probabilities=[probability], epr_buffer_sizes=[epr_buffer_size],
+                               classical_buffer_sizes=[classical_buffer_size], ea_rates=[LINK["ea_rate"]],
+                               nea_rates=[LINK["nea_rate"]], packet_size=LINK["packet_size"],
+                               test_length=LINK["test_length"], seeds=300, seed=0)
+                self.assertAlmostEqual(result.mean["throughput"].item(),
+                                       np.mean([row[1] for row in simulated]), delta=0.015)
+                self.assertAlmostEqual(result.mean["average_active_transmission_rate"].item(),
+                                       np.mean([row[4] for row in simulated]), delta=0.005)
+
+    def test_periodic_traffic(self):
+        for generation_period_length in (2, 5, 8):
+            with self.subTest(generation_period_length=generation_period_length):
+                simulated = gewi_simulator.test_topo(generation_period_length=generation_period_length,
+                                                     period_length=10, epr_buffer_size=0.1,
+                                                     classical_buffer_size=1, traffic="periodic", **LINK)
+                result = sweep(probabilities=[generation_period_length], ea_rates=[LINK["ea_rate"]],
+                               nea_rates=[LINK["nea_rate"]], packet_size=LINK["packet_size"],
+                               test_length=LINK["test_length"], seeds=2, traffic="periodic", period_length=10)
+                # Periodic traffic does not depend on the seed
+                samples = result.samples["throughput"].ravel()
+                self.assertEqual(samples[0], samples[1])
+                self.assertAlmostEqual(result.mean["throughput"].item(), simulated[2], delta=0.01)
@@ -0,0 +1,123 @@
+import os
+import socket
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from aux.pcap_analysis import (analyze, PcapReader, PCAP_MAGIC_US, PCAP_MAGIC_NS, LINKTYPE_ETHERNET,
+                               LINKTYPE_RAW, LINKTYPE_LINUX_SLL, LINKTYPE_IPV4)
+
+SOURCE = "11.0.0.1"
+OTHER = "11.0.0.2"
+
+
+def ipv4(src, length=40):
+    header = bytes([0x45, 0]) + struct.pack(">H", length) + bytes(8) + socket.inet_aton(src) + \
+        socket.inet_aton("11.0.0.3")
+    return header.ljust(length, b"\0")
+
+
+def ethernet(payload, ethertype=0x0800, vlan=False):
+    header = bytes(12)
+    if vlan:
+        header += struct.pack(">HH", 0x8100, 7)
+    return header + struct.pack(">H", ethertype) + payload
+
+
+def linux_sll(payload, protocol=0x0800):
+    return bytes(14) + struct.pack(">H", protocol) + payload
+
+
+def write_pcap(path, linktype, records, endian="<", magic=PCAP_MAGIC_US, truncate=0):
+    """ records: (seconds, fraction, data), the last truncate bytes of the file are cut off """
+    content = struct.pack(endian + "IHHiIII", magic, 2, 4, 0, 0, 65535, linktype)
+    for seconds, fraction, data in records:
+        content += struct.pack(endian + "IIII", seconds, fraction, len(data), len(data)) + data
+    with open(path, "wb") as pcap_file:
+        pcap_file.write(content[:len(content) - truncate])
+
+
+class TestPcapReader(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "capture.pcap")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_ethernet(self):
+        write_pcap(self.path, LINKTYPE_ETHERNET, [
+            (1, 0, ethernet(ipv4(SOURCE, 86))),
+            (1, 50000, ethernet(ipv4(OTHER, 86))),
+            # ARP
+            (1, 60000, ethernet(bytes(28), ethertype=0x0806)),
+            (1, 150000, ethernet(ipv4(SOURCE, 82), vlan=True)),
+            (1, 320000, ethernet(ipv4(SOURCE, 186))),
+        ])
+        capture = analyze(self.path, src=SOURCE)
+        self.assertEqual((capture.packets, capture.ip_packets, capture.matched), (5, 4, 3))
+        self.assertEqual(capture.matched_bytes, 100 + 100 + 200)
+        self.assertAlmostEqual(capture.first_timestamp, 1.0)
+        self.assertAlmostEqual(capture.last_timestamp, 1.32)
+        # All IPv4 packets count towards the rates: 200 bytes in the first segment, 100 in the second
+        np.testing.assert_allclose(capture.rates(), [0.016, 0.008, 0.0])
+        self.assertEqual(analyze(self.path).matched, 4)
+
+    def test_nanosecond_big_endian_raw_ip(self):
+        write_pcap(self.path, LINKTYPE_RAW, [
+            (2, 500000000, ipv4(SOURCE)),
+            (2, 500000001, bytes([0x60]) + bytes(39)),  # IPv6
+        ], endian=">", magic=PCAP_MAGIC_NS)
+        with PcapReader(self.path) as reader:
+            records = list(reader)
+        self.assertEqual(len(records), 2)
+        self.assertAlmostEqual(records[0][0], 2.5)
+        self.assertAlmostEqual(records[1][0] - records[0][0], 1e-9)
+        self.assertEqual(records[0][2], socket.inet_aton(SOURCE))
+        self.assertIsNone(records[1][2])
+
+    def test_microsecond_big_endian(self):
+        write_pcap(self.path, LINKTYPE_IPV4, [(3, 250000, ipv4(SOURCE))], endian=">")
+        with PcapReader(self.path) as reader:
+            (timestamp, length, source), = list(reader)
+        self.assertAlmostEqual(timestamp, 3.25)
+        self.assertEqual(length, 40)
+
+    def test_nanosecond_little_endian_linux_sll(self):
+        write_pcap(self.path, LINKTYPE_LINUX_SLL, [
+            (1, 0, linux_sll(ipv4(SOURCE))),
+            (1, 1000, linux_sll(bytes(40), protocol=0x86dd)),
+        ], magic=PCAP_MAGIC_NS)
+        capture = analyze(self.path, src=SOURCE)
+        self.assertEqual((capture.packets, capture.ip_packets, capture.matched), (2, 1, 1))
+
+    def test_truncated_ip_header(self):
+        write_pcap(self.path, LINKTYPE_ETHERNET, [(1, 0, ethernet(ipv4(SOURCE))[:30])])
+        capture = analyze(self.path, src=SOURCE)
+        self.assertEqual((capture.packets, capture.ip_packets), (1, 0))
+
+    def test_truncated_trailing_record(self):
+        # Last record is still being written by tshark
+        write_pcap(self.path, LINKTYPE_ETHERNET, [(1, 0, ethernet(ipv4(SOURCE))),
+                                                  (1, 10, ethernet(ipv4(SOURCE)))], truncate=10)
+        self.assertEqual(analyze(self.path, src=SOURCE).matched, 1)
+        # Only part of the record header
+        write_pcap(self.path, LINKTYPE_ETHERNET, [(1, 0, ethernet(ipv4(SOURCE))),
+                                                  (1, 10, ethernet(ipv4(SOURCE)))], truncate=54 + 10)
+        self.assertEqual(analyze(self.path, src=SOURCE).packets, 1)
+
+    def test_empty_file(self):
+        open(self.path, "wb").close()
+        capture = analyze(self.path, src=SOURCE)
+        self.assertEqual((capture.packets, capture.ip_packets, capture.matched), (0, 0, 0))
+        self.assertEqual(len(capture.rates()), 0)
+        self.assertIsNone(capture.first_timestamp)
+
+    def test_not_a_pcap(self):
+        with open(self.path, "wb") as pcap_file:
+            pcap_file.write(b"\x0a\x0d\x0d\x0a" + bytes(28))
+        with self.assertRaises(ValueError):
+            PcapReader(self.path)
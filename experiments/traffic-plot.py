@@ -21,34 +21,8 @@ from mininet.log import info, setLogLevel
 from mininet.node import Controller
 
 from qontainernet import Qontainernet
-
-
-def deviations(array):
-    average = np.average(array)
-    negative = []
-    positive = []
-    for point in array:
-        if point >= average:
-            positive.append(point-average)
-            negative.append(0)
-        if point <= average:
-            negative.append(average-point)
-            positive.append(0)
-
-    p = 0
-    n = 0
-    for x in positive:
-        p = p + x**2
-    for x in negative:
-        n = n + x**2
-
-    try:
-        p = math.sqrt(p/len(positive))
-        n = math.sqrt(n/len(negative))
-    except:
-        print("Division by 0")
-
-    return p,n
+from aux.pcap_analysis import analyze
+from aux.analytics import active_statistics
 
 
 def traffic(traffic="random",
@@ -134,83 +108,12 @@ def traffic(traffic="random",
 
 
     info(f"*** Analyzing *.pcap fiels\n")
-    in_count = 0
-    out_count = 0
-    for packet in rdpcap('t_traffic_in.pcap'):
-        try:
-            if IP in packet:
-                if packet[IP].src == "11.0.0.1":
-                    in_count = in_count+1
-        except:
-            pass
-
-    transmission_rates = []
-    segment_start_timestamp = 0
-    segment_duration = 0.1
-    segment_transmitted = 0
-    for packet in rdpcap('t_traffic_out.pcap'):
-        try:
-            if IP in packet:
-                if packet[IP].src == "11.0.0.1":
-                    out_count = out_count+1
-
-                if segment_start_timestamp == 0:
-                    segment_start_timestamp = float(packet.time)
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                elif (float(packet.time) - segment_start_timestamp)>segment_duration:
-                    transmission_rates.append(segment_transmitted*8/segment_duration/1000/1000)
-                    segment_transmitted = 0
-                    segment_start_timestamp = segment_start_timestamp + segment_duration
-
-                    empty_segments = 0
-                    empty_segments = int((float(packet.time)-segment_start_timestamp) / segment_duration)
-                    if empty_segments> 0:
-                        for s in range(empty_segments):
-                            transmission_rates.append(0)
-                        segment_start_timestamp = segment_start_timestamp + empty_segments * segment_duration
-
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                else:
-                    segment_transmitted = segment_transmitted + int(len(packet))
-
-        except Exception as e:
-            print("exception", e)
-            pass
-
-    incoming_rates = []
-    segment_start_timestamp = 0
-    segment_duration = 0.1
-    segment_transmitted = 0
-    f_ts = 0
-    l_ts = 0
-    for packet in rdpcap('t_traffic_in.pcap'):
-        try:
-            if IP in packet:
-                if f_ts == 0:
-                    f_ts = packet.time
-                if segment_start_timestamp == 0:
-                    segment_start_timestamp = float(packet.time)
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                elif (float(packet.time) - segment_start_timestamp)>segment_duration:
-                    incoming_rates.append(segment_transmitted*8/segment_duration/1000/1000)
-                    segment_transmitted = 0
-                    segment_start_timestamp = segment_start_timestamp + segment_duration
-
-                    empty_segments = 0
-                    empty_segments = int((float(packet.time)-segment_start_timestamp) / segment_duration)
-                    if empty_segments> 0:
-                        for s in range(empty_segments):
-                            incoming_rates.append(0)
-                        segment_start_timestamp = segment_start_timestamp + empty_segments * segment_duration
-
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                else:
-                    segment_transmitted = segment_transmitted + int(len(packet))
-                l_ts = packet.time
-
-        except Exception as e:
-            print("exception", e)
-            pass
+    captured_in = analyze('t_traffic_in.pcap', src="11.0.0.1")
+    captured_out = analyze('t_traffic_out.pcap', src="11.0.0.1")
+    in_count = captured_in.matched
+    out_count = captured_out.matched
+    transmission_rates = captured_out.rates().tolist()
+    incoming_rates = captured_in.rates().tolist()
     try:
         throughput = out_count/in_count
     except:
@@ -220,9 +123,8 @@ def traffic(traffic="random",
 
     rejection_rate = 1-throughput
     average_transmission_rate = (out_count*packet_size*8/test_length)/10**6 # mbps
-    average_active_transmission_rate = np.average([x for x in transmission_rates if x > ea_rate*0.1])
-    ur_err_pos, ur_err_neg = deviations([x for x in transmission_rates if x > ea_rate*0.1])
-    aar_dev = np.std([x for x in transmission_rates if x > ea_rate*0.1])
+    average_active_transmission_rate, aar_dev, ur_err_pos, ur_err_neg = active_statistics(
+        transmission_rates, ea_rate*0.1)
 
 
     print(incoming_rates)
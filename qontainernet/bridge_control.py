@@ -0,0 +1,141 @@
+"""
+Client of the C bridge control socket.
+The bridge listens on a unix socket on its log volume (./bridge -c /logs/control.sock),
+requests and replies are single lines, replies are JSON objects:
+    stats              -> counters, EPR buffer level, queue length and parameters,
+                          totals of all directions and one entry per direction in "links"
+    set <key> <value>  -> changes a parameter of all directions while the bridge runs
+    link <i> <request> -> stats or set of direction i alone (queue order of ./bridge -q)
+
+    with BridgeControl(path) as control:
+        control.set(epr_frame_size=20000, single_transmission_delay=2000)
+        print(control.stats()["epr_level"])
+"""
+import json
+import os
+import socket
+
+from bridge_status import wait_until
+
+
+CONTROL_SOCKET = "control.sock"
+
+#Parameters that can be changed at runtime (struct link_params)
+PARAMETERS = ("epr_frame_size", "epr_buffer_size", "sleep_time", "single_transmission_delay", "buffer_size")
+
+
+class BridgeControlException(Exception):
+    pass
+
+
+class BridgeControl:
+    """ BridgeControl
+    One connection to the control socket of a running C bridge,
+    connects on the first request
+    """
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self._socket = None
+        self._buffer = b""
+
+    def _connect(self):
+        """
+        PRIVATE METHOD: connects if not connected yet
+        """
+        if self._socket is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._socket = sock
+            self._buffer = b""
+        return self._socket
+
+    def request(self, line):
+        """
+        Sends request line, returns decoded reply
+        Raises BridgeControlException if the bridge rejected the request
+        """
+        sock = self._connect()
+        try:
+            sock.sendall(line.encode() + b"\n")
+            while b"\n" not in self._buffer:
+                data = sock.recv(4096)
+                if not data:
+                    raise ConnectionError(f"bridge closed control connection {self.path}")
+                self._buffer += data
+        except OSError:
+            self.close()
+            raise
+        reply, self._buffer = self._buffer.split(b"\n", 1)
+        reply = json.loads(reply.decode())
+        if not reply.pop("ok", False):
+            raise BridgeControlException(reply.get("error", f"request failed: {line}"))
+        return reply
+
+    def stats(self):
+        """
+        Returns counters of the bridge:
+        packets, bytes, superdense, sequential, mixed, drops, kernel_drops,
+        delay_total, transmission_total (ns), epr_level (qubytes), queue_length (packets)
+        and the current parameters, summed over the directions of the bridge,
+        "links" holds the counters of each direction
+        """
+        return self.request("stats")
+
+    def link_stats(self, link):
+        """
+        Returns counters of direction link alone
+        """
+        return self.request(f"link {int(link)} stats")
+
+    def set(self, link=None, **params):
+        """
+        Changes parameters, e.g. set(epr_frame_size=20000), values are integers in bridge units
+        link: index of the direction to change, all directions if None
+        """
+        prefix = "" if link is None else f"link {int(link)} "
+        for key, value in params.items():
+            if key not in PARAMETERS:
+                raise BridgeControlException(f"unknown parameter {key}")
+            self.request(f"{prefix}set {key} {int(value)}")
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def wait_for_control(path, timeout=None, poll_interval=1):
+    """
+    Waits until a bridge answers on the control socket at path,
+    tries again whenever something changes in its directory
+    Returns BridgeControl, None on timeout
+    """
+    connected = {}
+
+    def answers():
+        control = BridgeControl(path)
+        try:
+            control.stats()
+        except (OSError, ValueError):
+            control.close()
+            return False
+        connected["control"] = control
+        return True
+
+    if wait_until(answers, timeout=timeout, watch_dir=os.path.dirname(os.path.abspath(path)),
+                  poll_interval=poll_interval):
+        return connected["control"]
+    return None
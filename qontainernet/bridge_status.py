@@ -0,0 +1,138 @@
+"""
+Host side of the bridge status.
+Bridges publish status.json on their log volume, the host waits for
+changes of the volume directory with inotify instead of polling
+the container shell. If inotify is not available it falls back to polling.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import time
+
+
+STATUS_FILE = "status.json"
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+class DirectoryWatcher:
+    """
+    Wakes up when a file in directory is created, written or moved in.
+    Uses inotify through libc, polls when inotify can't be used.
+    """
+
+    def __init__(self, directory, poll_interval=0.5):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.fd = fd
+        except (OSError, AttributeError) as e:
+            print(f"inotify not available ({e}), polling {directory}")
+
+    @property
+    def uses_inotify(self):
+        return self.fd is not None
+
+    def wait(self, timeout=None):
+        """
+        Waits for a change in the directory, at most timeout seconds.
+        Returns True if a change was seen, polling watcher returns False after sleeping.
+        """
+        if self.fd is None:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            return False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_status(path):
+    """
+    Returns published bridge status, None if there is none (yet)
+    """
+    try:
+        with open(path, "r") as status_file:
+            return json.load(status_file)
+    except (OSError, ValueError):
+        return None
+
+
+def wait_until(predicate, timeout=None, watch_dir=None, poll_interval=1):
+    """
+    Waits until predicate() returns True.
+    Predicate is checked again whenever something changes in watch_dir,
+    and at least every poll_interval seconds.
+    Returns False if timeout (seconds) expired first.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    watcher = DirectoryWatcher(watch_dir, poll_interval) if watch_dir is not None else None
+    try:
+        while True:
+            if predicate():
+                return True
+            wait_time = poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            if watcher is not None:
+                watcher.wait(wait_time)
+            else:
+                time.sleep(wait_time)
+    finally:
+        if watcher is not None:
+            watcher.close()
+
+
+def wait_for_status(path, predicate, timeout=None, poll_interval=1):
+    """
+    Waits until bridge status at path satisfies predicate(status).
+    Returns last status, or None on timeout.
+    """
+    last_status = {}
+
+    def status_matches():
+        status = read_status(path)
+        if status is None:
+            return False
+        last_status["status"] = status
+        return predicate(status)
+
+    if wait_until(status_matches, timeout, watch_dir=os.path.dirname(os.path.abspath(path)),
+                  poll_interval=poll_interval):
+        return last_status["status"]
+    return None
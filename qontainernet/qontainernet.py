@@ -7,19 +7,43 @@ import pathlib
 import time
 import datetime
 
+from bridge_status import wait_for_status, wait_until, read_status, STATUS_FILE
+from bridge_control import wait_for_control, CONTROL_SOCKET
+from traffic_control import TrafficControl, quantum_tree, classical_tree, token_bucket_tree
+
+#Packet trace of the C bridge on its log volume, aux.bridge_trace reads it
+TRACE_FILE = "trace.bin"
+
+#Packet log written by the threaded channel of bridge.py (working directory /app)
+PACKET_LOG = "/app/packet_logs.bin"
+PACKET_LOG_CSV = "/app/packet_logs.log"
+
 class NetworkNotStartedException(Exception):
     pass
 
+class BridgeNotReadyException(Exception):
+    pass
+
 class Qontainernet(Containernet):
     """
     Qontainernet is extension of Containernet
     It adds quantum links; Currently supports only one link
     """
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, name_prefix="", log_dir="./tmp", **kwargs):
+        """
+        name_prefix: prepended to bridge names, so networks can run side by side
+        log_dir: bridge log volumes, removed when the network is created
+        """
         super().__init__(*args, **kwargs)
         self.quantum_bridge_counter = 0
         self.started = False
-        self.log_dir = "./tmp"
+        self.name_prefix = name_prefix
+        self.log_dir = log_dir
+        #Status files of the bridges on the host side of their /logs volume
+        self.bridge_status_files = {}
+        #Control sockets of the C bridges on the host side of their /logs volume
+        self.bridge_control_sockets = {}
+        self.bridge_start_timeout = 300
         try:
             shutil.rmtree(self.log_dir)
         except OSError as e:
@@ -34,29 +58,30 @@ class Qontainernet(Containernet):
         """
         Makes existing interface behave like quantum link.
         Buffers can only work one way and can not be shared between connected interfaces.
+        ifce: interface name or list of names, all are configured with one tc -batch
+        Returns applied tc commands
         """
 
 
         base_rate = 0.4
-        peak_rate = 2
         buffer_size = 1024
 
 
         if node is not None:
-            node.cmd(f"tc qdisc del root dev {ifce}")
             #node.cmd(f"tc qdisc add dev {ifce} root tbf rate {2*base_rate}mbit latency {latency}ms")
-            node.cmd(f"tc qdisc add dev {ifce} root handle 1: htb default 2")
-            node.cmd(f"tc class add dev {ifce} parent 1:1 classid 1:6 htb rate 0.5mbit ceil 1.5mbit burst 5mbit")
-
+            trees = [classical_tree(dev) for dev in self._interface_list(ifce)]
         else:
-            os.system(f"tc qdisc del root dev {ifce}")
-            os.system(f"tc qdisc add dev {ifce} root tbf rate {base_rate}mbit burst {buffer_size}kb latency 10ms")
+            trees = [token_bucket_tree(dev, rate=base_rate, burst=buffer_size*1024, latency=10)
+                     for dev in self._interface_list(ifce)]
+        return TrafficControl(node).configure(trees)
 
     def quantum_interface(self, ifce, node=None, base_rate=1, peak_rate=2,
                           e_buffer_size=10, c_buffer_size = 1):
         """
         Makes existing interface behave like quantum link.
         Buffers can only work one way and can not be shared between connected interfaces.
+        ifce: interface name or list of names, all are configured with one tc -batch
+        Returns applied tc commands
         """
         if not self.started:
             raise NetworkNotStartedException("Network must be started before configuring this interface")
@@ -71,95 +96,113 @@ class Qontainernet(Containernet):
 
 
 
-        commands = [
-            f"tc qdisc del root dev {ifce}", #REMOVE EXISTING TRAFFIC CONTROL RULES
-            f"tc qdisc add dev {ifce} root handle 1: htb default 1",
-            f"tc class add dev {ifce} parent 1:0 classid 1:1 htb rate {base_rate}mbit ceil {peak_rate}mbit burst {e_buffer_size}mbit",
-            f"tc qdisc add dev {ifce} parent 1:1 handle 2:1 bfifo limit {c_buffer_size}",
-            f"tc filter add dev {ifce} parent 1: matchall classid 2:1"
-        ]
-
-
-        if node is not None:
-            for cmd in commands:
-                node.cmd(cmd)
-        else:
-            for cmd in commands:
-                cmd = "sudo " + cmd
-                result = subprocess.run(cmd.split(" "), stdout=subprocess.PIPE)
-                #print(result.stdout)
-                #ret = os.system(cmd)
-                #print(ret)
+        #Only the difference to the current configuration is applied, queues are kept
+        trees = [quantum_tree(dev, base_rate=base_rate, peak_rate=peak_rate,
+                              e_buffer_size=e_buffer_size, c_buffer_size=c_buffer_size)
+                 for dev in self._interface_list(ifce)]
+        return TrafficControl(node).configure(trees)
 
+    def _interface_list(self, ifce):
         """
-        if node is not None:
-            node.cmd(f"tc qdisc del root dev {ifce}")
-            #node.cmd(f"tc qdisc add dev {ifce} root tbf rate {base_rate}mbit burst {buffer_size}kb latency {latency}ms peakrate {peak_rate}mbit mtu 1540")
-            node.cmd(f"tc qdisc add dev {ifce} root handle 1: htb default 6")
-            node.cmd(f"tc class add dev {ifce} parent 1:1 classid 1:6 htb rate {base_rate}mbit ceil {peak_rate}mbit burst {buffer_size}mbit")
-        else:
-            os.system(f"tc qdisc del root dev {ifce}")
-            os.system(f"tc qdisc add dev {ifce} root handle 1: htb default 6")
-            os.system(f"tc class add dev {ifce} parent 1: classid 1:1 htb rate {base_rate}mbit ceil {peak_rate}mbit burst {buffer_size}mbit")
-            os.system(f"tc qdisc add dev {ifce} parent 1:1 handle 1:6 bfifo limit 1mbit")
+        Interface name or list of names -> list of names
+        PRIVATE METHOD
         """
-
-
+        if isinstance(ifce, str):
+            return [ifce]
+        return list(ifce)
 
     def efficient_quantum_link(self, node_1, node_2, link_ip_address:str,
                                epr_frame_size = 10000, # qubytes
                                epr_buffer_size = 250000, #qubytes
                                sleep_time = 500000000, #in nano seconds
                                single_transmission_duration = 1000, # In nanoseconds 1000ns -> 1mbit/s
-                               classical_buffer_size = 2500 # In packets
+                               classical_buffer_size = 2500, # In packets
+                               trace_records = None, # Packets traced in the bridge, no tracing if None
+                               bidirectional = False, # Packets from node_2 to node_1 cross the link too
+                               shared_epr_pool = True # Directions draw from one EPR buffer
                                ):
+        """
+        Adds quantum link simulated by the C bridge
+        trace_records: the bridge keeps a trace of the last trace_records packets,
+        dump_bridge_trace writes it to its log volume
+        bidirectional: node_2 -> node_1 is a second direction of the link (e.g. TCP ACKs),
+        with its own classical buffer and transmission queue; direction 0 is node_1 -> node_2
+        shared_epr_pool: both directions draw from one EPR buffer, otherwise each has its own of epr_buffer_size
+        """
 
         print(f"EPR FRAME SIZE = {epr_frame_size}")
         print(f"EPR BUFFER SIZE= {epr_buffer_size}")
         print(f"sleep time = {sleep_time}")
         print(f"classical Buffer size= {classical_buffer_size}")
 
+        bridge = self._create_efficient_bridge(node_1, node_2, link_ip_address)
+        commands = self._efficient_bridge_commands(bridge, node_1, node_2, link_ip_address,
+                                                   epr_frame_size, epr_buffer_size, sleep_time,
+                                                   single_transmission_duration, classical_buffer_size,
+                                                   trace_records, bidirectional, shared_epr_pool)
+        self._run_batched(bridge, commands)
+        return bridge
+
+    def _create_efficient_bridge(self, node_1, node_2, link_ip_address):
+        """
+        Creates C bridge container with its log volume and links it to both nodes,
+        the control socket of the bridge is on the volume
+        PRIVATE METHOD
+        """
+        q_link_dir = self.log_dir+"/bridge_c"+str(self.quantum_bridge_counter)
+        abs_dir = str(str(pathlib.Path().absolute()) + q_link_dir.replace("./","/"))
+        os.mkdir(q_link_dir)
+
         bridge = self.addDockerHost(
-            "bridge"+str(self.quantum_bridge_counter),
+            self.name_prefix+"bridge"+str(self.quantum_bridge_counter),
             dimage=f"quantum_bridge_c:latest",
             ip=link_ip_address,
             docker_args={
                 "hostname": "quantum_bridge",
+                "volumes": {f"{abs_dir}": {"bind": "/logs", "mode": "rw"}},
             },
         )
+        self.quantum_bridge_counter = self.quantum_bridge_counter + 1
+        self.bridge_control_sockets[bridge.name] = os.path.join(abs_dir, CONTROL_SOCKET)
 
         bridgeName = bridge.name
         name1 = node_1.name
         name2 = node_2.name
 
-        gw = link_ip_address.split('/')[0].split('.')
-        gw[-1]='1'
-        gw = '.'.join(gw)
-
         self.addLink(node_1, bridge, bw=10, delay="0ms",
                      intfName1=f"{name1}-{bridgeName}",
                      intfName2=f"{bridgeName}-{name1}")
         self.addLink(node_2, bridge, bw=10, delay="0ms",
                      intfName1=f"{name2}-{bridgeName}",
                      intfName2=f"{bridgeName}-{name2}")
+        return bridge
 
-        bridge.cmd(f"ip addr flush dev {bridgeName}-{name1}")
-        bridge.cmd(f"ip addr flush dev {bridgeName}-{name2}")
-        bridge.cmd("brctl addbr bridge")
-        bridge.cmd(f"brctl addif bridge {bridgeName}-{name1}")
-        bridge.cmd(f"brctl addif bridge {bridgeName}-{name2}")
-        bridge.cmd("ip link set dev bridge up")
-        bridge.cmd(f"ip addr add {link_ip_address} brd + dev bridge")
-        bridge.cmd(f"route add default gw {gw} dev bridge")
-
-
-        bridge.cmd(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name1} -j NFQUEUE --queue-num 0 --queue-bypass")
-    
+    def _efficient_bridge_commands(self, bridge, node_1, node_2, link_ip_address,
+                                   epr_frame_size, epr_buffer_size, sleep_time,
+                                   single_transmission_duration, classical_buffer_size, trace_records=None,
+                                   bidirectional=False, shared_epr_pool=True):
+        """
+        Shell commands that configure and start the C bridge,
+        packets entering from node_1 go to queue 0, from node_2 to queue 1
+        PRIVATE METHOD
+        """
+        bridgeName = bridge.name
+        names = [node_1.name, node_2.name] if bidirectional else [node_1.name]
+        commands = self._bridge_setup_commands(bridge, node_1, node_2, link_ip_address)
+        for n, name in enumerate(names):
+            commands.append(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name} -j NFQUEUE --queue-num {n} --queue-bypass")
 
         #Start the bridge
-
-        print(f"tmux new-session -d -s bridge './bridge {epr_frame_size} {epr_buffer_size} {sleep_time} {single_transmission_duration} {classical_buffer_size}' &")
-        bridge.cmd(f"tmux new-session -d -s bridge './bridge {epr_frame_size} {epr_buffer_size} {sleep_time} {single_transmission_duration} {classical_buffer_size}' &")
+        trace_args = f"-t /logs/{TRACE_FILE} -r {trace_records} " if trace_records else ""
+        queue_args = f"-q {','.join(str(n) for n in range(len(names)))} "
+        if not shared_epr_pool:
+            queue_args += "-p "
+        start_command = (f"tmux new-session -d -s bridge './bridge -c /logs/{CONTROL_SOCKET} {trace_args}{queue_args}"
+                         f"{epr_frame_size} {epr_buffer_size} {sleep_time} {int(single_transmission_duration)} "
+                         f"{classical_buffer_size}'")
+        print(start_command)
+        commands.append(start_command)
+        return commands
 
     def add_quantum_link(self, node_1, node_2,
                          link_ip_address: str,
@@ -171,6 +214,8 @@ class Qontainernet(Containernet):
                          docker_bridge="quantum_bridge",
                          epr_frame_size=20,
                          classical_buffer_size=100,
+                         batched_frames=False,
+                         multi_queue=False,
                          ):
         """
         Adds quantum link in the folloving way:
@@ -180,8 +225,25 @@ class Qontainernet(Containernet):
         q_container
             ┌┴┐
         h1 -┘ └- h2
+
+        batched_frames: bridge passes packets through the channel as numpy bit arrays
+        multi_queue: bridge serves the queue of each direction with its own worker
         """
+        bridge = self._create_quantum_bridge(node_1, node_2, link_ip_address, bw=bw, delay=delay,
+                                             simple=simple, docker_bridge=docker_bridge)
+        self._run_batched(bridge, self._quantum_bridge_commands(bridge, node_1, node_2, link_ip_address,
+                                                                node_1_ip, node_2_ip))
+        self._set_link_ips(bridge, node_1, node_2, node_1_ip, node_2_ip)
+        self._start(docker_bridge ,bridge , epr_frame_size=epr_frame_size, simple=simple,
+                    batched_frames=batched_frames, queue_range=self._queue_range(multi_queue))
+        return bridge
 
+    def _create_quantum_bridge(self, node_1, node_2, link_ip_address, bw=100, delay="10ms",
+                               simple=False, docker_bridge="quantum_bridge"):
+        """
+        Creates bridge container with its log volume and links it to both nodes
+        PRIVATE METHOD
+        """
         br_type = ""
         if not simple:
             br_type = "qns"
@@ -196,7 +258,7 @@ class Qontainernet(Containernet):
         os.mkdir(q_link_dir)
 
         bridge = self.addDockerHost(
-            "br"+str(br_type)+str(self.quantum_bridge_counter),
+            self.name_prefix+"br"+str(br_type)+str(self.quantum_bridge_counter),
             dimage=f"{docker_bridge}:latest",
             ip=link_ip_address,
             docker_args={
@@ -205,6 +267,9 @@ class Qontainernet(Containernet):
             },
         )
         self.quantum_bridge_counter = self.quantum_bridge_counter + 1
+        #Only bridge.py publishes status.json, simple_bridge.py and the C bridge don't
+        if not simple and docker_bridge != "quantum_bridge_c":
+            self.bridge_status_files[bridge.name] = os.path.join(abs_dir, STATUS_FILE)
 
         bridgeName = bridge.name
         name1 = node_1.name
@@ -215,36 +280,48 @@ class Qontainernet(Containernet):
         self.addLink(node_2, bridge, bw=bw, delay=delay,
                      intfName1=f"{name2}-{bridgeName}",
                      intfName2=f"{bridgeName}-{name2}")
+        return bridge
 
-
+    def _bridge_setup_commands(self, bridge, node_1, node_2, link_ip_address):
+        """
+        Shell commands that join both bridge interfaces into a linux bridge
+        PRIVATE METHOD
+        """
         # SETTING KERNEL SETTINGS
         #h1.cmd("sysctl -w  net.ipv4.conf.all.rp_filter=0")
         #h2.cmd("sysctl -w  net.ipv4.conf.all.rp_filter=0")
         #h1.cmd("sysctl -w  net.ipv4.conf.default.rp_filter=0")
         #h2.cmd("sysctl -w  net.ipv4.conf.default.rp_filter=0")
         #h2.cmd("sysctl -w  net.ipv4.conf.h1-bridge.rp_filter=0")
-
+        bridgeName = bridge.name
+        name1 = node_1.name
+        name2 = node_2.name
 
         gw = link_ip_address.split('/')[0].split('.')
         gw[-1]='1'
         gw = '.'.join(gw)
 
-        bridge.cmd(f"ip addr flush dev {bridgeName}-{name1}")
-        bridge.cmd(f"ip addr flush dev {bridgeName}-{name2}")
-        bridge.cmd("brctl addbr bridge")
-        bridge.cmd(f"brctl addif bridge {bridgeName}-{name1}")
-        bridge.cmd(f"brctl addif bridge {bridgeName}-{name2}")
-        bridge.cmd("ip link set dev bridge up")
-        bridge.cmd(f"ip addr add {link_ip_address} brd + dev bridge")
-        bridge.cmd(f"route add default gw {gw} dev bridge")
-
-
-        if node_1_ip is not None:
-            node_1.setIP(node_1_ip, intf=f"{node_1.name}-{bridge.name}")
-
-        if node_2_ip is not None:
-            node_2.setIP(node_2_ip, intf=f"{node_2.name}-{bridge.name}")
+        return [
+            f"ip addr flush dev {bridgeName}-{name1}",
+            f"ip addr flush dev {bridgeName}-{name2}",
+            "brctl addbr bridge",
+            f"brctl addif bridge {bridgeName}-{name1}",
+            f"brctl addif bridge {bridgeName}-{name2}",
+            "ip link set dev bridge up",
+            f"ip addr add {link_ip_address} brd + dev bridge",
+            f"route add default gw {gw} dev bridge",
+        ]
 
+    def _quantum_bridge_commands(self, bridge, node_1, node_2, link_ip_address, node_1_ip, node_2_ip):
+        """
+        Shell commands that configure the bridge and its netfilter queues,
+        queue n gets packets from node_1, queue n+1 from node_2
+        PRIVATE METHOD
+        """
+        bridgeName = bridge.name
+        name1 = node_1.name
+        name2 = node_2.name
+        commands = self._bridge_setup_commands(bridge, node_1, node_2, link_ip_address)
         # bridge.cmd("nft add filter input counter queue num 1")
         # bridge.cmd("nft add table bridge custom")
         # bridge.cmd("nft add chain bridge custom
@@ -252,50 +329,192 @@ class Qontainernet(Containernet):
         #bridge.cmd(f"iptables -A FORWARD -i {bridgeName}-{name1} -p all -j NFQUEUE --queue-num 1")
         #bridge.cmd(f"iptables -A FORWARD -i {bridgeName}-{name2} -p all -j NFQUEUE --queue-num 2")
         n = 0
-        er = bridge.cmd(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name1} -j NFQUEUE --queue-num {n} --queue-bypass")
-        bridge.cmd(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name2} -j NFQUEUE --queue-num {n+1} --queue-bypass")
+        commands.append(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name1} -j NFQUEUE --queue-num {n} --queue-bypass")
+        commands.append(f"iptables -I FORWARD -m physdev --physdev-is-bridged --physdev-in {bridgeName}-{name2} -j NFQUEUE --queue-num {n+1} --queue-bypass")
+        commands.append(f"printf '%s\\n' '{node_1_ip}' '{node_2_ip}' > /app/hosts.txt")
+        return commands
 
-        bridge.cmd(f"echo '{node_1_ip}\n{node_2_ip}' > /app/hosts.txt")
-        self._start(docker_bridge ,bridge , epr_frame_size=epr_frame_size, simple=simple)
-        return bridge
+    def _queue_range(self, multi_queue):
+        """
+        Queues served by bridge.py workers, matches _quantum_bridge_commands
+        PRIVATE METHOD
+        """
+        if multi_queue:
+            return "0-1"
+        return None
+
+    def _set_link_ips(self, bridge, node_1, node_2, node_1_ip, node_2_ip):
+        """
+        Sets addresses of the node interfaces towards the bridge
+        PRIVATE METHOD
+        """
+        if node_1_ip is not None:
+            node_1.setIP(node_1_ip, intf=f"{node_1.name}-{bridge.name}")
+
+        if node_2_ip is not None:
+            node_2.setIP(node_2_ip, intf=f"{node_2.name}-{bridge.name}")
 
-    def _start(self, docker_bridge, bridge, epr_frame_size=100, epr_buffer_size=1000, sleep_time=5, single_transmission_delay=1, simple=False, classical_buffer_size=100):
+    def _run_batched(self, node, commands):
+        """
+        Runs commands in a single shell invocation of the node
+        PRIVATE METHOD
+        """
+        return node.cmd(" ; ".join(commands))
+
+    def _start(self, docker_bridge, bridge, epr_frame_size=100, epr_buffer_size=1000, sleep_time=5, single_transmission_delay=1, simple=False, classical_buffer_size=100,
+               batched_frames=False, queue_range=None):
         """
         Initiate bridge.py and wait until it's up and running
+        queue_range: netfilter queues served by per-queue workers (e.g. "0-1")
+        PRIVATE METHOD
+        """
+        bridge.cmd(self._start_command(docker_bridge, epr_frame_size=epr_frame_size, epr_buffer_size=epr_buffer_size,
+                                       sleep_time=sleep_time, single_transmission_delay=single_transmission_delay,
+                                       simple=simple, classical_buffer_size=classical_buffer_size,
+                                       batched_frames=batched_frames, queue_range=queue_range))
+        self._wait_for_bridge(docker_bridge, bridge, simple=simple)
+
+    def _start_command(self, docker_bridge, epr_frame_size=100, epr_buffer_size=1000, sleep_time=5, single_transmission_delay=1, simple=False, classical_buffer_size=100,
+                       batched_frames=False, queue_range=None):
+        """
+        Shell command that starts the bridge process in tmux
         PRIVATE METHOD
         """
-        if docker_bridge is "quantum_bridge_c":
-            bridge.cmd(f"tmux new-session -d -s bridge './bridge {epr_frame_size} {epr_buffer_size} {sleep_time} {single_transmission_delay}' &")
+        if docker_bridge == "quantum_bridge_c":
+            return f"tmux new-session -d -s bridge './bridge {epr_frame_size} {epr_buffer_size} {sleep_time} {single_transmission_delay}' &"
         elif simple:
-            bridge.cmd("tmux new-session -d -s bridge 'python simple_bridge.py' &")
-        else:
-            bridge.cmd(f"tmux new-session -d -s bridge 'python bridge.py {epr_frame_size} {classical_buffer_size}' &")
-
-        is_up = False
+            return "tmux new-session -d -s bridge 'python simple_bridge.py' &"
+        queue_arg = f" {queue_range}" if queue_range is not None else ""
+        return f"tmux new-session -d -s bridge 'python bridge.py {epr_frame_size} {classical_buffer_size} {int(batched_frames)}{queue_arg}' &"
 
+    def _wait_for_bridge(self, docker_bridge, bridge, simple=False):
+        """
+        Waits until bridge process signals it's running
+        PRIVATE METHOD
+        """
         info("\n*** Waiting for quantum bridge to initiate\n")
-        if docker_bridge is "quantum_bridge_c":
-            is_up = True
-        while not is_up :
-            if "log.txt" in bridge.cmd("ls /app/"):
-                is_up = True
+        if docker_bridge != "quantum_bridge_c":
+            #simple_bridge.py only signals readiness with log.txt
+            status_file = self.bridge_status_files.get(bridge.name)
+            if status_file is not None:
+                is_up = wait_for_status(status_file, lambda status: status.get("ready"),
+                                        timeout=self.bridge_start_timeout) is not None
+            else:
+                is_up = self.wait_until(lambda: "log.txt" in bridge.cmd("ls /app/"),
+                                        timeout=self.bridge_start_timeout)
+            if not is_up:
+                raise BridgeNotReadyException(f"{bridge.name} did not start in {self.bridge_start_timeout}s")
         info("*** Bridge initiated\n")
 
-    def wait_for_number_of_packets_transmitted(self, bridge, target_count):
-        """
-        Waiting for enough packets to be transmitted through a bridge
-        """
-        count = int(bridge.cmd("wc -l packet_logs.log").split(" ")[0])
-        time.sleep(1)
-        next_print = 0
-        while count < target_count:
-            #print(bridge.cmd("tail packet_logs.log"))
-            count = int(bridge.cmd("wc -l packet_logs.log").split(" ")[0])
-            #if (count-1) > next_print:
-            c_string = '{:4d}'.format(count-1)
-            print(f"{c_string} packets have been processed at {datetime.datetime.now()}")
-            #    next_print = next_print + 10
-            time.sleep(10)
+    def wait_for_number_of_packets_transmitted(self, bridge, target_count, timeout=None):
+        """
+        Waiting for enough packets to be transmitted through a bridge,
+        wakes up whenever the bridge publishes new counters,
+        polls the packet count if the bridge has not published any
+        Returns False if timeout expired first
+        """
+        progress = {"count": -1}
+
+        def enough_packets():
+            count = self.number_of_packets_transmitted(bridge)
+            if count != progress["count"]:
+                progress["count"] = count
+                c_string = '{:4d}'.format(count)
+                print(f"{c_string} packets have been processed at {datetime.datetime.now()}")
+            return count >= target_count
+
+        status_file = self.bridge_status_files.get(bridge.name)
+        if status_file is not None and read_status(status_file) is not None:
+            return wait_for_status(status_file, lambda status: enough_packets(), timeout=timeout) is not None
+        return self.wait_until(enough_packets, timeout=timeout, poll_interval=10)
+
+    def wait_until(self, predicate, timeout=None, watch_dir=None, poll_interval=1):
+        """
+        Waits until predicate() returns True, checks it again whenever
+        something changes in watch_dir and at least every poll_interval seconds
+        Returns False if timeout expired first
+        """
+        return wait_until(predicate, timeout=timeout, watch_dir=watch_dir, poll_interval=poll_interval)
+
+    def bridge_control(self, bridge, timeout=None):
+        """
+        Returns BridgeControl connected to a C bridge (efficient_quantum_link),
+        waits up to timeout seconds (bridge_start_timeout by default) for the bridge to answer
+        """
+        path = self.bridge_control_sockets.get(bridge.name)
+        if path is None:
+            raise BridgeNotReadyException(f"{bridge.name} has no control socket")
+        if timeout is None:
+            timeout = self.bridge_start_timeout
+        control = wait_for_control(path, timeout=timeout)
+        if control is None:
+            raise BridgeNotReadyException(f"{bridge.name} did not answer on {path} in {timeout}s")
+        return control
+
+    def efficient_bridge_stats(self, bridge):
+        """
+        Counters of a C bridge: packets, bytes, superdense, sequential, mixed,
+        drops, epr_level, queue_length, delay_total, ... of all directions,
+        "links" holds them per direction (see BridgeControl.stats)
+        """
+        with self.bridge_control(bridge) as control:
+            return control.stats()
+
+    def configure_efficient_bridge(self, bridge, direction=None, **params):
+        """
+        Changes parameters of a running C bridge, keys are the arguments of efficient_quantum_link
+        (single_transmission_duration, classical_buffer_size) or bridge parameter names
+        direction: 0 (node_1 -> node_2) or 1 (node_2 -> node_1) of a bidirectional link, both if None
+        """
+        names = {"single_transmission_duration": "single_transmission_delay",
+                 "classical_buffer_size": "buffer_size"}
+        with self.bridge_control(bridge) as control:
+            control.set(link=direction, **{names.get(key, key): value for key, value in params.items()})
+
+    def dump_bridge_trace(self, bridge, timeout=10):
+        """
+        Signals a C bridge started with trace_records to write its trace,
+        returns host path of the trace file once it was written
+        """
+        path = os.path.join(os.path.dirname(self.bridge_control_sockets[bridge.name]), TRACE_FILE)
+
+        def modified_time():
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+
+        previous = modified_time()
+        bridge.cmd("pkill -USR1 -x bridge")
+        if not wait_until(lambda: modified_time() not in (None, previous), timeout=timeout,
+                          watch_dir=os.path.dirname(path)):
+            raise BridgeNotReadyException(f"{bridge.name} did not write {path} in {timeout}s")
+        return path
+
+    def number_of_packets_transmitted(self, bridge):
+        """
+        Returns number of packets the bridge has logged,
+        from the control socket of a C bridge, its published status
+        or from the header of its binary packet log
+        """
+        if bridge.name in self.bridge_control_sockets:
+            return self.efficient_bridge_stats(bridge)["packets"]
+        status_file = self.bridge_status_files.get(bridge.name)
+        if status_file is not None:
+            status = read_status(status_file)
+            if status is not None and "packets" in status:
+                return status["packets"]
+        count = bridge.cmd(f"od -An -t u8 -j 16 -N 8 {PACKET_LOG}").strip()
+        if not count.isdigit():
+            return 0
+        return int(count)
+
+    def export_packet_log(self, bridge, dest=PACKET_LOG_CSV):
+        """
+        Exports the bridge's binary packet log to the comma separated format,
+        inside the bridge container
+        """
+        bridge.cmd(f"python -m quantum_bridge.packet_log export {PACKET_LOG} {dest}")
 
     def extract_data(self, bridge ,src:str, dest:str):
         """
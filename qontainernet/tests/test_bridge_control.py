@@ -0,0 +1,96 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from bridge_control import BridgeControl, BridgeControlException, wait_for_control
+
+
+class FakeBridge:
+    """ Answers control requests like link_group_control_handler """
+
+    def __init__(self, path):
+        self.params = {"epr_frame_size": 10000, "buffer_size": 2500}
+        self.requests = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(1)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def reply(self, line):
+        self.requests.append(line)
+        fields = line.split()
+        if fields[:1] == ["link"]:
+            if fields[1:2] != ["1"]:
+                return {"ok": False, "error": "no link"}
+            fields = fields[2:]
+        if fields == ["stats"]:
+            return dict(ok=True, packets=len(self.requests), **self.params)
+        if len(fields) == 3 and fields[0] == "set" and fields[1] in self.params:
+            self.params[fields[1]] = int(fields[2])
+            return {"ok": True}
+        return {"ok": False, "error": "unknown request"}
+
+    def serve(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return
+            with client, client.makefile("rwb") as stream:
+                for line in stream:
+                    stream.write(json.dumps(self.reply(line.decode().strip())).encode() + b"\n")
+                    stream.flush()
+
+    def close(self):
+        self.server.close()
+
+
+class TestBridgeControl(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "control.sock")
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.log_dir.cleanup()
+
+    def test_stats_and_set_on_one_connection(self):
+        bridge = FakeBridge(self.path)
+        with BridgeControl(self.path) as control:
+            self.assertEqual(control.stats(), {"packets": 1, "epr_frame_size": 10000, "buffer_size": 2500})
+            control.set(epr_frame_size=20000.0, buffer_size=10)
+            self.assertEqual(control.stats()["epr_frame_size"], 20000)
+        self.assertEqual(bridge.requests, ["stats", "set epr_frame_size 20000", "set buffer_size 10", "stats"])
+        bridge.close()
+
+    def test_requests_for_one_direction(self):
+        bridge = FakeBridge(self.path)
+        with BridgeControl(self.path) as control:
+            control.set(link=1, buffer_size=10)
+            self.assertEqual(control.link_stats(1)["buffer_size"], 10)
+            with self.assertRaises(BridgeControlException):
+                control.link_stats(2)
+        self.assertEqual(bridge.requests[:2], ["link 1 set buffer_size 10", "link 1 stats"])
+        bridge.close()
+
+    def test_rejected_requests(self):
+        bridge = FakeBridge(self.path)
+        with BridgeControl(self.path) as control:
+            with self.assertRaises(BridgeControlException):
+                control.set(rate=1)
+            with self.assertRaises(BridgeControlException):
+                control.request("reboot")
+        bridge.close()
+
+    def test_wait_for_control(self):
+        self.assertIsNone(wait_for_control(self.path, timeout=0.1, poll_interval=0.02))
+        threading.Timer(0.05, FakeBridge, args=(self.path,)).start()
+        control = wait_for_control(self.path, timeout=5, poll_interval=1)
+        self.assertIsNotNone(control)
+        self.assertEqual(control.stats()["packets"], 2)
+        control.close()
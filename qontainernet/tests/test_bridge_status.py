@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from bridge_status import DirectoryWatcher, read_status, wait_until, wait_for_status
+
+
+def write_status(path, status):
+    with open(path + ".tmp", "w") as status_file:
+        json.dump(status, status_file)
+    os.replace(path + ".tmp", path)
+
+
+class TestBridgeStatus(unittest.TestCase):
+
+    # Runs before each test
+    def setUp(self) -> None:
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.log_dir.name, "status.json")
+
+    # Runs after each test
+    def tearDown(self) -> None:
+        self.log_dir.cleanup()
+
+    def test_read_status(self):
+        self.assertIsNone(read_status(self.path))
+        write_status(self.path, {"ready": True})
+        self.assertEqual(read_status(self.path), {"ready": True})
+
+    def test_wait_for_status_wakes_up_on_change(self):
+        with DirectoryWatcher(self.log_dir.name) as watcher:
+            uses_inotify = watcher.uses_inotify
+        for count in range(3):
+            threading.Timer(0.05 * (count + 1), write_status, args=(self.path, {"packets": count})).start()
+        start = time.monotonic()
+        status = wait_for_status(self.path, lambda status: status["packets"] >= 2, timeout=10,
+                                 poll_interval=5 if uses_inotify else 0.05)
+        self.assertEqual(status, {"packets": 2})
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_wait_until_timeout(self):
+        start = time.monotonic()
+        self.assertFalse(wait_until(lambda: False, timeout=0.1, poll_interval=0.02))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(wait_for_status(self.path, lambda status: True, timeout=0.1) is not None)
+
+    def test_wait_until_predicate(self):
+        results = iter([False, False, True])
+        self.assertTrue(wait_until(lambda: next(results), timeout=1, poll_interval=0.01))
@@ -0,0 +1,157 @@
+import threading
+import time
+import unittest
+from topology import QuantumTopology, PHASES
+
+
+class FakeNode:
+
+    def __init__(self, name):
+        self.name = name
+        self.commands = []
+        self.ips = []
+
+    def cmd(self, command):
+        self.commands.append(command)
+        return ""
+
+    def setIP(self, ip, intf=None):
+        self.ips.append((ip, intf))
+
+
+class FakeNet:
+    """
+    Records calls the topology makes, configure/wait take `delay` seconds
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.started = False
+        self.bridge_counter = 0
+        self.calls = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.efficient_options = []
+
+    def start(self):
+        self.calls.append("start")
+        self.started = True
+
+    def _create_quantum_bridge(self, node_1, node_2, link_ip_address, bw=100, delay="10ms",
+                               simple=False, docker_bridge="quantum_bridge"):
+        self.calls.append("create")
+        bridge = FakeNode(f"brqns{self.bridge_counter}")
+        self.bridge_counter += 1
+        return bridge
+
+    def _create_efficient_bridge(self, node_1, node_2, link_ip_address):
+        self.calls.append("create_efficient")
+        bridge = FakeNode(f"bridge{self.bridge_counter}")
+        self.bridge_counter += 1
+        return bridge
+
+    def _quantum_bridge_commands(self, bridge, node_1, node_2, link_ip_address, node_1_ip, node_2_ip):
+        return [f"configure {link_ip_address}", f"hosts {node_1_ip} {node_2_ip}"]
+
+    def _efficient_bridge_commands(self, bridge, node_1, node_2, link_ip_address, *args, **kwargs):
+        self.efficient_options.append(kwargs)
+        return [f"configure {link_ip_address}", "./bridge"]
+
+    def _run_batched(self, node, commands):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return node.cmd(" ; ".join(commands))
+
+    def _set_link_ips(self, bridge, node_1, node_2, node_1_ip, node_2_ip):
+        if node_1_ip is not None:
+            node_1.setIP(node_1_ip, intf=f"{node_1.name}-{bridge.name}")
+        if node_2_ip is not None:
+            node_2.setIP(node_2_ip, intf=f"{node_2.name}-{bridge.name}")
+
+    def _queue_range(self, multi_queue):
+        return "0-1" if multi_queue else None
+
+    def _start_command(self, docker_bridge, **kwargs):
+        return f"start {docker_bridge} {kwargs['queue_range']}"
+
+    def _wait_for_bridge(self, docker_bridge, bridge, simple=False):
+        time.sleep(self.delay)
+        bridge.cmd("ready")
+
+
+class TestQuantumTopology(unittest.TestCase):
+
+    def test_build_ring(self):
+        net = FakeNet(delay=0.2)
+        switches = [FakeNode(f"s{i}") for i in range(4)]
+        topology = QuantumTopology(net, max_workers=4)
+        for i in range(4):
+            topology.add_quantum_link(switches[i], switches[(i + 1) % 4], f"11.0.0.10{i}/24",
+                                      node_1_ip=f"10.0.{i}.1/24", node_2_ip=f"10.0.{i}.2/24",
+                                      multi_queue=(i == 0))
+        start_time = time.monotonic()
+        bridges = topology.build()
+        duration = time.monotonic() - start_time
+
+        self.assertEqual(net.calls, ["create"] * 4 + ["start"])
+        self.assertEqual([bridge.name for bridge in bridges], ["brqns0", "brqns1", "brqns2", "brqns3"])
+        #All bridges were configured at the same time
+        self.assertEqual(net.max_active, 4)
+        self.assertLess(duration, 4 * 2 * 0.2)
+        #One shell invocation for the configuration, one for the start
+        self.assertEqual(bridges[0].commands,
+                         ["configure 11.0.0.100/24 ; hosts 10.0.0.1/24 10.0.0.2/24",
+                          "start quantum_bridge 0-1", "ready"])
+        self.assertEqual(bridges[1].commands[1], "start quantum_bridge None")
+        #Switch shared by two links got both addresses
+        self.assertEqual(switches[1].ips, [("10.0.0.2/24", "s1-brqns0"), ("10.0.1.1/24", "s1-brqns1")])
+        self.assertEqual(sorted(topology.timings), sorted(PHASES))
+        self.assertIn("4 links", topology.report())
+
+    def test_create_before_start(self):
+        net = FakeNet()
+        topology = QuantumTopology(net)
+        h1, h2 = FakeNode("h1"), FakeNode("h2")
+        topology.add_efficient_quantum_link(h1, h2, "11.0.0.101/24")
+        topology.create()
+        self.assertEqual(topology.bridges()[0].name, "bridge0")
+        with self.assertRaises(ValueError):
+            topology.add_quantum_link(h1, h2, "11.0.0.102/24")
+        net.started = True
+        topology.build()
+        self.assertNotIn("start", net.calls)
+        self.assertEqual(net.calls, ["create_efficient"])
+        self.assertEqual(topology.bridges()[0].commands, ["configure 11.0.0.101/24 ; ./bridge"])
+
+    def test_efficient_link_options(self):
+        net = FakeNet()
+        topology = QuantumTopology(net)
+        h1, h2 = FakeNode("h1"), FakeNode("h2")
+        topology.add_efficient_quantum_link(h1, h2, "11.0.0.101/24")
+        topology.add_efficient_quantum_link(h1, h2, "11.0.0.102/24", trace_records=1024, bidirectional=True,
+                                            shared_epr_pool=False)
+        topology.build()
+        self.assertCountEqual(net.efficient_options,
+                              [dict(trace_records=None, bidirectional=False, shared_epr_pool=True),
+                               dict(trace_records=1024, bidirectional=True, shared_epr_pool=False)])
+
+    def test_error_is_raised(self):
+        net = FakeNet()
+
+        def fail(docker_bridge, bridge, simple=False):
+            raise RuntimeError(f"{bridge.name} did not start")
+
+        net._wait_for_bridge = fail
+        topology = QuantumTopology(net)
+        topology.add_quantum_link(FakeNode("h1"), FakeNode("h2"), "11.0.0.101/24")
+        with self.assertRaises(RuntimeError):
+            topology.build()
+
+
+if __name__ == '__main__':
+    unittest.main()
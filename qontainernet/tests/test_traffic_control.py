@@ -0,0 +1,123 @@
+import unittest
+from traffic_control import (TrafficControl, TrafficControlException, InterfaceState, parse_class_line,
+                             parse_query_output, parse_state, diff, query_script, batch_script,
+                             quantum_tree, classical_tree, token_bucket_tree, mbit_rate, mbit_size)
+
+
+#Outputs of iproute2 6.1
+QUANTUM_QDISCS = ('[{"kind":"htb","handle":"1:","dev":"h1-s1","root":true,"refcnt":2,'
+                  '"options":{"r2q":10,"default":"0x1","direct_packets_stat":0,"direct_qlen":1000}},'
+                  '{"kind":"bfifo","handle":"2:","dev":"h1-s1","parent":"1:1","options":{"limit":125000}},'
+                  '{"kind":"noqueue","handle":"0:","dev":"h2-s1","root":true,"refcnt":2,"options":{}},'
+                  '{"kind":"ingress","handle":"ffff:","dev":"h1-s1","parent":"ffff:fff1","options":{}}]')
+QUANTUM_CLASSES = "class htb 1:1 root leaf 2: prio 0 rate 1Mbit ceil 2Mbit burst 1280Kb cburst 1600b \n"
+
+
+class FakeNode:
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.scripts = []
+
+    def cmd(self, script):
+        self.scripts.append(script)
+        return self.outputs.pop(0)
+
+
+def query_output(qdiscs, classes):
+    output = "### qdisc\r\n" + qdiscs + "\r\n"
+    for dev, class_output in classes.items():
+        output += f"### class {dev}\r\n" + class_output
+    return output
+
+
+class TestTrafficControl(unittest.TestCase):
+
+    def test_render_quantum_tree(self):
+        tree = quantum_tree("h1-s1", base_rate=1, peak_rate=2, e_buffer_size=10, c_buffer_size=125000)
+        self.assertEqual(diff(tree, InterfaceState("h1-s1")), [
+            "qdisc replace dev h1-s1 root handle 1: htb default 1",
+            "class add dev h1-s1 parent 1: classid 1:1 htb rate 125000bps ceil 250000bps burst 1310720b",
+            "qdisc add dev h1-s1 parent 1:1 handle 2: bfifo limit 125000b",
+        ])
+        self.assertEqual(mbit_rate(0.4), 50000)
+        self.assertEqual(mbit_size(10), 1310720)
+
+    def test_parse_class_line(self):
+        tc_class = parse_class_line(QUANTUM_CLASSES)
+        self.assertEqual(tc_class.classid, "1:1")
+        self.assertEqual(tc_class.parent, "1:")
+        self.assertEqual(tc_class.params, {"rate": 125000, "ceil": 250000, "burst": 1310720, "cburst": 1600})
+        tc_class = parse_class_line("class htb 1:6 parent 1:1 prio 0 rate 987656bit ceil 8Kbit burst 1309999b/1 mpu 0b")
+        self.assertEqual(tc_class.parent, "1:1")
+        self.assertEqual(tc_class.params["rate"], 987656 / 8)
+        self.assertEqual(tc_class.params["burst"], 1309999)
+        self.assertIsNone(parse_class_line("Error: Cannot find device"))
+
+    def test_unchanged_interface(self):
+        states = parse_state(QUANTUM_QDISCS, {"h1-s1": QUANTUM_CLASSES})
+        self.assertEqual(diff(quantum_tree("h1-s1"), states["h1-s1"]), [])
+
+    def test_rate_change_keeps_queues(self):
+        states = parse_state(QUANTUM_QDISCS, {"h1-s1": QUANTUM_CLASSES})
+        commands = diff(quantum_tree("h1-s1", base_rate=1.5, c_buffer_size=50000), states["h1-s1"])
+        self.assertEqual(commands, [
+            "class change dev h1-s1 parent 1: classid 1:1 htb rate 187500bps ceil 250000bps burst 1310720b",
+            "qdisc change dev h1-s1 parent 1:1 handle 2: bfifo limit 50000b",
+        ])
+
+    def test_root_change(self):
+        states = parse_state(QUANTUM_QDISCS, {"h1-s1": QUANTUM_CLASSES, "h2-s1": ""})
+        #htb can't change its default class, tree is recreated
+        commands = diff(classical_tree("h1-s1"), states["h1-s1"])
+        self.assertEqual(commands[:2], ["qdisc del dev h1-s1 root", "qdisc add dev h1-s1 root handle 1: htb default 2"])
+        self.assertEqual(len(commands), 3)
+        #Default root qdisc is replaced
+        self.assertEqual(diff(token_bucket_tree("h2-s1"), states["h2-s1"]),
+                         ["qdisc replace dev h2-s1 root handle 1: tbf rate 50000bps burst 1048576b latency 10ms"])
+
+    def test_tbf_change(self):
+        qdiscs = ('[{"kind":"tbf","handle":"1:","dev":"eth0","root":true,"refcnt":2,'
+                  '"options":{"rate":50000,"burst":1048576,"lat":10000}}]')
+        states = parse_state(qdiscs, {"eth0": "class tbf 1:1 parent 1: \n"})
+        self.assertEqual(diff(token_bucket_tree("eth0"), states["eth0"]), [])
+        self.assertEqual(diff(token_bucket_tree("eth0", rate=0.8), states["eth0"]),
+                         ["qdisc change dev eth0 root handle 1: tbf rate 100000bps burst 1048576b latency 10ms"])
+
+    def test_extra_classes_are_removed(self):
+        classes = (QUANTUM_CLASSES + "class htb 1:6 parent 1:1 prio 0 rate 8Kbit ceil 8Kbit burst 1600b cburst 1600b\n"
+                   + "class htb 1:7 parent 1:6 prio 0 rate 8Kbit ceil 8Kbit burst 1600b cburst 1600b\n")
+        states = parse_state(QUANTUM_QDISCS, {"h1-s1": classes})
+        self.assertEqual(diff(quantum_tree("h1-s1"), states["h1-s1"]),
+                         ["class del dev h1-s1 classid 1:7", "class del dev h1-s1 classid 1:6"])
+
+    def test_configure_many_interfaces(self):
+        output = query_output(QUANTUM_QDISCS, {"h1-s1": QUANTUM_CLASSES, "h2-s1": ""})
+        node = FakeNode([output, ""])
+        commands = TrafficControl(node).configure([quantum_tree("h1-s1"), quantum_tree("h2-s1")])
+        #One invocation reads the state, one tc -batch applies changes of h2-s1 only
+        self.assertEqual(node.scripts[0], query_script(["h1-s1", "h2-s1"]))
+        self.assertEqual(len(commands), 3)
+        self.assertTrue(all("h2-s1" in command for command in commands))
+        self.assertEqual(node.scripts[1], batch_script(commands))
+        self.assertTrue(node.scripts[1].endswith("| tc -batch - 2>&1"))
+
+        node = FakeNode([output])
+        self.assertEqual(TrafficControl(node).configure([quantum_tree("h1-s1")]), [])
+        self.assertEqual(len(node.scripts), 1)
+
+    def test_failed_batch(self):
+        node = FakeNode([query_output(QUANTUM_QDISCS, {"h2-s1": ""}),
+                         "RTNETLINK answers: Operation not supported\r\nCommand failed -:1\r\n"])
+        with self.assertRaises(TrafficControlException):
+            TrafficControl(node).configure([quantum_tree("h2-s1")])
+
+    def test_parse_query_output(self):
+        qdiscs, classes = parse_query_output(query_output("[]", {"a": "class htb 1:1 root\r\n", "b": ""}))
+        self.assertEqual(qdiscs.strip(), "[]")
+        self.assertEqual(set(classes), {"a", "b"})
+        self.assertEqual(classes["b"], "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+"""
+Declarative construction of multi-link quantum topologies.
+Quantum links are collected first and built together:
+    create    -> bridge containers and their links (serial, Containernet isn't thread safe)
+    start     -> network is started if it wasn't yet
+    configure -> every bridge is configured with one shell invocation, bridges in parallel
+    address   -> node addresses towards the bridges
+    launch    -> bridge processes are started, bridges in parallel
+    ready     -> waiting for all bridges to signal they're running, bridges in parallel
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+
+PHASES = ["create", "start", "configure", "address", "launch", "ready"]
+
+
+class _Link_spec:
+    """ _Link_spec
+    private class, arguments of one quantum link and the bridge built for it
+    """
+
+    def __init__(self, node_1, node_2, link_ip_address, efficient=False, **kwargs):
+        self.node_1 = node_1
+        self.node_2 = node_2
+        self.link_ip_address = link_ip_address
+        self.efficient = efficient
+        self.kwargs = kwargs
+        self.bridge = None
+
+
+class QuantumTopology:
+    """ QuantumTopology
+    -> Collects quantum links of a Qontainernet network
+    -> build() builds all of them, bridges are configured concurrently
+    -> Time spent in every phase is kept in timings
+    """
+
+    def __init__(self, net, max_workers=8):
+        """
+        Inits topology
+        net: Qontainernet the links are added to
+        max_workers: number of bridges configured at the same time
+        """
+        self.net = net
+        self.max_workers = max_workers
+        self.links = []
+        self.timings = {}
+        self.created = False
+
+    def add_quantum_link(self, node_1, node_2, link_ip_address: str,
+                         node_1_ip: str=None,
+                         node_2_ip: str=None,
+                         bw=100,
+                         delay="10ms",
+                         simple=False,
+                         docker_bridge="quantum_bridge",
+                         epr_frame_size=20,
+                         classical_buffer_size=100,
+                         batched_frames=False,
+                         multi_queue=False,
+                         ):
+        """
+        Records quantum link, arguments are the same as of Qontainernet.add_quantum_link
+        Returns index of the link, bridge is available after create() in bridges()
+
+        PUBLIC METHOD
+        """
+        return self._add(_Link_spec(node_1, node_2, link_ip_address,
+                                    node_1_ip=node_1_ip, node_2_ip=node_2_ip, bw=bw, delay=delay,
+                                    simple=simple, docker_bridge=docker_bridge,
+                                    epr_frame_size=epr_frame_size,
+                                    classical_buffer_size=classical_buffer_size,
+                                    batched_frames=batched_frames, multi_queue=multi_queue))
+
+    def add_efficient_quantum_link(self, node_1, node_2, link_ip_address: str,
+                                   epr_frame_size=10000,
+                                   epr_buffer_size=250000,
+                                   sleep_time=500000000,
+                                   single_transmission_duration=1000,
+                                   classical_buffer_size=2500,
+                                   trace_records=None,
+                                   bidirectional=False,
+                                   shared_epr_pool=True,
+                                   ):
+        """
+        Records C bridge link, arguments are the same as of Qontainernet.efficient_quantum_link
+
+        PUBLIC METHOD
+        """
+        return self._add(_Link_spec(node_1, node_2, link_ip_address, efficient=True,
+                                    epr_frame_size=epr_frame_size, epr_buffer_size=epr_buffer_size,
+                                    sleep_time=sleep_time,
+                                    single_transmission_duration=single_transmission_duration,
+                                    classical_buffer_size=classical_buffer_size, trace_records=trace_records,
+                                    bidirectional=bidirectional, shared_epr_pool=shared_epr_pool))
+
+    def _add(self, spec):
+        if self.created:
+            raise ValueError("Links can't be added after the topology was created")
+        self.links.append(spec)
+        return len(self.links) - 1
+
+    def bridges(self):
+        """
+        Returns bridge containers in the order links were added
+
+        PUBLIC METHOD
+        """
+        return [spec.bridge for spec in self.links]
+
+    def create(self):
+        """
+        Creates bridge containers and their links,
+        can be called before net.start() so other links can be added afterwards
+
+        PUBLIC METHOD
+        """
+        if self.created:
+            return
+        with self._phase("create"):
+            for spec in self.links:
+                if spec.efficient:
+                    spec.bridge = self.net._create_efficient_bridge(spec.node_1, spec.node_2,
+                                                                    spec.link_ip_address)
+                else:
+                    spec.bridge = self.net._create_quantum_bridge(
+                        spec.node_1, spec.node_2, spec.link_ip_address,
+                        bw=spec.kwargs["bw"], delay=spec.kwargs["delay"],
+                        simple=spec.kwargs["simple"], docker_bridge=spec.kwargs["docker_bridge"])
+        self.created = True
+
+    def build(self):
+        """
+        Builds all recorded links, returns bridges
+
+        PUBLIC METHOD
+        """
+        self.create()
+        with self._phase("start"):
+            if not self.net.started:
+                self.net.start()
+        with self._phase("configure"):
+            self._parallel(self._configure)
+        with self._phase("address"):
+            #Nodes can be shared between links, their addresses are set one by one
+            for spec in self.links:
+                if not spec.efficient:
+                    self.net._set_link_ips(spec.bridge, spec.node_1, spec.node_2,
+                                           spec.kwargs["node_1_ip"], spec.kwargs["node_2_ip"])
+        with self._phase("launch"):
+            self._parallel(self._launch)
+        with self._phase("ready"):
+            self._parallel(self._wait)
+        print(self.report())
+        return self.bridges()
+
+    def report(self):
+        """
+        Returns per phase timings as text
+
+        PUBLIC METHOD
+        """
+        lines = [f"*** Quantum topology: {len(self.links)} links"]
+        for phase in PHASES:
+            if phase in self.timings:
+                lines.append(f"    {phase:<10} {self.timings[phase]:8.3f}s")
+        lines.append(f"    {'total':<10} {sum(self.timings.values()):8.3f}s")
+        return "\n".join(lines)
+
+    def _configure(self, spec):
+        """
+        PRIVATE METHOD: called by build, in worker thread
+        """
+        if spec.efficient:
+            #C bridge is configured and started with the same invocation
+            return
+        self.net._run_batched(spec.bridge, self.net._quantum_bridge_commands(
+            spec.bridge, spec.node_1, spec.node_2, spec.link_ip_address,
+            spec.kwargs["node_1_ip"], spec.kwargs["node_2_ip"]))
+
+    def _launch(self, spec):
+        """
+        PRIVATE METHOD: called by build, in worker thread
+        """
+        kwargs = spec.kwargs
+        if spec.efficient:
+            self.net._run_batched(spec.bridge, self.net._efficient_bridge_commands(
+                spec.bridge, spec.node_1, spec.node_2, spec.link_ip_address,
+                kwargs["epr_frame_size"], kwargs["epr_buffer_size"], kwargs["sleep_time"],
+                kwargs["single_transmission_duration"], kwargs["classical_buffer_size"],
+                trace_records=kwargs["trace_records"], bidirectional=kwargs["bidirectional"], shared_epr_pool=kwargs["shared_epr_pool"]))
+            return
+        spec.bridge.cmd(self.net._start_command(
+            kwargs["docker_bridge"], epr_frame_size=kwargs["epr_frame_size"], simple=kwargs["simple"],
+            batched_frames=kwargs["batched_frames"],
+            queue_range=self.net._queue_range(kwargs["multi_queue"])))
+
+    def _wait(self, spec):
+        """
+        PRIVATE METHOD: called by build, in worker thread
+        """
+        if not spec.efficient:
+            self.net._wait_for_bridge(spec.kwargs["docker_bridge"], spec.bridge,
+                                      simple=spec.kwargs["simple"])
+
+    def _parallel(self, function):
+        """
+        Runs function for every link in the thread pool,
+        first exception is raised after all links were processed
+        """
+        if not self.links:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.links))) as executor:
+            futures = [executor.submit(function, spec) for spec in self.links]
+        for future in futures:
+            future.result()
+
+    def _phase(self, name):
+        return _Phase_timer(self.timings, name)
+
+
+class _Phase_timer:
+    """ _Phase_timer
+    private class, adds time spent in the with block to timings[name]
+    """
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *args):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + time.monotonic() - self.start
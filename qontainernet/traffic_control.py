@@ -0,0 +1,450 @@
+"""
+Traffic control of quantum and classical interfaces.
+Desired qdisc/class tree of an interface is rendered from its parameters,
+compared with the tree the kernel reports and only the difference is applied,
+all changes of all interfaces go through a single `tc -batch` invocation.
+Rates are kept in bytes per second and sizes in bytes, the same units `tc -j` reports.
+
+    trees = [quantum_tree("h1-s1", base_rate=1, peak_rate=2), quantum_tree("h2-s1", ...)]
+    TrafficControl(node).configure(trees)
+"""
+import json
+import shlex
+import subprocess
+
+
+#Kinds of qdiscs whose parameters can be changed without recreating them
+CHANGEABLE_KINDS = {"tbf", "bfifo", "pfifo"}
+#Kinds of qdiscs whose classes are managed, others (e.g. tbf) report internal classes
+CLASSFUL_KINDS = {"htb"}
+#Parameters tc reports rounded
+ROUNDED_PARAMS = {"rate", "ceil", "burst", "cburst"}
+
+RATE_UNITS = {"bit": 1, "kbit": 1000, "mbit": 1000**2, "gbit": 1000**3, "tbit": 1000**4}
+SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024**2, "gb": 1024**3}
+
+QDISC_MARKER = "### qdisc"
+CLASS_MARKER = "### class "
+
+
+class TrafficControlException(Exception):
+    pass
+
+
+def mbit_rate(rate):
+    """
+    Rate in Mbit/s -> bytes/s
+    """
+    return int(round(rate * 1000 * 1000 / 8))
+
+
+def mbit_size(size):
+    """
+    Size in Mbit (tc units, 1 Mbit = 1024*1024 bit) -> bytes
+    """
+    return int(round(size * 1024 * 1024 / 8))
+
+
+class Qdisc:
+    """ Qdisc
+    params: name -> value compared with the kernel state and rendered as tc arguments
+    """
+
+    def __init__(self, kind, handle, parent="root", **params):
+        self.kind = kind
+        self.handle = handle
+        self.parent = parent
+        self.params = params
+
+    def spec(self):
+        location = "root" if self.parent == "root" else f"parent {self.parent}"
+        return f"{location} handle {self.handle} {self.kind}{render_params(self.kind, self.params)}"
+
+
+class TcClass:
+    """ TcClass
+    Class of a classful qdisc (htb)
+    """
+
+    def __init__(self, classid, parent, kind="htb", **params):
+        self.classid = classid
+        self.parent = parent
+        self.kind = kind
+        self.params = params
+
+    def spec(self):
+        return f"parent {self.parent} classid {self.classid} {self.kind}{render_params(self.kind, self.params)}"
+
+
+class InterfaceTree:
+    """ InterfaceTree
+    Desired traffic control of one interface:
+    root qdisc, classes (parents before children) and qdiscs attached to classes
+    """
+
+    def __init__(self, dev, root, classes=None, qdiscs=None):
+        self.dev = dev
+        self.root = root
+        self.classes = classes or []
+        self.qdiscs = qdiscs or []
+
+
+class InterfaceState:
+    """ InterfaceState
+    Traffic control of one interface as reported by tc
+    """
+
+    def __init__(self, dev, root=None, classes=None, qdiscs=None):
+        self.dev = dev
+        self.root = root
+        self.classes = classes or {}
+        self.qdiscs = qdiscs or {}
+
+
+def render_params(kind, params):
+    """
+    Renders params as tc arguments, rates are given in bytes/s and sizes in bytes
+    """
+    args = ""
+    for name, value in params.items():
+        if name in ("rate", "ceil"):
+            args += f" {name} {value}bps"
+        elif name in ("burst", "cburst") or (name == "limit" and kind == "bfifo"):
+            args += f" {name} {value}b"
+        elif name == "latency":
+            args += f" latency {value}ms"
+        else:
+            args += f" {name} {value}"
+    return args
+
+
+def quantum_tree(dev, base_rate=1, peak_rate=2, e_buffer_size=10, c_buffer_size=125000):
+    """
+    Quantum interface: EPR buffer is the burst of htb class, classical buffer is bfifo
+    base_rate, peak_rate: Mbit/s
+    e_buffer_size: Mbit
+    c_buffer_size: bytes
+    """
+    return InterfaceTree(
+        dev,
+        Qdisc("htb", "1:", default=1),
+        classes=[TcClass("1:1", "1:", rate=mbit_rate(base_rate), ceil=mbit_rate(peak_rate),
+                         burst=mbit_size(e_buffer_size))],
+        qdiscs=[Qdisc("bfifo", "2:", parent="1:1", limit=int(c_buffer_size))],
+    )
+
+
+def classical_tree(dev, base_rate=0.5, peak_rate=1.5, buffer_size=5):
+    """
+    Classical interface with htb class
+    base_rate, peak_rate: Mbit/s
+    buffer_size: Mbit
+    Default class 2 does not exist (as in the original setup), so unclassified
+    traffic is not shaped by class 1:6
+    """
+    return InterfaceTree(
+        dev,
+        Qdisc("htb", "1:", default=2),
+        classes=[TcClass("1:6", "1:", rate=mbit_rate(base_rate), ceil=mbit_rate(peak_rate),
+                         burst=mbit_size(buffer_size))],
+    )
+
+
+def token_bucket_tree(dev, rate=0.4, burst=1024 * 1024, latency=10):
+    """
+    Interface shaped with tbf only
+    rate: Mbit/s
+    burst: bytes
+    latency: ms
+    """
+    return InterfaceTree(dev, Qdisc("tbf", "1:", rate=mbit_rate(rate), burst=int(burst), latency=latency))
+
+
+def normalize_handle(handle):
+    """
+    "1:0" -> "1:", "1:1" stays
+    """
+    major, _, minor = handle.partition(":")
+    if minor in ("", "0"):
+        return f"{major}:"
+    return f"{major}:{minor}"
+
+
+def parse_number(value):
+    """
+    "0x1" -> 1, "10" -> 10.0, other strings stay
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value, 16) if value.startswith("0x") else float(value)
+    except ValueError:
+        return value
+
+
+def parse_unit(value, units):
+    """
+    "2Mbit" -> 2000000 with RATE_UNITS, "1280Kb" -> 1310720 with SIZE_UNITS
+    """
+    value = value.split("/")[0].lower()
+    for unit in sorted(units, key=len, reverse=True):
+        if value.endswith(unit):
+            return float(value[:-len(unit)]) * units[unit]
+    return float(value)
+
+
+def parse_class_line(line):
+    """
+    Parses class in tc text output, iproute2 does not print htb classes as json:
+    class htb 1:1 root leaf 2: prio 0 rate 1Mbit ceil 2Mbit burst 1280Kb cburst 1600b
+    """
+    tokens = line.split()
+    if len(tokens) < 3 or tokens[0] != "class":
+        return None
+    tc_class = TcClass(normalize_handle(tokens[2]), None, kind=tokens[1])
+    for i, token in enumerate(tokens[3:-1], start=3):
+        value = tokens[i + 1]
+        if token == "root":
+            tc_class.parent = tc_class.classid.split(":")[0] + ":"
+        elif token == "parent":
+            tc_class.parent = normalize_handle(value)
+        elif token in ("rate", "ceil"):
+            tc_class.params[token] = parse_unit(value, RATE_UNITS) / 8
+        elif token in ("burst", "cburst"):
+            tc_class.params[token] = parse_unit(value, SIZE_UNITS)
+    return tc_class
+
+
+def parse_class_json(entry):
+    tc_class = TcClass(normalize_handle(entry["handle"]), None, kind=entry.get("class"))
+    if entry.get("root"):
+        tc_class.parent = tc_class.classid.split(":")[0] + ":"
+    else:
+        tc_class.parent = normalize_handle(entry.get("parent", ""))
+    options = dict(entry)
+    options.update(entry.get("options", {}))
+    for name in ("rate", "ceil", "burst", "cburst"):
+        if name in options:
+            tc_class.params[name] = parse_number(options[name])
+    return tc_class
+
+
+def parse_classes(output):
+    """
+    Parses output of `tc -j class show dev <dev>`, json or text
+    """
+    output = output.strip()
+    if output.startswith("["):
+        return [parse_class_json(entry) for entry in json.loads(output)]
+    return [c for c in (parse_class_line(line) for line in output.splitlines()) if c is not None]
+
+
+def parse_state(qdisc_output, class_outputs):
+    """
+    Builds interface states from `tc -j qdisc show` (all interfaces)
+    and `tc -j class show dev <dev>` outputs (dev -> output)
+    """
+    states = {dev: InterfaceState(dev) for dev in class_outputs}
+    qdisc_output = qdisc_output.strip()
+    for entry in json.loads(qdisc_output) if qdisc_output else []:
+        dev = entry.get("dev")
+        if dev not in states:
+            continue
+        qdisc = Qdisc(entry["kind"], normalize_handle(entry.get("handle", "0:")),
+                      "root" if entry.get("root") else entry.get("parent"),
+                      **{name: parse_number(value) for name, value in entry.get("options", {}).items()
+                         if isinstance(value, (int, float, str))})
+        if qdisc.parent == "root":
+            states[dev].root = qdisc
+        elif qdisc.parent is not None and not qdisc.parent.startswith("ffff:"):
+            #ingress/clsact qdiscs are not part of the tree
+            states[dev].qdiscs[normalize_handle(qdisc.parent)] = qdisc
+    for dev, output in class_outputs.items():
+        for tc_class in parse_classes(output):
+            if tc_class.kind in CLASSFUL_KINDS:
+                states[dev].classes[tc_class.classid] = tc_class
+    return states
+
+
+def close_enough(name, desired, current):
+    """
+    tc rounds rates and sizes it reports (e.g. 1280Kb),
+    such values within 0.2% (at least 16) are equal
+    """
+    if isinstance(desired, str) or isinstance(current, str):
+        return str(desired) == str(current)
+    if name in ROUNDED_PARAMS:
+        return abs(desired - current) <= max(16, 0.002 * abs(desired))
+    return desired == current
+
+
+def params_match(desired, current):
+    """
+    Only parameters of the desired tree are compared,
+    latency is not reported the way it's configured
+    """
+    for name, value in desired.params.items():
+        if name == "latency":
+            continue
+        if name not in current.params or not close_enough(name, value, current.params[name]):
+            return False
+    return True
+
+
+def class_depth(classes, classid):
+    depth = 0
+    while classid in classes and classes[classid].parent in classes:
+        classid = classes[classid].parent
+        depth += 1
+    return depth
+
+
+def diff(tree, state):
+    """
+    Returns tc batch commands (without "tc") that turn state into tree,
+    empty list if the interface is already configured
+    """
+    dev = tree.dev
+    commands = []
+    current_root = state.root
+    current_classes = dict(state.classes)
+    current_qdiscs = dict(state.qdiscs)
+
+    if current_root is None or current_root.handle == "0:":
+        #Default root qdisc (noqueue, pfifo_fast, mq) can't be deleted, it's replaced
+        commands.append(f"qdisc replace dev {dev} {tree.root.spec()}")
+        current_classes, current_qdiscs = {}, {}
+    elif current_root.kind != tree.root.kind or current_root.handle != tree.root.handle:
+        commands.append(f"qdisc del dev {dev} root")
+        commands.append(f"qdisc add dev {dev} {tree.root.spec()}")
+        current_classes, current_qdiscs = {}, {}
+    elif not params_match(tree.root, current_root):
+        if tree.root.kind in CHANGEABLE_KINDS:
+            commands.append(f"qdisc change dev {dev} {tree.root.spec()}")
+        else:
+            #e.g. htb can't change its default class
+            commands.append(f"qdisc del dev {dev} root")
+            commands.append(f"qdisc add dev {dev} {tree.root.spec()}")
+            current_classes, current_qdiscs = {}, {}
+
+    desired_classes = {tc_class.classid: tc_class for tc_class in tree.classes}
+    desired_qdiscs = {qdisc.parent: qdisc for qdisc in tree.qdiscs}
+
+    for parent in sorted(set(current_qdiscs) - set(desired_qdiscs)):
+        if parent in current_classes:
+            commands.append(f"qdisc del dev {dev} parent {parent}")
+    for classid in sorted(set(current_classes) - set(desired_classes),
+                          key=lambda classid: -class_depth(current_classes, classid)):
+        commands.append(f"class del dev {dev} classid {classid}")
+
+    for tc_class in tree.classes:
+        current = current_classes.get(tc_class.classid)
+        if current is None:
+            commands.append(f"class add dev {dev} {tc_class.spec()}")
+        elif current.parent != tc_class.parent or not params_match(tc_class, current):
+            commands.append(f"class change dev {dev} {tc_class.spec()}")
+
+    for qdisc in tree.qdiscs:
+        current = current_qdiscs.get(qdisc.parent)
+        if current is None:
+            commands.append(f"qdisc add dev {dev} {qdisc.spec()}")
+        elif current.kind != qdisc.kind or current.handle != qdisc.handle:
+            commands.append(f"qdisc replace dev {dev} {qdisc.spec()}")
+        elif not params_match(qdisc, current):
+            commands.append(f"qdisc change dev {dev} {qdisc.spec()}")
+    return commands
+
+
+def query_script(devs):
+    """
+    Shell script printing qdiscs of all interfaces and classes of devs
+    """
+    lines = [f"echo '{QDISC_MARKER}'", "tc -j qdisc show"]
+    for dev in devs:
+        lines.append(f"echo {shlex.quote(CLASS_MARKER + dev)}")
+        lines.append(f"tc -j class show dev {shlex.quote(dev)} 2>/dev/null")
+    return " ; ".join(lines)
+
+
+def parse_query_output(output):
+    """
+    Splits output of query_script into qdisc output and dev -> class output
+    """
+    qdisc_lines = []
+    class_lines = {}
+    current = None
+    for line in output.splitlines():
+        if line.strip() == QDISC_MARKER:
+            current = qdisc_lines
+        elif line.startswith(CLASS_MARKER):
+            current = class_lines.setdefault(line[len(CLASS_MARKER):].strip(), [])
+        elif current is not None:
+            current.append(line)
+    return "\n".join(qdisc_lines), {dev: "\n".join(lines) for dev, lines in class_lines.items()}
+
+
+def batch_script(commands):
+    """
+    Shell script applying commands with one tc invocation
+    """
+    quoted = " ".join(shlex.quote(command) for command in commands)
+    return f"printf '%s\\n' {quoted} | tc -batch - 2>&1"
+
+
+class TrafficControl:
+    """ TrafficControl
+    -> Configures traffic control of interfaces of a node (or of the host if node is None)
+    -> Current state is read with one shell invocation, changes are applied with one `tc -batch`
+    """
+
+    def __init__(self, node=None):
+        self.node = node
+
+    def state(self, devs):
+        """
+        Returns dev -> InterfaceState
+
+        PUBLIC METHOD
+        """
+        qdisc_output, class_outputs = parse_query_output(self._shell(query_script(devs)))
+        try:
+            return parse_state(qdisc_output, class_outputs)
+        except ValueError as e:
+            raise TrafficControlException(f"Could not parse tc output: {e}")
+
+    def plan(self, trees):
+        """
+        Returns tc batch commands needed to configure trees
+
+        PUBLIC METHOD
+        """
+        states = self.state([tree.dev for tree in trees])
+        commands = []
+        for tree in trees:
+            commands.extend(diff(tree, states[tree.dev]))
+        return commands
+
+    def configure(self, trees):
+        """
+        Applies difference of trees to the interfaces,
+        returns applied commands
+
+        PUBLIC METHOD
+        """
+        commands = self.plan(trees)
+        if not commands:
+            return commands
+        output = self._shell(batch_script(commands))
+        if "Command failed" in output:
+            raise TrafficControlException(output.strip())
+        return commands
+
+    def _shell(self, script):
+        """
+        PRIVATE METHOD: runs script on the node or with sudo on the host
+        """
+        if self.node is not None:
+            return self.node.cmd(script)
+        result = subprocess.run(["sudo", "sh", "-c", script], stdout=subprocess.PIPE,
+                                universal_newlines=True)
+        return result.stdout